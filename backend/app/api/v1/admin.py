@@ -3,11 +3,28 @@ import time
 import csv
 import io
 
-from fastapi import APIRouter, Query, Request
+from fastapi import APIRouter, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
 
+from app.api.v1.chat import handle_chat
+from app.core.config import settings
 from app.core.logging import log_event
-from app.schemas.metrics import MetricsSummaryResponse, PaperKpiResponse
+from app.schemas.metrics import (
+    AnswerCachePurgeResponse,
+    AnswerCacheResponse,
+    AnswerWarmupResponse,
+    BulkheadStatesResponse,
+    CircuitBreakerStatesResponse,
+    LlmUsageResponse,
+    MetricsSummaryResponse,
+    PaperKpiResponse,
+    UpstreamHostStatsResponse,
+)
+from app.services import answer_cache
+from app.services import answer_warmup
+from app.services import bulkhead
+from app.services import circuit_breaker
+from app.services import http_client
 from app.services import metrics as metrics_service
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
@@ -114,3 +131,96 @@ def metrics_paper_kpi(
         cost_ms=f"{elapsed_ms:.2f}",
     )
     return PaperKpiResponse(**payload)
+
+
+@router.get("/metrics/llm-usage", response_model=LlmUsageResponse)
+def metrics_llm_usage(
+    request: Request,
+    days: int | None = Query(default=None, ge=1, le=365, description="仅统计最近 N 天"),
+) -> LlmUsageResponse:
+    started = time.perf_counter()
+    request_id = getattr(request.state, "request_id", "")
+    payload = metrics_service.get_llm_usage_summary(days=days)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    log_event(
+        logger,
+        "info",
+        "metrics_llm_usage_handled",
+        rid=request_id,
+        days=days,
+        total_calls=payload["total_calls"],
+        cost_ms=f"{elapsed_ms:.2f}",
+    )
+    return LlmUsageResponse(**payload)
+
+
+@router.get("/upstreams/http", response_model=UpstreamHostStatsResponse)
+def upstream_http_stats() -> UpstreamHostStatsResponse:
+    return UpstreamHostStatsResponse(hosts=http_client.get_host_stats())
+
+
+@router.get("/upstreams/breakers", response_model=CircuitBreakerStatesResponse)
+def upstream_breaker_states() -> CircuitBreakerStatesResponse:
+    return CircuitBreakerStatesResponse(enabled=settings.circuit_breaker_enabled, breakers=circuit_breaker.get_states())
+
+
+@router.post("/upstreams/breakers/reset", response_model=CircuitBreakerStatesResponse)
+def reset_upstream_breakers(
+    request: Request,
+    name: str | None = Query(default=None, description="只重置指定上游；为空时全部重置"),
+) -> CircuitBreakerStatesResponse:
+    if name is not None and name not in circuit_breaker.UPSTREAMS:
+        raise HTTPException(status_code=404, detail=f"unknown upstream: {name}")
+    circuit_breaker.reset(name)
+    log_event(logger, "info", "circuit_breaker_reset", rid=getattr(request.state, "request_id", ""), upstream=name or "all")
+    return upstream_breaker_states()
+
+
+@router.get("/upstreams/bulkheads", response_model=BulkheadStatesResponse)
+def upstream_bulkhead_states() -> BulkheadStatesResponse:
+    return BulkheadStatesResponse(enabled=settings.bulkhead_enabled, bulkheads=bulkhead.get_states())
+
+
+@router.get("/answer-cache", response_model=AnswerCacheResponse)
+def answer_cache_state(limit: int = Query(default=100, ge=0, le=1000, description="最多列出的条目数")) -> AnswerCacheResponse:
+    return AnswerCacheResponse(**answer_cache.get_stats(), items=answer_cache.list_entries(limit))
+
+
+@router.post("/answer-cache/{key}/pin", response_model=AnswerCacheResponse)
+def pin_answer_cache_entry(
+    key: str,
+    request: Request,
+    pinned: bool = Query(default=True, description="false 表示取消置顶"),
+) -> AnswerCacheResponse:
+    if not answer_cache.pin(key, pinned):
+        raise HTTPException(status_code=404, detail=f"unknown answer cache key: {key}")
+    log_event(logger, "info", "answer_cache_pinned", rid=getattr(request.state, "request_id", ""), key=key, pinned=pinned)
+    return answer_cache_state(limit=100)
+
+
+@router.delete("/answer-cache", response_model=AnswerCachePurgeResponse)
+def purge_answer_cache(
+    request: Request,
+    key: str | None = Query(default=None, description="只清除指定条目；为空时清除全部"),
+    include_pinned: bool = Query(default=False, description="清除全部时是否连置顶条目一起清除"),
+) -> AnswerCachePurgeResponse:
+    purged = answer_cache.purge(key, include_pinned=include_pinned)
+    if key is not None and not purged:
+        raise HTTPException(status_code=404, detail=f"unknown answer cache key: {key}")
+    log_event(
+        logger, "info", "answer_cache_purged", rid=getattr(request.state, "request_id", ""), key=key or "all", purged=purged
+    )
+    return AnswerCachePurgeResponse(purged=purged)
+
+
+@router.get("/answer-cache/warmup", response_model=AnswerWarmupResponse)
+def answer_warmup_state() -> AnswerWarmupResponse:
+    return AnswerWarmupResponse(**answer_warmup.get_state())
+
+
+@router.post("/answer-cache/warmup", response_model=AnswerWarmupResponse, status_code=202)
+async def start_answer_warmup(request: Request) -> AnswerWarmupResponse:
+    if not answer_warmup.start(handle_chat):
+        raise HTTPException(status_code=409, detail="answer warmup already running")
+    log_event(logger, "info", "answer_warmup_started", rid=getattr(request.state, "request_id", ""))
+    return answer_warmup_state()
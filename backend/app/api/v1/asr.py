@@ -1,17 +1,19 @@
 import base64
 from pathlib import Path
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import FileResponse
 
 from app.core.config import settings
 from app.schemas.asr import AsrTranscribeRequest, AsrTranscribeResponse
 from app.services import asr as asr_service
+from app.services import bulkhead
 
 router = APIRouter(prefix="/api/asr", tags=["asr"])
 
 
-@router.post("/transcribe", response_model=AsrTranscribeResponse)
+# 识别接口是同步处理函数：先在事件循环里按 asr 舱壁排队准入，满载直接 429/503，不占用线程池。
+@router.post("/transcribe", response_model=AsrTranscribeResponse, dependencies=[Depends(bulkhead.admission("asr"))])
 def transcribe(req: AsrTranscribeRequest) -> AsrTranscribeResponse:
     raw = (req.audio_base64 or "").strip()
     if not raw:
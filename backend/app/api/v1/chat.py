@@ -1,16 +1,29 @@
+import asyncio
 import logging
 import time
 import json
+import uuid
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
 
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
 from app.core.config import settings
 from app.core.logging import log_event
-from app.schemas.chat import ChatRequest, ChatResponse
+from app.schemas.chat import AnswerJson, ChatBatchRequest, ChatRequest, ChatResponse, SuggestedQuestionsResponse
+from app.services import answer_cache
 from app.services import chat as chat_service
+from app.services import deadline
+from app.services import history_summary
+from app.services import http_client
 from app.services import knowledge as knowledge_service
+from app.services import llm_cache
+from app.services import llm_hedge
+from app.services import llm_usage
 from app.services import metrics as metrics_service
+from app.services import model_router
 from app.services import runtime_config as runtime_config_service
 from app.services import session_store
 from app.services import tts as tts_service
@@ -31,55 +44,279 @@ def _should_generate_tts(req: ChatRequest, default_enabled: bool) -> bool:
     return req.enable_tts if req.enable_tts is not None else default_enabled
 
 
-def _search_knowledge_for_chat(query: str, top_k: int, req: ChatRequest, runtime_rerank: bool):
+async def _search_knowledge_for_chat(query: str, top_k: int, req: ChatRequest, runtime_rerank: bool):
     if req.use_rerank is None:
-        return knowledge_service.search(query, top_k)
-    return knowledge_service.search(query, top_k, use_rerank=runtime_rerank)
+        return await knowledge_service.search_async(query, top_k)
+    return await knowledge_service.search_async(query, top_k, use_rerank=runtime_rerank)
+
+
+async def _synthesize_public_audio(text: str, emotion: str) -> str | None:
+    audio_url = await tts_service.synthesize_async(text, emotion=emotion)
+    return await tts_service.public_audio_url_async(audio_url)
+
+
+# 剩余预算低于此值时 /chat 不再同步等待 TTS，改为返回后台合成任务 id。
+_TTS_SYNC_MIN_SEC = 2.0
+
+
+def _deadline_meta(request_deadline: deadline.Deadline | None) -> dict[str, object]:
+    return request_deadline.summary() if request_deadline is not None else {}
+
+
+def _answer_cache_key(
+    req: ChatRequest,
+    history: list[dict[str, str]],
+    analysis: chat_service.QueryAnalysis,
+    answer_evidence: list[dict[str, object]],
+) -> str | None:
+    """只有无历史且有本地依据的请求才走整条回答缓存；生成参数按生效值并入模型档位。"""
+    if not settings.answer_cache_enabled or history or not answer_evidence:
+        return None
+    runtime = runtime_config_service.get_runtime_config()
+    variant = "|".join(
+        [
+            req.model_variant,
+            str(chat_service._effective_temperature(req, runtime.temperature)),
+            str(chat_service._effective_max_tokens(req, runtime.max_tokens)),
+            str(chat_service._effective_citation_strict(req, runtime.strict_citation_check)),
+        ]
+    )
+    return answer_cache.cache_key(
+        req.text,
+        analysis.tags,
+        [str(item.get("chunk_id") or "") for item in answer_evidence],
+        variant,
+        knowledge_service.corpus_version(),
+    )
+
+
+def _expansion_variant(req: ChatRequest) -> str:
+    # 检索扩展发生在路由之前；auto 时用快速模型（扩展本身是轻量任务）。
+    return "fast" if req.model_variant == "auto" else req.model_variant
+
+
+def _answer_cacheable(answer_trace: dict[str, str], llm_hedge_stats: dict[str, object]) -> bool:
+    # 离线模板、护栏回答不缓存；对冲时快速模型胜出的回答也不记到默认模型名下。
+    return answer_trace["source"] == "llm" and not llm_hedge_stats["hedge_won"]
+
+
+def _citations_event(chunk_ids: list[str], evidence: list[dict[str, object]]) -> dict[str, object]:
+    citations = chat_service._pick_citations_by_ids(evidence, chunk_ids)
+    return {"type": "citations", "chunk_ids": chunk_ids, "citations": [citation.model_dump() for citation in citations]}
+
+
+class _SpeculativeConclusionTts:
+    """非流式 /chat 的提前合成：LLM 输出的 conclusion 字段一闭合就开始 TTS，与其余字段的生成重叠。
+
+    最终结论或情绪与提前合成的不一致（护栏改写、情绪字段不同）时丢弃，按原流程重新合成。
+    """
+
+    def __init__(self, emotion: str) -> None:
+        self.emotion = emotion
+        self.text = ""
+        self._task: "asyncio.Task[str | None] | None" = None
+        self._started = 0.0
+        self._finished: float | None = None
+
+    def start(self, conclusion: str) -> None:
+        text = (conclusion or "").strip()
+        if self._task is not None or not text:
+            return
+        self.text = text
+        self._started = time.perf_counter()
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> str | None:
+        try:
+            return await _synthesize_public_audio(self.text, self.emotion)
+        finally:
+            self._finished = time.perf_counter()
+
+    def matches(self, conclusion: str, emotion: str) -> bool:
+        return self._task is not None and conclusion.strip() == self.text and emotion == self.emotion
+
+    async def result(self) -> str | None:
+        return None if self._task is None else await self._task
+
+    def overlap_ms(self, answer_done: float) -> float:
+        """与回答生成重叠的合成时长，即非流式路径因提前合成省下的端到端耗时。"""
+        if self._task is None:
+            return 0.0
+        end = answer_done if self._finished is None else min(self._finished, answer_done)
+        return max(0.0, (end - self._started) * 1000)
+
+    def cancel(self) -> None:
+        task = self._task
+        if task is None:
+            return
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            # 不再使用的结果也要取走异常，避免 "exception was never retrieved" 警告。
+            task.exception()
+
+
+class _SentenceAudioPipeline:
+    """流式回答的逐句 TTS：每句完成即提交合成（限并发），按句序输出 audio 事件。"""
+
+    def __init__(self, emotion: str, request_id: str, started: float) -> None:
+        self.emotion = emotion
+        self._request_id = request_id
+        self._started = started
+        self._semaphore = asyncio.Semaphore(max(1, settings.tts_stream_concurrency))
+        self._pending: deque[tuple[int, str, asyncio.Task[str | None]]] = deque()
+        self._next_seq = 0
+        self.emitted = 0
+        self.first_audio_ms: float | None = None
+
+    def submit(self, sentence: str) -> None:
+        task = asyncio.create_task(self._synthesize(sentence))
+        self._pending.append((self._next_seq, sentence, task))
+        self._next_seq += 1
+
+    @property
+    def submitted(self) -> int:
+        return self._next_seq
+
+    def ready_events(self) -> list[dict[str, object]]:
+        # 只按顺序取出队首已完成的句子，后面的句子先合成好也要等前一句发出。
+        events: list[dict[str, object]] = []
+        while self._pending and self._pending[0][2].done():
+            events.extend(self._to_event(*self._pending.popleft()))
+        return events
+
+    async def drain_events(self) -> AsyncIterator[dict[str, object]]:
+        while self._pending:
+            seq, sentence, task = self._pending.popleft()
+            await asyncio.wait([task])
+            for event in self._to_event(seq, sentence, task):
+                yield event
+
+    def cancel(self) -> None:
+        while self._pending:
+            self._pending.popleft()[2].cancel()
+
+    async def _synthesize(self, sentence: str) -> str | None:
+        # final 之后的逐句语音不受请求预算约束（task 复制了上下文，这里只解除本 task 的预算）。
+        deadline.clear()
+        async with self._semaphore:
+            return await _synthesize_public_audio(sentence, self.emotion)
+
+    def _to_event(self, seq: int, sentence: str, task: "asyncio.Task[str | None]") -> list[dict[str, object]]:
+        if task.cancelled() or task.exception() is not None:
+            log_event(logger, "warning", "chat_stream_tts_failed", rid=self._request_id, seq=seq)
+            return []
+        audio_url = task.result()
+        if not audio_url:
+            return []
+        if self.first_audio_ms is None:
+            self.first_audio_ms = (time.perf_counter() - self._started) * 1000
+        self.emitted += 1
+        return [{"type": "audio", "seq": seq, "text": sentence, "audio_url": audio_url}]
 
 
 @router.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest, request: Request) -> ChatResponse:
+async def chat(req: ChatRequest, request: Request) -> ChatResponse:
+    return await handle_chat(req, getattr(request.state, "request_id", ""))
+
+
+@router.get("/chat/suggestions", response_model=SuggestedQuestionsResponse)
+def chat_suggestions() -> SuggestedQuestionsResponse:
+    return SuggestedQuestionsResponse(questions=settings.suggested_question_list())
+
+
+async def handle_chat(
+    req: ChatRequest,
+    request_id: str,
+    endpoint: str = "chat",
+    stage_ms: dict[str, float] | None = None,
+) -> ChatResponse:
+    """非流式问答的完整流程；预热任务以 endpoint="chat_warmup"、批量问答以 "chat_batch" 调用，指标与真实请求分开统计。
+
+    传入 stage_ms 时各阶段耗时写入其中，供批量问答逐条返回。
+    """
     started = time.perf_counter()
-    request_id = getattr(request.state, "request_id", "")
-    stage_ms: dict[str, float] = {}
+    stage_ms = {} if stage_ms is None else stage_ms
+    llm_cache_stats = llm_cache.begin_request_stats()
+    llm_hedge_stats = llm_hedge.begin_request_stats()
+    llm_usage_stats = llm_usage.begin_request_stats()
+    answer_trace = chat_service.begin_answer_trace()
+    request_deadline = deadline.start(settings.chat_deadline_sec, settings.chat_deadline_answer_reserve_sec)
+    analysis = chat_service.analyze_query(req.text)
+    speculative_tts: _SpeculativeConclusionTts | None = None
     try:
         # 1. 获取历史记录
         stage_started = time.perf_counter()
-        history = session_store.get_chat_history(req.session_id)
+        history = await session_store.get_chat_history_async(req.session_id)
+        # 改写与回答只看“滚动摘要 + 最近一轮”，history 本身仍按原样追加保存。
+        context = await history_summary.load_context(req.session_id, history)
         stage_ms["history"] = (time.perf_counter() - stage_started) * 1000
         
-        # 2. Query Rewrite / Retrieval Query Expansion
-        stage_started = time.perf_counter()
-        search_text = chat_service.build_retrieval_query(history, req.text, req.model_variant)
-        stage_ms["rewrite"] = (time.perf_counter() - stage_started) * 1000
-        
-        # 3. 检索时使用重写/扩展后的 search_text
+        # 2-3. Query Rewrite 后立即用规则扩展检索，LLM 检索扩展并行进行（不再阻塞检索）
         runtime = runtime_config_service.get_runtime_config()
         top_k = _effective_top_k(req, runtime.chat_top_k)
         use_rerank = _effective_rerank(req, runtime.enable_rerank)
         stage_started = time.perf_counter()
-        evidence = _search_knowledge_for_chat(search_text, top_k, req, use_rerank)
+        retrieval = await chat_service.retrieve_evidence_async(
+            context,
+            req.text,
+            lambda query: _search_knowledge_for_chat(query, top_k, req, use_rerank),
+            _expansion_variant(req),
+        )
+        search_text = retrieval.query
+        evidence = retrieval.evidence
         answer_evidence = chat_service.select_answer_evidence(evidence)
-        stage_ms["search"] = (time.perf_counter() - stage_started) * 1000
+        stage_ms["rewrite"] = retrieval.rewrite_ms
+        stage_ms["search"] = (time.perf_counter() - stage_started) * 1000 - retrieval.rewrite_ms
+        route = model_router.route(req.model_variant, analysis, history, evidence, runtime)
+        req = req.model_copy(update={"model_variant": route.variant})
         
-        # 4. 回答时带上 context
+        # 4. 回答时带上 context；需要语音时结论一生成就提前合成。高频问题直接复用缓存的整条回答与语音。
         stage_started = time.perf_counter()
-        answer = chat_service.build_answer(req, answer_evidence, history)
-        stage_ms["answer"] = (time.perf_counter() - stage_started) * 1000
+        cache_key = _answer_cache_key(req, context, analysis, answer_evidence)
+        cached = answer_cache.get(cache_key)
+        if _should_generate_tts(req, runtime.enable_tts):
+            speculative_tts = _SpeculativeConclusionTts(runtime.default_emotion)
+        if cached is not None:
+            answer = AnswerJson(**cached["answer"])
+        elif speculative_tts is not None:
+            answer = await chat_service.build_answer_async(
+                req, answer_evidence, context, analysis=analysis, on_conclusion=speculative_tts.start
+            )
+        else:
+            answer = await chat_service.build_answer_async(req, answer_evidence, context, analysis=analysis)
+        answer_done = time.perf_counter()
+        stage_ms["answer"] = (answer_done - stage_started) * 1000
         
         # 5. 更新并保存新的历史记录
         history.append({"role": "user", "content": req.text})
         history.append({"role": "assistant", "content": answer.conclusion})
         stage_started = time.perf_counter()
-        session_store.save_chat_history(req.session_id, history)
+        turn = await session_store.save_chat_history_async(req.session_id, history)
         stage_ms["history_save"] = (time.perf_counter() - stage_started) * 1000
+        if endpoint == "chat":
+            history_summary.schedule(req.session_id, turn, req.text, answer.conclusion)
 
         stage_started = time.perf_counter()
-        audio_url = None
-        if _should_generate_tts(req, runtime.enable_tts):
+        audio_url = cached["audio_url"] if cached is not None and speculative_tts is not None else None
+        tts_job_id = None
+        tts_overlap_ms = 0.0
+        tts_speculative_hit = False
+        if speculative_tts is not None and audio_url is None:
             try:
-                audio_url = tts_service.synthesize(answer.conclusion, emotion=answer.emotion)
-                audio_url = tts_service.public_audio_url(audio_url)
+                if speculative_tts.matches(answer.conclusion, answer.emotion):
+                    tts_speculative_hit = True
+                    tts_overlap_ms = speculative_tts.overlap_ms(answer_done)
+                    audio_url = await speculative_tts.result()
+                else:
+                    speculative_tts.cancel()
+                    if deadline.allows("tts", _TTS_SYNC_MIN_SEC, keep_reserve=False):
+                        audio_url = await _synthesize_public_audio(answer.conclusion, answer.emotion)
+                    else:
+                        # 预算不够同步合成：先返回文本，语音转后台任务，前端凭 job id 轮询。
+                        tts_job_id = await asyncio.to_thread(
+                            tts_service.start_synthesize_job, answer.conclusion, answer.emotion
+                        )
             except Exception:
                 log_event(
                     logger,
@@ -89,6 +326,14 @@ def chat(req: ChatRequest, request: Request) -> ChatResponse:
                     session_id=req.session_id,
                 )
         stage_ms["tts"] = (time.perf_counter() - stage_started) * 1000
+        # 新生成的回答入缓存；命中但当时没有语音的条目补上本次合成的语音。
+        if cache_key is not None and (
+            (cached is None and _answer_cacheable(answer_trace, llm_hedge_stats))
+            or (cached is not None and audio_url and not cached["audio_url"])
+        ):
+            await asyncio.to_thread(
+                answer_cache.put, cache_key, req.text, req.model_variant, answer.model_dump(), audio_url
+            )
         elapsed_ms = (time.perf_counter() - started) * 1000
         log_event(
             logger,
@@ -100,10 +345,14 @@ def chat(req: ChatRequest, request: Request) -> ChatResponse:
             evidence=len(evidence),
             answer_evidence=len(answer_evidence),
             citations=len(answer.citations),
+            answer_cache_hit=cached is not None,
             audio_ready=bool(audio_url),
+            tts_job=bool(tts_job_id),
             model_variant=req.model_variant,
+            route_reason=route.reason,
             rewrite_changed=search_text != req.text,
             rewrite_len=len(search_text),
+            retrieval_expansion=retrieval.expansion,
             top_k=top_k,
             use_rerank=use_rerank,
             stage_history_ms=f"{stage_ms.get('history', 0.0):.2f}",
@@ -112,10 +361,13 @@ def chat(req: ChatRequest, request: Request) -> ChatResponse:
             stage_answer_ms=f"{stage_ms.get('answer', 0.0):.2f}",
             stage_history_save_ms=f"{stage_ms.get('history_save', 0.0):.2f}",
             stage_tts_ms=f"{stage_ms.get('tts', 0.0):.2f}",
+            tts_overlap_ms=f"{tts_overlap_ms:.2f}",
+            degraded_stages=",".join(request_deadline.degraded) if request_deadline else "",
             cost_ms=f"{elapsed_ms:.2f}",
         )
-        metrics_service.record_api_call(
-            endpoint="chat",
+        await asyncio.to_thread(
+            metrics_service.record_api_call,
+            endpoint=endpoint,
             ok=True,
             status_code=200,
             latency_ms=elapsed_ms,
@@ -135,15 +387,38 @@ def chat(req: ChatRequest, request: Request) -> ChatResponse:
                 ),
                 "audio_ready": bool(audio_url),
                 "rewrite_changed": search_text != req.text,
+                "retrieval_expansion": retrieval.expansion,
+                "llm_cache_hits": int(llm_cache_stats["hits"]),
+                "llm_cache_misses": int(llm_cache_stats["misses"]),
+                "llm_cache_saved_ms": round(llm_cache_stats["saved_ms"], 2),
+                "llm_hedged": bool(llm_hedge_stats["hedged"]),
+                "llm_hedge_won": bool(llm_hedge_stats["hedge_won"]),
+                "llm_winner_model": llm_hedge_stats["winner"] or None,
+                "llm_calls": llm_usage_stats["calls"],
+                "llm_prompt_tokens": llm_usage_stats["prompt_tokens"],
+                "llm_completion_tokens": llm_usage_stats["completion_tokens"],
+                "llm_cached_tokens": llm_usage_stats["cached_tokens"],
+                "answer_cache_eligible": cache_key is not None,
+                "answer_cache_hit": cached is not None,
+                "faq_hit": answer_trace["source"] == "faq",
+                "model_routed": route.routed,
+                "route_reason": route.reason,
+                "history_summarized": bool(context) and context[0].get("role") == "system",
                 "stage_history_ms": round(stage_ms.get("history", 0.0), 2),
                 "stage_rewrite_ms": round(stage_ms.get("rewrite", 0.0), 2),
                 "stage_search_ms": round(stage_ms.get("search", 0.0), 2),
                 "stage_answer_ms": round(stage_ms.get("answer", 0.0), 2),
                 "stage_history_save_ms": round(stage_ms.get("history_save", 0.0), 2),
                 "stage_tts_ms": round(stage_ms.get("tts", 0.0), 2),
+                "tts_speculative_hit": tts_speculative_hit,
+                "tts_overlap_ms": round(tts_overlap_ms, 2),
+                "tts_job": bool(tts_job_id),
+                **_deadline_meta(request_deadline),
             },
         )
     except Exception as exc:
+        if speculative_tts is not None:
+            speculative_tts.cancel()
         elapsed_ms = (time.perf_counter() - started) * 1000
         log_event(
             logger,
@@ -154,128 +429,402 @@ def chat(req: ChatRequest, request: Request) -> ChatResponse:
             mode=req.mode,
             cost_ms=f"{elapsed_ms:.2f}",
         )
-        metrics_service.record_api_call(
-            endpoint="chat",
+        await asyncio.to_thread(
+            metrics_service.record_api_call,
+            endpoint=endpoint,
             ok=False,
             status_code=500,
             latency_ms=elapsed_ms,
             request_id=request_id,
-            meta={"mode": req.mode},
+            meta={"mode": req.mode, **_deadline_meta(request_deadline)},
         )
         raise HTTPException(status_code=500, detail="聊天服务暂时不可用，请稍后重试") from exc
-    return ChatResponse(answer_json=answer, audio_url=audio_url, tts_job_id=None)
+    return ChatResponse(answer_json=answer, audio_url=audio_url, tts_job_id=tts_job_id, model_variant=req.model_variant)
 
 
 @router.post("/chat/stream")
-def chat_stream(req: ChatRequest, request: Request) -> StreamingResponse:
+async def chat_stream(req: ChatRequest, request: Request) -> StreamingResponse:
     request_id = getattr(request.state, "request_id", "")
+    # 历史保存与指标写入不影响客户端已收到的 final 事件，放到响应结束后的后台任务里执行。
+    deferred: list[Callable[[], Awaitable[None]]] = []
 
     def emit(event: dict[str, object]) -> bytes:
         return (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
 
-    def stream():
+    async def run_deferred() -> None:
+        for job in deferred:
+            try:
+                await job()
+            except Exception:
+                log_event(logger, "exception", "chat_stream_deferred_failed", rid=request_id, session_id=req.session_id)
+
+    async def stream():
+        nonlocal req
         started = time.perf_counter()
         stage_ms: dict[str, float] = {}
+        llm_cache_stats = llm_cache.begin_request_stats()
+        llm_hedge_stats = llm_hedge.begin_request_stats()
+        llm_usage_stats = llm_usage.begin_request_stats()
+        answer_trace = chat_service.begin_answer_trace()
+        request_deadline = deadline.start(settings.chat_deadline_sec, settings.chat_deadline_answer_reserve_sec)
+        analysis = chat_service.analyze_query(req.text)
+        audio_pipeline: _SentenceAudioPipeline | None = None
         try:
             stage_started = time.perf_counter()
-            history = session_store.get_chat_history(req.session_id)
+            history = await session_store.get_chat_history_async(req.session_id)
+            context = await history_summary.load_context(req.session_id, history)
             stage_ms["history"] = (time.perf_counter() - stage_started) * 1000
             yield emit({"type": "status", "phase": "history"})
 
-            stage_started = time.perf_counter()
-            search_text = chat_service.build_retrieval_query(history, req.text, req.model_variant)
-            stage_ms["rewrite"] = (time.perf_counter() - stage_started) * 1000
             yield emit({"type": "status", "phase": "search"})
 
             runtime = runtime_config_service.get_runtime_config()
             top_k = _effective_top_k(req, runtime.chat_top_k)
             use_rerank = _effective_rerank(req, runtime.enable_rerank)
             stage_started = time.perf_counter()
-            evidence = _search_knowledge_for_chat(search_text, top_k, req, use_rerank)
+            retrieval = await chat_service.retrieve_evidence_async(
+                context,
+                req.text,
+                lambda query: _search_knowledge_for_chat(query, top_k, req, use_rerank),
+                _expansion_variant(req),
+            )
+            search_text = retrieval.query
+            evidence = retrieval.evidence
             answer_evidence = chat_service.select_answer_evidence(evidence)
-            stage_ms["search"] = (time.perf_counter() - stage_started) * 1000
+            stage_ms["rewrite"] = retrieval.rewrite_ms
+            stage_ms["search"] = (time.perf_counter() - stage_started) * 1000 - retrieval.rewrite_ms
+            route = model_router.route(req.model_variant, analysis, history, evidence, runtime)
+            req = req.model_copy(update={"model_variant": route.variant})
+            # 检索一结束就把候选依据发给前端，引用卡片不必等 LLM 写完。
+            yield emit(
+                {
+                    "type": "evidence",
+                    "citations": [citation.model_dump() for citation in chat_service._to_citations(answer_evidence)],
+                }
+            )
 
-            if not answer_evidence:
-                answer = chat_service.build_answer(req, answer_evidence, history)
-                history.append({"role": "user", "content": req.text})
-                history.append({"role": "assistant", "content": answer.conclusion})
-                session_store.save_chat_history(req.session_id, history)
-                stage_started = time.perf_counter()
-                audio_url = None
-                if _should_generate_tts(req, runtime.enable_tts):
-                    audio_url = tts_service.synthesize(answer.conclusion, emotion=answer.emotion)
-                    audio_url = tts_service.public_audio_url(audio_url)
-                stage_ms["tts"] = (time.perf_counter() - stage_started) * 1000
-                yield emit({"type": "final", "answer_json": answer.model_dump(), "audio_url": audio_url, "tts_job_id": None})
-                return
-
-            yield emit({"type": "status", "phase": "answer"})
-            stage_started = time.perf_counter()
-            accumulated = ""
-            for delta in chat_service.stream_answer_text(req, answer_evidence, history):
-                accumulated += delta
-                yield emit({"type": "delta", "text": delta})
-            stage_ms["answer"] = (time.perf_counter() - stage_started) * 1000
+            cache_key = _answer_cache_key(req, context, analysis, answer_evidence)
+            cached = answer_cache.get(cache_key)
+            tts_enabled = _should_generate_tts(req, runtime.enable_tts)
+            cached_audio_url = cached["audio_url"] if cached is not None and tts_enabled else None
 
-            answer = chat_service.build_answer_from_stream_text(accumulated, answer_evidence)
-            answer = chat_service._finalize_answer(
-                answer,
-                answer_evidence,
-                runtime.default_emotion,
-                req.citation_strict if req.citation_strict is not None else runtime.strict_citation_check,
-                req,
-            )
+            # 句子一完整就提交 TTS，首段语音不必等整段回答生成完；命中缓存且带语音时直接下发整段语音。
+            splitter = chat_service.StreamSentenceSplitter()
+            if tts_enabled and cached_audio_url is None:
+                audio_pipeline = _SentenceAudioPipeline(runtime.default_emotion, request_id, started)
 
             stage_started = time.perf_counter()
-            audio_url = None
-            if _should_generate_tts(req, runtime.enable_tts):
-                audio_url = tts_service.synthesize(answer.conclusion, emotion=answer.emotion)
-                audio_url = tts_service.public_audio_url(audio_url)
-            stage_ms["tts"] = (time.perf_counter() - stage_started) * 1000
+            # LLM 熔断打开或预算不足时不发起流式请求，直接走 build_answer_async 的本地兜底回答。
+            if cached is not None or not answer_evidence or not chat_service.should_stream_answer():
+                if cached is not None:
+                    answer = AnswerJson(**cached["answer"])
+                else:
+                    answer = await chat_service.build_answer_async(req, answer_evidence, context, analysis=analysis)
+                if audio_pipeline is not None:
+                    audio_pipeline.emotion = answer.emotion
+                    for sentence in splitter.feed(answer.conclusion):
+                        audio_pipeline.submit(sentence)
+            else:
+                yield emit({"type": "status", "phase": "answer"})
+                # 引用标记在流中即时剥离：正文照常下发，标记闭合时单独推送 citations 事件。
+                citation_parser = chat_service.StreamCitationParser()
+                citations_sent = False
+                stream_completed = True
+                try:
+                    async for delta in chat_service.stream_answer_text_async(req, answer_evidence, context):
+                        visible = citation_parser.feed(delta)
+                        if visible:
+                            yield emit({"type": "delta", "text": visible})
+                        if not citations_sent and citation_parser.chunk_ids is not None:
+                            citations_sent = True
+                            yield emit(_citations_event(citation_parser.chunk_ids, answer_evidence))
+                        if audio_pipeline is not None:
+                            for sentence in splitter.feed(visible):
+                                audio_pipeline.submit(sentence)
+                            for event in audio_pipeline.ready_events():
+                                yield emit(event)
+                except http_client.UpstreamError:
+                    # 中途断流：已下发的正文照常收尾成回答，但不能当作完整回答缓存。
+                    stream_completed = False
+                visible = citation_parser.finish()
+                if visible:
+                    yield emit({"type": "delta", "text": visible})
+                    if audio_pipeline is not None:
+                        for sentence in splitter.feed(visible):
+                            audio_pipeline.submit(sentence)
+                if not citations_sent and citation_parser.chunk_ids is not None:
+                    yield emit(_citations_event(citation_parser.chunk_ids, answer_evidence))
+
+                if citation_parser.text:
+                    answer_trace["source"] = "llm" if stream_completed else "llm_truncated"
+                    answer = chat_service.build_answer_from_stream_text(
+                        citation_parser.text, answer_evidence, chunk_ids=citation_parser.chunk_ids or []
+                    )
+                else:
+                    # 上游流式请求失败（含中途熔断）时没有任何正文，改用本地兜底回答。
+                    answer = chat_service._fallback_answer(req, answer_evidence)
+                    if audio_pipeline is not None:
+                        for sentence in splitter.feed(answer.conclusion):
+                            audio_pipeline.submit(sentence)
+                answer = chat_service._finalize_answer(
+                    answer,
+                    answer_evidence,
+                    runtime.default_emotion,
+                    req.citation_strict if req.citation_strict is not None else runtime.strict_citation_check,
+                    req,
+                    analysis,
+                )
+            stage_ms["answer"] = (time.perf_counter() - stage_started) * 1000
+
             history.append({"role": "user", "content": req.text})
             history.append({"role": "assistant", "content": answer.conclusion})
-            stage_started = time.perf_counter()
-            session_store.save_chat_history(req.session_id, history)
-            stage_ms["history_save"] = (time.perf_counter() - stage_started) * 1000
-
-            elapsed_ms = (time.perf_counter() - started) * 1000
-            metrics_service.record_api_call(
-                endpoint="chat_stream",
-                ok=True,
-                status_code=200,
-                latency_ms=elapsed_ms,
-                request_id=request_id,
-                meta={
-                    "mode": req.mode,
-                    "top_k": top_k,
-                    "use_rerank": use_rerank,
-                    "evidence": len(evidence),
-                    "answer_evidence": len(answer_evidence),
-                    "citations": len(answer.citations),
-                    "answer_emotion": answer.emotion,
+            if audio_pipeline is not None:
+                for sentence in splitter.flush():
+                    audio_pipeline.submit(sentence)
+            final_ms = (time.perf_counter() - started) * 1000
+            deadline_meta = _deadline_meta(request_deadline)
+            yield emit(
+                {
+                    "type": "final",
+                    "answer_json": answer.model_dump(),
+                    "audio_url": cached_audio_url,
+                    "audio_streaming": audio_pipeline is not None and audio_pipeline.submitted > 0,
+                    "tts_job_id": None,
                     "model_variant": req.model_variant,
-                    "llm_model": settings.resolved_fast_llm_model() if req.model_variant == "fast" else settings.resolved_llm_model(),
-                    "audio_ready": bool(audio_url),
-                    "rewrite_changed": search_text != req.text,
-                    "stage_history_ms": round(stage_ms.get("history", 0.0), 2),
-                    "stage_rewrite_ms": round(stage_ms.get("rewrite", 0.0), 2),
-                    "stage_search_ms": round(stage_ms.get("search", 0.0), 2),
-                    "stage_answer_ms": round(stage_ms.get("answer", 0.0), 2),
-                    "stage_history_save_ms": round(stage_ms.get("history_save", 0.0), 2),
-                    "stage_tts_ms": round(stage_ms.get("tts", 0.0), 2),
-                },
+                }
             )
-            yield emit({"type": "final", "answer_json": answer.model_dump(), "audio_url": audio_url, "tts_job_id": None})
+
+            # 先登记持久化任务：即使客户端在剩余语音推送期间断开，历史也照常保存。
+            async def persist() -> None:
+                stage_started = time.perf_counter()
+                turn = await session_store.save_chat_history_async(req.session_id, history)
+                stage_ms["history_save"] = (time.perf_counter() - stage_started) * 1000
+                history_summary.schedule(req.session_id, turn, req.text, answer.conclusion)
+                # 逐句语音没有整段音频可缓存，只缓存回答本身。
+                if cache_key is not None and cached is None and _answer_cacheable(answer_trace, llm_hedge_stats):
+                    await asyncio.to_thread(answer_cache.put, cache_key, req.text, req.model_variant, answer.model_dump())
+                await asyncio.to_thread(
+                    metrics_service.record_api_call,
+                    endpoint="chat_stream",
+                    ok=True,
+                    status_code=200,
+                    latency_ms=final_ms,
+                    request_id=request_id,
+                    meta={
+                        "mode": req.mode,
+                        "top_k": top_k,
+                        "use_rerank": use_rerank,
+                        "evidence": len(evidence),
+                        "answer_evidence": len(answer_evidence),
+                        "citations": len(answer.citations),
+                        "answer_emotion": answer.emotion,
+                        "model_variant": req.model_variant,
+                        "llm_model": settings.resolved_fast_llm_model() if req.model_variant == "fast" else settings.resolved_llm_model(),
+                        "audio_ready": bool(cached_audio_url or (audio_pipeline and audio_pipeline.emitted)),
+                        "audio_segments": audio_pipeline.emitted if audio_pipeline else 0,
+                        "first_audio_ms": round(audio_pipeline.first_audio_ms, 2)
+                        if audio_pipeline and audio_pipeline.first_audio_ms is not None
+                        else None,
+                        "rewrite_changed": search_text != req.text,
+                        "retrieval_expansion": retrieval.expansion,
+                        "llm_cache_hits": int(llm_cache_stats["hits"]),
+                        "llm_cache_misses": int(llm_cache_stats["misses"]),
+                        "llm_cache_saved_ms": round(llm_cache_stats["saved_ms"], 2),
+                        "llm_hedged": bool(llm_hedge_stats["hedged"]),
+                        "llm_hedge_won": bool(llm_hedge_stats["hedge_won"]),
+                        "llm_winner_model": llm_hedge_stats["winner"] or None,
+                        "llm_calls": llm_usage_stats["calls"],
+                        "llm_prompt_tokens": llm_usage_stats["prompt_tokens"],
+                        "llm_completion_tokens": llm_usage_stats["completion_tokens"],
+                        "llm_cached_tokens": llm_usage_stats["cached_tokens"],
+                        "answer_cache_eligible": cache_key is not None,
+                        "answer_cache_hit": cached is not None,
+                        "faq_hit": answer_trace["source"] == "faq",
+                        "model_routed": route.routed,
+                        "route_reason": route.reason,
+                        "history_summarized": bool(context) and context[0].get("role") == "system",
+                        "completed_ms": round((time.perf_counter() - started) * 1000, 2),
+                        "stage_history_ms": round(stage_ms.get("history", 0.0), 2),
+                        "stage_rewrite_ms": round(stage_ms.get("rewrite", 0.0), 2),
+                        "stage_search_ms": round(stage_ms.get("search", 0.0), 2),
+                        "stage_answer_ms": round(stage_ms.get("answer", 0.0), 2),
+                        "stage_history_save_ms": round(stage_ms.get("history_save", 0.0), 2),
+                        "stage_tts_ms": round(stage_ms.get("tts", 0.0), 2),
+                        **deadline_meta,
+                    },
+                )
+
+            deferred.append(persist)
+
+            # 剩余句子的语音在 final 之后继续按序推送。
+            stage_started = time.perf_counter()
+            if audio_pipeline is not None:
+                async for event in audio_pipeline.drain_events():
+                    yield emit(event)
+            stage_ms["tts"] = (time.perf_counter() - stage_started) * 1000
         except Exception:
             elapsed_ms = (time.perf_counter() - started) * 1000
-            metrics_service.record_api_call(
-                endpoint="chat_stream",
-                ok=False,
-                status_code=500,
-                latency_ms=elapsed_ms,
+
+            async def record_failure() -> None:
+                await asyncio.to_thread(
+                    metrics_service.record_api_call,
+                    endpoint="chat_stream",
+                    ok=False,
+                    status_code=500,
+                    latency_ms=elapsed_ms,
+                    request_id=request_id,
+                    meta={"mode": req.mode, "model_variant": req.model_variant, **_deadline_meta(request_deadline)},
+                )
+
+            deferred.append(record_failure)
+            yield emit({"type": "error", "detail": "聊天服务暂时不可用，请稍后重试"})
+        finally:
+            # 客户端中途断开时，尚未完成的逐句合成不再需要。
+            if audio_pipeline is not None:
+                audio_pipeline.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson", background=BackgroundTask(run_deferred))
+
+
+@router.post("/chat/batch")
+async def chat_batch(batch: ChatBatchRequest, request: Request) -> StreamingResponse:
+    """批量问答（离线评测、预计算用）：先整批预取检索结果，再限并发逐条走非流式问答流程，
+    按完成顺序输出 NDJSON（每条一行 item 事件，最后一行 done 汇总）。"""
+    request_id = getattr(request.state, "request_id", "")
+    run_id = uuid.uuid4().hex[:8]
+    items = [
+        (
+            item.id or str(index),
+            ChatRequest(**item.model_dump(exclude={"id", "session_id"}), session_id=item.session_id or f"batch_{run_id}_{index}"),
+        )
+        for index, item in enumerate(batch.items)
+    ]
+    concurrency = batch.concurrency or max(1, settings.chat_batch_concurrency)
+
+    def emit(event: dict[str, object]) -> bytes:
+        return (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+
+    async def stream():
+        started = time.perf_counter()
+        prefetched, prefetch = await _prefetch_batch_evidence([req for _, req in items], batch.retrieval_only)
+        if batch.retrieval_only:
+            events = []
+            for index, ((item_id, _), evidence) in enumerate(zip(items, prefetched)):
+                event: dict[str, object] = {"type": "item", "index": index, "id": item_id}
+                if evidence is None:
+                    # 检索失败不能当作“没检索到”返回，否则评测会把故障算成未命中。
+                    event.update(ok=False, status_code=500, error="检索服务暂时不可用")
+                else:
+                    event.update(ok=True, status_code=200, evidence=evidence)
+                event.update(latency_ms=prefetch["ms"], stages={"search": prefetch["ms"]})
+                events.append(event)
+                yield emit(event)
+            await asyncio.to_thread(
+                metrics_service.record_api_call,
+                endpoint="knowledge_search_batch",
+                ok=not prefetch["failed"],
+                status_code=500 if prefetch["failed"] else 200,
+                latency_ms=(time.perf_counter() - started) * 1000,
                 request_id=request_id,
-                meta={"mode": req.mode, "model_variant": req.model_variant},
+                meta={"items": len(items), "unique_queries": prefetch["unique"], "failed": prefetch["failed"]},
             )
-            yield emit({"type": "error", "detail": "聊天服务暂时不可用，请稍后重试"})
+        else:
+            semaphore = asyncio.Semaphore(concurrency)
+            tasks = [
+                asyncio.create_task(_run_batch_item(index, item_id, req, f"{request_id}:{index}", semaphore))
+                for index, (item_id, req) in enumerate(items)
+            ]
+            events = []
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    event = await next_done
+                    events.append(event)
+                    yield emit(event)
+            finally:
+                # 客户端中途断开时，尚未开始或未完成的条目不再需要。
+                for task in tasks:
+                    task.cancel()
+        ok = sum(1 for event in events if event["ok"])
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        log_event(
+            logger,
+            "info",
+            "chat_batch_handled",
+            rid=request_id,
+            items=len(items),
+            ok=ok,
+            retrieval_only=batch.retrieval_only,
+            concurrency=concurrency,
+            unique_queries=prefetch["unique"],
+            prefetch_ms=f"{prefetch['ms']:.2f}",
+            cost_ms=f"{elapsed_ms:.2f}",
+        )
+        yield emit(
+            {
+                "type": "done",
+                "total": len(items),
+                "ok": ok,
+                "failed": len(items) - ok,
+                "concurrency": concurrency,
+                "latency_ms": round(elapsed_ms, 2),
+                "prefetch": prefetch,
+            }
+        )
 
     return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+async def _prefetch_batch_evidence(
+    requests: list[ChatRequest], retrieval_only: bool
+) -> tuple[list[list[dict[str, object]] | None], dict[str, object]]:
+    """按 (top_k, rerank) 分组批量检索：去重后的语句一次批量向量化、一次批量向量检索，结果进检索缓存。
+
+    检索失败的分组里各条结果为 None（区别于检索成功但无结果的空列表），prefetch["failed"] 记失败条数。
+
+    问答模式预取的是无历史时首次检索的规则扩展语句（见 chat_service.rule_retrieval_query），
+    逐条流程中的 search_async 随即命中检索缓存；有历史而被改写的条目照常单独检索。
+    """
+    started = time.perf_counter()
+    runtime = runtime_config_service.get_runtime_config()
+    queries = [req.text.strip() if retrieval_only else chat_service.rule_retrieval_query(req.text.strip()) for req in requests]
+    groups: dict[tuple[int, bool | None], list[int]] = {}
+    for index, req in enumerate(requests):
+        groups.setdefault((_effective_top_k(req, runtime.chat_top_k), req.use_rerank), []).append(index)
+    results: list[list[dict[str, object]] | None] = [[] for _ in requests]
+    failed = 0
+    for (top_k, use_rerank), indexes in groups.items():
+        try:
+            found = await knowledge_service.search_many_async([queries[idx] for idx in indexes], top_k, use_rerank=use_rerank)
+        except Exception:
+            log_event(logger, "exception", "chat_batch_prefetch_failed", top_k=top_k, items=len(indexes))
+            for idx in indexes:
+                results[idx] = None
+            failed += len(indexes)
+            continue
+        for idx, evidence in zip(indexes, found):
+            results[idx] = evidence
+    prefetch = {
+        "queries": len(queries),
+        "unique": len({(query, _effective_top_k(req, runtime.chat_top_k), req.use_rerank) for query, req in zip(queries, requests)}),
+        "ms": round((time.perf_counter() - started) * 1000, 2),
+        "failed": failed,
+    }
+    return results, prefetch
+
+
+async def _run_batch_item(
+    index: int, item_id: str, req: ChatRequest, request_id: str, semaphore: asyncio.Semaphore
+) -> dict[str, object]:
+    async with semaphore:
+        started = time.perf_counter()
+        stage_ms: dict[str, float] = {}
+        event: dict[str, object] = {"type": "item", "index": index, "id": item_id}
+        try:
+            resp = await handle_chat(req, request_id, endpoint="chat_batch", stage_ms=stage_ms)
+        except HTTPException as exc:
+            event.update(ok=False, status_code=exc.status_code, error=exc.detail)
+        else:
+            event.update(ok=True, status_code=200, response=resp.model_dump())
+        event["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        event["stages"] = {name: round(ms, 2) for name, ms in stage_ms.items()}
+        return event
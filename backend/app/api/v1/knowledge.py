@@ -5,6 +5,7 @@ from fastapi import APIRouter, HTTPException, Request
 
 from app.core.logging import log_event
 from app.schemas.knowledge import KnowledgeChunk, KnowledgeSearchRequest, KnowledgeSearchResponse
+from app.services import faq as faq_service
 from app.services import knowledge as knowledge_service
 from app.services import metrics as metrics_service
 
@@ -62,7 +63,10 @@ def search(req: KnowledgeSearchRequest, request: Request) -> KnowledgeSearchResp
 @router.get("/chunk/{chunk_id}", response_model=KnowledgeChunk)
 def get_chunk(chunk_id: str, request: Request) -> KnowledgeChunk:
     request_id = getattr(request.state, "request_id", "")
-    chunk = knowledge_service.get_chunk(chunk_id)
+    if chunk_id.startswith(faq_service.CHUNK_PREFIX):
+        chunk = faq_service.get_chunk(chunk_id)
+    else:
+        chunk = knowledge_service.get_chunk(chunk_id)
     if not chunk:
         log_event(logger, "info", "knowledge_chunk_not_found", rid=request_id, chunk_id=chunk_id)
         metrics_service.record_api_call(
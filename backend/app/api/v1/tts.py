@@ -1,10 +1,11 @@
 from pathlib import Path
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import FileResponse
 from pydantic import BaseModel, Field
 
 from app.core.config import settings
+from app.services import bulkhead
 from app.services import tts as tts_service
 
 router = APIRouter(prefix="/api/tts", tags=["tts"])
@@ -39,7 +40,7 @@ def get_tts_audio(file_name: str):
     return FileResponse(target)
 
 
-@router.post("/synthesize", response_model=TtsSynthesizeResponse)
+@router.post("/synthesize", response_model=TtsSynthesizeResponse, dependencies=[Depends(bulkhead.admission("tts"))])
 def synthesize_tts(req: TtsSynthesizeRequest) -> TtsSynthesizeResponse:
     audio_url = tts_service.synthesize(req.text, emotion=req.emotion)
     audio_url = tts_service.public_audio_url(audio_url)
@@ -53,6 +54,7 @@ def create_tts_job(req: TtsSynthesizeRequest) -> TtsJobResponse:
 
 
 @router.get("/jobs/{job_id}", response_model=TtsJobStatusResponse)
-def get_tts_job(job_id: str) -> TtsJobStatusResponse:
-    status, audio_url = tts_service.read_synthesize_job(job_id)
+def get_tts_job(job_id: str, wait_ms: int = Query(default=0, ge=0, le=10000)) -> TtsJobStatusResponse:
+    # wait_ms > 0 时长轮询：任务未完成则最多等待这么久再返回，减少前端轮询次数。
+    status, audio_url = tts_service.read_synthesize_job(job_id, wait_ms=wait_ms)
     return TtsJobStatusResponse(status=status, audio_url=audio_url)
@@ -26,11 +26,63 @@ class Settings(BaseSettings):
     embedding_api_key: str = Field(default="", alias="EMBEDDING_API_KEY")
     embedding_model: str = Field(default="", alias="EMBEDDING_MODEL")
     chat_top_k: int = Field(default=5, alias="CHAT_TOP_K")
+    # 可选的 JSON 词表 {"分组名": [关键词...]}，与内置关键词表合并后编译成 Aho-Corasick 自动机。
+    # LEGAL_KEYWORDS_PATH 扩展问答守卫的分组（如 "topic:rent"），RETRIEVAL_KEYWORDS_PATH 扩展检索主题的触发词
+    # （分组名 "retrieval:<序号>"，序号对应 knowledge._RETRIEVAL_TOPIC_TERMS），两者分组名不同，各用各的文件。
+    legal_keywords_path: str = Field(default="", alias="LEGAL_KEYWORDS_PATH")
+    retrieval_keywords_path: str = Field(default="", alias="RETRIEVAL_KEYWORDS_PATH")
+    # 查询切分词表（scripts/build_legal_vocab.py 从 chunks 挖掘生成），文件不存在时只用内置词表。
+    legal_vocab_path: str = Field(default="data/legal_vocab.txt", alias="LEGAL_VOCAB_PATH")
+    # 规则扩展检索的最高法条分数达到该值时，取消并行中的 LLM 检索扩展；<=0 表示总是等待扩展。
+    retrieval_speculative_confidence: float = Field(default=0.82, alias="RETRIEVAL_SPECULATIVE_CONFIDENCE")
     llm_provider: str = Field(default="mock", alias="LLM_PROVIDER")
     llm_base_url: str = Field(default="", alias="LLM_BASE_URL")
     llm_api_key: str = Field(default="", alias="LLM_API_KEY")
     llm_model: str = Field(default="", alias="LLM_MODEL")
     llm_fast_model: str = Field(default="doubao-1-5-lite-32k-250115", alias="LLM_FAST_MODEL")
+    llm_cache_enabled: bool = Field(default=True, alias="LLM_CACHE_ENABLED")
+    llm_cache_db_path: str = Field(default="data/llm_cache.db", alias="LLM_CACHE_DB_PATH")
+    llm_cache_ttl_sec: int = Field(default=7 * 24 * 3600, alias="LLM_CACHE_TTL_SEC")
+    llm_cache_max_entries: int = Field(default=5000, alias="LLM_CACHE_MAX_ENTRIES")
+    llm_cache_max_temperature: float = Field(default=0.1, alias="LLM_CACHE_MAX_TEMPERATURE")
+    # 公开网页检索（无本地依据时的外部参考）：结果缓存、无结果的短期负缓存，失败后按指数退避暂停请求。
+    web_search_base_url: str = Field(default="https://html.duckduckgo.com/html/", alias="WEB_SEARCH_BASE_URL")
+    web_search_cache_ttl_sec: int = Field(default=6 * 3600, alias="WEB_SEARCH_CACHE_TTL_SEC")
+    web_search_negative_ttl_sec: int = Field(default=300, alias="WEB_SEARCH_NEGATIVE_TTL_SEC")
+    web_search_failure_backoff_sec: float = Field(default=15.0, alias="WEB_SEARCH_FAILURE_BACKOFF_SEC")
+    web_search_failure_backoff_max_sec: float = Field(default=300.0, alias="WEB_SEARCH_FAILURE_BACKOFF_MAX_SEC")
+    # 回答路径上最多等联网检索这么久；超时先返回通用提示，检索转入后台继续并写入缓存（<=0 表示完全不等）。
+    web_search_inline_wait_sec: float = Field(default=3.0, alias="WEB_SEARCH_INLINE_WAIT_SEC")
+    faq_enabled: bool = Field(default=True, alias="FAQ_ENABLED")
+    faq_source_path: str = Field(default="data/legal_faq.jsonl", alias="FAQ_SOURCE_PATH")
+    faq_index_path: str = Field(default="data/legal_faq_index.json", alias="FAQ_INDEX_PATH")
+    faq_min_score: float = Field(default=0.5, alias="FAQ_MIN_SCORE")
+    faq_min_vector_score: float = Field(default=0.82, alias="FAQ_MIN_VECTOR_SCORE")
+    # 整条回答缓存：无历史的高频问题按 (问题, 主题标签, 依据 chunk 集合, 模型档位, 语料版本) 复用最终回答与语音。
+    answer_cache_enabled: bool = Field(default=False, alias="ANSWER_CACHE_ENABLED")
+    answer_cache_db_path: str = Field(default="data/answer_cache.db", alias="ANSWER_CACHE_DB_PATH")
+    answer_cache_ttl_sec: int = Field(default=24 * 3600, alias="ANSWER_CACHE_TTL_SEC")
+    answer_cache_max_entries: int = Field(default=2000, alias="ANSWER_CACHE_MAX_ENTRIES")
+    # 手动递增即可让全部已缓存回答失效（如更新了提示词或法规解读口径）。
+    answer_cache_corpus_version: str = Field(default="", alias="ANSWER_CACHE_CORPUS_VERSION")
+    # 前端“推荐问题”列表（| 分隔），也是回答预热任务的输入。
+    suggested_questions: str = Field(
+        default="房东不退押金怎么办？|兼职被拖欠工资如何维权？|网购到假货如何取证？", alias="SUGGESTED_QUESTIONS"
+    )
+    # 启动时把推荐问题走一遍完整问答流程（检索、回答、TTS）写入回答缓存；间隔 <=0 表示只在启动时跑一次。
+    answer_warmup_enabled: bool = Field(default=False, alias="ANSWER_WARMUP_ENABLED")
+    answer_warmup_interval_sec: int = Field(default=0, alias="ANSWER_WARMUP_INTERVAL_SEC")
+    # 会话滚动摘要：每轮结束后由快速模型把这一轮折叠进摘要，回答与改写提示词只带“摘要 + 最近一轮”。
+    history_summary_enabled: bool = Field(default=True, alias="HISTORY_SUMMARY_ENABLED")
+    history_summary_max_chars: int = Field(default=300, alias="HISTORY_SUMMARY_MAX_CHARS")
+    # 回答提示词的 token 预算（本地近似估算，见 prompt_budget）：依据正文按检索得分分配，历史预算平均分成每条消息的固定上限。
+    prompt_evidence_token_budget: int = Field(default=720, alias="PROMPT_EVIDENCE_TOKEN_BUDGET")
+    prompt_evidence_min_tokens: int = Field(default=60, alias="PROMPT_EVIDENCE_MIN_TOKENS")
+    prompt_history_token_budget: int = Field(default=400, alias="PROMPT_HISTORY_TOKEN_BUDGET")
+    prompt_question_token_budget: int = Field(default=240, alias="PROMPT_QUESTION_TOKEN_BUDGET")
+    # 供应商上下文缓存（Ark context API）：回答类提示词的静态指令前缀只创建一次上下文，之后按 context_id 复用。
+    llm_context_cache_enabled: bool = Field(default=False, alias="LLM_CONTEXT_CACHE_ENABLED")
+    llm_context_cache_ttl_sec: int = Field(default=3600, alias="LLM_CONTEXT_CACHE_TTL_SEC")
     ark_base_url: str = Field(default="https://ark.cn-beijing.volces.com/api/v3", alias="ARK_BASE_URL")
     ark_api_key: str = Field(default="", alias="ARK_API_KEY")
     ark_model: str = Field(default="", alias="ARK_MODEL")
@@ -54,7 +106,13 @@ class Settings(BaseSettings):
     )
     tts_audio_format: str = Field(default="wav", alias="TTS_AUDIO_FORMAT")
     tts_sample_rate: int = Field(default=24000, alias="TTS_SAMPLE_RATE")
+    chat_deadline_sec: float = Field(default=45.0, alias="CHAT_DEADLINE_SEC")
+    chat_deadline_answer_reserve_sec: float = Field(default=8.0, alias="CHAT_DEADLINE_ANSWER_RESERVE_SEC")
     chat_tts_soft_timeout_ms: int = Field(default=300, alias="CHAT_TTS_SOFT_TIMEOUT_MS")
+    # 流式回答按句合成语音时，同时在途的 TTS 请求上限。
+    tts_stream_concurrency: int = Field(default=3, alias="TTS_STREAM_CONCURRENCY")
+    # /api/chat/batch 同时处理的条目上限（请求可用 concurrency 覆盖）。
+    chat_batch_concurrency: int = Field(default=4, alias="CHAT_BATCH_CONCURRENCY")
     tts_audio_public_base_url: str = Field(default="http://127.0.0.1:8000", alias="TTS_AUDIO_PUBLIC_BASE_URL")
     tts_audio_store_dir: str = Field(default="data/tts_cache", alias="TTS_AUDIO_STORE_DIR")
     asr_enabled: bool = Field(default=False, alias="ASR_ENABLED")
@@ -78,11 +136,51 @@ class Settings(BaseSettings):
     asr_auc_timeout_sec: int = Field(default=40, alias="ASR_AUC_TIMEOUT_SEC")
     force_no_proxy: bool = Field(default=False, alias="FORCE_NO_PROXY")
     outbound_proxy: str = Field(default="", alias="OUTBOUND_PROXY")
+    http2_enabled: bool = Field(default=True, alias="HTTP2_ENABLED")
+    http_pool_max_connections: int = Field(default=32, alias="HTTP_POOL_MAX_CONNECTIONS")
+    http_pool_max_keepalive: int = Field(default=16, alias="HTTP_POOL_MAX_KEEPALIVE")
+    http_keepalive_expiry_sec: float = Field(default=30.0, alias="HTTP_KEEPALIVE_EXPIRY_SEC")
+    http_connect_timeout_sec: float = Field(default=5.0, alias="HTTP_CONNECT_TIMEOUT_SEC")
+    http_retry_backoff_ms: int = Field(default=500, alias="HTTP_RETRY_BACKOFF_MS")
+    circuit_breaker_enabled: bool = Field(default=True, alias="CIRCUIT_BREAKER_ENABLED")
+    circuit_breaker_window_sec: float = Field(default=60.0, alias="CIRCUIT_BREAKER_WINDOW_SEC")
+    circuit_breaker_min_calls: int = Field(default=5, alias="CIRCUIT_BREAKER_MIN_CALLS")
+    circuit_breaker_error_rate: float = Field(default=0.5, alias="CIRCUIT_BREAKER_ERROR_RATE")
+    circuit_breaker_slow_call_ms: float = Field(default=20000.0, alias="CIRCUIT_BREAKER_SLOW_CALL_MS")
+    circuit_breaker_slow_call_rate: float = Field(default=0.8, alias="CIRCUIT_BREAKER_SLOW_CALL_RATE")
+    circuit_breaker_open_sec: float = Field(default=30.0, alias="CIRCUIT_BREAKER_OPEN_SEC")
+    bulkhead_enabled: bool = Field(default=True, alias="BULKHEAD_ENABLED")
+    bulkhead_limits: str = Field(
+        default="llm=8:16,llm_fast=16:32,embedding=16:32,qdrant=16:32,tts=4:8,asr=2:4,web_search=4:8",
+        alias="BULKHEAD_LIMITS",
+    )
+    bulkhead_queue_timeout_sec: float = Field(default=10.0, alias="BULKHEAD_QUEUE_TIMEOUT_SEC")
+    llm_hedge_enabled: bool = Field(default=False, alias="LLM_HEDGE_ENABLED")
+    llm_hedge_percentile: float = Field(default=0.9, alias="LLM_HEDGE_PERCENTILE")
+    llm_hedge_min_samples: int = Field(default=20, alias="LLM_HEDGE_MIN_SAMPLES")
+    llm_hedge_delay_ms: float = Field(default=3000.0, alias="LLM_HEDGE_DELAY_MS")
+    llm_hedge_min_delay_ms: float = Field(default=800.0, alias="LLM_HEDGE_MIN_DELAY_MS")
 
     def cors_origin_list(self) -> list[str]:
         # 支持用逗号分隔多个 origin
         return [x.strip() for x in self.cors_origins.split(",") if x.strip()]
 
+    def suggested_question_list(self) -> list[str]:
+        # 用 | 分隔，问题文本里常有中文逗号
+        return [x.strip() for x in self.suggested_questions.split("|") if x.strip()]
+
+    def bulkhead_limit_map(self) -> dict[str, tuple[int, int]]:
+        # 格式 name=并发上限:排队上限，逗号分隔；写错的项忽略
+        limits: dict[str, tuple[int, int]] = {}
+        for item in self.bulkhead_limits.split(","):
+            name, _, value = item.partition("=")
+            concurrency, _, queue = value.partition(":")
+            try:
+                limits[name.strip()] = (max(1, int(concurrency)), max(0, int(queue or 0)))
+            except ValueError:
+                continue
+        return limits
+
     def resolved_llm_base_url(self) -> str:
         return (self.llm_base_url or self.ark_base_url).rstrip("/")
 
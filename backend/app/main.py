@@ -1,6 +1,8 @@
+import asyncio
 import logging
 import time
 import uuid
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
@@ -10,15 +12,38 @@ from fastapi.exceptions import RequestValidationError
 from app.core.config import settings
 from app.core.logging import setup_logging
 from app.schemas.common import HealthResponse
+from app.api.v1.chat import handle_chat
 from app.api.v1.router import api_router
+from app.services import answer_cache
+from app.services import answer_warmup
+from app.services import bulkhead
+from app.services import history_summary
+from app.services import http_client
+from app.services import llm_cache
+from app.services import metrics as metrics_service
 
 logger = logging.getLogger(__name__)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(llm_cache.warm)
+    await asyncio.to_thread(answer_cache.warm)
+    warmup_task = asyncio.create_task(answer_warmup.run_forever(handle_chat)) if settings.answer_warmup_enabled else None
+    yield
+    if warmup_task is not None:
+        warmup_task.cancel()
+    # 等后台摘要更新写完再关 HTTP 客户端，避免最后几轮的摘要丢失。
+    await history_summary.drain()
+    # 缓冲里尚未随接口指标落库的 LLM 调用记录（如刚完成的摘要调用）在退出前写入。
+    await asyncio.to_thread(metrics_service.flush_llm_calls)
+    await http_client.aclose_client()
+
+
 def create_app() -> FastAPI:
     setup_logging()
 
-    app = FastAPI(title=settings.app_name)
+    app = FastAPI(title=settings.app_name, lifespan=lifespan)
 
     app.add_middleware(
         CORSMiddleware,
@@ -69,6 +94,16 @@ def create_app() -> FastAPI:
             },
         )
 
+    @app.exception_handler(bulkhead.BulkheadFullError)
+    async def bulkhead_full_handler(request: Request, exc: bulkhead.BulkheadFullError):
+        request_id = getattr(request.state, "request_id", "")
+        logger.warning("bulkhead rejected name=%s reason=%s rid=%s", exc.name, exc.reason, request_id)
+        return JSONResponse(
+            status_code=exc.status_code,
+            content={"detail": "服务繁忙，请稍后重试", "request_id": request_id},
+            headers={"Retry-After": str(exc.retry_after_sec)},
+        )
+
     @app.exception_handler(Exception)
     async def unhandled_exception_handler(request: Request, exc: Exception):
         request_id = getattr(request.state, "request_id", "")
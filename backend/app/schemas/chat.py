@@ -3,6 +3,7 @@ from typing import Literal
 from app.schemas.common import Citation
 
 ModelVariant = Literal["default", "fast"]
+RequestedModelVariant = Literal["auto", "default", "fast"]
 
 
 class ChatRequest(BaseModel):
@@ -10,7 +11,7 @@ class ChatRequest(BaseModel):
     text: str = Field(..., min_length=1, description="用户输入文本")
     mode: Literal["chat", "case"] = Field(default="chat", description="模式：普通问答/案件模拟")
     case_state: dict | None = Field(default=None, description="案件状态（可选）")
-    model_variant: ModelVariant = Field(default="default", description="模型变体：默认/快速")
+    model_variant: RequestedModelVariant = Field(default="auto", description="模型变体：自动路由/默认/快速")
     top_k: int | None = Field(default=None, ge=1, le=12, description="本次检索 TopK 覆盖值")
     use_hybrid_search: bool | None = Field(default=None, description="预留：混合检索开关，当前后端未启用")
     use_rerank: bool | None = Field(default=None, description="预留：重排开关，当前后端未启用")
@@ -34,3 +35,19 @@ class ChatResponse(BaseModel):
     answer_json: AnswerJson
     audio_url: str | None = None
     tts_job_id: str | None = None
+    model_variant: ModelVariant | None = Field(default=None, description="实际使用的模型变体（auto 路由后的结果）")
+
+
+class SuggestedQuestionsResponse(BaseModel):
+    questions: list[str]
+
+
+class ChatBatchItem(ChatRequest):
+    id: str | None = Field(default=None, description="调用方自定义条目 ID，原样回传；缺省为序号")
+    session_id: str | None = Field(default=None, description="会话ID；缺省为每条独立的一次性会话")
+
+
+class ChatBatchRequest(BaseModel):
+    items: list[ChatBatchItem] = Field(..., min_length=1, max_length=200, description="待回答的问题")
+    concurrency: int | None = Field(default=None, ge=1, le=32, description="同时处理的条目上限；缺省取 CHAT_BATCH_CONCURRENCY")
+    retrieval_only: bool = Field(default=False, description="只做检索并返回依据，不生成回答（检索质量评测用）")
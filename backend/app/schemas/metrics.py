@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class MetricsEndpointSummary(BaseModel):
@@ -26,6 +26,13 @@ class PaperKpiLatency(BaseModel):
     avg_ms: float
 
 
+class ModelVariantKpi(BaseModel):
+    requests: int
+    routed: int
+    citation_hit_rate: float
+    latency: PaperKpiLatency
+
+
 class PaperKpiResponse(BaseModel):
     days: int | None = None
     chat_total: int
@@ -35,3 +42,138 @@ class PaperKpiResponse(BaseModel):
     no_local_evidence_external_reference_rate: float
     chat_latency: PaperKpiLatency
     case_step_latency: PaperKpiLatency
+    chat_tts_speculative_hits: int = 0
+    chat_tts_overlap_saved_ms_avg: float = 0.0
+    chat_llm_hedge_rate: float = 0.0
+    chat_llm_hedge_win_rate: float = 0.0
+    chat_answer_cache_eligible: int = 0
+    chat_answer_cache_hit_rate: float = 0.0
+    no_local_evidence_faq_hit_rate: float = 0.0
+    chat_by_model_variant: dict[str, ModelVariantKpi] = Field(default_factory=dict)
+
+
+class LlmUsageItem(BaseModel):
+    stage: str
+    model: str
+    calls: int
+    ok: int
+    stream_calls: int
+    prompt_tokens: int
+    completion_tokens: int
+    avg_prompt_tokens: float
+    avg_completion_tokens: float
+    cached_calls: int = 0
+    cached_tokens: int = 0
+    ttft_saved_ms: float | None = None
+    ttft: PaperKpiLatency
+    duration: PaperKpiLatency
+
+
+class LlmUsageResponse(BaseModel):
+    days: int | None = None
+    total_calls: int
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int = 0
+    items: list[LlmUsageItem] = Field(default_factory=list)
+
+
+class UpstreamHostStats(BaseModel):
+    host: str
+    requests: int
+    errors: int
+    retries: int
+    new_connections: int
+    reused_connections: int
+    reuse_rate: float
+    avg_latency_ms: float
+    max_latency_ms: float
+
+
+class UpstreamHostStatsResponse(BaseModel):
+    hosts: list[UpstreamHostStats]
+
+
+class CircuitBreakerState(BaseModel):
+    name: str
+    state: str
+    window_calls: int
+    window_errors: int
+    window_slow_calls: int
+    error_rate: float
+    slow_call_rate: float
+    rejected: int
+    opened_count: int
+    retry_after_sec: float
+
+
+class CircuitBreakerStatesResponse(BaseModel):
+    enabled: bool
+    breakers: list[CircuitBreakerState]
+
+
+class BulkheadState(BaseModel):
+    name: str
+    max_concurrent: int
+    max_queue: int
+    active: int
+    queued: int
+    saturation: float
+    peak_active: int
+    peak_queued: int
+    admitted: int
+    rejected: int
+    timed_out: int
+    avg_hold_ms: float
+
+
+class BulkheadStatesResponse(BaseModel):
+    enabled: bool
+    bulkheads: list[BulkheadState]
+
+
+class AnswerCacheEntry(BaseModel):
+    key: str
+    question: str
+    model_variant: str
+    conclusion: str
+    citations: int
+    has_audio: bool
+    pinned: bool
+    hits: int
+    created_at: float
+
+
+class AnswerCacheResponse(BaseModel):
+    enabled: bool
+    entries: int
+    pinned: int
+    hits: int
+    misses: int
+    hit_rate: float
+    items: list[AnswerCacheEntry]
+
+
+class AnswerCachePurgeResponse(BaseModel):
+    purged: int
+
+
+class AnswerWarmupItem(BaseModel):
+    question: str
+    ok: bool
+    audio_ready: bool
+    elapsed_ms: float
+    error: str | None = None
+
+
+class AnswerWarmupResponse(BaseModel):
+    status: str
+    runs: int
+    total: int
+    completed: int
+    failed: int
+    started_at: float | None = None
+    finished_at: float | None = None
+    elapsed_ms: float
+    cache_entries: int
+    items: list[AnswerWarmupItem]
@@ -25,3 +25,9 @@ class RuntimeConfig(BaseModel):
     model_name: str = ""
     temperature: float = Field(default=0.2, ge=0.0, le=1.0)
     max_tokens: int = Field(default=260, ge=128, le=4096)
+    # 自动模型路由（请求 model_variant="auto" 时生效）：短、单主题、历史浅且检索结果区分度足够的问题走快速模型。
+    model_routing_enabled: bool = True
+    route_fast_max_chars: int = Field(default=40, ge=0, le=500)
+    route_fast_max_topics: int = Field(default=1, ge=0, le=10)
+    route_fast_max_history_turns: int = Field(default=1, ge=0, le=20)
+    route_fast_min_score_gap: float = Field(default=0.05, ge=0.0, le=1.0)
@@ -0,0 +1,285 @@
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import closing
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+from app.core.config import settings
+
+# 整条回答缓存：高频、无历史的问题直接复用最终 AnswerJson 与合成好的语音，跳过回答 LLM 与 TTS。
+# 键包含依据 chunk 集合与语料版本：检索结果或知识库一变，键随之变化，旧回答自然失效。
+# 置顶（pinned）条目不受 TTL 与容量淘汰影响，只能手动清除。
+_CACHE: "OrderedDict[str, dict[str, Any]]" = OrderedDict()
+_CACHE_LOCK = Lock()
+_LOADED = False
+_STATS = {"hits": 0, "misses": 0}
+_WS_RE = re.compile(r"\s+")
+_TRAILING_PUNCT = "?？。.!！~～…"
+
+
+def _get_db_path() -> Path:
+    root = Path(__file__).resolve().parents[3]
+    db_path = Path(settings.answer_cache_db_path)
+    if not db_path.is_absolute():
+        db_path = root / db_path
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    return db_path
+
+
+def _get_conn() -> sqlite3.Connection:
+    return sqlite3.connect(_get_db_path())
+
+
+def _ensure_table(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS answer_cache (
+            cache_key TEXT PRIMARY KEY,
+            question TEXT NOT NULL,
+            model_variant TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            audio_url TEXT,
+            pinned INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL
+        )
+        """
+    )
+
+
+def normalize_question(text: str) -> str:
+    """去掉空白与句末标点并转小写，使“房东不退押金怎么办？”与“房东 不退押金怎么办”同键。"""
+    return _WS_RE.sub("", (text or "").lower()).rstrip(_TRAILING_PUNCT)
+
+
+def cache_key(
+    question: str,
+    tags: frozenset[str] | set[str] | list[str],
+    chunk_ids: list[str],
+    model_variant: str,
+    corpus_version: str,
+) -> str:
+    raw = json.dumps(
+        [normalize_question(question), sorted(tags), sorted(set(chunk_ids)), model_variant, corpus_version],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def get(key: str | None) -> dict[str, Any] | None:
+    """命中返回 {"answer": AnswerJson 字典, "audio_url": 语音地址或 None}。"""
+    if key is None or not settings.answer_cache_enabled:
+        return None
+    _ensure_loaded()
+    now = time.time()
+    with _CACHE_LOCK:
+        entry = _CACHE.get(key)
+        if entry is not None and not entry["pinned"] and now - entry["created_at"] > _ttl_sec():
+            _CACHE.pop(key, None)
+            entry = None
+        if entry is None:
+            _STATS["misses"] += 1
+            return None
+        _CACHE.move_to_end(key)
+        _STATS["hits"] += 1
+        entry["hits"] += 1
+        return {"answer": dict(entry["answer"]), "audio_url": entry["audio_url"]}
+
+
+def put(key: str | None, question: str, model_variant: str, answer: dict[str, Any], audio_url: str | None = None) -> None:
+    """写入或刷新条目；已有条目的置顶状态与命中次数保留，新结果没有语音时沿用旧语音。"""
+    if key is None or not settings.answer_cache_enabled:
+        return
+    _ensure_loaded()
+    with _CACHE_LOCK:
+        previous = _CACHE.get(key)
+        entry = {
+            "question": question,
+            "model_variant": model_variant,
+            "answer": dict(answer),
+            "audio_url": audio_url or (previous["audio_url"] if previous else None),
+            "pinned": bool(previous and previous["pinned"]),
+            "hits": previous["hits"] if previous else 0,
+            "created_at": time.time(),
+        }
+        _CACHE[key] = entry
+        _CACHE.move_to_end(key)
+        _evict_locked()
+    try:
+        with closing(_get_conn()) as conn:
+            _ensure_table(conn)
+            conn.execute(
+                "INSERT OR REPLACE INTO answer_cache "
+                "(cache_key, question, model_variant, answer, audio_url, pinned, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    question,
+                    model_variant,
+                    json.dumps(entry["answer"], ensure_ascii=False),
+                    entry["audio_url"],
+                    int(entry["pinned"]),
+                    entry["created_at"],
+                ),
+            )
+            conn.execute(
+                "DELETE FROM answer_cache WHERE pinned = 0 AND (created_at < ? OR cache_key IN "
+                "(SELECT cache_key FROM answer_cache WHERE pinned = 0 ORDER BY created_at DESC LIMIT -1 OFFSET ?))",
+                (entry["created_at"] - _ttl_sec(), _max_entries()),
+            )
+            conn.commit()
+    except sqlite3.Error:
+        # 持久化失败只影响重启后的命中率，不影响本次回答。
+        pass
+
+
+def pin(key: str, pinned: bool = True) -> bool:
+    """设置置顶状态；条目不存在时返回 False。"""
+    _ensure_loaded()
+    with _CACHE_LOCK:
+        entry = _CACHE.get(key)
+        if entry is None:
+            return False
+        entry["pinned"] = bool(pinned)
+        if not pinned:
+            # 取消置顶后从当前时刻重新计算 TTL，避免立刻过期。
+            entry["created_at"] = time.time()
+        created_at = entry["created_at"]
+    _execute("UPDATE answer_cache SET pinned = ?, created_at = ? WHERE cache_key = ?", (int(pinned), created_at, key))
+    return True
+
+
+def purge(key: str | None = None, include_pinned: bool = False) -> int:
+    """清除单个条目（key）或全部条目（默认保留置顶条目）；返回清除条数。"""
+    _ensure_loaded()
+    with _CACHE_LOCK:
+        if key is not None:
+            keys = [key] if key in _CACHE else []
+        else:
+            keys = [k for k, entry in _CACHE.items() if include_pinned or not entry["pinned"]]
+        for k in keys:
+            _CACHE.pop(k, None)
+    if key is not None:
+        _execute("DELETE FROM answer_cache WHERE cache_key = ?", (key,))
+    elif include_pinned:
+        _execute("DELETE FROM answer_cache", ())
+    else:
+        _execute("DELETE FROM answer_cache WHERE pinned = 0", ())
+    return len(keys)
+
+
+def list_entries(limit: int = 100) -> list[dict[str, Any]]:
+    """按最近使用倒序列出条目摘要（不含完整回答）。"""
+    _ensure_loaded()
+    with _CACHE_LOCK:
+        items = list(reversed(_CACHE.items()))[: max(0, int(limit))]
+        return [
+            {
+                "key": key,
+                "question": entry["question"],
+                "model_variant": entry["model_variant"],
+                "conclusion": str(entry["answer"].get("conclusion") or ""),
+                "citations": len(entry["answer"].get("citations") or []),
+                "has_audio": bool(entry["audio_url"]),
+                "pinned": entry["pinned"],
+                "hits": entry["hits"],
+                "created_at": entry["created_at"],
+            }
+            for key, entry in items
+        ]
+
+
+def warm() -> int:
+    """从 SQLite 载入置顶与未过期条目；返回载入条数。"""
+    global _LOADED
+    rows: list[tuple[str, str, str, str, str | None, int, float]] = []
+    try:
+        if not _get_db_path().exists():
+            raise FileNotFoundError
+        with closing(_get_conn()) as conn:
+            _ensure_table(conn)
+            pinned_count = conn.execute("SELECT COUNT(*) FROM answer_cache WHERE pinned = 1").fetchone()[0]
+            rows = conn.execute(
+                "SELECT cache_key, question, model_variant, answer, audio_url, pinned, created_at FROM answer_cache "
+                "WHERE pinned = 1 OR created_at >= ? ORDER BY pinned DESC, created_at DESC LIMIT ?",
+                (time.time() - _ttl_sec(), _max_entries() + int(pinned_count)),
+            ).fetchall()
+    except (sqlite3.Error, FileNotFoundError):
+        rows = []
+    loaded = 0
+    with _CACHE_LOCK:
+        for key, question, model_variant, answer, audio_url, pinned, created_at in sorted(rows, key=lambda row: row[6]):
+            try:
+                payload = json.loads(answer)
+            except json.JSONDecodeError:
+                continue
+            _CACHE.setdefault(
+                key,
+                {
+                    "question": question,
+                    "model_variant": model_variant,
+                    "answer": payload,
+                    "audio_url": audio_url,
+                    "pinned": bool(pinned),
+                    "hits": 0,
+                    "created_at": float(created_at),
+                },
+            )
+            loaded += 1
+        _LOADED = True
+    return loaded
+
+
+def clear() -> None:
+    global _LOADED
+    with _CACHE_LOCK:
+        _CACHE.clear()
+        _STATS.update({"hits": 0, "misses": 0})
+        _LOADED = True
+    if _get_db_path().exists():
+        _execute("DELETE FROM answer_cache", ())
+
+
+def get_stats() -> dict[str, Any]:
+    with _CACHE_LOCK:
+        hits, misses = int(_STATS["hits"]), int(_STATS["misses"])
+        return {
+            "enabled": settings.answer_cache_enabled,
+            "entries": len(_CACHE),
+            "pinned": sum(1 for entry in _CACHE.values() if entry["pinned"]),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        }
+
+
+def _evict_locked() -> None:
+    unpinned = [key for key, entry in _CACHE.items() if not entry["pinned"]]
+    for key in unpinned[: max(0, len(unpinned) - _max_entries())]:
+        _CACHE.pop(key, None)
+
+
+def _execute(sql: str, params: tuple[Any, ...]) -> None:
+    try:
+        with closing(_get_conn()) as conn:
+            _ensure_table(conn)
+            conn.execute(sql, params)
+            conn.commit()
+    except sqlite3.Error:
+        pass
+
+
+def _ensure_loaded() -> None:
+    if not _LOADED:
+        warm()
+
+
+def _ttl_sec() -> float:
+    return max(1.0, float(settings.answer_cache_ttl_sec))
+
+
+def _max_entries() -> int:
+    return max(1, int(settings.answer_cache_max_entries))
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from app.core.config import settings
+from app.core.logging import log_event
+from app.schemas.chat import ChatRequest, ChatResponse
+from app.services import answer_cache
+from app.services import session_store
+
+logger = logging.getLogger(__name__)
+
+# 回答预热：把推荐问题逐个走一遍完整的非流式问答流程（检索、回答、TTS），结果经正常路径写入整条回答缓存，
+# 用户第一次点推荐问题即可命中。问答流程由调用方注入（api 层的 handle_chat），这里只负责调度与进度。
+ChatHandler = Callable[[ChatRequest, str, str], Awaitable[ChatResponse]]
+# 固定会话且每题前清空历史：只有无历史的请求才能写入回答缓存。
+_SESSION_ID = "__answer_warmup__"
+_STATE: dict[str, Any] = {
+    "status": "idle",
+    "runs": 0,
+    "total": 0,
+    "completed": 0,
+    "failed": 0,
+    "started_at": None,
+    "finished_at": None,
+    "elapsed_ms": 0.0,
+    "items": [],
+}
+_STATE_LOCK = threading.Lock()
+_TASK: "asyncio.Task[None] | None" = None
+
+
+def get_state() -> dict[str, Any]:
+    with _STATE_LOCK:
+        state = dict(_STATE)
+        state["items"] = [dict(item) for item in _STATE["items"]]
+    state["cache_entries"] = answer_cache.get_stats()["entries"]
+    return state
+
+
+def is_running() -> bool:
+    return _TASK is not None and not _TASK.done()
+
+
+def start(handler: ChatHandler, questions: list[str] | None = None) -> bool:
+    """在后台跑一轮预热；已有一轮在跑时返回 False。"""
+    global _TASK
+    if is_running():
+        return False
+    _TASK = asyncio.create_task(run(handler, questions))
+    return True
+
+
+async def run_forever(handler: ChatHandler) -> None:
+    """启动时跑一轮，ANSWER_WARMUP_INTERVAL_SEC > 0 时按间隔重复（缓存过期后重新生成）。"""
+    while True:
+        if start(handler) and _TASK is not None:
+            await _TASK
+        interval = settings.answer_warmup_interval_sec
+        if interval <= 0:
+            return
+        await asyncio.sleep(interval)
+
+
+async def run(handler: ChatHandler, questions: list[str] | None = None) -> None:
+    questions = settings.suggested_question_list() if questions is None else questions
+    started = time.perf_counter()
+    with _STATE_LOCK:
+        _STATE.update(
+            {
+                "status": "running" if settings.answer_cache_enabled else "skipped",
+                "runs": _STATE["runs"] + 1,
+                "total": len(questions),
+                "completed": 0,
+                "failed": 0,
+                "started_at": time.time(),
+                "finished_at": None,
+                "elapsed_ms": 0.0,
+                "items": [],
+            }
+        )
+    if not settings.answer_cache_enabled:
+        # 回答缓存关闭时预热没有意义，只记录状态。
+        log_event(logger, "info", "answer_warmup_skipped", reason="answer_cache_disabled")
+        return
+
+    for question in questions:
+        item_started = time.perf_counter()
+        item: dict[str, Any] = {"question": question, "ok": False, "audio_ready": False, "elapsed_ms": 0.0, "error": None}
+        try:
+            await session_store.delete_chat_history_async(_SESSION_ID)
+            resp = await handler(ChatRequest(session_id=_SESSION_ID, text=question), "warmup", "chat_warmup")
+            item.update({"ok": True, "audio_ready": bool(resp.audio_url)})
+        except asyncio.CancelledError:
+            with _STATE_LOCK:
+                _STATE["status"] = "cancelled"
+            raise
+        except Exception as exc:
+            item["error"] = type(exc).__name__
+        item["elapsed_ms"] = round((time.perf_counter() - item_started) * 1000, 2)
+        with _STATE_LOCK:
+            _STATE["items"].append(item)
+            _STATE["completed"] += 1
+            _STATE["failed"] += 0 if item["ok"] else 1
+            _STATE["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    try:
+        await session_store.delete_chat_history_async(_SESSION_ID)
+    except Exception:
+        pass
+    with _STATE_LOCK:
+        _STATE.update({"status": "done", "finished_at": time.time(), "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)})
+        failed, elapsed_ms = _STATE["failed"], _STATE["elapsed_ms"]
+    log_event(
+        logger,
+        "info",
+        "answer_warmup_done",
+        total=len(questions),
+        failed=failed,
+        cache_entries=answer_cache.get_stats()["entries"],
+        cost_ms=f"{elapsed_ms:.2f}",
+    )
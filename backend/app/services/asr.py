@@ -10,7 +10,6 @@ import wave
 import math
 import time
 from pathlib import Path
-from urllib import error, request
 
 import websockets
 from websockets.exceptions import ConnectionClosed, ConnectionClosedOK
@@ -20,8 +19,8 @@ except Exception:  # pragma: no cover
     InvalidStatus = Exception  # type: ignore[assignment]
 
 from app.core.config import settings
+from app.services import http_client
 
-_NO_PROXY_OPENER = request.build_opener(request.ProxyHandler({}))
 logger = logging.getLogger(__name__)
 
 
@@ -31,16 +30,6 @@ _LAST_SERVER_SUMMARY: str | None = None
 _LAST_AUDIO_PROBE: str | None = None
 
 
-def _get_opener():
-    # Prefer explicit proxy from settings; otherwise follow system proxy; optionally force direct.
-    if settings.force_no_proxy:
-        return _NO_PROXY_OPENER
-    proxy = (settings.outbound_proxy or "").strip()
-    if proxy:
-        return request.build_opener(request.ProxyHandler({"http": proxy, "https": proxy}))
-    return request.build_opener()
-
-
 def transcribe(audio_bytes: bytes, content_type: str | None = None) -> str:
     global _LAST_DETAIL, _LAST_LOG_ID, _LAST_SERVER_SUMMARY, _LAST_AUDIO_PROBE
     _LAST_DETAIL = None
@@ -95,19 +84,19 @@ def _ark_transcribe(audio_bytes: bytes, content_type: str | None = None) -> str:
         },
         "language": settings.asr_language,
     }
-    req_obj = request.Request(
-        url=f"{settings.resolved_asr_base_url()}/audio/transcriptions",
-        data=json.dumps(payload).encode("utf-8"),
-        headers={
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        },
-        method="POST",
-    )
     try:
-        with _get_opener().open(req_obj, timeout=20) as resp:
-            parsed = json.loads(resp.read().decode("utf-8", errors="ignore"))
-    except (error.HTTPError, error.URLError, TimeoutError, OSError, json.JSONDecodeError):
+        resp = http_client.request(
+            "POST",
+            f"{settings.resolved_asr_base_url()}/audio/transcriptions",
+            json=payload,
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+            },
+            timeout=20,
+        )
+        parsed = json.loads(resp.content.decode("utf-8", errors="ignore"))
+    except (http_client.UpstreamError, json.JSONDecodeError):
         return ""
 
     text = parsed.get("text") or parsed.get("result") or parsed.get("data", {}).get("text")
@@ -552,22 +541,22 @@ def _doubao_open_transcribe(audio_bytes: bytes, content_type: str | None = None)
         },
         "request": {"model_name": "bigmodel"},
     }
-    req_obj = request.Request(
-        url=f"{base}{settings.asr_submit_path}",
-        data=json.dumps(payload).encode("utf-8"),
-        headers={
-            "X-Api-App-Key": app_id,
-            "X-Api-Access-Key": access_token,
-            "X-Api-Resource-Id": resource_id,
-            "X-Api-Request-Id": uuid.uuid4().hex,
-            "Content-Type": "application/json",
-        },
-        method="POST",
-    )
     try:
-        with _get_opener().open(req_obj, timeout=20) as resp:
-            parsed = json.loads(resp.read().decode("utf-8", errors="ignore"))
-    except (error.HTTPError, error.URLError, TimeoutError, OSError, json.JSONDecodeError):
+        resp = http_client.request(
+            "POST",
+            f"{base}{settings.asr_submit_path}",
+            json=payload,
+            headers={
+                "X-Api-App-Key": app_id,
+                "X-Api-Access-Key": access_token,
+                "X-Api-Resource-Id": resource_id,
+                "X-Api-Request-Id": uuid.uuid4().hex,
+                "Content-Type": "application/json",
+            },
+            timeout=20,
+        )
+        parsed = json.loads(resp.content.decode("utf-8", errors="ignore"))
+    except (http_client.UpstreamError, json.JSONDecodeError):
         return ""
 
     text = (
@@ -616,27 +605,26 @@ def _doubao_auc_transcribe(audio_bytes: bytes, content_type: str | None = None)
         },
         "request": {"model_name": "bigmodel", "enable_itn": True, "enable_punc": True, "show_utterances": False},
     }
-    submit_req = request.Request(
-        url=f"{base}{settings.asr_submit_path}",
-        data=json.dumps(submit_payload).encode("utf-8"),
-        headers=headers,
-        method="POST",
-    )
     try:
-        with _get_opener().open(submit_req, timeout=20) as resp:
-            _LAST_LOG_ID = resp.headers.get("X-Tt-Logid", "")
-            status_code = resp.headers.get("X-Api-Status-Code", "")
-            status_msg = resp.headers.get("X-Api-Message", "")
-            if status_code and status_code != "20000000":
-                _LAST_DETAIL = f"submit失败 status={status_code} msg={status_msg}"
-                return ""
-    except error.HTTPError as exc:
-        body = exc.read().decode("utf-8", errors="ignore")
-        probe = f"{_LAST_AUDIO_PROBE}，" if _LAST_AUDIO_PROBE else ""
-        _LAST_DETAIL = f"{probe}submit HTTPError={exc.code} body={body[:300]}"
+        resp = http_client.request(
+            "POST",
+            f"{base}{settings.asr_submit_path}",
+            json=submit_payload,
+            headers=headers,
+            timeout=20,
+        )
+    except http_client.UpstreamError as exc:
+        if exc.status_code is not None:
+            probe = f"{_LAST_AUDIO_PROBE}，" if _LAST_AUDIO_PROBE else ""
+            _LAST_DETAIL = f"{probe}submit HTTPError={exc.status_code} body={exc.body[:300]}"
+        else:
+            _LAST_DETAIL = f"submit异常={exc}"
         return ""
-    except Exception as exc:
-        _LAST_DETAIL = f"submit异常={type(exc).__name__}"
+    _LAST_LOG_ID = resp.headers.get("X-Tt-Logid", "")
+    status_code = resp.headers.get("X-Api-Status-Code", "")
+    status_msg = resp.headers.get("X-Api-Message", "")
+    if status_code and status_code != "20000000":
+        _LAST_DETAIL = f"submit失败 status={status_code} msg={status_msg}"
         return ""
 
     query_headers = {
@@ -646,21 +634,21 @@ def _doubao_auc_transcribe(audio_bytes: bytes, content_type: str | None = None)
         "X-Api-Request-Id": task_id,
         "Content-Type": "application/json",
     }
-    query_req = request.Request(
-        url=f"{base}{settings.asr_query_path}",
-        data=b"{}",
-        headers=query_headers,
-        method="POST",
-    )
     deadline = time.time() + max(5, int(settings.asr_auc_timeout_sec))
     while time.time() < deadline:
         try:
-            with _get_opener().open(query_req, timeout=20) as resp:
-                _LAST_LOG_ID = resp.headers.get("X-Tt-Logid", "") or _LAST_LOG_ID
-                status_code = (resp.headers.get("X-Api-Status-Code") or "").strip()
-                status_msg = (resp.headers.get("X-Api-Message") or "").strip()
-                body = resp.read().decode("utf-8", errors="ignore")
-                parsed = json.loads(body) if body else {}
+            resp = http_client.request(
+                "POST",
+                f"{base}{settings.asr_query_path}",
+                content=b"{}",
+                headers=query_headers,
+                timeout=20,
+            )
+            _LAST_LOG_ID = resp.headers.get("X-Tt-Logid", "") or _LAST_LOG_ID
+            status_code = (resp.headers.get("X-Api-Status-Code") or "").strip()
+            status_msg = (resp.headers.get("X-Api-Message") or "").strip()
+            body = resp.content.decode("utf-8", errors="ignore")
+            parsed = json.loads(body) if body else {}
         except Exception as exc:
             _LAST_DETAIL = f"query异常={type(exc).__name__}"
             return ""
@@ -720,17 +708,17 @@ def _doubao_flash_transcribe(audio_bytes: bytes, content_type: str | None, task_
         },
         "request": {"model_name": "bigmodel", "enable_itn": True, "enable_punc": True, "show_utterances": False},
     }
-    req = request.Request(
-        url=f"{base}/api/v3/auc/bigmodel/recognize/flash",
-        data=json.dumps(payload).encode("utf-8"),
-        headers=headers,
-        method="POST",
-    )
     try:
-        with _get_opener().open(req, timeout=30) as resp:
-            status_code = (resp.headers.get("X-Api-Status-Code") or "").strip()
-            status_msg = (resp.headers.get("X-Api-Message") or "").strip()
-            body = resp.read().decode("utf-8", errors="ignore")
+        resp = http_client.request(
+            "POST",
+            f"{base}/api/v3/auc/bigmodel/recognize/flash",
+            json=payload,
+            headers=headers,
+            timeout=30,
+        )
+        status_code = (resp.headers.get("X-Api-Status-Code") or "").strip()
+        status_msg = (resp.headers.get("X-Api-Message") or "").strip()
+        body = resp.content.decode("utf-8", errors="ignore")
         if status_code and status_code != "20000000":
             return "", f"flash status={status_code} msg={status_msg}"
         parsed = json.loads(body) if body else {}
@@ -740,9 +728,10 @@ def _doubao_flash_transcribe(audio_bytes: bytes, content_type: str | None, task_
             if isinstance(text, str) and text.strip():
                 return text.strip(), ""
         return "", "flash返回成功但文本为空"
-    except error.HTTPError as exc:
-        body = exc.read().decode("utf-8", errors="ignore")
-        return "", f"flash HTTPError={exc.code} body={body[:200]}"
+    except http_client.UpstreamError as exc:
+        if exc.status_code is None:
+            return "", f"flash异常={exc}"
+        return "", f"flash HTTPError={exc.status_code} body={exc.body[:200]}"
     except Exception as exc:
         return "", f"flash异常={type(exc).__name__}"
 
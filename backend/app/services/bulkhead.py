@@ -0,0 +1,240 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from app.core.config import settings
+
+# 每个上游一个舱壁：限制同时进行的调用数，超出的调用排队（队列也有上限），
+# 排满或等待超时立即失败，避免某个慢上游占满线程池 / 连接把其它接口一起拖垮。
+# 线程与事件循环里的调用共用同一个舱壁，释放时按 FIFO 把名额直接交给队首等待者。
+_HELD: ContextVar[frozenset[str]] = ContextVar("bulkheads_held", default=frozenset())
+_HOLD_EWMA_ALPHA = 0.2
+_MAX_RETRY_AFTER_SEC = 60
+
+
+class BulkheadFullError(Exception):
+    """舱壁已满：reason 为 queue_full（排队已满，对外 429）或 queue_timeout（排队超时，对外 503）。"""
+
+    def __init__(self, name: str, reason: str, retry_after_sec: int) -> None:
+        super().__init__(f"bulkhead {reason}: {name}")
+        self.name = name
+        self.reason = reason
+        self.retry_after_sec = retry_after_sec
+
+    @property
+    def status_code(self) -> int:
+        return 429 if self.reason == "queue_full" else 503
+
+
+class _Waiter:
+    __slots__ = ("granted", "wake")
+
+    def __init__(self, wake: Callable[[], None]) -> None:
+        self.granted = False
+        self.wake = wake
+
+
+class Bulkhead:
+    def __init__(self, name: str, *, max_concurrent: int, max_queue: int, queue_timeout_sec: float) -> None:
+        self.name = name
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout_sec = max(0.0, float(queue_timeout_sec))
+        self._lock = threading.Lock()
+        self._waiters: deque[_Waiter] = deque()
+        self._active = 0
+        self._peak_active = 0
+        self._peak_queued = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._hold_ms_ewma = 0.0
+
+    def acquire(self) -> None:
+        event = threading.Event()
+        waiter = self._try_enter(event.set)
+        if waiter is None:
+            return
+        event.wait(self.queue_timeout_sec)
+        self._finish_wait(waiter)
+
+    async def acquire_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[None] = loop.create_future()
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        waiter = self._try_enter(wake)
+        if waiter is None:
+            return
+        try:
+            await asyncio.wait({future}, timeout=self.queue_timeout_sec)
+        except BaseException:
+            # 等待期间被取消：已经拿到的名额要还回去。
+            with self._lock:
+                if waiter.granted:
+                    self._release_locked()
+                else:
+                    self._waiters.remove(waiter)
+            raise
+        self._finish_wait(waiter)
+
+    def release(self, held_ms: float = 0.0) -> None:
+        with self._lock:
+            self._hold_ms_ewma = (
+                held_ms if self._hold_ms_ewma == 0 else (1 - _HOLD_EWMA_ALPHA) * self._hold_ms_ewma + _HOLD_EWMA_ALPHA * held_ms
+            )
+            self._release_locked()
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "queued": len(self._waiters),
+                "saturation": round(self._active / self.max_concurrent, 4),
+                "peak_active": self._peak_active,
+                "peak_queued": self._peak_queued,
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "avg_hold_ms": round(self._hold_ms_ewma, 2),
+            }
+
+    def _try_enter(self, wake: Callable[[], None]) -> _Waiter | None:
+        """有空闲名额时直接占用并返回 None；否则登记等待者，排队已满则抛出 queue_full。"""
+        with self._lock:
+            if self._active < self.max_concurrent and not self._waiters:
+                self._grant_locked()
+                return None
+            if len(self._waiters) >= self.max_queue:
+                self._rejected += 1
+                raise BulkheadFullError(self.name, "queue_full", self._retry_after_locked())
+            waiter = _Waiter(wake)
+            self._waiters.append(waiter)
+            self._peak_queued = max(self._peak_queued, len(self._waiters))
+            return waiter
+
+    def _finish_wait(self, waiter: _Waiter) -> None:
+        with self._lock:
+            if waiter.granted:
+                return
+            self._waiters.remove(waiter)
+            self._timed_out += 1
+            raise BulkheadFullError(self.name, "queue_timeout", self._retry_after_locked())
+
+    def _grant_locked(self) -> None:
+        self._active += 1
+        self._admitted += 1
+        self._peak_active = max(self._peak_active, self._active)
+
+    def _release_locked(self) -> None:
+        self._active -= 1
+        if self._waiters:
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+            self._grant_locked()
+            waiter.wake()
+
+    def _retry_after_locked(self) -> int:
+        # 按平均占用时长估算排在当前队列之后大约要等多久。
+        rounds = (len(self._waiters) + 1) / self.max_concurrent
+        estimate = math.ceil(rounds * self._hold_ms_ewma / 1000) if self._hold_ms_ewma else 1
+        return min(_MAX_RETRY_AFTER_SEC, max(1, estimate))
+
+
+_BULKHEADS: dict[str, Bulkhead] = {}
+_BULKHEADS_LOCK = threading.Lock()
+
+
+def get_bulkhead(name: str) -> Bulkhead | None:
+    """按 BULKHEAD_LIMITS 创建；未配置限额的名字返回 None（不限流）。"""
+    bulkhead = _BULKHEADS.get(name)
+    if bulkhead is not None:
+        return bulkhead
+    limits = settings.bulkhead_limit_map().get(name)
+    if limits is None:
+        return None
+    with _BULKHEADS_LOCK:
+        bulkhead = _BULKHEADS.get(name)
+        if bulkhead is None:
+            bulkhead = Bulkhead(
+                name,
+                max_concurrent=limits[0],
+                max_queue=limits[1],
+                queue_timeout_sec=settings.bulkhead_queue_timeout_sec,
+            )
+            _BULKHEADS[name] = bulkhead
+    return bulkhead
+
+
+def _resolve(name: str | None) -> Bulkhead | None:
+    # 同一上下文里已经持有该舱壁（如接口入口已准入，内部再调用同名上游）时不重复占用名额。
+    if not name or not settings.bulkhead_enabled or name in _HELD.get():
+        return None
+    return get_bulkhead(name)
+
+
+@contextmanager
+def guard(name: str | None) -> Iterator[None]:
+    bulkhead = _resolve(name)
+    if bulkhead is None:
+        yield
+        return
+    bulkhead.acquire()
+    held = _HELD.get()
+    _HELD.set(held | {bulkhead.name})
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _HELD.set(held)
+        bulkhead.release((time.perf_counter() - started) * 1000)
+
+
+@asynccontextmanager
+async def aguard(name: str | None) -> AsyncIterator[None]:
+    bulkhead = _resolve(name)
+    if bulkhead is None:
+        yield
+        return
+    await bulkhead.acquire_async()
+    held = _HELD.get()
+    _HELD.set(held | {bulkhead.name})
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        # 不用 reset(token)：依赖注入的退出阶段不一定与进入时处于同一个 Context。
+        _HELD.set(held)
+        bulkhead.release((time.perf_counter() - started) * 1000)
+
+
+def admission(name: str) -> Callable[[], AsyncIterator[None]]:
+    """FastAPI 依赖：同步接口在事件循环里排队准入，不占用线程池线程；满载时抛出 BulkheadFullError。"""
+
+    async def dependency() -> AsyncIterator[None]:
+        async with aguard(name):
+            yield
+
+    return dependency
+
+
+def get_states() -> list[dict[str, Any]]:
+    names = sorted({*settings.bulkhead_limit_map(), *_BULKHEADS})
+    return [bulkhead.snapshot() for bulkhead in (get_bulkhead(name) for name in names) if bulkhead is not None]
+
+
+def reset() -> None:
+    """丢弃全部舱壁，下次使用时按当前配置重建（配置变更或测试用）。"""
+    with _BULKHEADS_LOCK:
+        _BULKHEADS.clear()
@@ -1,12 +1,15 @@
 import json
 import logging
+import time
 import uuid
 from typing import Any
-from urllib import error, request
 
 from app.core.config import settings
 from app.schemas.case import CaseResponse, CaseStartRequest, CaseStepRequest
 from app.schemas.common import Citation
+from app.services import http_client
+from app.services import llm_cache
+from app.services import llm_usage
 from app.services import session_store
 from app.services.runtime_config import get_runtime_config
 
@@ -236,35 +239,55 @@ def step_case(req: CaseStepRequest) -> CaseResponse:
 
 # ── LLM 调用 ──────────────────────────────────────────────────────────
 
-def _llm_call(system_prompt: str, user_prompt: str) -> str:
-    """统一的 LLM 调用"""
+def _llm_call(system_prompt: str, user_prompt: str, temperature: float = 0.6, cacheable: bool = False) -> str:
+    """统一的 LLM 调用；cacheable=True 时相同 prompt 复用缓存结果。"""
     payload = {
         "model": settings.resolved_llm_model(),
         "messages": [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
         ],
-        "temperature": 0.6,
+        "temperature": temperature,
     }
-    url = f"{settings.resolved_llm_base_url()}/chat/completions"
-    data = json.dumps(payload).encode("utf-8")
-    req_obj = request.Request(
-        url=url,
-        data=data,
-        headers={
-            "Authorization": f"Bearer {settings.resolved_llm_api_key()}",
-            "Content-Type": "application/json",
-        },
-        method="POST",
-    )
+    key = llm_cache.cache_key(payload, force=cacheable)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        try:
+            return json.loads(cached)["choices"][0]["message"]["content"].strip()
+        except (KeyError, IndexError, TypeError, json.JSONDecodeError):
+            pass  # 旧版本直接存正文的条目按未命中处理，重新请求后覆盖
+    started = time.perf_counter()
     try:
-        with request.urlopen(req_obj, timeout=get_runtime_config().timeout_sec) as resp:
-            body = resp.read().decode("utf-8")
-            raw = json.loads(body)
-            return raw["choices"][0]["message"]["content"].strip()
+        resp = http_client.request(
+            "POST",
+            f"{settings.resolved_llm_base_url()}/chat/completions",
+            json=payload,
+            headers={
+                "Authorization": f"Bearer {settings.resolved_llm_api_key()}",
+                "Content-Type": "application/json",
+            },
+            timeout=get_runtime_config().timeout_sec,
+            breaker="llm",
+        )
+        raw = resp.json()
+        content = raw["choices"][0]["message"]["content"].strip()
     except Exception as e:
         logger.warning("LLM call failed: %s", e)
+        llm_usage.record("case", payload["model"], None, None, None, (time.perf_counter() - started) * 1000, ok=False)
         return ""
+    duration_ms = (time.perf_counter() - started) * 1000
+    prompt_tokens, completion_tokens = llm_usage.parse_usage(raw.get("usage"))
+    llm_usage.record(
+        "case",
+        payload["model"],
+        prompt_tokens,
+        completion_tokens,
+        duration_ms,
+        duration_ms,
+        cached_tokens=llm_usage.parse_cached_tokens(raw.get("usage")),
+    )
+    llm_cache.put(key, payload["model"], resp.text, (time.perf_counter() - started) * 1000)
+    return content
 
 
 def _parse_json_from_text(text: str) -> dict[str, Any]:
@@ -325,7 +348,8 @@ def _llm_generate_options(case: dict[str, Any], state: dict[str, Any], context:
         f"上下文：{context[:300]}\n\n"
         "请生成下一步的选项。"
     )
-    result = _llm_call(system_prompt, user_prompt)
+    # 相同案件、阶段、轮次与上下文的选项 prompt 会反复出现（如重复开庭），直接复用。
+    result = _llm_call(system_prompt, user_prompt, cacheable=True)
     parsed = _parse_json_from_text(result)
     if parsed and "options" in parsed:
         return parsed
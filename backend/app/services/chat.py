@@ -1,14 +1,28 @@
+import asyncio
 import json
 import logging
 import re
-from collections.abc import Iterator
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import Any
-from urllib import error, request
 
 from app.core.config import settings
 from app.schemas.chat import AnswerJson, ChatRequest
 from app.schemas.common import Citation
 from app.services.runtime_config import get_runtime_config
+from app.services import circuit_breaker
+from app.services import context_cache
+from app.services import deadline
+from app.services import faq as faq_service
+from app.services import http_client
+from app.services import keyword_matcher
+from app.services import llm_cache
+from app.services import llm_hedge
+from app.services import llm_usage
+from app.services import prompt_budget
 from app.services import web_search as web_search_service
 
 logger = logging.getLogger(__name__)
@@ -40,9 +54,21 @@ _QUERY_SELF_CONTAINED_KEYWORDS = (
 )
 _ANSWER_EVIDENCE_LIMIT = 3
 _ANSWER_HISTORY_LIMIT = 4
+# 预算再紧，每条近期历史也至少保留这么多 token，避免整条被截空。
+_HISTORY_MIN_TOKENS = 24
 _RETRIEVAL_QUERY_MAX_LEN = 220
 _STREAM_CITATION_SENTINEL = "[[CITATIONS:"
+_SENTENCE_END_CHARS = frozenset("。！？!?；;\n")
+_MIN_SPOKEN_SENTENCE_LEN = 6
 _OUT_OF_SCOPE_FOLLOW_UP = "请描述具体法律问题。"
+# 各可选阶段至少需要的剩余预算（秒），不足时跳过该阶段降级处理，见 deadline.allows()。
+_REWRITE_MIN_SEC = 3.0
+_EXPANSION_MIN_SEC = 3.0
+_WEB_SEARCH_MIN_SEC = 4.0
+# 超过 WEB_SEARCH_INLINE_WAIT_SEC 仍未返回、转入后台继续的联网检索（持有引用，避免任务被回收）。
+_BACKGROUND_WEB_SEARCHES: set[asyncio.Task] = set()
+_ANSWER_LLM_MIN_SEC = 3.0
+_ANSWER_TRACE: ContextVar[dict[str, str] | None] = ContextVar("chat_answer_trace", default=None)
 
 _LEGAL_SIGNAL_KEYWORDS = (
     "法律",
@@ -213,41 +239,203 @@ _LEGAL_TOPIC_SYNONYMS: tuple[tuple[tuple[str, ...], tuple[str, ...]], ...] = (
     (("物业",), ("物业服务合同", "物业服务", "业主", "物业费")),
     (("被骗", "拉黑"), ("诈骗", "财物", "转账记录", "民事诉讼")),
 )
+_CONCRETE_ISSUE_TERMS = (
+    "押金",
+    "不退",
+    "拖欠工资",
+    "扣钱",
+    "加班费",
+    "退款",
+    "退费",
+    "假货",
+    "被骗",
+    "拉黑",
+    "停水",
+    "停电",
+    "受伤",
+)
+_INSUFFICIENT_PATTERNS = ("别人有纠纷", "公司有问题", "工资相关有争议")
+# 上述关键词表在导入时编译成一个自动机，单次线性扫描即可得到全部命中分组。
+_KEYWORD_MATCHER = keyword_matcher.compile_groups(
+    {
+        "legal_signal": _LEGAL_SIGNAL_KEYWORDS,
+        "finance_market": _FINANCE_MARKET_KEYWORDS,
+        "investment_prediction": _INVESTMENT_PREDICTION_KEYWORDS,
+        "out_of_scope": (*_MEDICAL_KEYWORDS, *_TECH_KEYWORDS, *_NEWS_KEYWORDS, *_CASUAL_KEYWORDS),
+        "insufficient_query": _INSUFFICIENT_QUERY_HINTS,
+        "insufficient_detail": _INSUFFICIENT_DETAIL_HINTS,
+        "insufficient_pattern": _INSUFFICIENT_PATTERNS,
+        "concrete_issue": _CONCRETE_ISSUE_TERMS,
+        **{f"topic:{tag}": keywords for tag, keywords in _LEGAL_TOPIC_KEYWORDS.items()},
+        **{f"synonym:{idx}": triggers for idx, (triggers, _synonyms) in enumerate(_LEGAL_TOPIC_SYNONYMS)},
+    },
+    extra_path=settings.legal_keywords_path,
+)
+
+
+def _tags_of_hits(hits: frozenset[str]) -> frozenset[str]:
+    return frozenset(group[len("topic:") :] for group in hits if group.startswith("topic:"))
 
 
-def build_answer(req: ChatRequest, evidence: list[dict[str, Any]], history: list[dict[str, str]] | None = None) -> AnswerJson:
+# 同义词是固定文本，其主题标签在导入时算好，匹配时直接并入。
+_SYNONYM_TAGS = tuple(
+    _tags_of_hits(_KEYWORD_MATCHER.match(" ".join(synonyms))) for _triggers, synonyms in _LEGAL_TOPIC_SYNONYMS
+)
+
+
+@dataclass(frozen=True)
+class QueryAnalysis:
+    """单轮问题的关键词分类结果：每个请求只扫描一次关键词表，沿调用链复用。"""
+
+    normalized: str
+    tags: frozenset[str]
+    synonyms: tuple[str, ...]
+    legal_signal: bool
+    investment_prediction: bool
+    out_of_scope: bool
+    legal_domain: bool
+    insufficient: bool
+
+
+def analyze_query(text: str) -> QueryAnalysis:
+    return _analyze_normalized((text or "").strip().lower())
+
+
+@lru_cache(maxsize=1024)
+def _analyze_normalized(normalized: str) -> QueryAnalysis:
+    hits = _KEYWORD_MATCHER.match(normalized)
+    synonyms, tags = _expand_topic_hits(hits)
+    legal_signal = "legal_signal" in hits
+    investment_prediction = "finance_market" in hits and "investment_prediction" in hits
+    out_of_scope = bool(normalized) and not legal_signal and (investment_prediction or "out_of_scope" in hits)
+    legal_domain = bool(normalized) and not out_of_scope and (legal_signal or bool(tags))
+    return QueryAnalysis(
+        normalized=normalized,
+        tags=tags,
+        synonyms=synonyms,
+        legal_signal=legal_signal,
+        investment_prediction=investment_prediction,
+        out_of_scope=out_of_scope,
+        legal_domain=legal_domain,
+        insufficient=legal_domain and _classify_insufficient(normalized, tags, hits),
+    )
+
+
+def _classify_insufficient(normalized: str, tags: frozenset[str], hits: frozenset[str]) -> bool:
+    has_generic = "insufficient_query" in hits
+    has_detail = "insufficient_detail" in hits
+    if "insufficient_pattern" in hits:
+        return True
+    if tags and "concrete_issue" in hits:
+        return False
+    if has_detail and tags:
+        return False
+    # 典型“泛问句”：
+    # 1) 命中泛化提问词但缺乏事实细节；或
+    # 2) 极短且不包含关键信息字段。
+    if has_generic and not has_detail:
+        return True
+    return len(normalized) <= 14 and not has_detail
+
+
+def _expand_topic_hits(hits: frozenset[str]) -> tuple[tuple[str, ...], frozenset[str]]:
+    """由命中分组得到同义词扩展与主题标签（等价于在“原文 + 同义词”上匹配主题词）。"""
+    additions: list[str] = []
+    tags = set(_tags_of_hits(hits))
+    for idx, (_triggers, synonyms) in enumerate(_LEGAL_TOPIC_SYNONYMS):
+        if f"synonym:{idx}" in hits:
+            additions.extend(synonyms)
+            tags |= _SYNONYM_TAGS[idx]
+    return tuple(additions), frozenset(tags)
+
+
+async def build_answer_async(
+    req: ChatRequest,
+    evidence: list[dict[str, Any]],
+    history: list[dict[str, str]] | None = None,
+    analysis: QueryAnalysis | None = None,
+    on_conclusion: Callable[[str], None] | None = None,
+) -> AnswerJson:
+    """生成回答：护栏回答 → 基于本地依据的 LLM 回答（不可用时离线模板）→ 无本地依据时 FAQ / 联网检索兜底。
+
+    传入 on_conclusion 时 LLM 改为流式请求，JSON 的 conclusion 字段一闭合即回调（供调用方提前合成语音）；
+    回调拿到的是模型原始结论，最终结论仍以返回值为准。
+    """
     runtime = get_runtime_config()
-    if _is_out_of_scope_request(req.text):
-        return _out_of_scope_answer(req)
-    if _is_insufficient_fact_query(req.text):
-        # 信息不足场景优先追问，避免给出看似确定但不可核验的结论。
-        return _legal_domain_no_citation_answer(req)
+    analysis = analysis or analyze_query(req.text)
+    guarded = _guard_answer(req, analysis)
+    if guarded is not None:
+        _note_answer_source("guard")
+        return guarded
 
     if not evidence:
-        return _answer_without_local_evidence(req)
+        _note_answer_source("no_evidence")
+        return await _answer_without_local_evidence_async(req)
 
-    provider = settings.llm_provider.strip().lower()
     answer: AnswerJson | None = None
-    if provider in {"doubao", "ark"} and settings.resolved_llm_api_key() and settings.resolved_llm_model():
-        answer = _ask_ark(req, evidence, history)
+    if _answer_llm_configured() and deadline.allows("answer_llm", _ANSWER_LLM_MIN_SEC, keep_reserve=False):
+        answer = await _ask_ark_async(req, evidence, history, on_conclusion=on_conclusion)
+    _note_answer_source("fallback" if answer is None else "llm")
     if answer is None:
         answer = _fallback_answer(req, evidence)
-    finalized = _finalize_answer(answer, evidence, runtime.default_emotion, _effective_citation_strict(req, runtime.strict_citation_check), req)
+    finalized = _finalize_answer(
+        answer, evidence, runtime.default_emotion, _effective_citation_strict(req, runtime.strict_citation_check), req, analysis
+    )
     if _looks_like_no_evidence_answer(finalized.conclusion):
-        return _answer_without_local_evidence(req)
+        _note_answer_source("no_evidence")
+        return await _answer_without_local_evidence_async(req)
     return finalized
 
 
+def begin_answer_trace() -> dict[str, str]:
+    """为当前请求记录回答来源，供整条回答缓存判断结果能否复用。
+
+    source：llm（模型基于本地依据作答）/ fallback（模型不可用时的离线模板）/ guard（护栏回答）/ no_evidence（无本地依据）/
+    faq（无本地依据但命中离线常见问题）/ llm_truncated（流式回答中途断开，只有部分正文）。
+    """
+    trace = {"source": ""}
+    _ANSWER_TRACE.set(trace)
+    return trace
+
+
+def _note_answer_source(source: str) -> None:
+    trace = _ANSWER_TRACE.get()
+    if trace is not None:
+        trace["source"] = source
+
+
+def _guard_answer(req: ChatRequest, analysis: QueryAnalysis) -> AnswerJson | None:
+    if analysis.out_of_scope:
+        return _out_of_scope_answer(req)
+    if analysis.insufficient:
+        # 信息不足场景优先追问，避免给出看似确定但不可核验的结论。
+        return _legal_domain_no_citation_answer(req)
+    return None
+
+
+def _answer_llm_configured() -> bool:
+    provider = settings.llm_provider.strip().lower()
+    return provider in {"doubao", "ark"} and bool(settings.resolved_llm_api_key()) and bool(settings.resolved_llm_model())
+
+
+def should_stream_answer() -> bool:
+    """流式接口是否还值得调用 LLM：熔断打开或剩余预算不足时直接走模板回答。"""
+    if circuit_breaker.is_open("llm"):
+        return False
+    return deadline.allows("answer_llm", _ANSWER_LLM_MIN_SEC, keep_reserve=False)
+
+
 def expand_legal_query(query: str) -> str:
     text = (query or "").strip()
     if not text:
         return query
 
-    if not _is_legal_domain_question(text):
+    analysis = analyze_query(text)
+    if not analysis.legal_domain:
         return text
 
     expansions: list[str] = [text]
-    tags = _extract_legal_topic_tags(text)
+    tags = analysis.tags
     if "rent" in tags:
         expansions.extend(
             [
@@ -286,25 +474,135 @@ def expand_legal_query(query: str) -> str:
     return expanded
 
 
-def build_retrieval_query(
+@dataclass
+class RetrievalResult:
+    query: str
+    evidence: list[dict[str, Any]]
+    # skipped: 不需要 LLM 扩展；confident: 首轮检索已足够，扩展被取消；
+    # fused: 扩展词增量检索并融合；unchanged: 扩展无新增词或失败；deadline: 预算不足未做扩展。
+    expansion: str
+    rewrite_ms: float = 0.0
+
+
+def rule_retrieval_query(query: str) -> str:
+    """retrieve_evidence_async 首次检索用的规则扩展语句；批量问答据此预取检索结果。"""
+    return expand_legal_query(query)[:_RETRIEVAL_QUERY_MAX_LEN]
+
+
+async def retrieve_evidence_async(
     history: list[dict[str, str]] | None,
     current_query: str,
+    search: Callable[[str], Awaitable[list[dict[str, Any]]]],
     model_variant: str = "fast",
-) -> str:
-    """Build a retrieval-only query. It must not contain a legal conclusion."""
+) -> RetrievalResult:
+    """先用规则扩展的检索语句立即检索，LLM 扩展并行进行，只对新增词补检索后融合。"""
     text = (current_query or "").strip()
     if not text:
-        return current_query
+        return RetrievalResult(query=current_query, evidence=await search(current_query), expansion="skipped")
+
+    started = time.perf_counter()
+    rewritten = text
+    if history:
+        # 预算不足时只用规则改写，不再等待 LLM 改写。
+        local = _rewrite_query_locally(history, text)
+        if local is not None:
+            rewritten = local
+        elif deadline.allows("rewrite", _REWRITE_MIN_SEC):
+            rewritten = await rewrite_query_async(history, text)
+    rewrite_ms = (time.perf_counter() - started) * 1000
+    rule_expanded = rule_retrieval_query(rewritten)
+    if _retrieval_expansion_messages(rewritten, rule_expanded) is None:
+        return RetrievalResult(rule_expanded, await search(rule_expanded), "skipped", rewrite_ms)
+    if not deadline.allows("expansion", _EXPANSION_MIN_SEC):
+        return RetrievalResult(rule_expanded, await search(rule_expanded), "deadline", rewrite_ms)
+
+    expansion_task = asyncio.create_task(
+        _expand_query_with_llm_for_retrieval_async(rewritten, rule_expanded, model_variant)
+    )
+    try:
+        base = await search(rule_expanded)
+    except BaseException:
+        expansion_task.cancel()
+        raise
+    if _retrieval_is_confident(base):
+        expansion_task.cancel()
+        return RetrievalResult(rule_expanded, base, "confident", rewrite_ms)
 
-    rewritten = rewrite_query(history or [], text) if history else text
-    rule_expanded = expand_legal_query(rewritten)
-    llm_expanded = _expand_query_with_llm_for_retrieval(rewritten, rule_expanded, model_variant)
-    if llm_expanded:
-        return llm_expanded
-    return rule_expanded[:_RETRIEVAL_QUERY_MAX_LEN]
+    try:
+        llm_expanded = await expansion_task
+    except Exception as exc:
+        logger.warning("retrieval expansion failed: %s", exc)
+        llm_expanded = None
+    delta = _expansion_delta_terms(rule_expanded, llm_expanded)
+    if not delta:
+        return RetrievalResult(rule_expanded, base, "unchanged", rewrite_ms)
+
+    extra = await search(" ".join(delta))
+    return RetrievalResult(llm_expanded or rule_expanded, _fuse_evidence(base, extra), "fused", rewrite_ms)
+
+
+def _retrieval_is_confident(evidence: list[dict[str, Any]]) -> bool:
+    threshold = float(settings.retrieval_speculative_confidence)
+    if threshold <= 0:
+        return False
+    law_scores = [float(item.get("score") or 0.0) for item in evidence if str(item.get("source_type") or "law") == "law"]
+    return bool(law_scores) and max(law_scores) >= threshold
 
 
-def _expand_query_with_llm_for_retrieval(original_query: str, rule_expanded_query: str, model_variant: str) -> str | None:
+def _expansion_delta_terms(base_query: str, expanded_query: str | None) -> list[str]:
+    if not expanded_query:
+        return []
+    base_terms = set(base_query.split())
+    delta: list[str] = []
+    for term in expanded_query.split():
+        if term in base_terms or term in delta or term in base_query:
+            continue
+        delta.append(term)
+    return delta
+
+
+def _fuse_evidence(primary: list[dict[str, Any]], extra: list[dict[str, Any]], rrf_k: int = 60) -> list[dict[str, Any]]:
+    """按来源分别做 RRF 融合，保持“先法条、后案例”的顺序与原有条数上限。"""
+    fused: list[dict[str, Any]] = []
+    for source_type in ("law", "case"):
+        lists = [
+            [item for item in ranked if str(item.get("source_type") or "law") == source_type]
+            for ranked in (primary, extra)
+        ]
+        limit = max(len(items) for items in lists)
+        scores: dict[str, float] = {}
+        items_by_id: dict[str, dict[str, Any]] = {}
+        for ranked in lists:
+            for rank, item in enumerate(ranked):
+                chunk_id = str(item.get("chunk_id") or "")
+                if not chunk_id:
+                    continue
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (rrf_k + rank + 1)
+                items_by_id.setdefault(chunk_id, item)
+        ordered = sorted(scores, key=lambda chunk_id: -scores[chunk_id])
+        fused.extend(items_by_id[chunk_id] for chunk_id in ordered[:limit])
+    return fused
+
+
+async def _expand_query_with_llm_for_retrieval_async(
+    original_query: str,
+    rule_expanded_query: str,
+    model_variant: str,
+) -> str | None:
+    messages = _retrieval_expansion_messages(original_query, rule_expanded_query)
+    if messages is None:
+        return None
+    content = await _chat_completion_text_async(
+        messages,
+        model=_resolve_llm_model(model_variant),
+        max_tokens=160,
+        temperature=0.0,
+        stage="expansion",
+    )
+    return _finish_retrieval_expansion(original_query, content)
+
+
+def _retrieval_expansion_messages(original_query: str, rule_expanded_query: str) -> list[dict[str, str]] | None:
     original = (original_query or "").strip()
     if not _should_use_llm_retrieval_expansion(original):
         return None
@@ -325,27 +623,24 @@ def _expand_query_with_llm_for_retrieval(original_query: str, rule_expanded_quer
         f"规则扩展参考：{rule_expanded_query[:180]}\n"
         "检索语句："
     )
+    return [{"role": "user", "content": prompt}]
 
-    content = _chat_completion_text(
-        [{"role": "user", "content": prompt}],
-        model=_resolve_llm_model(model_variant),
-        max_tokens=160,
-        temperature=0.0,
-    )
+
+def _finish_retrieval_expansion(original_query: str, content: str | None) -> str | None:
     cleaned = _sanitize_retrieval_query(content)
     if not cleaned:
         return None
+    original = (original_query or "").strip()
     return expand_legal_query(f"{original} {cleaned}")[:_RETRIEVAL_QUERY_MAX_LEN]
 
 
 def _should_use_llm_retrieval_expansion(query: str) -> bool:
     text = (query or "").strip()
-    if not text or not _is_legal_domain_question(text) or _is_out_of_scope_request(text):
-        return False
-    if _is_insufficient_fact_query(text):
+    analysis = analyze_query(text)
+    if not analysis.legal_domain or analysis.insufficient:
         return False
     # 短句、无明确问号的口语句、或只含高频争议词时，最需要补全检索意图。
-    return len(text) <= 32 or not text.endswith(("?", "？")) or bool(_extract_legal_topic_tags(text))
+    return len(text) <= 32 or not text.endswith(("?", "？")) or bool(analysis.tags)
 
 
 def _sanitize_retrieval_query(content: str | None) -> str:
@@ -372,18 +667,29 @@ def _sanitize_retrieval_query(content: str | None) -> str:
     return text[:120]
 
 
-def _ask_ark(req: ChatRequest, evidence: list[dict[str, Any]], history: list[dict[str, str]] | None = None) -> AnswerJson | None:
+async def _ask_ark_async(
+    req: ChatRequest,
+    evidence: list[dict[str, Any]],
+    history: list[dict[str, str]] | None = None,
+    on_conclusion: Callable[[str], None] | None = None,
+) -> AnswerJson | None:
     messages = _build_answer_messages(req, evidence, history)
     runtime = get_runtime_config()
-    content = _chat_completion_text(
-        messages,
-        model=_resolve_llm_model(req.model_variant),
-        max_tokens=_effective_max_tokens(req, runtime.max_tokens),
-        temperature=_effective_temperature(req, runtime.temperature),
-    )
+    model = _resolve_llm_model(req.model_variant)
+    max_tokens = _effective_max_tokens(req, runtime.max_tokens)
+    temperature = _effective_temperature(req, runtime.temperature)
+    if on_conclusion is None:
+        content = await _answer_completion_text_async(messages, model=model, max_tokens=max_tokens, temperature=temperature)
+    else:
+        content = await _chat_completion_json_streamed_async(
+            messages, model=model, max_tokens=max_tokens, temperature=temperature, on_conclusion=on_conclusion
+        )
     if content is None:
         return None
+    return _parse_ark_answer(content, evidence)
+
 
+def _parse_ark_answer(content: str, evidence: list[dict[str, Any]]) -> AnswerJson:
     # 尝试解析 JSON 格式（兼容模型可能返回 JSON 的情况）
     json_answer = _try_parse_json_answer(content, evidence)
     if json_answer is not None:
@@ -433,19 +739,221 @@ def select_answer_evidence(evidence: list[dict[str, Any]], limit: int = _ANSWER_
     return deduped
 
 
-def stream_answer_text(req: ChatRequest, evidence: list[dict[str, Any]], history: list[dict[str, str]] | None = None) -> Iterator[str]:
+async def stream_answer_text_async(
+    req: ChatRequest,
+    evidence: list[dict[str, Any]],
+    history: list[dict[str, str]] | None = None,
+) -> AsyncIterator[str]:
     messages = _build_stream_messages(req, evidence, history)
     runtime = get_runtime_config()
-    yield from _chat_completion_stream(
+    async for delta in _answer_stream_async(
         messages,
         model=_resolve_llm_model(req.model_variant),
         max_tokens=_effective_max_tokens(req, runtime.max_tokens),
         temperature=_effective_temperature(req, runtime.temperature),
-    )
+    ):
+        yield delta
+
+
+class StreamSentenceSplitter:
+    """把流式增量切成可朗读的整句；引用标记 [[CITATIONS:...]] 及其后的内容不进入朗读。
+
+    过短的句子（如“建议：”）并入下一句，避免为几个字单独发起一次 TTS。
+    """
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._closed = False
+
+    def feed(self, delta: str) -> list[str]:
+        if self._closed:
+            return []
+        self._buffer += delta or ""
+        idx = self._buffer.upper().find(_STREAM_CITATION_SENTINEL)
+        if idx >= 0:
+            self._buffer = self._buffer[:idx]
+            return self.flush()
+        return self._take_sentences()
+
+    def flush(self) -> list[str]:
+        sentences = [] if self._closed else self._take_sentences()
+        self._closed = True
+        rest, self._buffer = self._buffer.strip(), ""
+        # 未闭合的引用标记前缀（如 "[[CIT"）不朗读。
+        rest = re.sub(r"\[+[A-Za-z:]*$", "", rest).strip()
+        if not rest:
+            return sentences
+        if len(rest) < _MIN_SPOKEN_SENTENCE_LEN and sentences:
+            sentences[-1] = f"{sentences[-1]}{rest}"
+        else:
+            sentences.append(rest)
+        return sentences
+
+    def _take_sentences(self) -> list[str]:
+        sentences: list[str] = []
+        start = 0
+        for idx, ch in enumerate(self._buffer):
+            if ch not in _SENTENCE_END_CHARS:
+                continue
+            sentence = self._buffer[start : idx + 1].strip()
+            if len(sentence) >= _MIN_SPOKEN_SENTENCE_LEN:
+                sentences.append(sentence)
+                start = idx + 1
+        self._buffer = self._buffer[start:]
+        return sentences
+
+
+class StreamCitationParser:
+    """逐段剥离流式回答中的 [[CITATIONS:...]] 标记，标记闭合时即可取得引用 chunk_id。
+
+    只缓存可能是标记前缀的尾部（如 "[[CIT"），其余文本立即返回给调用方下发，
+    标记内容不会以 delta 形式泄露给前端；正文按片段追加到列表，结束时一次拼接。
+    """
+
+    def __init__(self) -> None:
+        self._parts: list[str] = []
+        self._id_parts: list[str] = []
+        self._pending = ""
+        self._in_sentinel = False
+        self.chunk_ids: list[str] | None = None
+
+    def feed(self, delta: str) -> str:
+        """返回本段中可以直接展示的正文。"""
+        data = self._pending + (delta or "")
+        self._pending = ""
+        visible: list[str] = []
+        pos = 0
+        size = len(_STREAM_CITATION_SENTINEL)
+        while pos < len(data):
+            if self._in_sentinel:
+                end = data.find("]]", pos)
+                if end < 0:
+                    tail = data[pos:]
+                    # 结尾单个 "]" 可能是 "]]" 的前半，留到下一段再判断。
+                    if tail.endswith("]"):
+                        tail, self._pending = tail[:-1], "]"
+                    self._id_parts.append(tail)
+                    break
+                self._id_parts.append(data[pos:end])
+                self._close_sentinel()
+                pos = end + 2
+                continue
+            start = data.find("[", pos)
+            if start < 0:
+                visible.append(data[pos:])
+                break
+            visible.append(data[pos:start])
+            head = data[start : start + size].upper()
+            if head == _STREAM_CITATION_SENTINEL:
+                self._in_sentinel = True
+                pos = start + size
+            elif len(head) < size and _STREAM_CITATION_SENTINEL.startswith(head):
+                self._pending = data[start:]
+                break
+            else:
+                visible.append("[")
+                pos = start + 1
+        text = "".join(visible)
+        if text:
+            self._parts.append(text)
+        return text
+
+    def finish(self) -> str:
+        """流结束：未闭合的标记按已收到的内容解析引用，残留的标记前缀丢弃。"""
+        pending, self._pending = self._pending, ""
+        if self._in_sentinel:
+            self._id_parts.append(pending.rstrip("]"))
+            self._close_sentinel()
+            return ""
+        if pending and not _STREAM_CITATION_SENTINEL.startswith(pending.upper()):
+            self._parts.append(pending)
+            return pending
+        return ""
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts).strip()
+
+    def _close_sentinel(self) -> None:
+        self._in_sentinel = False
+        raw, self._id_parts = "".join(self._id_parts), []
+        if self.chunk_ids is None:
+            self.chunk_ids = [item.strip() for item in raw.split(",") if item.strip()][:3]
+
+
+class StreamJsonFieldParser:
+    """增量扫描流式输出的 JSON 对象，顶层指定字符串字段一闭合就返回其值。
+
+    只跟踪嵌套深度与字符串/转义状态，不做完整解析；对象前的 ```json 等包裹文本忽略。
+    """
+
+    def __init__(self, field: str) -> None:
+        self.field = field
+        self.value: str | None = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._chars: list[str] = []
+        self._key: str | None = None
+        self._after_colon = False
+
+    def feed(self, delta: str) -> str | None:
+        """字段在本段内闭合时返回其值，否则返回 None；取到值之后不再扫描。"""
+        if self.value is not None:
+            return None
+        for ch in delta or "":
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._close_string():
+                        return self.value
+                    continue
+                if self._depth == 1:
+                    self._chars.append(ch)
+                continue
+            if ch == '"':
+                self._in_string = True
+                self._chars = []
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+            elif self._depth == 1 and ch == ":":
+                self._after_colon = True
+            elif self._depth == 1 and ch == ",":
+                self._key = None
+                self._after_colon = False
+        return None
+
+    def _close_string(self) -> bool:
+        raw = "".join(self._chars)
+        try:
+            text = json.loads(f'"{raw}"')
+        except ValueError:
+            text = raw
+        if not self._after_colon:
+            self._key = text
+            return False
+        if self._key == self.field:
+            self.value = text
+            return True
+        return False
 
 
-def build_answer_from_stream_text(content: str, evidence: list[dict[str, Any]]) -> AnswerJson:
-    cleaned, chunk_ids = _extract_stream_citations(content)
+def build_answer_from_stream_text(
+    content: str,
+    evidence: list[dict[str, Any]],
+    chunk_ids: list[str] | None = None,
+) -> AnswerJson:
+    """content 为完整流式文本；若调用方已用 StreamCitationParser 剥离标记，则同时传入 chunk_ids。"""
+    if chunk_ids is None:
+        cleaned, chunk_ids = _extract_stream_citations(content)
+    else:
+        cleaned = content.strip()
     conclusion, analysis, actions, _ = _split_natural_response(cleaned)
     citations = _pick_citations_by_ids(evidence, chunk_ids)
     if not citations:
@@ -588,20 +1096,36 @@ def _to_citations(evidence: list[dict[str, Any]]) -> list[Citation]:
 def _render_evidence_text(evidence: list[dict[str, Any]]) -> str:
     if not evidence:
         return "无"
+    items = evidence[:_ANSWER_EVIDENCE_LIMIT]
+    contents = [" ".join(str(item.get("text", "")).split()) for item in items]
+    # 依据正文共享一个 token 预算，按检索得分分配：短条目用多少给多少，省下的额度给更相关的长法条。
+    grants = prompt_budget.allocate(
+        [prompt_budget.estimate_tokens(content) for content in contents],
+        [_evidence_weight(item) for item in items],
+        settings.prompt_evidence_token_budget,
+        floor=settings.prompt_evidence_min_tokens,
+    )
     lines: list[str] = []
-    for i, item in enumerate(evidence[:_ANSWER_EVIDENCE_LIMIT], start=1):
+    for i, (item, content, grant) in enumerate(zip(items, contents, grants), start=1):
         source_type = str(item.get("source_type") or "law")
         head = "法条" if source_type == "law" else "案例"
         name = item.get("law_name") if source_type == "law" else (item.get("case_name") or item.get("law_name"))
         index = item.get("article_no") if source_type == "law" else (item.get("case_id") or "案例")
-        content = str(item.get("text", "")).replace("\n", " ").strip()
         lines.append(
             f"{i}. 类型={head} | chunk_id={item.get('chunk_id')} | 名称={name} | "
-            f"标识={index} | 内容={content[:120]}"
+            f"标识={index} | 内容={prompt_budget.truncate_to_tokens(content, grant)}"
         )
     return "\n".join(lines)
 
 
+def _evidence_weight(item: dict[str, Any]) -> float:
+    try:
+        return float(item.get("score"))
+    except (TypeError, ValueError):
+        # 无检索得分（如 FAQ、外部来源）时按中等相关度处理。
+        return 0.5
+
+
 def _fallback_answer(req: ChatRequest, evidence: list[dict[str, Any]]) -> AnswerJson:
     return AnswerJson(
         conclusion="抱歉，AI 助手暂时无法连接，请稍后再试。如果问题持续，请检查网络连接。",
@@ -619,10 +1143,28 @@ def _fallback_answer(req: ChatRequest, evidence: list[dict[str, Any]]) -> Answer
     )
 
 
-def _answer_without_local_evidence(req: ChatRequest) -> AnswerJson:
-    web_hits = web_search_service.search_public_web(f"{req.text} 法律", limit=4, timeout_sec=min(get_runtime_config().timeout_sec, 20))
+async def _answer_without_local_evidence_async(req: ChatRequest) -> AnswerJson:
+    """无本地依据时：FAQ 命中直接作答；否则联网检索只在回答路径上等 WEB_SEARCH_INLINE_WAIT_SEC，
+    等不到就先返回通用提示，检索在后台继续并写入检索缓存，同一问题再问时直接用上。"""
+    faq_match = await faq_service.match_async(req.text)
+    if faq_match is not None:
+        return _faq_answer(req, faq_match)
+    if not deadline.allows("web_search", _WEB_SEARCH_MIN_SEC, keep_reserve=False):
+        return _fallback_no_evidence_answer(req)
+    search = asyncio.ensure_future(
+        web_search_service.search_public_web_async(
+            f"{req.text} 法律", limit=4, timeout_sec=min(get_runtime_config().timeout_sec, 20)
+        )
+    )
+    _BACKGROUND_WEB_SEARCHES.add(search)
+    search.add_done_callback(_forget_background_web_search)
+    done, _ = await asyncio.wait({search}, timeout=max(0.0, settings.web_search_inline_wait_sec))
+    if not done:
+        logger.info("Web search still running after inline wait; answering without web evidence")
+        return _fallback_no_evidence_answer(req)
+    web_hits = search.result()
     if web_hits:
-        online = _ask_ark_with_web_results(req, web_hits)
+        online = await _ask_ark_with_web_results_async(req, web_hits)
         if online is not None:
             return online
         return _fallback_web_answer(req, web_hits)
@@ -630,9 +1172,39 @@ def _answer_without_local_evidence(req: ChatRequest) -> AnswerJson:
     return _fallback_no_evidence_answer(req)
 
 
+def _forget_background_web_search(task: asyncio.Task) -> None:
+    _BACKGROUND_WEB_SEARCHES.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Background web search failed: %s", task.exception())
+
+
+def _faq_answer(req: ChatRequest, faq_match: faq_service.FaqMatch) -> AnswerJson:
+    _note_answer_source("faq")
+    item = faq_match.item
+    return AnswerJson(
+        conclusion=item.answer,
+        analysis=list(item.analysis),
+        actions=list(item.actions),
+        assumptions=[f"本地知识库未直接命中，以下依据常见问题“{item.question}”作答，具体处理以个案事实为准。"],
+        follow_up_questions=_build_follow_up_questions(req.text),
+        citations=[
+            Citation(
+                chunk_id=item.chunk_id,
+                law_name=item.source or None,
+                article_no=item.article or None,
+                section="常见问题",
+                tags=list(item.tags) or None,
+                source="legal_faq",
+                source_type="faq",
+            )
+        ],
+        emotion="supportive",
+    )
+
+
 def _fallback_no_evidence_answer(req: ChatRequest) -> AnswerJson:
     text = (req.text or "").strip()
-    if "rent" in _extract_legal_topic_tags(text):
+    if "rent" in analyze_query(text).tags:
         return _legal_domain_no_citation_answer(req)
 
     return AnswerJson(
@@ -671,35 +1243,39 @@ def _fallback_web_answer(req: ChatRequest, web_hits: list[web_search_service.Web
     )
 
 
-def _ask_ark_with_web_results(req: ChatRequest, web_hits: list[web_search_service.WebSearchHit]) -> AnswerJson | None:
-    provider = settings.llm_provider.strip().lower()
-    if provider not in {"doubao", "ark"} or not settings.resolved_llm_api_key() or not settings.resolved_llm_model():
+async def _ask_ark_with_web_results_async(
+    req: ChatRequest,
+    web_hits: list[web_search_service.WebSearchHit],
+) -> AnswerJson | None:
+    messages = _web_answer_messages(req, web_hits)
+    if messages is None:
         return None
-
-    web_text = "\n".join(
-        f"{idx + 1}. 标题={hit.title} | 摘要={hit.snippet} | 链接={hit.url}"
-        for idx, hit in enumerate(web_hits[:4])
-    )
-    prompt = (
-        "你是高校法律普法助手。当前本地知识库没有直接命中用户问题。"
-        "下面给你的是公开网络搜索摘要，请输出一个谨慎、非确定性的参考回答。"
-        "不要把网络搜索内容说成本地知识库依据。"
-        "必须明确提醒：以下内容来自公开网络信息整理，需用户自行判断并进一步核实。"
-        '输出严格 JSON，不要 markdown。格式：{"conclusion":"一句话结论","analysis":["最多2条分析"],'
-        '"actions":["最多2条建议"],"emotion":"supportive","follow_up_questions":["最多2条补充问题"]}\n'
-        f"【用户问题】{req.text.strip()[:240]}\n"
-        f"【公开网络摘要】\n{web_text}"
-    )
     runtime = get_runtime_config()
-    content = _chat_completion_text(
-        [{"role": "user", "content": prompt}],
+    content = await _chat_completion_text_async(
+        messages,
         model=_resolve_llm_model(req.model_variant),
         max_tokens=_effective_max_tokens(req, max(runtime.max_tokens, 320)),
         temperature=_effective_temperature(req, runtime.temperature),
+        stage="web_answer",
     )
     if content is None:
         return None
+    return _parse_web_answer(req, content)
 
+
+def _web_answer_messages(req: ChatRequest, web_hits: list[web_search_service.WebSearchHit]) -> list[dict[str, str]] | None:
+    if not _answer_llm_configured():
+        return None
+
+    web_text = "\n".join(
+        f"{idx + 1}. 标题={hit.title} | 摘要={hit.snippet} | 链接={hit.url}"
+        for idx, hit in enumerate(web_hits[:4])
+    )
+    prompt = f"【用户问题】{req.text.strip()[:240]}\n【公开网络摘要】\n{web_text}"
+    return [{"role": "system", "content": _WEB_ANSWER_SYSTEM_PROMPT}, {"role": "user", "content": prompt}]
+
+
+def _parse_web_answer(req: ChatRequest, content: str) -> AnswerJson:
     parsed = _try_parse_json_answer(content, [])
     if parsed is not None:
         parsed.citations = []
@@ -758,73 +1334,23 @@ def _build_follow_up_questions(text: str) -> list[str]:
 
 
 def _is_out_of_scope_request(text: str) -> bool:
-    normalized = (text or "").strip().lower()
-    if not normalized:
-        return False
-
-    if _contains_legal_signal(normalized):
-        return False
-
-    if _is_investment_prediction_request(normalized):
-        return True
-
-    out_of_scope_groups = (_MEDICAL_KEYWORDS, _TECH_KEYWORDS, _NEWS_KEYWORDS, _CASUAL_KEYWORDS)
-    return any(any(keyword in normalized for keyword in group) for group in out_of_scope_groups)
+    return analyze_query(text).out_of_scope
 
 
 def _is_investment_prediction_request(text: str) -> bool:
-    return any(keyword in text for keyword in _FINANCE_MARKET_KEYWORDS) and any(
-        keyword in text for keyword in _INVESTMENT_PREDICTION_KEYWORDS
-    )
+    return analyze_query(text).investment_prediction
 
 
 def _contains_legal_signal(text: str) -> bool:
-    return any(keyword in text for keyword in _LEGAL_SIGNAL_KEYWORDS)
+    return analyze_query(text).legal_signal
 
 
 def _is_legal_domain_question(text: str) -> bool:
-    normalized = (text or "").strip().lower()
-    if not normalized or _is_out_of_scope_request(normalized):
-        return False
-    return _contains_legal_signal(normalized) or bool(_extract_legal_topic_tags(normalized))
+    return analyze_query(text).legal_domain
 
 
 def _is_insufficient_fact_query(text: str) -> bool:
-    normalized = (text or "").strip().lower()
-    if not normalized or _is_out_of_scope_request(normalized):
-        return False
-    if not _is_legal_domain_question(normalized):
-        return False
-    has_generic = any(hint in normalized for hint in _INSUFFICIENT_QUERY_HINTS)
-    has_detail = any(hint in normalized for hint in _INSUFFICIENT_DETAIL_HINTS)
-    topic_tags = _extract_legal_topic_tags(normalized)
-    if any(pattern in normalized for pattern in ("别人有纠纷", "公司有问题", "工资相关有争议")):
-        return True
-    concrete_issue_terms = (
-        "押金",
-        "不退",
-        "拖欠工资",
-        "扣钱",
-        "加班费",
-        "退款",
-        "退费",
-        "假货",
-        "被骗",
-        "拉黑",
-        "停水",
-        "停电",
-        "受伤",
-    )
-    if topic_tags and any(term in normalized for term in concrete_issue_terms):
-        return False
-    if has_detail and topic_tags:
-        return False
-    # 典型“泛问句”：
-    # 1) 命中泛化提问词但缺乏事实细节；或
-    # 2) 极短且不包含关键信息字段。
-    if has_generic and not has_detail:
-        return True
-    return len(normalized) <= 14 and not has_detail
+    return analyze_query(text).insufficient
 
 
 def _effective_citation_strict(req: ChatRequest | None, default: bool) -> bool:
@@ -844,8 +1370,7 @@ def _effective_max_tokens(req: ChatRequest | None, default: int) -> int:
 
 
 def _out_of_scope_answer(req: ChatRequest) -> AnswerJson:
-    text = (req.text or "").strip().lower()
-    if _is_investment_prediction_request(text):
+    if analyze_query(req.text).investment_prediction:
         conclusion = "我只能提供法律普法相关帮助，无法预测股票涨跌或提供投资建议。"
     else:
         conclusion = "我只能提供法律普法相关帮助，无法处理该领域请求。"
@@ -862,8 +1387,7 @@ def _out_of_scope_answer(req: ChatRequest) -> AnswerJson:
 
 
 def _legal_domain_no_citation_answer(req: ChatRequest, answer: AnswerJson | None = None) -> AnswerJson:
-    tags = _extract_legal_topic_tags(req.text)
-    if "rent" in tags:
+    if "rent" in analyze_query(req.text).tags:
         conclusion = "该问题属于租赁押金纠纷，但当前本地知识库未检索到足够可核验依据。请补充租赁合同约定、押金金额、房东扣押理由等信息。"
     else:
         conclusion = "该问题属于法律咨询场景，但当前本地知识库未检索到足够可核验依据。请补充关键事实后再继续判断。"
@@ -901,15 +1425,18 @@ def _filter_relevant_citations(
     answer: AnswerJson,
     evidence: list[dict[str, Any]],
     citations: list[Citation],
+    analysis: QueryAnalysis | None = None,
 ) -> list[Citation]:
     if not citations:
         return []
-    if req is not None and _is_out_of_scope_request(req.text):
+    analysis = analysis or analyze_query(req.text if req else "")
+    if req is not None and analysis.out_of_scope:
         return []
     if _answer_disclaims_no_basis(answer):
         return []
 
     evidence_map = {str(item.get("chunk_id")): item for item in evidence if item.get("chunk_id")}
+    answer_tags: frozenset[str] | None = None
     filtered: list[Citation] = []
     seen: set[str] = set()
     for citation in citations:
@@ -919,45 +1446,28 @@ def _filter_relevant_citations(
         item = evidence_map.get(chunk_id)
         if item is None:
             continue
-        if _is_citation_relevant_to_answer(req.text if req else "", answer, item):
+        if not analysis.tags:
+            relevant = True
+        else:
+            evidence_tags = _extract_legal_topic_tags(_evidence_topic_text(item))
+            relevant = bool(analysis.tags & evidence_tags)
+            if not relevant:
+                if answer_tags is None:
+                    answer_tags = _extract_legal_topic_tags(" ".join([answer.conclusion, *answer.analysis, *answer.actions]))
+                relevant = bool(analysis.tags & answer_tags & evidence_tags)
+        if relevant:
             filtered.append(citation)
             seen.add(chunk_id)
     return filtered
 
 
-def _is_citation_relevant_to_answer(req_text: str, answer: AnswerJson, evidence_item: dict[str, Any]) -> bool:
-    query_tags = _extract_legal_topic_tags(req_text)
-    if not query_tags:
-        return True
-
-    citation_text = _evidence_topic_text(evidence_item)
-    evidence_tags = _extract_legal_topic_tags(citation_text)
-    if query_tags & evidence_tags:
-        return True
-
-    answer_text = " ".join([answer.conclusion, *answer.analysis, *answer.actions])
-    answer_tags = _extract_legal_topic_tags(answer_text)
-    return bool(query_tags & answer_tags & evidence_tags)
-
-
-def _extract_legal_topic_tags(text: str) -> set[str]:
-    normalized = _expand_legal_topic_text(text)
-    tags: set[str] = set()
-    for tag, keywords in _LEGAL_TOPIC_KEYWORDS.items():
-        if any(keyword in normalized for keyword in keywords):
-            tags.add(tag)
-    return tags
+def _extract_legal_topic_tags(text: str) -> frozenset[str]:
+    return _extract_normalized_topic_tags((text or "").lower())
 
 
-def _expand_legal_topic_text(text: str) -> str:
-    normalized = (text or "").lower()
-    additions: list[str] = []
-    for triggers, synonyms in _LEGAL_TOPIC_SYNONYMS:
-        if any(trigger in normalized for trigger in triggers):
-            additions.extend(synonyms)
-    if additions:
-        return f"{normalized} {' '.join(additions)}"
-    return normalized
+@lru_cache(maxsize=4096)
+def _extract_normalized_topic_tags(normalized: str) -> frozenset[str]:
+    return _expand_topic_hits(_KEYWORD_MATCHER.match(normalized))[1]
 
 
 def _evidence_topic_text(item: dict[str, Any]) -> str:
@@ -973,18 +1483,26 @@ def _evidence_topic_text(item: dict[str, Any]) -> str:
     return " ".join(str(part) for part in parts if part)
 
 
-def _fallback_relevant_citations(req: ChatRequest | None, answer: AnswerJson, evidence: list[dict[str, Any]]) -> list[Citation]:
-    if req is None or not _is_legal_domain_question(req.text) or _is_out_of_scope_request(req.text):
+def _fallback_relevant_citations(
+    req: ChatRequest | None,
+    answer: AnswerJson,
+    evidence: list[dict[str, Any]],
+    analysis: QueryAnalysis | None = None,
+) -> list[Citation]:
+    if req is None:
+        return []
+    analysis = analysis or analyze_query(req.text)
+    if not analysis.legal_domain:
         return []
     if _answer_disclaims_no_basis(answer):
         return []
-    query_tags = _extract_legal_topic_tags(req.text)
+    query_tags = analysis.tags
     if not query_tags:
         return []
     strong_evidence = [
         item for item in evidence if query_tags & _extract_legal_topic_tags(_evidence_topic_text(item))
     ]
-    return _filter_relevant_citations(req, answer, strong_evidence, _to_citations(strong_evidence))[:_ANSWER_EVIDENCE_LIMIT]
+    return _filter_relevant_citations(req, answer, strong_evidence, _to_citations(strong_evidence), analysis)[:_ANSWER_EVIDENCE_LIMIT]
 
 
 def _finalize_answer(
@@ -993,25 +1511,28 @@ def _finalize_answer(
     default_emotion: str,
     strict_citation_check: bool,
     req: ChatRequest | None = None,
+    analysis: QueryAnalysis | None = None,
 ) -> AnswerJson:
+    if analysis is None and req is not None:
+        analysis = analyze_query(req.text)
     evidence_chunk_ids = {str(item.get("chunk_id")) for item in evidence if item.get("chunk_id")}
     citations = answer.citations
 
     if strict_citation_check:
         citations = [citation for citation in answer.citations if citation.chunk_id in evidence_chunk_ids]
         if not citations:
-            citations = _fallback_relevant_citations(req, answer, evidence)
+            citations = _fallback_relevant_citations(req, answer, evidence, analysis)
     elif not citations:
-        citations = _fallback_relevant_citations(req, answer, evidence)
+        citations = _fallback_relevant_citations(req, answer, evidence, analysis)
 
-    citations = _filter_relevant_citations(req, answer, evidence, citations)
+    citations = _filter_relevant_citations(req, answer, evidence, citations, analysis)
 
     emotion = (answer.emotion or default_emotion or "calm").strip().lower()
     if emotion not in {"calm", "serious", "supportive", "warning"}:
         emotion = default_emotion or "calm"
 
     if strict_citation_check and evidence and not citations:
-        if req is not None and _is_legal_domain_question(req.text):
+        if analysis is not None and analysis.legal_domain:
             return _legal_domain_no_citation_answer(req, answer)
         return AnswerJson(
             conclusion="当前回答未能生成可核验引用，系统已中止直接结论输出。",
@@ -1030,10 +1551,10 @@ def _finalize_answer(
         )
 
     # 非 strict 模式下也做守卫：信息不足或泛化结论但缺乏可靠引用时，强制回到追问模板。
-    if req is not None and _is_legal_domain_question(req.text):
+    if analysis is not None and analysis.legal_domain:
         conclusion_text = _strip_citation_sentinel(answer.conclusion or "").strip().lower()
         generic_conclusion = any(marker in conclusion_text for marker in _GENERIC_CONCLUSION_MARKERS)
-        if _is_insufficient_fact_query(req.text) and (not citations or generic_conclusion):
+        if analysis.insufficient and (not citations or generic_conclusion):
             return _legal_domain_no_citation_answer(req, answer)
 
     return AnswerJson(
@@ -1047,7 +1568,16 @@ def _finalize_answer(
     )
 
 
-def rewrite_query(history: list[dict[str, str]], current_query: str) -> str:
+async def rewrite_query_async(history: list[dict[str, str]], current_query: str) -> str:
+    local = _rewrite_query_locally(history, current_query)
+    if local is not None:
+        return local
+    body = await _chat_completion_request_async(_rewrite_payload(history, current_query), stage="rewrite")
+    return _parse_rewrite_response(body, current_query)
+
+
+def _rewrite_query_locally(history: list[dict[str, str]], current_query: str) -> str | None:
+    """不需要 LLM 时直接返回改写结果；返回 None 表示需要走 LLM 改写。"""
     if not history:
         return current_query
     if not _should_rewrite_query(current_query):
@@ -1056,12 +1586,16 @@ def rewrite_query(history: list[dict[str, str]], current_query: str) -> str:
     rule_rewritten = _rewrite_query_by_rules(history, current_query)
     if rule_rewritten is not None:
         return rule_rewritten
-    
+
     provider = settings.llm_provider.strip().lower()
     if provider not in {"doubao", "ark"} or not settings.resolved_llm_api_key():
         return current_query
-        
-    history_text = "\n".join([f"{msg['role']}: {msg['content']}" for msg in history[-4:]]) # 只看最近几轮防止超长
+    return None
+
+
+def _rewrite_payload(history: list[dict[str, str]], current_query: str) -> dict[str, Any]:
+    # 只看摘要与最近几轮，防止超长
+    history_text = "\n".join([f"{msg['role']}: {msg['content']}" for msg in _trim_history_messages(history)])
     prompt = (
         "你是查询意图重写助手。请根据以下历史对话，将最新的用户问题重写为一个独立、完整且没有代词的查询语句，用于去向量数据库检索法律条文。\n"
         "规则：除了重写后的查询语句外，不要输出任何其他解释性内容。如果不需要重写（本来就很完整），则原样输出。\n\n"
@@ -1069,33 +1603,24 @@ def rewrite_query(history: list[dict[str, str]], current_query: str) -> str:
         f"【最新问题】\n{current_query}\n\n"
         "重写结果："
     )
-    
-    payload = {
+    return {
         "model": settings.resolved_llm_model(),
         "messages": [
             {"role": "user", "content": prompt},
         ],
         "temperature": 0.1,
     }
-    url = f"{settings.resolved_llm_base_url()}/chat/completions"
-    data = json.dumps(payload).encode("utf-8")
-    req_obj = request.Request(
-        url=url,
-        data=data,
-        headers={
-            "Authorization": f"Bearer {settings.resolved_llm_api_key()}",
-            "Content-Type": "application/json",
-        },
-        method="POST",
-    )
+
+
+def _parse_rewrite_response(body: str | None, current_query: str) -> str:
+    if body is None:
+        return current_query
     try:
-        with request.urlopen(req_obj, timeout=get_runtime_config().timeout_sec) as resp:
-            body = resp.read().decode("utf-8")
-            raw = json.loads(body)
-            rewritten = raw["choices"][0]["message"]["content"].strip()
-            return rewritten if rewritten else current_query
-    except Exception:
+        raw = json.loads(body)
+        rewritten = raw["choices"][0]["message"]["content"].strip()
+    except (KeyError, IndexError, TypeError, AttributeError, json.JSONDecodeError):
         return current_query
+    return rewritten if rewritten else current_query
 
 
 def _should_rewrite_query(current_query: str) -> bool:
@@ -1169,58 +1694,134 @@ def _is_self_contained_query(text: str) -> bool:
 
 
 def _trim_evidence_item(item: dict[str, Any]) -> dict[str, Any]:
+    # 只做换行归一；正文长度由回答提示词的 token 预算统一控制（见 _render_evidence_text）。
     trimmed = dict(item)
-    text = str(trimmed.get("text") or "").replace("\n", " ").strip()
-    trimmed["text"] = text[:120]
+    trimmed["text"] = str(trimmed.get("text") or "").replace("\n", " ").strip()
     return trimmed
 
 
-def _build_answer_messages(req: ChatRequest, evidence: list[dict[str, Any]], history: list[dict[str, str]] | None) -> list[dict[str, str]]:
-    system_prompt = (
-        "你是高校法律普法助手。只能依据给定依据回答，禁止编造法条。"
-        "输出严格 JSON，不要 markdown，不要解释。"
-        '格式：{"conclusion":"一句结论","analysis":["最多2条分析"],"actions":["最多2条建议"],'
-        '"emotion":"calm","citation_chunk_ids":["chunk_id"]}。'
-        "citation_chunk_ids 只能填写给定 chunk_id。"
-    )
-    evidence_text = _render_evidence_text(evidence)
-    if evidence_text != "无":
-        system_prompt += f"\n依据：\n{evidence_text}"
+# 提示词布局按变化频率排列：静态指令（全局一致）-> 近期对话原文（每条按固定上限截断，与所在位置无关，
+# 同一条消息在相邻两轮的提示词里逐字节相同）-> 本轮的滚动摘要、依据与问题（每轮都变，放在最后一条 user 消息）。
+# 这样 system 消息在所有会话间一致，可登记为供应商上下文（见 context_cache）；近期对话段对供应商的隐式前缀缓存也是稳定的。
+_ANSWER_SYSTEM_PROMPT = (
+    "你是高校法律普法助手。只能依据给定依据回答，禁止编造法条。"
+    "输出严格 JSON，不要 markdown，不要解释。"
+    '格式：{"conclusion":"一句结论","analysis":["最多2条分析"],"actions":["最多2条建议"],'
+    '"emotion":"calm","citation_chunk_ids":["chunk_id"]}。'
+    "citation_chunk_ids 只能填写给定 chunk_id。"
+    "依据随最后一条用户消息给出。"
+)
+_STREAM_SYSTEM_PROMPT = (
+    "你是高校法律普法助手。只能依据给定依据回答，禁止编造法条。"
+    "先直接输出自然中文答案，不要 markdown。"
+    "最后单独一行输出 [[CITATIONS:chunk_id_1,chunk_id_2]]，chunk_id 只能来自给定依据。"
+    "正文结构：先给结论，再用“建议：”给出最多2条建议。"
+    "依据随最后一条用户消息给出。"
+)
+_WEB_ANSWER_SYSTEM_PROMPT = (
+    "你是高校法律普法助手。当前本地知识库没有直接命中用户问题。"
+    "用户消息里给你的是公开网络搜索摘要，请输出一个谨慎、非确定性的参考回答。"
+    "不要把网络搜索内容说成本地知识库依据。"
+    "必须明确提醒：以下内容来自公开网络信息整理，需用户自行判断并进一步核实。"
+    '输出严格 JSON，不要 markdown。格式：{"conclusion":"一句话结论","analysis":["最多2条分析"],'
+    '"actions":["最多2条建议"],"emotion":"supportive","follow_up_questions":["最多2条补充问题"]}'
+)
+# 可登记为供应商上下文的静态前缀：只有首条 system 消息恰好是其中之一时才走上下文缓存。
+_CACHEABLE_PREFIXES = frozenset({_ANSWER_SYSTEM_PROMPT, _STREAM_SYSTEM_PROMPT, _WEB_ANSWER_SYSTEM_PROMPT})
 
-    messages = [{"role": "system", "content": system_prompt}]
-    messages.extend(_trim_history_messages(history))
-    messages.append({"role": "user", "content": req.text.strip()[:240]})
-    return messages
+
+def _build_answer_messages(req: ChatRequest, evidence: list[dict[str, Any]], history: list[dict[str, str]] | None) -> list[dict[str, str]]:
+    return _layout_messages(_ANSWER_SYSTEM_PROMPT, req, evidence, history)
 
 
 def _build_stream_messages(req: ChatRequest, evidence: list[dict[str, Any]], history: list[dict[str, str]] | None) -> list[dict[str, str]]:
-    system_prompt = (
-        "你是高校法律普法助手。只能依据给定依据回答，禁止编造法条。"
-        "先直接输出自然中文答案，不要 markdown。"
-        "最后单独一行输出 [[CITATIONS:chunk_id_1,chunk_id_2]]，chunk_id 只能来自给定依据。"
-        "正文结构：先给结论，再用“建议：”给出最多2条建议。"
-    )
+    return _layout_messages(_STREAM_SYSTEM_PROMPT, req, evidence, history)
+
+
+def _layout_messages(
+    system_prompt: str,
+    req: ChatRequest,
+    evidence: list[dict[str, Any]],
+    history: list[dict[str, str]] | None,
+) -> list[dict[str, str]]:
+    summary, recent = _split_history(history)
+    question = _budget_question(req.text)
     evidence_text = _render_evidence_text(evidence)
     if evidence_text != "无":
-        system_prompt += f"\n依据：\n{evidence_text}"
+        question = f"依据：\n{evidence_text}\n\n问题：{question}"
+    if summary:
+        question = f"{summary}\n\n{question}"
 
     messages = [{"role": "system", "content": system_prompt}]
-    messages.extend(_trim_history_messages(history))
-    messages.append({"role": "user", "content": req.text.strip()[:240]})
+    messages.extend(recent)
+    messages.append({"role": "user", "content": question})
     return messages
 
 
+def _budget_question(text: str) -> str:
+    return prompt_budget.truncate_to_tokens(text.strip(), settings.prompt_question_token_budget)
+
+
 def _trim_history_messages(history: list[dict[str, str]] | None) -> list[dict[str, str]]:
+    """摘要（若有）作为开头的 system 消息，后接截断后的近期对话；供改写等只需要一段历史文本的提示词使用。"""
+    summary, recent = _split_history(history)
+    return ([{"role": "system", "content": summary}] if summary else []) + recent
+
+
+def _split_history(history: list[dict[str, str]] | None) -> tuple[str, list[dict[str, str]]]:
+    """拆出滚动摘要（history 开头的 system 消息，见 history_summary）与最近几条对话。
+
+    历史预算平均分给每条消息，按固定上限截断：截断结果只取决于消息本身，不随新一轮到来而变化。
+    """
     if not history:
-        return []
-    trimmed: list[dict[str, str]] = []
-    for item in history[-_ANSWER_HISTORY_LIMIT:]:
+        return "", []
+    summary = ""
+    if history[0].get("role") == "system":
+        # 摘要正文已在 history_summary.prompt_history 按 HISTORY_SUMMARY_MAX_CHARS 截好，这里原样使用。
+        summary = str(history[0].get("content") or "").strip()
+    cap = max(_HISTORY_MIN_TOKENS, settings.prompt_history_token_budget // _ANSWER_HISTORY_LIMIT)
+    recent: list[dict[str, str]] = []
+    for item in history[1 if history[0].get("role") == "system" else 0 :][-_ANSWER_HISTORY_LIMIT:]:
         role = str(item.get("role") or "").strip()
         content = str(item.get("content") or "").strip()
         if role not in {"user", "assistant"} or not content:
             continue
-        trimmed.append({"role": role, "content": content[:180]})
-    return trimmed
+        recent.append({"role": role, "content": prompt_budget.truncate_to_tokens(content, cap)})
+    return summary, recent
+
+
+async def summarize_turn_async(previous: str, user_text: str, assistant_text: str) -> str:
+    """把一轮对话折叠进滚动摘要：优先用快速模型压缩，模型不可用时退回本地截断拼接。"""
+    limit = max(40, settings.history_summary_max_chars)
+    if _answer_llm_configured() and not circuit_breaker.is_open("llm"):
+        prompt = (
+            f"请把下面的已有摘要与新一轮对话合并为一段不超过{limit}字的中文摘要，供后续回答参考。"
+            "保留当事人身份、关键事实（时间、金额、证据）、已给出的结论和仍待确认的问题；"
+            "不要编造，不要寒暄，只输出摘要正文。\n"
+            f"【已有摘要】{previous.strip() or '无'}\n"
+            f"【新一轮对话】\n用户：{user_text.strip()[:240]}\n助手：{assistant_text.strip()[:240]}"
+        )
+        content = await _chat_completion_text_async(
+            [{"role": "user", "content": prompt}],
+            model=_resolve_llm_model("fast"),
+            max_tokens=max(96, limit),
+            temperature=0.1,
+            stage="summary",
+        )
+        summary = " ".join((content or "").split())
+        if summary:
+            return summary[:limit]
+    return _local_turn_summary(previous, user_text, assistant_text, limit)
+
+
+def _local_turn_summary(previous: str, user_text: str, assistant_text: str, limit: int) -> str:
+    turn = f"用户问：{user_text.strip()[:60]}；答：{assistant_text.strip()[:60]}"
+    merged = f"{previous.strip()}\n{turn}" if previous.strip() else turn
+    # 超长时丢掉最早的轮次，保留最近的内容。
+    lines = merged.split("\n")
+    while len(lines) > 1 and len("\n".join(lines)) > limit:
+        lines.pop(0)
+    return "\n".join(lines)[-limit:]
 
 
 def _resolve_llm_model(model_variant: str) -> str:
@@ -1229,14 +1830,119 @@ def _resolve_llm_model(model_variant: str) -> str:
     return settings.resolved_llm_model()
 
 
-def _chat_completion_text(messages: list[dict[str, str]], model: str, max_tokens: int, temperature: float = 0.2) -> str | None:
+async def _chat_completion_text_async(
+    messages: list[dict[str, str]],
+    model: str,
+    max_tokens: int,
+    temperature: float = 0.2,
+    stage: str = "other",
+) -> str | None:
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+    return _completion_content(await _chat_completion_request_async(payload, stage=stage))
+
+
+async def _chat_completion_json_streamed_async(
+    messages: list[dict[str, str]],
+    model: str,
+    max_tokens: int,
+    temperature: float,
+    on_conclusion: Callable[[str], None],
+) -> str | None:
+    """流式取回 JSON 回答，conclusion 闭合即回调；返回值与 _chat_completion_text_async 相同，流未正常结束时返回 None。
+
+    缓存键沿用非流式 payload，与非流式调用共享 LLM 缓存；命中时直接回调缓存中的结论。
+    """
     payload = {
         "model": model,
         "messages": messages,
         "temperature": temperature,
         "max_tokens": max_tokens,
     }
-    body = _chat_completion_request(payload)
+    parser = StreamJsonFieldParser("conclusion")
+    key = llm_cache.cache_key(payload)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        content = _completion_content(cached)
+        if content and parser.feed(content) is not None:
+            on_conclusion(parser.value or "")
+        return content
+
+    started = time.perf_counter()
+    parts: list[str] = []
+    stream = _answer_stream_async(messages, model, max_tokens, temperature)
+    try:
+        async for delta in stream:
+            parts.append(delta)
+            if parser.feed(delta) is not None:
+                on_conclusion(parser.value or "")
+    except http_client.UpstreamError:
+        # 中途断流得到的是半截 JSON，既不能当回答也不能进缓存，交给调用方走兜底回答。
+        return None
+    content = "".join(parts).strip()
+    if not content:
+        return None
+    # 对冲由快速模型胜出时，结果不能写进默认模型的缓存键下。
+    if key is not None and getattr(stream, "winner", model) == model:
+        body = json.dumps({"choices": [{"message": {"content": content}}]}, ensure_ascii=False)
+        await asyncio.to_thread(llm_cache.put, key, model, body, (time.perf_counter() - started) * 1000)
+    return content
+
+
+def _hedge_model(model: str) -> str | None:
+    """默认模型的回答调用可对冲到快速模型；未开启、本就是快速模型或两者相同时返回 None。"""
+    if not settings.llm_hedge_enabled or model != settings.resolved_llm_model():
+        return None
+    fast = settings.resolved_fast_llm_model()
+    return fast if fast and fast != model else None
+
+
+async def _answer_completion_text_async(
+    messages: list[dict[str, str]],
+    model: str,
+    max_tokens: int,
+    temperature: float,
+) -> str | None:
+    hedge_model = _hedge_model(model)
+    if hedge_model is None:
+        return await _chat_completion_text_async(
+            messages, model=model, max_tokens=max_tokens, temperature=temperature, stage="answer"
+        )
+    return await llm_hedge.race(
+        lambda: _chat_completion_text_async(
+            messages, model=model, max_tokens=max_tokens, temperature=temperature, stage="answer"
+        ),
+        lambda: _chat_completion_text_async(
+            messages, model=hedge_model, max_tokens=max_tokens, temperature=temperature, stage="answer"
+        ),
+        model,
+        hedge_model,
+    )
+
+
+def _answer_stream_async(
+    messages: list[dict[str, str]],
+    model: str,
+    max_tokens: int,
+    temperature: float,
+) -> AsyncIterator[str]:
+    """回答生成的流式调用；开启对冲时返回 HedgedStream（迭代结束后可读 winner）。"""
+    hedge_model = _hedge_model(model)
+    if hedge_model is None:
+        return _chat_completion_stream_async(messages, model, max_tokens, temperature)
+    return llm_hedge.HedgedStream(
+        lambda: _chat_completion_stream_async(messages, model, max_tokens, temperature),
+        lambda: _chat_completion_stream_async(messages, hedge_model, max_tokens, temperature),
+        model,
+        hedge_model,
+    )
+
+
+def _completion_content(body: str | None) -> str | None:
     if body is None:
         return None
     try:
@@ -1247,82 +1953,219 @@ def _chat_completion_text(messages: list[dict[str, str]], model: str, max_tokens
         return None
 
 
-def _chat_completion_stream(messages: list[dict[str, str]], model: str, max_tokens: int, temperature: float = 0.2) -> Iterator[str]:
+async def _chat_completion_stream_async(
+    messages: list[dict[str, str]],
+    model: str,
+    max_tokens: int,
+    temperature: float = 0.2,
+    stage: str = "answer",
+) -> AsyncIterator[str]:
     payload = {
         "model": model,
         "messages": messages,
         "temperature": temperature,
         "max_tokens": max_tokens,
         "stream": True,
-        "stream_options": {"include_usage": False},
+        "stream_options": {"include_usage": True},
     }
-    req_obj = request.Request(
-        url=f"{settings.resolved_llm_base_url()}/chat/completions",
-        data=json.dumps(payload).encode("utf-8"),
-        headers={
-            "Authorization": f"Bearer {settings.resolved_llm_api_key()}",
-            "Content-Type": "application/json",
-        },
-        method="POST",
-    )
+    attempts = await _completion_attempts_async(payload)
+    usage = _StreamUsage(stage, model)
     try:
-        with request.urlopen(req_obj, timeout=get_runtime_config().timeout_sec) as resp:
-            for raw_line in resp:
-                line = raw_line.decode("utf-8", errors="ignore").strip()
-                if not line:
-                    continue
-                if line.startswith("data:"):
-                    line = line[5:].strip()
-                if not line or line == "[DONE]":
-                    continue
-                try:
-                    chunk = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
-                delta = ((chunk.get("choices") or [{}])[0].get("delta") or {})
-                content = delta.get("content")
-                if isinstance(content, str) and content:
-                    yield content
-    except error.HTTPError as e:
-        logger.warning("LLM HTTPError: %s", e)
-    except error.URLError as e:
-        logger.warning("LLM URLError: %s", e)
-    except TimeoutError:
-        logger.warning("LLM timeout")
-
-
-def _chat_completion_request(payload: dict[str, Any]) -> str | None:
-    req_obj = request.Request(
-        url=f"{settings.resolved_llm_base_url()}/chat/completions",
-        data=json.dumps(payload).encode("utf-8"),
-        headers={
-            "Authorization": f"Bearer {settings.resolved_llm_api_key()}",
-            "Content-Type": "application/json",
-        },
-        method="POST",
-    )
+        for attempt, (url, body) in enumerate(attempts, start=1):
+            try:
+                async with http_client.astream(
+                    "POST",
+                    url,
+                    json=body,
+                    headers=_llm_headers(),
+                    timeout=get_runtime_config().timeout_sec,
+                    breaker="llm",
+                    bulkhead=_llm_bulkhead(model),
+                ) as resp:
+                    async for raw_line in resp.aiter_lines():
+                        content = usage.feed(raw_line)
+                        if content:
+                            yield content
+                usage.ok = True
+                break
+            except http_client.UpstreamError as e:
+                # 已经输出过内容就不能换接口重来；否则上下文调用失败时退回普通接口。
+                if attempt == len(attempts) or usage.ttft_ms is not None:
+                    raise
+                _drop_context(payload)
+                logger.warning("LLM context stream failed, retrying without context: %s", e)
+    except http_client.UpstreamError as e:
+        logger.warning("LLM stream failed: %s", e)
+        # 未输出任何内容时按空流处理；已输出部分内容则继续抛出，调用方据此区分截断的回答与完整回答。
+        if usage.ttft_ms is not None:
+            raise
+    finally:
+        usage.finish()
+
+
+class _StreamUsage:
+    """流式调用的用量记录：首个内容块到达时记 TTFT，include_usage 的末尾块给出 token 数，结束（含取消）时落一条记录。"""
+
+    def __init__(self, stage: str, model: str) -> None:
+        self.stage = stage
+        self.model = model
+        self.started = time.perf_counter()
+        self.ttft_ms: float | None = None
+        self.usage: Any = None
+        self.ok = False
+
+    def feed(self, raw_line: str) -> str | None:
+        chunk = _stream_line_chunk(raw_line)
+        if chunk is None:
+            return None
+        if chunk.get("usage"):
+            self.usage = chunk["usage"]
+        delta = ((chunk.get("choices") or [{}])[0].get("delta") or {})
+        content = delta.get("content")
+        if not isinstance(content, str) or not content:
+            return None
+        if self.ttft_ms is None:
+            self.ttft_ms = (time.perf_counter() - self.started) * 1000
+        return content
+
+    def finish(self) -> None:
+        prompt_tokens, completion_tokens = llm_usage.parse_usage(self.usage)
+        llm_usage.record(
+            self.stage,
+            self.model,
+            prompt_tokens,
+            completion_tokens,
+            self.ttft_ms,
+            (time.perf_counter() - self.started) * 1000,
+            stream=True,
+            ok=self.ok or self.ttft_ms is not None,
+            cached_tokens=llm_usage.parse_cached_tokens(self.usage),
+        )
+
+
+def _stream_line_chunk(raw_line: str) -> dict[str, Any] | None:
+    line = raw_line.strip()
+    if line.startswith("data:"):
+        line = line[5:].strip()
+    if not line or line == "[DONE]":
+        return None
     try:
-        with request.urlopen(req_obj, timeout=get_runtime_config().timeout_sec) as resp:
-            return resp.read().decode("utf-8")
-    except error.HTTPError as e:
-        logger.warning("LLM HTTPError: %s", e)
+        chunk = json.loads(line)
+    except json.JSONDecodeError:
         return None
-    except error.URLError as e:
-        logger.warning("LLM URLError: %s", e)
+    return chunk if isinstance(chunk, dict) else None
+
+
+async def _chat_completion_request_async(payload: dict[str, Any], stage: str = "other") -> str | None:
+    key = llm_cache.cache_key(payload)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
+    started = time.perf_counter()
+    attempts = await _completion_attempts_async(payload)
+    resp = None
+    for attempt, (url, body) in enumerate(attempts, start=1):
+        try:
+            resp = await http_client.arequest(
+                "POST",
+                url,
+                json=body,
+                headers=_llm_headers(),
+                timeout=get_runtime_config().timeout_sec,
+                breaker="llm",
+                bulkhead=_llm_bulkhead(str(payload.get("model") or "")),
+            )
+            break
+        except http_client.UpstreamError as e:
+            logger.warning("LLM request failed: %s", e)
+            if attempt < len(attempts):
+                _drop_context(payload)
+    if resp is None:
+        _record_completion_usage(stage, payload, None, started)
         return None
-    except TimeoutError:
-        logger.warning("LLM timeout")
+    _record_completion_usage(stage, payload, resp.text, started)
+    if key is not None:
+        await asyncio.to_thread(
+            llm_cache.put, key, str(payload.get("model") or ""), resp.text, (time.perf_counter() - started) * 1000
+        )
+    return resp.text
+
+
+def _record_completion_usage(stage: str, payload: dict[str, Any], body: str | None, started: float) -> None:
+    """非流式调用整段返回，TTFT 即总耗时；body 为 None 表示上游失败。"""
+    duration_ms = (time.perf_counter() - started) * 1000
+    usage: Any = None
+    if body is not None:
+        try:
+            usage = json.loads(body).get("usage")
+        except (AttributeError, json.JSONDecodeError):
+            usage = None
+    prompt_tokens, completion_tokens = llm_usage.parse_usage(usage)
+    llm_usage.record(
+        stage,
+        str(payload.get("model") or ""),
+        prompt_tokens,
+        completion_tokens,
+        duration_ms if body is not None else None,
+        duration_ms,
+        ok=body is not None,
+        cached_tokens=llm_usage.parse_cached_tokens(usage),
+    )
+
+
+async def _completion_attempts_async(payload: dict[str, Any]) -> list[tuple[str, dict[str, Any]]]:
+    """返回依次尝试的 (url, 请求体)。
+
+    首条 system 消息是登记过的静态前缀且上下文缓存可用时，先走 /context/chat/completions（只发前缀之后的消息），
+    失败再退回普通接口发完整消息；其余情况只走普通接口。
+    """
+    plain = (_llm_completions_url(), payload)
+    prefix = _cacheable_prefix(payload)
+    if prefix is None:
+        return [plain]
+    context_id = await context_cache.context_id_async(str(payload.get("model") or ""), prefix)
+    if context_id is None:
+        return [plain]
+    body = {**payload, "context_id": context_id, "messages": payload["messages"][len(prefix) :]}
+    return [(context_cache.completions_url(), body), plain]
+
+
+def _cacheable_prefix(payload: dict[str, Any]) -> list[dict[str, str]] | None:
+    messages = payload.get("messages") or []
+    if not messages or messages[0].get("role") != "system" or messages[0].get("content") not in _CACHEABLE_PREFIXES:
         return None
+    return messages[:1]
+
+
+def _drop_context(payload: dict[str, Any]) -> None:
+    # 上下文可能已被供应商提前回收，丢弃本地记录，下一次调用重新创建。
+    prefix = _cacheable_prefix(payload)
+    if prefix is not None:
+        context_cache.invalidate(str(payload.get("model") or ""), prefix)
+
+
+def _llm_bulkhead(model: str) -> str:
+    # 快速模型单独一个舱壁，默认模型的慢请求堆积时不挤占改写、扩展等轻量调用。
+    fast = settings.resolved_fast_llm_model()
+    return "llm_fast" if model == fast and fast != settings.resolved_llm_model() else "llm"
+
+
+def _llm_completions_url() -> str:
+    return f"{settings.resolved_llm_base_url()}/chat/completions"
+
+
+def _llm_headers() -> dict[str, str]:
+    return {
+        "Authorization": f"Bearer {settings.resolved_llm_api_key()}",
+        "Content-Type": "application/json",
+    }
 
 
 def _extract_stream_citations(content: str) -> tuple[str, list[str]]:
-    text = (content or "").strip()
-    match = re.search(r"\[\[CITATIONS:([^\]]*)\]\]", text, re.IGNORECASE)
-    if not match:
-        return _strip_citation_sentinel(text), []
-    chunk_ids = [item.strip() for item in match.group(1).split(",") if item.strip()]
-    cleaned = (text[: match.start()] + text[match.end() :]).strip()
-    return cleaned, chunk_ids[:3]
+    parser = StreamCitationParser()
+    parser.feed(content or "")
+    parser.finish()
+    return parser.text, parser.chunk_ids or []
 
 
 def _strip_citation_sentinel(text: str) -> str:
@@ -0,0 +1,208 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from app.core.config import settings
+from app.core.logging import log_event
+
+logger = logging.getLogger(__name__)
+
+# 每个上游一个熔断器：滚动窗口内失败率或慢调用率超阈值即打开（直接拒绝、调用方走降级），
+# 冷却 open_sec 后进入半开，放行一个探测请求，成功则关闭，失败则重新打开。
+UPSTREAMS = ("llm", "embedding", "tts", "web_search")
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        *,
+        window_sec: float,
+        min_calls: int,
+        error_rate: float,
+        slow_call_ms: float,
+        slow_call_rate: float,
+        open_sec: float,
+        half_open_probes: int = 1,
+    ) -> None:
+        self.name = name
+        self.window_sec = max(1.0, float(window_sec))
+        self.min_calls = max(1, int(min_calls))
+        self.error_rate = float(error_rate)
+        self.slow_call_ms = float(slow_call_ms)
+        self.slow_call_rate = float(slow_call_rate)
+        self.open_sec = max(0.0, float(open_sec))
+        self.half_open_probes = max(1, int(half_open_probes))
+        self._lock = threading.Lock()
+        # (时间戳, 是否成功, 是否慢调用)
+        self._calls: deque[tuple[float, bool, bool]] = deque()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._rejected = 0
+        self._opened_count = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def allow(self) -> bool:
+        """是否放行本次调用；半开状态下只放行有限个探测请求。"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == OPEN:
+                self._rejected += 1
+                return False
+            if state == HALF_OPEN:
+                if self._state == OPEN:
+                    self._state, self._probes = HALF_OPEN, 0
+                if self._probes >= self.half_open_probes:
+                    self._rejected += 1
+                    return False
+                self._probes += 1
+            return True
+
+    def record(self, ok: bool, latency_ms: float) -> None:
+        slow = latency_ms >= self.slow_call_ms
+        with self._lock:
+            now = time.monotonic()
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                if ok and not slow:
+                    self._state = CLOSED
+                    self._calls.clear()
+                    log_event(logger, "info", "circuit_breaker_closed", upstream=self.name)
+                else:
+                    self._trip(now, "probe_failed")
+                return
+            if self._state == OPEN:
+                # 打开前已发出的请求迟到的结果，不再计入窗口。
+                return
+            self._calls.append((now, ok, slow))
+            self._trim(now)
+            total = len(self._calls)
+            if total < self.min_calls:
+                return
+            errors = sum(1 for _ts, call_ok, _slow in self._calls if not call_ok)
+            slows = sum(1 for _ts, _ok, call_slow in self._calls if call_slow)
+            if errors / total >= self.error_rate:
+                self._trip(now, "error_rate")
+            elif slows / total >= self.slow_call_rate:
+                self._trip(now, "slow_call_rate")
+
+    def abandon(self) -> None:
+        """放行后被调用方主动取消的调用（如对冲落败）：不计入窗口，只归还半开探测名额。"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._calls.clear()
+            self._probes = 0
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            state = self._current_state(now)
+            total = len(self._calls)
+            errors = sum(1 for _ts, ok, _slow in self._calls if not ok)
+            slows = sum(1 for _ts, _ok, slow in self._calls if slow)
+            retry_after = max(0.0, self.open_sec - (now - self._opened_at)) if state == OPEN else 0.0
+            return {
+                "name": self.name,
+                "state": state,
+                "window_calls": total,
+                "window_errors": errors,
+                "window_slow_calls": slows,
+                "error_rate": (errors / total) if total else 0.0,
+                "slow_call_rate": (slows / total) if total else 0.0,
+                "rejected": self._rejected,
+                "opened_count": self._opened_count,
+                "retry_after_sec": round(retry_after, 2),
+            }
+
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.open_sec:
+            return HALF_OPEN
+        return self._state
+
+    def _trip(self, now: float, reason: str) -> None:
+        self._state = OPEN
+        self._opened_at = now
+        self._opened_count += 1
+        self._probes = 0
+        self._calls.clear()
+        log_event(logger, "warning", "circuit_breaker_opened", upstream=self.name, reason=reason)
+
+    def _trim(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] > self.window_sec:
+            self._calls.popleft()
+
+
+_BREAKERS: dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    breaker = _BREAKERS.get(name)
+    if breaker is not None:
+        return breaker
+    with _BREAKERS_LOCK:
+        breaker = _BREAKERS.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                window_sec=settings.circuit_breaker_window_sec,
+                min_calls=settings.circuit_breaker_min_calls,
+                error_rate=settings.circuit_breaker_error_rate,
+                slow_call_ms=settings.circuit_breaker_slow_call_ms,
+                slow_call_rate=settings.circuit_breaker_slow_call_rate,
+                open_sec=settings.circuit_breaker_open_sec,
+            )
+            _BREAKERS[name] = breaker
+    return breaker
+
+
+def allow(name: str) -> bool:
+    if not settings.circuit_breaker_enabled:
+        return True
+    return get_breaker(name).allow()
+
+
+def record(name: str, ok: bool, latency_ms: float) -> None:
+    if settings.circuit_breaker_enabled:
+        get_breaker(name).record(ok, latency_ms)
+
+
+def abandon(name: str) -> None:
+    if settings.circuit_breaker_enabled:
+        get_breaker(name).abandon()
+
+
+def is_open(name: str) -> bool:
+    """只读判断：熔断打开且仍在冷却期内（半开时返回 False，让探测请求照常发出）。"""
+    return settings.circuit_breaker_enabled and get_breaker(name).state == OPEN
+
+
+def get_states() -> list[dict[str, Any]]:
+    names = sorted({*UPSTREAMS, *_BREAKERS})
+    return [get_breaker(name).snapshot() for name in names]
+
+
+def reset(name: str | None = None) -> None:
+    """name 为空时重置全部熔断器（配置变更或测试用）。"""
+    with _BREAKERS_LOCK:
+        if name is None:
+            _BREAKERS.clear()
+            return
+        _BREAKERS.pop(name, None)
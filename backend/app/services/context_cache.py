@@ -0,0 +1,92 @@
+import hashlib
+import json
+import logging
+import time
+from threading import Lock
+from typing import Any
+
+from app.core.config import settings
+from app.services import http_client
+from app.services.runtime_config import get_runtime_config
+
+logger = logging.getLogger(__name__)
+
+# 供应商上下文缓存（Ark context API，common_prefix 模式）：回答类提示词的首条 system 消息是与会话无关的静态指令，
+# 按 (model, 前缀) 只创建一次上下文，之后的调用改走 /context/chat/completions，只带 context_id 与其后的消息，
+# 前缀不再逐次重发，也不再在上游重复做 prefill。上下文在本地提前于供应商 TTL 过期；创建失败后一段时间内不再尝试。
+# 并发的首次请求可能各自创建一次上下文，后写入的覆盖先写入的，不影响正确性。
+_EXPIRY_MARGIN_SEC = 60.0
+_CREATE_RETRY_SEC = 60.0
+_CONTEXTS: dict[str, tuple[str, float]] = {}  # key -> (context_id, expires_at)
+_FAILED_UNTIL: dict[str, float] = {}
+_LOCK = Lock()
+_STATS = {"created": 0, "create_failures": 0, "hits": 0, "invalidated": 0}
+
+
+def prefix_key(model: str, prefix: list[dict[str, str]]) -> str:
+    raw = json.dumps({"model": model, "messages": prefix}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def completions_url() -> str:
+    return f"{settings.resolved_llm_base_url()}/context/chat/completions"
+
+
+async def context_id_async(model: str, prefix: list[dict[str, str]]) -> str | None:
+    """返回前缀对应的 context_id；未开启、没有前缀或创建失败时返回 None，调用方走普通接口。"""
+    if not settings.llm_context_cache_enabled or not model or not prefix:
+        return None
+    key = prefix_key(model, prefix)
+    now = time.time()
+    with _LOCK:
+        cached = _CONTEXTS.get(key)
+        if cached is not None and cached[1] > now:
+            _STATS["hits"] += 1
+            return cached[0]
+        if _FAILED_UNTIL.get(key, 0.0) > now:
+            return None
+    ttl = max(60, int(settings.llm_context_cache_ttl_sec))
+    try:
+        resp = await http_client.arequest(
+            "POST",
+            f"{settings.resolved_llm_base_url()}/context/create",
+            json={"model": model, "messages": prefix, "mode": "common_prefix", "ttl": ttl},
+            headers={
+                "Authorization": f"Bearer {settings.resolved_llm_api_key()}",
+                "Content-Type": "application/json",
+            },
+            timeout=get_runtime_config().timeout_sec,
+        )
+        context_id = str(json.loads(resp.text).get("id") or "").strip()
+    except (http_client.UpstreamError, json.JSONDecodeError, AttributeError) as e:
+        logger.warning("LLM context create failed: %s", e)
+        context_id = ""
+    with _LOCK:
+        if not context_id:
+            _STATS["create_failures"] += 1
+            _FAILED_UNTIL[key] = time.time() + _CREATE_RETRY_SEC
+            return None
+        _STATS["created"] += 1
+        _FAILED_UNTIL.pop(key, None)
+        _CONTEXTS[key] = (context_id, time.time() + max(ttl / 2, ttl - _EXPIRY_MARGIN_SEC))
+    return context_id
+
+
+def invalidate(model: str, prefix: list[dict[str, str]]) -> None:
+    """上下文调用失败（如供应商提前回收）时丢弃本地记录，下一次调用重新创建。"""
+    with _LOCK:
+        if _CONTEXTS.pop(prefix_key(model, prefix), None) is not None:
+            _STATS["invalidated"] += 1
+
+
+def stats() -> dict[str, Any]:
+    with _LOCK:
+        return {**_STATS, "contexts": len(_CONTEXTS)}
+
+
+def clear() -> None:
+    with _LOCK:
+        _CONTEXTS.clear()
+        _FAILED_UNTIL.clear()
+        for name in _STATS:
+            _STATS[name] = 0
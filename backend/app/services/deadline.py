@@ -0,0 +1,69 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+# 单次对话请求的端到端时间预算。处理函数开头 start()，经 ContextVar 传到同一请求派生的 task/线程：
+# http_client 把每次上游调用的超时收缩到剩余预算，各阶段用 allows() 判断是否还有时间，不够就降级。
+_MIN_TIMEOUT_SEC = 0.5
+_CURRENT: ContextVar["Deadline | None"] = ContextVar("request_deadline", default=None)
+
+
+@dataclass
+class Deadline:
+    budget_sec: float
+    # 回答阶段的保留时间：回答之前的阶段（改写、扩展、向量检索）只能使用预算中超出保留的部分。
+    reserve_sec: float = 0.0
+    started: float = field(default_factory=time.perf_counter)
+    degraded: list[str] = field(default_factory=list)
+
+    def remaining_sec(self) -> float:
+        return self.budget_sec - (time.perf_counter() - self.started)
+
+    def allows(self, stage: str, need_sec: float, keep_reserve: bool = True) -> bool:
+        """剩余时间够 stage 用（默认还需留出回答保留时间）时返回 True，否则记为降级并返回 False。"""
+        spare = self.remaining_sec() - (self.reserve_sec if keep_reserve else 0.0)
+        if spare >= need_sec:
+            return True
+        if stage not in self.degraded:
+            self.degraded.append(stage)
+        return False
+
+    def clamp(self, timeout_sec: float | None) -> float:
+        remaining = max(_MIN_TIMEOUT_SEC, self.remaining_sec())
+        return remaining if not timeout_sec else min(float(timeout_sec), remaining)
+
+    def summary(self) -> dict[str, Any]:
+        remaining_ms = self.remaining_sec() * 1000
+        return {
+            "deadline_budget_ms": round(self.budget_sec * 1000, 2),
+            "deadline_remaining_ms": round(remaining_ms, 2),
+            "deadline_exceeded": remaining_ms < 0,
+            "degraded_stages": list(self.degraded),
+        }
+
+
+def start(budget_sec: float, reserve_sec: float = 0.0) -> Deadline | None:
+    """为当前请求开启预算；budget_sec <= 0 表示不限时。"""
+    deadline = Deadline(float(budget_sec), max(0.0, float(reserve_sec))) if budget_sec and budget_sec > 0 else None
+    _CURRENT.set(deadline)
+    return deadline
+
+
+def current() -> Deadline | None:
+    return _CURRENT.get()
+
+
+def clear() -> None:
+    """在当前上下文（通常是单独的后台 task）中解除预算，例如 final 之后继续推送的逐句语音。"""
+    _CURRENT.set(None)
+
+
+def allows(stage: str, need_sec: float, keep_reserve: bool = True) -> bool:
+    deadline = _CURRENT.get()
+    return True if deadline is None else deadline.allows(stage, need_sec, keep_reserve)
+
+
+def clamp_timeout(timeout_sec: float | None) -> float | None:
+    deadline = _CURRENT.get()
+    return timeout_sec if deadline is None else deadline.clamp(timeout_sec)
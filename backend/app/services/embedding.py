@@ -1,30 +1,19 @@
+import asyncio
 import hashlib
 import json
-import time
 from collections import OrderedDict
 from threading import Lock
-from urllib import error, request
-from http.client import IncompleteRead
+from typing import Any
 
 from app.core.config import settings
+from app.services import http_client
 from app.services.runtime_config import get_runtime_config
 
-_NO_PROXY_OPENER = request.build_opener(request.ProxyHandler({}))
 _EMBED_CACHE_MAX = 512
 _EMBED_CACHE: "OrderedDict[str, list[float]]" = OrderedDict()
 _EMBED_CACHE_LOCK = Lock()
 
 
-def _get_opener():
-    # Prefer explicit proxy from settings; otherwise follow system proxy; optionally force direct.
-    if settings.force_no_proxy:
-        return _NO_PROXY_OPENER
-    proxy = (settings.outbound_proxy or "").strip()
-    if proxy:
-        return request.build_opener(request.ProxyHandler({"http": proxy, "https": proxy}))
-    return request.build_opener()
-
-
 def embed_text(text: str, provider_override: str | None = None) -> list[float]:
     runtime = get_runtime_config()
     provider = (provider_override or runtime.embedding_provider or settings.embedding_provider).lower().strip()
@@ -54,7 +43,118 @@ def _mock_embed(text: str, dim: int) -> list[float]:
     return vec
 
 
+async def embed_text_async(text: str, provider_override: str | None = None) -> list[float]:
+    runtime = get_runtime_config()
+    provider = (provider_override or runtime.embedding_provider or settings.embedding_provider).lower().strip()
+    cache_key = _cache_key(provider, text)
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return cached
+    if provider == "mock":
+        vector = _mock_embed(text, settings.embedding_dim)
+        _cache_set(cache_key, vector)
+        return vector
+    if provider in {"doubao", "ark"}:
+        vector = await _ark_embed_async(text)
+        _cache_set(cache_key, vector)
+        return vector
+    raise ValueError(f"Unsupported embedding provider: {provider}")
+
+
+async def embed_texts_async(texts: list[str], provider_override: str | None = None) -> list[list[float]]:
+    """批量向量化：按去空白后的文本去重、先查缓存，未命中的文本在一次请求里发出（多模态接口不支持批量，改为并发逐条）。"""
+    runtime = get_runtime_config()
+    provider = (provider_override or runtime.embedding_provider or settings.embedding_provider).lower().strip()
+    vectors: dict[str, list[float]] = {}
+    missing: list[str] = []
+    for text in dict.fromkeys(text.strip() for text in texts):
+        cached = _cache_get(_cache_key(provider, text))
+        if cached is not None:
+            vectors[text] = cached
+        else:
+            missing.append(text)
+    if missing:
+        if provider == "mock":
+            fresh = [_mock_embed(text, settings.embedding_dim) for text in missing]
+        elif provider in {"doubao", "ark"}:
+            if "vision" in settings.resolved_embedding_model().lower():
+                fresh = list(await asyncio.gather(*(_ark_embed_async(text) for text in missing)))
+            else:
+                fresh = await _ark_embed_batch_async(missing)
+        else:
+            raise ValueError(f"Unsupported embedding provider: {provider}")
+        for text, vector in zip(missing, fresh):
+            _cache_set(_cache_key(provider, text), vector)
+            vectors[text] = vector
+    return [list(vectors[text.strip()]) for text in texts]
+
+
 def _ark_embed(text: str) -> list[float]:
+    url, payload, headers = _ark_embed_request(text)
+    try:
+        resp = http_client.request(
+            "POST",
+            url,
+            json=payload,
+            headers=headers,
+            timeout=get_runtime_config().timeout_sec,
+            retries=2,
+            breaker="embedding",
+        )
+    except http_client.CircuitOpenError:
+        raise
+    except http_client.UpstreamError as exc:
+        raise _embedding_error(exc) from exc
+    return _parse_ark_embedding(resp.text)
+
+
+async def _ark_embed_async(text: str) -> list[float]:
+    url, payload, headers = _ark_embed_request(text)
+    try:
+        resp = await http_client.arequest(
+            "POST",
+            url,
+            json=payload,
+            headers=headers,
+            timeout=get_runtime_config().timeout_sec,
+            retries=2,
+            breaker="embedding",
+        )
+    except http_client.CircuitOpenError:
+        raise
+    except http_client.UpstreamError as exc:
+        raise _embedding_error(exc) from exc
+    return _parse_ark_embedding(resp.text)
+
+
+async def _ark_embed_batch_async(texts: list[str]) -> list[list[float]]:
+    url, payload, headers = _ark_embed_request(texts[0])
+    payload["input"] = list(texts)
+    try:
+        resp = await http_client.arequest(
+            "POST",
+            url,
+            json=payload,
+            headers=headers,
+            timeout=get_runtime_config().timeout_sec,
+            retries=2,
+            breaker="embedding",
+        )
+    except http_client.CircuitOpenError:
+        raise
+    except http_client.UpstreamError as exc:
+        raise _embedding_error(exc) from exc
+    try:
+        data = json.loads(resp.text)["data"]
+        ordered = [item["embedding"] for item in sorted(data, key=lambda item: int(item.get("index", 0)))]
+    except (KeyError, TypeError, ValueError, AttributeError) as exc:
+        raise ValueError(f"Invalid Ark embedding response: {resp.text[:300]}") from exc
+    if len(ordered) != len(texts):
+        raise ValueError(f"Ark embedding returned {len(ordered)} vectors for {len(texts)} inputs")
+    return [_checked_vector(vector) for vector in ordered]
+
+
+def _ark_embed_request(text: str) -> tuple[str, dict[str, Any], dict[str, str]]:
     api_key = settings.resolved_embedding_api_key()
     if not api_key:
         raise ValueError("EMBEDDING_API_KEY/ARK_API_KEY is empty")
@@ -82,37 +182,20 @@ def _ark_embed(text: str) -> list[float]:
             "encoding_format": "float",
         }
         url = f"{settings.resolved_embedding_base_url()}/embeddings"
-    data = json.dumps(payload).encode("utf-8")
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
     }
-    last_exc = None
-    body = None
-    for attempt in range(3):
-        req_obj = request.Request(url=url, data=data, headers=headers, method="POST")
-        try:
-            with _get_opener().open(req_obj, timeout=get_runtime_config().timeout_sec) as resp:
-                body = resp.read().decode("utf-8")
-            break
-        except error.HTTPError as exc:
-            detail = exc.read().decode("utf-8", errors="ignore")
-            raise ValueError(f"Ark embedding HTTPError: {exc.code} {detail}") from exc
-        except (error.URLError, OSError, IncompleteRead) as exc:
-            last_exc = exc
-            if attempt < 2:
-                time.sleep(2 ** attempt)
-            else:
-                raise ValueError(f"Ark embedding URLError (after retries): {exc}") from exc
-        except TimeoutError as exc:
-            last_exc = exc
-            if attempt < 2:
-                time.sleep(2 ** attempt)
-            else:
-                raise ValueError("Ark embedding timeout") from exc
-    if body is None and last_exc:
-        raise ValueError(f"Ark embedding failed: {last_exc}") from last_exc
+    return url, payload, headers
+
+
+def _embedding_error(exc: http_client.UpstreamError) -> ValueError:
+    if exc.status_code is not None:
+        return ValueError(f"Ark embedding HTTPError: {exc.status_code} {exc.body}")
+    return ValueError(f"Ark embedding request failed (after retries): {exc}")
 
+
+def _parse_ark_embedding(body: str) -> list[float]:
     try:
         parsed = json.loads(body)
         data = parsed.get("data")
@@ -124,7 +207,10 @@ def _ark_embed(text: str) -> list[float]:
             raise KeyError("data")
     except (KeyError, IndexError, TypeError, json.JSONDecodeError) as exc:
         raise ValueError(f"Invalid Ark embedding response: {body[:300]}") from exc
+    return _checked_vector(vector)
+
 
+def _checked_vector(vector: Any) -> list[float]:
     if not isinstance(vector, list) or not vector:
         raise ValueError("Ark embedding is empty")
     if settings.embedding_dim > 0 and len(vector) != settings.embedding_dim:
@@ -0,0 +1,249 @@
+import json
+import logging
+import math
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+from app.core.logging import log_event
+from app.services import circuit_breaker
+from app.services import http_client
+from app.services.embedding import embed_text, embed_text_async
+from app.services.runtime_config import get_runtime_config
+
+logger = logging.getLogger(__name__)
+
+# 离线普法 FAQ：本地知识库未命中时先查这份人工整理的常见问题，命中即可直接作答，
+# 不必再走联网检索 + 一次 LLM 调用。语料是 data/legal_faq.jsonl，
+# scripts/ingest_legal_faq.py 为每条问题及其别名预先算好向量写入索引文件。
+# 匹配先看字面（关键词命中 + 字符二元组重合度），字面不够时才用向量相似度；
+# 只有索引与当前嵌入配置一致且不是 mock 嵌入时才算向量，否则只做字面匹配。
+CHUNK_PREFIX = "faq:"
+_KEYWORD_WEIGHT = 0.25
+_STRIP_RE = re.compile(r"[\s，。、！？,.!?;；:：“”\"'（）()【】\[\]~～…]+")
+_CACHE: dict[str, Any] = {"stamp": None, "items": (), "vectors": {}}
+_CACHE_LOCK = threading.Lock()
+
+
+@dataclass(frozen=True)
+class FaqItem:
+    id: str
+    question: str
+    answer: str
+    aliases: tuple[str, ...] = ()
+    keywords: tuple[str, ...] = ()
+    analysis: tuple[str, ...] = ()
+    actions: tuple[str, ...] = ()
+    source: str = ""
+    article: str = ""
+    tags: tuple[str, ...] = ()
+
+    @property
+    def chunk_id(self) -> str:
+        return f"{CHUNK_PREFIX}{self.id}"
+
+
+@dataclass(frozen=True)
+class FaqMatch:
+    item: FaqItem
+    score: float
+    method: str  # lexical / vector
+
+
+def match(text: str) -> FaqMatch | None:
+    items, vectors = _load()
+    best = _best_lexical(text, items)
+    if best is not None or not _vectors_usable(vectors):
+        return best
+    try:
+        query_vector = embed_text(text)
+    except ValueError:
+        return None
+    except http_client.UpstreamError as exc:
+        # 嵌入熔断打开或舱壁已满：向量这一层跳过，字面匹配已经没有命中。
+        log_event(logger, "warning", "faq_vector_skipped", error=str(exc))
+        return best
+    return _best_vector(query_vector, items, vectors)
+
+
+async def match_async(text: str) -> FaqMatch | None:
+    """match() 的协程版本；查询向量走异步嵌入。"""
+    items, vectors = _load()
+    best = _best_lexical(text, items)
+    if best is not None or not _vectors_usable(vectors):
+        return best
+    try:
+        query_vector = await embed_text_async(text)
+    except ValueError:
+        return None
+    except http_client.UpstreamError as exc:
+        # 嵌入熔断打开或舱壁已满：向量这一层跳过，字面匹配已经没有命中。
+        log_event(logger, "warning", "faq_vector_skipped", error=str(exc))
+        return best
+    return _best_vector(query_vector, items, vectors)
+
+
+def get_item(item_id: str) -> FaqItem | None:
+    items, _ = _load()
+    for item in items:
+        if item.id == item_id:
+            return item
+    return None
+
+
+def get_chunk(chunk_id: str) -> dict[str, Any] | None:
+    """把 faq:<id> 引用还原成与知识库 chunk 相同结构的字典，供引用详情弹窗展示。"""
+    if not chunk_id.startswith(CHUNK_PREFIX):
+        return None
+    item = get_item(chunk_id[len(CHUNK_PREFIX) :])
+    if item is None:
+        return None
+    return {
+        "chunk_id": item.chunk_id,
+        "text": f"问：{item.question}\n答：{item.answer}",
+        "law_name": item.source or None,
+        "article_no": item.article or None,
+        "section": "常见问题",
+        "tags": ",".join(item.tags) or None,
+        "source": "legal_faq",
+        "source_type": "faq",
+    }
+
+
+def normalize(text: str) -> str:
+    return _STRIP_RE.sub("", (text or "").lower())
+
+
+def lexical_score(text: str, item: FaqItem) -> float:
+    """关键词至少命中一个才计分：问题/别名的字符二元组 Dice 系数取最大，每命中一个关键词再加权。"""
+    normalized = normalize(text)
+    hits = sum(1 for keyword in item.keywords if keyword and keyword in normalized)
+    if not hits:
+        return 0.0
+    grams = _bigrams(normalized)
+    overlap = max(_dice(grams, _bigrams(normalize(variant))) for variant in (item.question, *item.aliases))
+    return min(1.0, overlap + _KEYWORD_WEIGHT * hits)
+
+
+def index_signature() -> dict[str, Any]:
+    """当前嵌入配置；与索引文件记录的一致时才能比较向量。"""
+    runtime = get_runtime_config()
+    provider = (runtime.embedding_provider or settings.embedding_provider).lower().strip()
+    model = settings.resolved_embedding_model() if provider in {"doubao", "ark"} else "mock"
+    return {"embedding_provider": provider, "embedding_model": model}
+
+
+def load_source(path: Path | None = None) -> list[FaqItem]:
+    items: list[FaqItem] = []
+    with (path or _resolve_path(settings.faq_source_path)).open("r", encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if line:
+                items.append(_to_item(json.loads(line)))
+    return items
+
+
+def clear_cache() -> None:
+    with _CACHE_LOCK:
+        _CACHE.update({"stamp": None, "items": (), "vectors": {}})
+
+
+def _load() -> tuple[tuple[FaqItem, ...], dict[str, list[list[float]]]]:
+    """优先读索引（含向量），没有索引时退回源文件；按文件修改时间缓存，重新生成索引后自动重载。"""
+    if not settings.faq_enabled:
+        return (), {}
+    index_path = _resolve_path(settings.faq_index_path)
+    source_path = _resolve_path(settings.faq_source_path)
+    path = index_path if index_path.exists() else source_path
+    try:
+        stamp = (str(path), path.stat().st_mtime_ns)
+    except OSError:
+        return (), {}
+    with _CACHE_LOCK:
+        if _CACHE["stamp"] == stamp:
+            return _CACHE["items"], _CACHE["vectors"]
+
+    vectors: dict[str, list[list[float]]] = {}
+    try:
+        if path == index_path:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+            items = [_to_item(raw) for raw in payload.get("items", [])]
+            signature = {key: payload.get(key) for key in ("embedding_provider", "embedding_model")}
+            if signature == index_signature() and signature["embedding_provider"] != "mock":
+                vectors = {str(raw["id"]): raw.get("vectors") or [] for raw in payload.get("items", [])}
+        else:
+            items = load_source(path)
+    except (OSError, ValueError, KeyError) as exc:
+        log_event(logger, "warning", "faq_load_failed", path=str(path), error=str(exc))
+        items = []
+    with _CACHE_LOCK:
+        _CACHE.update({"stamp": stamp, "items": tuple(items), "vectors": vectors})
+    log_event(logger, "info", "faq_loaded", path=str(path), items=len(items), vectors=bool(vectors))
+    return tuple(items), vectors
+
+
+def _best_lexical(text: str, items: tuple[FaqItem, ...]) -> FaqMatch | None:
+    best: FaqMatch | None = None
+    for item in items:
+        score = lexical_score(text, item)
+        if score >= settings.faq_min_score and (best is None or score > best.score):
+            best = FaqMatch(item=item, score=round(score, 4), method="lexical")
+    return best
+
+
+def _vectors_usable(vectors: dict[str, list[list[float]]]) -> bool:
+    return bool(vectors) and not circuit_breaker.is_open("embedding")
+
+
+def _best_vector(query_vector: list[float], items: tuple[FaqItem, ...], vectors: dict[str, list[list[float]]]) -> FaqMatch | None:
+    best: FaqMatch | None = None
+    for item in items:
+        score = max((_cosine(query_vector, vector) for vector in vectors.get(item.id, [])), default=0.0)
+        if score >= settings.faq_min_vector_score and (best is None or score > best.score):
+            best = FaqMatch(item=item, score=round(score, 4), method="vector")
+    return best
+
+
+def _to_item(raw: dict[str, Any]) -> FaqItem:
+    return FaqItem(
+        id=str(raw["id"]),
+        question=str(raw["question"]),
+        answer=str(raw["answer"]),
+        aliases=tuple(str(x) for x in raw.get("aliases") or []),
+        keywords=tuple(normalize(str(x)) for x in raw.get("keywords") or []),
+        analysis=tuple(str(x) for x in raw.get("analysis") or []),
+        actions=tuple(str(x) for x in raw.get("actions") or []),
+        source=str(raw.get("source") or ""),
+        article=str(raw.get("article") or ""),
+        tags=tuple(str(x) for x in raw.get("tags") or []),
+    )
+
+
+def _resolve_path(value: str) -> Path:
+    path = Path(value)
+    if not path.is_absolute():
+        path = Path(__file__).resolve().parents[3] / path
+    return path
+
+
+def _bigrams(text: str) -> set[str]:
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i : i + 2] for i in range(len(text) - 1)}
+
+
+def _dice(a: set[str], b: set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def _cosine(a: list[float], b: list[float]) -> float:
+    if len(a) != len(b) or not a:
+        return 0.0
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
@@ -0,0 +1,94 @@
+import asyncio
+import contextvars
+import logging
+from typing import Any
+
+from app.core.config import settings
+from app.core.logging import log_event
+from app.services import chat as chat_service
+from app.services import session_store
+
+logger = logging.getLogger(__name__)
+
+# 会话滚动摘要：每轮结束后在后台把这一轮折叠进摘要（快速模型压缩，见 chat.summarize_turn_async），
+# 存在 session_store 的 chat_summaries 表。下一轮的回答与改写提示词只带“摘要 + 摘要之后的原文（至少最近一轮）”，
+# 会话再长提示词长度也基本不变。摘要记录最近折叠进去的轮次号（chat_sessions.turns 递增的会话轮数），
+# 据此判断哪些消息还没进摘要，后台更新稍慢、用户重复同一句话也不会丢上下文。
+SUMMARY_PREFIX = "此前对话摘要："
+_PENDING: "dict[str, asyncio.Task[None]]" = {}
+
+
+async def load_context(session_id: str, history: list[dict[str, str]]) -> list[dict[str, str]]:
+    """返回传给改写/回答提示词的对话上下文；无历史时为空列表（整条回答缓存据此判断是否无历史）。"""
+    if not history or not settings.history_summary_enabled:
+        return history
+    try:
+        summary = await session_store.get_chat_summary_async(session_id)
+    except Exception as exc:
+        log_event(logger, "warning", "history_summary_load_failed", session_id=session_id, error=type(exc).__name__)
+        summary = None
+    return prompt_history(history, summary)
+
+
+def prompt_history(history: list[dict[str, str]], summary: dict[str, Any] | None) -> list[dict[str, str]]:
+    if not history or not summary or not str(summary.get("summary") or "").strip():
+        return history
+    last_turn = int(summary.get("last_turn") or 0)
+    turn = int(summary.get("session_turns") or 0)
+    covered_at = None
+    if last_turn > 0 and turn > 0:
+        # 从后往前给每条用户发言标轮次号：最后一条是会话当前轮数，往前依次减一。
+        for idx in range(len(history) - 1, -1, -1):
+            if history[idx].get("role") != "user":
+                continue
+            if turn <= last_turn:
+                covered_at = idx
+                break
+            turn -= 1
+    # 摘要之后的消息还没折叠进去，按原文带上；摘要已是最新时仍带最近一轮原文。
+    raw = history if covered_at is None else history[covered_at + 2 :]
+    if len(raw) < 2:
+        raw = history[-2:]
+    text = str(summary["summary"]).strip()[: max(1, settings.history_summary_max_chars)]
+    return [{"role": "system", "content": SUMMARY_PREFIX + text}, *raw]
+
+
+def schedule(session_id: str, turn: int, user_text: str, assistant_text: str) -> None:
+    """在后台把刚结束的第 turn 轮（save_chat_history 的返回值）折叠进摘要；同一会话的更新按顺序执行。"""
+    if not settings.history_summary_enabled or not user_text.strip():
+        return
+    previous = _PENDING.get(session_id)
+    # 空上下文：不继承本次请求的时间预算与 LLM 统计，摘要调用不计入请求指标。
+    task = asyncio.get_running_loop().create_task(
+        _update(session_id, turn, user_text, assistant_text, previous), context=contextvars.Context()
+    )
+    _PENDING[session_id] = task
+    task.add_done_callback(lambda done: _forget(session_id, done))
+
+
+async def drain() -> None:
+    """等待所有进行中的摘要更新（关停与测试用）。"""
+    loop = asyncio.get_running_loop()
+    tasks = [task for task in _PENDING.values() if task.get_loop() is loop]
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _update(
+    session_id: str, turn: int, user_text: str, assistant_text: str, previous: "asyncio.Task[None] | None"
+) -> None:
+    if previous is not None and not previous.done() and previous.get_loop() is asyncio.get_running_loop():
+        await asyncio.gather(previous, return_exceptions=True)
+    try:
+        current = await session_store.get_chat_summary_async(session_id) or {"summary": "", "turns": 0}
+        summary = await chat_service.summarize_turn_async(current["summary"], user_text, assistant_text)
+        await session_store.save_chat_summary_async(session_id, summary, int(current["turns"]) + 1, int(turn))
+    except Exception as exc:
+        log_event(logger, "warning", "history_summary_failed", session_id=session_id, error=type(exc).__name__)
+        return
+    log_event(logger, "info", "history_summary_updated", session_id=session_id, turns=int(current["turns"]) + 1, chars=len(summary))
+
+
+def _forget(session_id: str, task: "asyncio.Task[None]") -> None:
+    if _PENDING.get(session_id) is task:
+        _PENDING.pop(session_id, None)
@@ -0,0 +1,457 @@
+import asyncio
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from importlib.util import find_spec
+from typing import Any
+from urllib import parse
+
+import httpx
+
+from app.core.config import settings
+from app.services import bulkhead as bulkhead_service
+from app.services import circuit_breaker, deadline
+
+# 所有上游（LLM/Embedding/TTS/ASR/Web）共用一个连接池：按 host 复用 keep-alive 连接，
+# 代理在创建时解析一次，超时与重试策略统一。
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+_CLIENT: httpx.Client | None = None
+_CLIENT_LOCK = threading.Lock()
+# AsyncClient 的连接绑定在创建它的事件循环上，因此按 loop 各持有一个。
+_ASYNC_CLIENTS: dict[int, tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+_STATS: dict[str, dict[str, float]] = {}
+_STATS_LOCK = threading.Lock()
+
+
+class UpstreamError(Exception):
+    """上游请求失败：status_code 为 None 表示网络/超时等传输层错误。"""
+
+    def __init__(self, message: str, status_code: int | None = None, body: str = "") -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+
+class CircuitOpenError(UpstreamError):
+    """上游熔断器处于打开状态，请求未发出即失败；调用方按普通上游失败走降级。"""
+
+    def __init__(self, upstream: str) -> None:
+        super().__init__(f"circuit open: {upstream}")
+        self.upstream = upstream
+
+
+class UpstreamBusyError(CircuitOpenError):
+    """上游舱壁已满（排队已满或排队超时），请求未发出即失败；与熔断打开一样由调用方走降级。"""
+
+    def __init__(self, upstream: str, reason: str, retry_after_sec: int) -> None:
+        super().__init__(upstream)
+        self.args = (f"bulkhead {reason}: {upstream}",)
+        self.reason = reason
+        self.retry_after_sec = retry_after_sec
+
+
+def get_client() -> httpx.Client:
+    global _CLIENT
+    if _CLIENT is not None:
+        return _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = httpx.Client(**_client_options())
+    return _CLIENT
+
+
+def get_async_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    with _CLIENT_LOCK:
+        for key, (owner, _client) in list(_ASYNC_CLIENTS.items()):
+            if owner.is_closed():
+                _ASYNC_CLIENTS.pop(key, None)
+        entry = _ASYNC_CLIENTS.get(id(loop))
+        if entry is None or entry[0] is not loop:
+            entry = (loop, httpx.AsyncClient(**_client_options()))
+            _ASYNC_CLIENTS[id(loop)] = entry
+    return entry[1]
+
+
+def close_client() -> None:
+    global _CLIENT
+    with _CLIENT_LOCK:
+        client, _CLIENT = _CLIENT, None
+    if client is not None:
+        client.close()
+
+
+async def aclose_client() -> None:
+    close_client()
+    loop = asyncio.get_running_loop()
+    with _CLIENT_LOCK:
+        entry = _ASYNC_CLIENTS.pop(id(loop), None)
+    if entry is not None:
+        await entry[1].aclose()
+
+
+def request(
+    method: str,
+    url: str,
+    *,
+    json: Any = None,
+    content: bytes | None = None,
+    headers: dict[str, str] | None = None,
+    timeout: float | None = None,
+    retries: int = 0,
+    breaker: str | None = None,
+    bulkhead: str | None = None,
+) -> httpx.Response:
+    """发送请求并读取完整响应体；HTTP >= 400 或传输错误时抛出 UpstreamError。
+
+    breaker 为上游熔断器名（llm/embedding/tts/web_search）：熔断打开时直接抛出 CircuitOpenError，
+    整次调用（含重试）的结果与耗时计入熔断窗口。
+    bulkhead 为舱壁名（默认与 breaker 同名）：并发已满时排队，排满或排队超时抛出 UpstreamBusyError。
+    """
+    with _bulkhead_slot(bulkhead or breaker):
+        host = _host_of(url)
+        attempts = max(0, int(retries)) + 1
+        call_started = _breaker_enter(breaker)
+        healthy = False
+        try:
+            for attempt in range(attempts):
+                tracer = _ConnectionTracer()
+                started = time.perf_counter()
+                try:
+                    resp = get_client().request(
+                        method,
+                        url,
+                        json=json,
+                        content=content,
+                        headers=headers,
+                        timeout=_request_timeout(timeout),
+                        extensions={"trace": tracer},
+                    )
+                except httpx.HTTPError as exc:
+                    _record(host, started, tracer, ok=False)
+                    if attempt + 1 < attempts:
+                        _record_retry(host)
+                        _backoff(attempt)
+                        continue
+                    raise UpstreamError(f"{type(exc).__name__}: {exc}") from exc
+
+                _record(host, started, tracer, ok=resp.status_code < 400)
+                if resp.status_code in _RETRY_STATUS and attempt + 1 < attempts:
+                    _record_retry(host)
+                    _backoff(attempt)
+                    continue
+                healthy = _upstream_healthy(resp.status_code)
+                if resp.status_code >= 400:
+                    raise UpstreamError(f"HTTP {resp.status_code}", status_code=resp.status_code, body=resp.text[:500])
+                return resp
+            raise UpstreamError("retries exhausted")  # pragma: no cover
+        finally:
+            _breaker_exit(breaker, call_started, healthy)
+
+
+@contextmanager
+def stream(
+    method: str,
+    url: str,
+    *,
+    json: Any = None,
+    headers: dict[str, str] | None = None,
+    timeout: float | None = None,
+    breaker: str | None = None,
+    bulkhead: str | None = None,
+) -> Iterator[httpx.Response]:
+    """流式读取响应（SSE 等）；流式请求不做重试，避免重复输出。
+
+    熔断只按响应头到达前的耗时计慢调用，长回答的正常生成时间不算作上游变慢。
+    """
+    with _bulkhead_slot(bulkhead or breaker):
+        host = _host_of(url)
+        tracer = _ConnectionTracer()
+        started = _breaker_enter(breaker)
+        headers_at: float | None = None
+        status_code: int | None = None
+        ok = False
+        try:
+            with get_client().stream(
+                method,
+                url,
+                json=json,
+                headers=headers,
+                timeout=_request_timeout(timeout),
+                extensions={"trace": tracer},
+            ) as resp:
+                headers_at, status_code = time.perf_counter(), resp.status_code
+                if resp.status_code >= 400:
+                    body = resp.read().decode("utf-8", errors="ignore")
+                    raise UpstreamError(f"HTTP {resp.status_code}", status_code=resp.status_code, body=body[:500])
+                yield resp
+                ok = True
+        except httpx.HTTPError as exc:
+            status_code = None
+            raise UpstreamError(f"{type(exc).__name__}: {exc}") from exc
+        finally:
+            _record(host, started, tracer, ok=ok)
+            _breaker_exit(breaker, started, ok or _upstream_healthy(status_code), headers_at)
+
+
+async def arequest(
+    method: str,
+    url: str,
+    *,
+    json: Any = None,
+    content: bytes | None = None,
+    headers: dict[str, str] | None = None,
+    timeout: float | None = None,
+    retries: int = 0,
+    breaker: str | None = None,
+    bulkhead: str | None = None,
+) -> httpx.Response:
+    """request() 的协程版本，语义一致，但不占用线程池线程。
+
+    调用方取消（如对冲请求落败）不算上游失败，不计入熔断窗口。
+    """
+    async with _abulkhead_slot(bulkhead or breaker):
+        host = _host_of(url)
+        attempts = max(0, int(retries)) + 1
+        call_started = _breaker_enter(breaker)
+        healthy = False
+        abandoned = False
+        try:
+            for attempt in range(attempts):
+                tracer = _AsyncConnectionTracer()
+                started = time.perf_counter()
+                try:
+                    resp = await get_async_client().request(
+                        method,
+                        url,
+                        json=json,
+                        content=content,
+                        headers=headers,
+                        timeout=_request_timeout(timeout),
+                        extensions={"trace": tracer},
+                    )
+                except httpx.HTTPError as exc:
+                    _record(host, started, tracer, ok=False)
+                    if attempt + 1 < attempts:
+                        _record_retry(host)
+                        await asyncio.sleep(_backoff_sec(attempt))
+                        continue
+                    raise UpstreamError(f"{type(exc).__name__}: {exc}") from exc
+
+                _record(host, started, tracer, ok=resp.status_code < 400)
+                if resp.status_code in _RETRY_STATUS and attempt + 1 < attempts:
+                    _record_retry(host)
+                    await asyncio.sleep(_backoff_sec(attempt))
+                    continue
+                healthy = _upstream_healthy(resp.status_code)
+                if resp.status_code >= 400:
+                    raise UpstreamError(f"HTTP {resp.status_code}", status_code=resp.status_code, body=resp.text[:500])
+                return resp
+            raise UpstreamError("retries exhausted")  # pragma: no cover
+        except asyncio.CancelledError:
+            abandoned = True
+            raise
+        finally:
+            _breaker_exit(breaker, call_started, healthy, abandoned=abandoned)
+
+
+@asynccontextmanager
+async def astream(
+    method: str,
+    url: str,
+    *,
+    json: Any = None,
+    headers: dict[str, str] | None = None,
+    timeout: float | None = None,
+    breaker: str | None = None,
+    bulkhead: str | None = None,
+) -> AsyncIterator[httpx.Response]:
+    async with _abulkhead_slot(bulkhead or breaker):
+        host = _host_of(url)
+        tracer = _AsyncConnectionTracer()
+        started = _breaker_enter(breaker)
+        headers_at: float | None = None
+        status_code: int | None = None
+        ok = False
+        abandoned = False
+        try:
+            async with get_async_client().stream(
+                method,
+                url,
+                json=json,
+                headers=headers,
+                timeout=_request_timeout(timeout),
+                extensions={"trace": tracer},
+            ) as resp:
+                headers_at, status_code = time.perf_counter(), resp.status_code
+                if resp.status_code >= 400:
+                    body = (await resp.aread()).decode("utf-8", errors="ignore")
+                    raise UpstreamError(f"HTTP {resp.status_code}", status_code=resp.status_code, body=body[:500])
+                yield resp
+                ok = True
+        except httpx.HTTPError as exc:
+            status_code = None
+            raise UpstreamError(f"{type(exc).__name__}: {exc}") from exc
+        except (asyncio.CancelledError, GeneratorExit):
+            # 响应头到达前被调用方放弃，无法判断上游好坏。
+            abandoned = headers_at is None
+            raise
+        finally:
+            _record(host, started, tracer, ok=ok)
+            _breaker_exit(breaker, started, ok or _upstream_healthy(status_code), headers_at, abandoned=abandoned)
+
+
+def get_host_stats() -> list[dict[str, Any]]:
+    with _STATS_LOCK:
+        snapshot = {host: dict(stats) for host, stats in _STATS.items()}
+    out: list[dict[str, Any]] = []
+    for host in sorted(snapshot):
+        stats = snapshot[host]
+        total = int(stats["requests"])
+        new_connections = int(stats["new_connections"])
+        out.append(
+            {
+                "host": host,
+                "requests": total,
+                "errors": int(stats["errors"]),
+                "retries": int(stats["retries"]),
+                "new_connections": new_connections,
+                "reused_connections": max(0, total - new_connections),
+                "reuse_rate": (max(0, total - new_connections) / total) if total else 0.0,
+                "avg_latency_ms": (stats["total_ms"] / total) if total else 0.0,
+                "max_latency_ms": stats["max_ms"],
+            }
+        )
+    return out
+
+
+def reset_host_stats() -> None:
+    with _STATS_LOCK:
+        _STATS.clear()
+
+
+def _client_options() -> dict[str, Any]:
+    options: dict[str, Any] = {
+        "http2": bool(settings.http2_enabled) and find_spec("h2") is not None,
+        "limits": httpx.Limits(
+            max_connections=max(1, settings.http_pool_max_connections),
+            max_keepalive_connections=max(0, settings.http_pool_max_keepalive),
+            keepalive_expiry=max(1.0, float(settings.http_keepalive_expiry_sec)),
+        ),
+        "timeout": _timeout(None),
+    }
+    # Prefer explicit proxy from settings; otherwise follow system proxy; optionally force direct.
+    proxy = (settings.outbound_proxy or "").strip()
+    if settings.force_no_proxy:
+        options["trust_env"] = False
+    elif proxy:
+        options["proxy"] = proxy
+    return options
+
+
+def _request_timeout(timeout: float | None) -> httpx.Timeout:
+    # 单次调用的超时不超过当前请求剩余的端到端预算（未开启预算时原样使用）。
+    return _timeout(deadline.clamp_timeout(timeout))
+
+
+def _timeout(timeout: float | None) -> httpx.Timeout:
+    total = float(timeout) if timeout else 30.0
+    return httpx.Timeout(total, connect=min(total, float(settings.http_connect_timeout_sec)))
+
+
+def _backoff(attempt: int) -> None:
+    time.sleep(_backoff_sec(attempt))
+
+
+def _backoff_sec(attempt: int) -> float:
+    return max(0, settings.http_retry_backoff_ms) / 1000.0 * (2**attempt)
+
+
+@contextmanager
+def _bulkhead_slot(name: str | None) -> Iterator[None]:
+    entered = False
+    try:
+        with bulkhead_service.guard(name):
+            entered = True
+            yield
+    except bulkhead_service.BulkheadFullError as exc:
+        if entered:
+            raise
+        raise UpstreamBusyError(exc.name, exc.reason, exc.retry_after_sec) from exc
+
+
+@asynccontextmanager
+async def _abulkhead_slot(name: str | None) -> AsyncIterator[None]:
+    entered = False
+    try:
+        async with bulkhead_service.aguard(name):
+            entered = True
+            yield
+    except bulkhead_service.BulkheadFullError as exc:
+        if entered:
+            raise
+        raise UpstreamBusyError(exc.name, exc.reason, exc.retry_after_sec) from exc
+
+
+def _breaker_enter(breaker: str | None) -> float:
+    if breaker and not circuit_breaker.allow(breaker):
+        raise CircuitOpenError(breaker)
+    return time.perf_counter()
+
+
+def _breaker_exit(
+    breaker: str | None, started: float, healthy: bool, finished: float | None = None, abandoned: bool = False
+) -> None:
+    if not breaker:
+        return
+    if abandoned:
+        circuit_breaker.abandon(breaker)
+        return
+    circuit_breaker.record(breaker, healthy, ((finished or time.perf_counter()) - started) * 1000)
+
+
+def _upstream_healthy(status_code: int | None) -> bool:
+    # 4xx（参数、鉴权等）说明上游本身可用，只有传输错误、429 与 5xx 计入熔断失败。
+    return status_code is not None and status_code < 500 and status_code != 429
+
+
+def _host_of(url: str) -> str:
+    return parse.urlsplit(url).netloc or url
+
+
+class _ConnectionTracer:
+    """httpcore trace 回调：本次请求若触发了 TCP 建连，则说明没有复用已有连接。"""
+
+    def __init__(self) -> None:
+        self.new_connection = False
+
+    def __call__(self, event_name: str, info: dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.started":
+            self.new_connection = True
+
+
+class _AsyncConnectionTracer(_ConnectionTracer):
+    async def __call__(self, event_name: str, info: dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.started":
+            self.new_connection = True
+
+
+def _record(host: str, started: float, tracer: _ConnectionTracer, ok: bool) -> None:
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    with _STATS_LOCK:
+        stats = _STATS.setdefault(host, _empty_stats())
+        stats["requests"] += 1
+        stats["errors"] += 0 if ok else 1
+        stats["new_connections"] += 1 if tracer.new_connection else 0
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+
+def _record_retry(host: str) -> None:
+    with _STATS_LOCK:
+        _STATS.setdefault(host, _empty_stats())["retries"] += 1
+
+
+def _empty_stats() -> dict[str, float]:
+    return {"requests": 0, "errors": 0, "retries": 0, "new_connections": 0, "total_ms": 0.0, "max_ms": 0.0}
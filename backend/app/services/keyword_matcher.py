@@ -0,0 +1,98 @@
+import json
+import logging
+from collections import deque
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+
+from app.core.logging import log_event
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordMatcher:
+    """Aho-Corasick 多模式匹配：一次线性扫描文本，返回命中的全部关键词分组。
+
+    分组名由调用方约定（如 "legal_signal"、"topic:rent"）；关键词按小写匹配。
+    """
+
+    def __init__(self, groups: Mapping[str, Iterable[str]]) -> None:
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[frozenset[str]] = [frozenset()]
+        self.groups: dict[str, tuple[str, ...]] = {}
+        pending: list[set[str]] = [set()]
+        for group, keywords in groups.items():
+            cleaned = tuple(dict.fromkeys(k.strip().lower() for k in keywords if k and k.strip()))
+            self.groups[group] = cleaned
+            for keyword in cleaned:
+                node = 0
+                for ch in keyword:
+                    nxt = self._goto[node].get(ch)
+                    if nxt is None:
+                        nxt = len(self._goto)
+                        self._goto[node][ch] = nxt
+                        self._goto.append({})
+                        self._fail.append(0)
+                        pending.append(set())
+                    node = nxt
+                pending[node].add(group)
+        self._build_fail_links(pending)
+
+    def _build_fail_links(self, pending: list[set[str]]) -> None:
+        # BFS 计算失败指针，并把失败链上的输出合并进当前节点，匹配时无需再沿链回溯。
+        queue: deque[int] = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            pending[node] |= pending[self._fail[node]]
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+        self._out = [frozenset(groups) for groups in pending]
+
+    def match(self, text: str) -> frozenset[str]:
+        """返回 text（按小写）中命中的分组名集合。"""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        hits: set[str] = set()
+        for ch in (text or "").lower():
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                hits |= out[node]
+        return frozenset(hits)
+
+
+def load_groups(path: str | Path) -> dict[str, tuple[str, ...]]:
+    """读取 {"分组名": ["关键词", ...]} 格式的 JSON 词表；文件缺失或格式错误时返回空表。"""
+    if not str(path or "").strip():
+        return {}
+    file_path = Path(path)
+    if not file_path.is_absolute():
+        file_path = Path(__file__).resolve().parents[3] / file_path
+    if not file_path.exists():
+        return {}
+    try:
+        raw = json.loads(file_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        log_event(logger, "warning", "keyword_table_load_failed", path=str(file_path), error=str(exc))
+        return {}
+    if not isinstance(raw, dict):
+        return {}
+    return {
+        str(group): tuple(str(k) for k in keywords if isinstance(k, str))
+        for group, keywords in raw.items()
+        if isinstance(keywords, list)
+    }
+
+
+def compile_groups(groups: Mapping[str, Iterable[str]], extra_path: str | Path = "") -> KeywordMatcher:
+    """把内置词表与数据文件中的同名/新增分组合并后编译成自动机。"""
+    merged: dict[str, list[str]] = {group: list(keywords) for group, keywords in groups.items()}
+    for group, keywords in load_groups(extra_path).items():
+        merged.setdefault(group, []).extend(keywords)
+    return KeywordMatcher(merged)
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import re
 import sqlite3
@@ -7,11 +8,17 @@ from contextlib import closing
 from typing import Any
 from pathlib import Path
 
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http import models as qdrant_models
 from qdrant_client.http.models import Distance, VectorParams
 
 from app.core.config import settings
-from app.services.embedding import embed_text
+from app.services import bulkhead
+from app.services import deadline
+from app.services import http_client
+from app.services import keyword_matcher
+from app.services import segmenter
+from app.services.embedding import embed_text, embed_text_async, embed_texts_async
 from app.services.runtime_config import get_runtime_config
 
 
@@ -20,6 +27,10 @@ _ENSURE_LOCK = threading.Lock()
 _SEARCH_CACHE_MAX = 256
 _SEARCH_CACHE: "OrderedDict[tuple[str, int, str, str, bool, int], list[dict[str, Any]]]" = OrderedDict()
 _SEARCH_CACHE_LOCK = threading.Lock()
+_ASYNC_QDRANT: dict[int, tuple[asyncio.AbstractEventLoop, AsyncQdrantClient]] = {}
+_ASYNC_QDRANT_LOCK = threading.Lock()
+# 剩余预算不足以完成 Embedding + 向量检索时直接走词法检索。
+_VECTOR_SEARCH_MIN_SEC = 2.0
 
 
 def _get_db() -> sqlite3.Connection:
@@ -71,6 +82,20 @@ def _get_qdrant() -> QdrantClient:
         return QdrantClient(url=settings.qdrant_url, timeout=5)
 
 
+def _get_async_qdrant() -> AsyncQdrantClient:
+    # AsyncQdrantClient 内部的 httpx 连接绑定事件循环，按 loop 复用。
+    loop = asyncio.get_running_loop()
+    with _ASYNC_QDRANT_LOCK:
+        for key, (owner, _client) in list(_ASYNC_QDRANT.items()):
+            if owner.is_closed():
+                _ASYNC_QDRANT.pop(key, None)
+        entry = _ASYNC_QDRANT.get(id(loop))
+        if entry is None or entry[0] is not loop:
+            entry = (loop, AsyncQdrantClient(url=settings.qdrant_url, timeout=5))
+            _ASYNC_QDRANT[id(loop)] = entry
+    return entry[1]
+
+
 def ensure_collection() -> None:
     runtime = get_runtime_config()
     targets = {runtime.knowledge_collection}
@@ -104,45 +129,170 @@ def ensure_collection() -> None:
 def search(query: str, top_k: int = 5, use_rerank: bool | None = None) -> list[dict[str, Any]]:
     runtime = get_runtime_config()
     enable_rerank = runtime.enable_rerank if use_rerank is None else use_rerank
-    cache_key = (
-        query.strip(),
-        int(top_k),
-        str(runtime.knowledge_collection),
-        str(runtime.case_collection),
-        bool(enable_rerank),
-        int(runtime.chat_case_top_k or 0),
-    )
+    cache_key = _search_cache_key(query, top_k, enable_rerank)
     cached = _search_cache_get(cache_key)
     if cached is not None:
         return cached
 
     case_top_k = max(0, int(runtime.chat_case_top_k or 0))
     case_fetch_k = max(case_top_k, case_top_k * 3) if case_top_k > 0 else 0
+    if not deadline.allows("vector_search", _VECTOR_SEARCH_MIN_SEC):
+        return _assemble_results(query, top_k, enable_rerank, 0, [], [], lexical_only=True)
 
     try:
         ensure_collection()
         vector = embed_text(query)
         client = _get_qdrant()
         law_fetch_k = max(int(top_k), min(24, int(top_k) * 3))
-        law_results = _search_points(client, vector, law_fetch_k, runtime.knowledge_collection)
-
-        case_results = []
-        if case_top_k > 0:
-            try:
-                case_results = _search_points(client, vector, case_fetch_k, runtime.case_collection)
-            except Exception as e:
-                logging.getLogger(__name__).warning("case search skipped: %s", e)
+        with bulkhead.guard("qdrant"):
+            law_results = _search_points(client, vector, law_fetch_k, runtime.knowledge_collection)
+
+            case_results = []
+            if case_top_k > 0:
+                try:
+                    case_results = _search_points(client, vector, case_fetch_k, runtime.case_collection)
+                except Exception as e:
+                    logging.getLogger(__name__).warning("case search skipped: %s", e)
+    except (http_client.CircuitOpenError, bulkhead.BulkheadFullError):
+        # Embedding 熔断或舱壁已满期间退化为纯词法检索；降级结果不写入检索缓存。
+        return _assemble_results(query, top_k, enable_rerank, 0, [], [], lexical_only=True)
     except Exception as e:
         # Qdrant 不可用或网络错误时返回空，避免 500
         logging.getLogger(__name__).warning("knowledge search: Qdrant unreachable, returning []: %s", e)
         return []
 
+    result = _assemble_results(query, top_k, enable_rerank, case_top_k, law_results, case_results)
+    if result:
+        _search_cache_set(cache_key, result)
+    return result
+
+
+async def search_async(query: str, top_k: int = 5, use_rerank: bool | None = None) -> list[dict[str, Any]]:
+    """search() 的协程版本：Embedding 与 Qdrant 走异步客户端，SQLite 词法检索放到 executor。"""
+    runtime = get_runtime_config()
+    enable_rerank = runtime.enable_rerank if use_rerank is None else use_rerank
+    cache_key = _search_cache_key(query, top_k, enable_rerank)
+    cached = _search_cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    case_top_k = max(0, int(runtime.chat_case_top_k or 0))
+    case_fetch_k = max(case_top_k, case_top_k * 3) if case_top_k > 0 else 0
+    if not deadline.allows("vector_search", _VECTOR_SEARCH_MIN_SEC):
+        return await asyncio.to_thread(_assemble_results, query, top_k, enable_rerank, 0, [], [], True)
+
+    try:
+        await asyncio.to_thread(ensure_collection)
+        vector = await embed_text_async(query)
+        client = _get_async_qdrant()
+        law_fetch_k = max(int(top_k), min(24, int(top_k) * 3))
+        async with bulkhead.aguard("qdrant"):
+            law_task = _search_points_async(client, vector, law_fetch_k, runtime.knowledge_collection)
+            if case_top_k > 0:
+                case_task = _search_points_async(client, vector, case_fetch_k, runtime.case_collection)
+                law_results, case_results = await asyncio.gather(law_task, case_task, return_exceptions=True)
+                if isinstance(case_results, BaseException):
+                    logging.getLogger(__name__).warning("case search skipped: %s", case_results)
+                    case_results = []
+                if isinstance(law_results, BaseException):
+                    raise law_results
+            else:
+                law_results, case_results = await law_task, []
+    except (http_client.CircuitOpenError, bulkhead.BulkheadFullError):
+        return await asyncio.to_thread(_assemble_results, query, top_k, enable_rerank, 0, [], [], True)
+    except Exception as e:
+        logging.getLogger(__name__).warning("knowledge search: Qdrant unreachable, returning []: %s", e)
+        return []
+
+    result = await asyncio.to_thread(
+        _assemble_results, query, top_k, enable_rerank, case_top_k, law_results, case_results
+    )
+    if result:
+        _search_cache_set(cache_key, result)
+    return result
+
+
+async def search_many_async(queries: list[str], top_k: int = 5, use_rerank: bool | None = None) -> list[list[dict[str, Any]]]:
+    """批量检索（批量问答、离线评测用）：相同语句只检索一次，未命中检索缓存的语句一次批量向量化、
+    每个集合一次批量向量检索，结果写入检索缓存，随后同语句的 search_async 直接命中。返回顺序与 queries 一致。
+
+    Embedding 或 Qdrant 不可用时抛出异常而不是返回空列表，调用方据此区分“检索失败”与“没有命中”。"""
+    runtime = get_runtime_config()
+    enable_rerank = runtime.enable_rerank if use_rerank is None else use_rerank
+    results: dict[str, list[dict[str, Any]]] = {}
+    pending: list[str] = []
+    for query in dict.fromkeys(query.strip() for query in queries):
+        cached = _search_cache_get(_search_cache_key(query, top_k, enable_rerank))
+        if cached is not None:
+            results[query] = cached
+        elif query:
+            pending.append(query)
+    if pending:
+        results.update(await _search_uncached_many_async(pending, top_k, enable_rerank))
+    return [results.get(query.strip(), []) for query in queries]
+
+
+async def _search_uncached_many_async(queries: list[str], top_k: int, enable_rerank: bool) -> dict[str, list[dict[str, Any]]]:
+    runtime = get_runtime_config()
+    case_top_k = max(0, int(runtime.chat_case_top_k or 0))
+    case_fetch_k = max(case_top_k, case_top_k * 3) if case_top_k > 0 else 0
+    try:
+        await asyncio.to_thread(ensure_collection)
+        vectors = await embed_texts_async(queries)
+        client = _get_async_qdrant()
+        law_fetch_k = max(int(top_k), min(24, int(top_k) * 3))
+        async with bulkhead.aguard("qdrant"):
+            law_batches = await _search_points_batch_async(client, vectors, law_fetch_k, runtime.knowledge_collection)
+            case_batches: list[list[Any]] = [[] for _ in queries]
+            if case_top_k > 0:
+                try:
+                    case_batches = await _search_points_batch_async(client, vectors, case_fetch_k, runtime.case_collection)
+                except Exception as e:
+                    logging.getLogger(__name__).warning("case search skipped: %s", e)
+    except (http_client.CircuitOpenError, bulkhead.BulkheadFullError):
+        return {
+            query: await asyncio.to_thread(_assemble_results, query, top_k, enable_rerank, 0, [], [], True) for query in queries
+        }
+    except Exception as e:
+        logging.getLogger(__name__).warning("knowledge batch search failed: %s", e)
+        raise
+
+    results: dict[str, list[dict[str, Any]]] = {}
+    for query, law_results, case_results in zip(queries, law_batches, case_batches):
+        result = await asyncio.to_thread(_assemble_results, query, top_k, enable_rerank, case_top_k, law_results, case_results)
+        if result:
+            _search_cache_set(_search_cache_key(query, top_k, enable_rerank), result)
+        results[query] = result
+    return results
+
+
+def _search_cache_key(query: str, top_k: int, enable_rerank: bool) -> tuple[str, int, str, str, bool, int]:
+    runtime = get_runtime_config()
+    return (
+        query.strip(),
+        int(top_k),
+        str(runtime.knowledge_collection),
+        str(runtime.case_collection),
+        bool(enable_rerank),
+        int(runtime.chat_case_top_k or 0),
+    )
+
+
+def _assemble_results(
+    query: str,
+    top_k: int,
+    enable_rerank: bool,
+    case_top_k: int,
+    law_results: list[Any],
+    case_results: list[Any],
+    lexical_only: bool = False,
+) -> list[dict[str, Any]]:
     law_ids = [str(r.id) for r in law_results]
     case_ids = [str(r.id) for r in case_results]
     law_score_map = {str(r.id): r.score for r in law_results}
     case_score_map = {str(r.id): r.score for r in case_results}
 
-    if not law_ids and not case_ids:
+    if not law_ids and not case_ids and not lexical_only:
         return []
 
     law_rows: list[sqlite3.Row] = []
@@ -182,9 +332,7 @@ def search(query: str, top_k: int = 5, use_rerank: bool | None = None) -> list[d
     case_items = _dedupe_case_items(case_items, case_top_k)
 
     # 先法条、后案例，符合“先给依据再举例”的回答顺序。
-    result = law_items + case_items
-    _search_cache_set(cache_key, result)
-    return result
+    return law_items + case_items
 
 
 def _build_law_items(ids: list[str], rows: list[sqlite3.Row], score_map: dict[str, float]) -> list[dict[str, Any]]:
@@ -290,52 +438,92 @@ def _search_points(client: QdrantClient, vector: list[float], top_k: int, collec
     return points or []
 
 
+async def _search_points_async(client: AsyncQdrantClient, vector: list[float], top_k: int, collection_name: str):
+    if hasattr(client, "search"):
+        return await client.search(
+            collection_name=collection_name,
+            query_vector=vector,
+            limit=top_k,
+            with_payload=True,
+        )
+    resp = await client.query_points(
+        collection_name=collection_name,
+        query=vector,
+        limit=top_k,
+        with_payload=True,
+    )
+    return getattr(resp, "points", None) or []
+
+
+async def _search_points_batch_async(
+    client: AsyncQdrantClient, vectors: list[list[float]], top_k: int, collection_name: str
+) -> list[list[Any]]:
+    # 与 _search_points 一样兼容新旧 qdrant-client：旧版 search_batch，新版 query_batch_points，都没有时逐条并发。
+    if hasattr(client, "search_batch"):
+        requests = [qdrant_models.SearchRequest(vector=vector, limit=top_k, with_payload=True) for vector in vectors]
+        return list(await client.search_batch(collection_name=collection_name, requests=requests))
+    query_request = getattr(qdrant_models, "QueryRequest", None)
+    if query_request is not None and hasattr(client, "query_batch_points"):
+        requests = [query_request(query=vector, limit=top_k, with_payload=True) for vector in vectors]
+        responses = await client.query_batch_points(collection_name=collection_name, requests=requests)
+        return [getattr(resp, "points", None) or [] for resp in responses]
+    return list(
+        await asyncio.gather(*(_search_points_async(client, vector, top_k, collection_name) for vector in vectors))
+    )
+
+
 def _extract_query_terms(query: str) -> list[str]:
     terms: list[str] = []
     for t in re.findall(r"[A-Za-z0-9_]{2,}", query.lower()):
         terms.append(t)
-    for t in re.findall(r"[\u4e00-\u9fff]{2,}", query):
-        terms.append(t)
+    # 汉字部分按词典切分成词项（按查询缓存），而不是把整句当作一个 LIKE 词。
+    terms.extend(segmenter.query_terms(query))
     terms.extend(_legal_retrieval_terms(query))
     # keep order, remove duplicates
     return list(dict.fromkeys(terms))
 
 
+_RETRIEVAL_TOPIC_TERMS: tuple[tuple[tuple[str, ...], tuple[str, ...]], ...] = (
+    (
+        ("押金", "房东", "租房", "租客", "退租", "出租人", "承租人"),
+        ("租赁合同", "租赁", "出租人", "承租人", "租金", "合同"),
+    ),
+    (
+        ("工资", "加班", "兼职", "劳动", "老板", "用人单位", "劳动仲裁"),
+        ("劳动争议", "劳动报酬", "工资", "用人单位", "劳动者", "劳动合同", "工作时间"),
+    ),
+    (
+        ("网购", "退款", "退货", "假货", "消费者", "商家", "平台"),
+        ("消费者", "经营者", "退货", "商品", "质量要求", "欺诈"),
+    ),
+    (
+        ("物业", "物业费", "停水", "停电", "业主"),
+        ("物业服务合同", "物业服务", "物业费", "业主"),
+    ),
+    (
+        ("培训", "退费", "格式条款", "合同里写"),
+        ("合同", "格式条款", "民事法律行为", "消费者", "经营者"),
+    ),
+    (
+        ("被骗", "诈骗", "拉黑", "转账", "起诉", "欠钱", "借款"),
+        ("诈骗", "财物", "民事诉讼", "债权", "合同", "侵权"),
+    ),
+    (
+        ("打人", "被打", "伤害", "报警"),
+        ("故意伤害", "治安管理处罚", "人身权利", "侵权责任"),
+    ),
+)
+_RETRIEVAL_TOPIC_MATCHER = keyword_matcher.compile_groups(
+    {f"retrieval:{idx}": triggers for idx, (triggers, _additions) in enumerate(_RETRIEVAL_TOPIC_TERMS)},
+    extra_path=settings.retrieval_keywords_path,
+)
+
+
 def _legal_retrieval_terms(query: str) -> list[str]:
-    normalized = (query or "").lower()
+    hits = _RETRIEVAL_TOPIC_MATCHER.match(query)
     terms: list[str] = []
-    topic_terms: tuple[tuple[tuple[str, ...], tuple[str, ...]], ...] = (
-        (
-            ("押金", "房东", "租房", "租客", "退租", "出租人", "承租人"),
-            ("租赁合同", "租赁", "出租人", "承租人", "租金", "合同"),
-        ),
-        (
-            ("工资", "加班", "兼职", "劳动", "老板", "用人单位", "劳动仲裁"),
-            ("劳动争议", "劳动报酬", "工资", "用人单位", "劳动者", "劳动合同", "工作时间"),
-        ),
-        (
-            ("网购", "退款", "退货", "假货", "消费者", "商家", "平台"),
-            ("消费者", "经营者", "退货", "商品", "质量要求", "欺诈"),
-        ),
-        (
-            ("物业", "物业费", "停水", "停电", "业主"),
-            ("物业服务合同", "物业服务", "物业费", "业主"),
-        ),
-        (
-            ("培训", "退费", "格式条款", "合同里写"),
-            ("合同", "格式条款", "民事法律行为", "消费者", "经营者"),
-        ),
-        (
-            ("被骗", "诈骗", "拉黑", "转账", "起诉", "欠钱", "借款"),
-            ("诈骗", "财物", "民事诉讼", "债权", "合同", "侵权"),
-        ),
-        (
-            ("打人", "被打", "伤害", "报警"),
-            ("故意伤害", "治安管理处罚", "人身权利", "侵权责任"),
-        ),
-    )
-    for triggers, additions in topic_terms:
-        if any(trigger.lower() in normalized for trigger in triggers):
+    for idx, (_triggers, additions) in enumerate(_RETRIEVAL_TOPIC_TERMS):
+        if f"retrieval:{idx}" in hits:
             terms.extend(additions)
     return terms
 
@@ -437,6 +625,25 @@ def get_chunk(chunk_id: str) -> dict[str, Any] | None:
     return None
 
 
+def corpus_version() -> str:
+    """知识库版本标识：集合名 + 法条库文件的修改时间与大小 + ANSWER_CACHE_CORPUS_VERSION。
+
+    重新入库或切换集合后值随之变化，供整条回答缓存区分不同语料下生成的回答。
+    """
+    runtime = get_runtime_config()
+    db_path = Path(settings.knowledge_db_path)
+    if not db_path.is_absolute():
+        db_path = Path(__file__).resolve().parents[3] / db_path
+    try:
+        stat = db_path.stat()
+        db_stamp = f"{stat.st_mtime_ns}:{stat.st_size}"
+    except OSError:
+        db_stamp = "missing"
+    return "|".join(
+        [str(runtime.knowledge_collection), str(runtime.case_collection), db_stamp, settings.answer_cache_corpus_version]
+    )
+
+
 def _search_cache_get(key: tuple[str, int, str, str, bool, int]) -> list[dict[str, Any]] | None:
     with _SEARCH_CACHE_LOCK:
         cached = _SEARCH_CACHE.get(key)
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import closing
+from contextvars import ContextVar
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+from app.core.config import settings
+
+# 低温度（近似确定性）的 LLM 调用结果缓存：内存 LRU + SQLite 持久化，重启后仍可命中。
+# 只缓存 rewrite / 检索扩展 / 回答这类 prompt 高度重复的调用；高温度调用不进缓存。流式 JSON 回答在完整收齐后入缓存，
+# 中途断流的不入缓存。值统一为 chat/completions 响应体 JSON，调用方从 choices[0].message.content 取正文。
+_CACHE: "OrderedDict[str, tuple[str, float, float]]" = OrderedDict()  # key -> (body, latency_ms, created_at)
+_CACHE_LOCK = Lock()
+_LOADED = False
+_STATS = {"hits": 0, "misses": 0, "saved_ms": 0.0}
+_REQUEST_STATS: ContextVar[dict[str, float] | None] = ContextVar("llm_cache_request_stats", default=None)
+_WS_RE = re.compile(r"\s+")
+
+
+def _get_db_path() -> Path:
+    root = Path(__file__).resolve().parents[3]
+    db_path = Path(settings.llm_cache_db_path)
+    if not db_path.is_absolute():
+        db_path = root / db_path
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    return db_path
+
+
+def _get_conn() -> sqlite3.Connection:
+    return sqlite3.connect(_get_db_path())
+
+
+def _ensure_table(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            cache_key TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            body TEXT NOT NULL,
+            latency_ms REAL NOT NULL,
+            created_at REAL NOT NULL
+        )
+        """
+    )
+
+
+def cache_key(payload: dict[str, Any], force: bool = False) -> str | None:
+    """按 (model, 归一化 messages, temperature, max_tokens) 生成键；不可缓存时返回 None。
+
+    force=True 用于调用方明确接受“相同 prompt 复用同一结果”的场景（如庭审选项），忽略温度上限。
+    """
+    if not settings.llm_cache_enabled or payload.get("stream"):
+        return None
+    try:
+        temperature = float(payload.get("temperature", 1.0))
+    except (TypeError, ValueError):
+        return None
+    if not force and temperature > float(settings.llm_cache_max_temperature):
+        return None
+    messages = [
+        {"role": str(msg.get("role") or ""), "content": _WS_RE.sub(" ", str(msg.get("content") or "")).strip()}
+        for msg in payload.get("messages") or []
+    ]
+    raw = json.dumps(
+        [str(payload.get("model") or ""), messages, round(temperature, 3), payload.get("max_tokens")],
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def get(key: str | None) -> str | None:
+    if key is None:
+        return None
+    _ensure_loaded()
+    now = time.time()
+    with _CACHE_LOCK:
+        entry = _CACHE.get(key)
+        if entry is not None and now - entry[2] > _ttl_sec():
+            _CACHE.pop(key, None)
+            entry = None
+        if entry is None:
+            _STATS["misses"] += 1
+        else:
+            _CACHE.move_to_end(key)
+            _STATS["hits"] += 1
+            _STATS["saved_ms"] += entry[1]
+    _record_request(hit=entry is not None, saved_ms=entry[1] if entry else 0.0)
+    return entry[0] if entry else None
+
+
+def put(key: str | None, model: str, body: str, latency_ms: float) -> None:
+    if key is None or not body:
+        return
+    _ensure_loaded()
+    created_at = time.time()
+    with _CACHE_LOCK:
+        _CACHE[key] = (body, float(latency_ms), created_at)
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > _max_entries():
+            _CACHE.popitem(last=False)
+    try:
+        with closing(_get_conn()) as conn:
+            _ensure_table(conn)
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (cache_key, model, body, latency_ms, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, model, body, float(latency_ms), created_at),
+            )
+            conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ? OR cache_key IN "
+                "(SELECT cache_key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (created_at - _ttl_sec(), _max_entries()),
+            )
+            conn.commit()
+    except sqlite3.Error:
+        # 持久化失败只影响重启后的命中率，不影响本次调用。
+        pass
+
+
+def warm() -> int:
+    """从 SQLite 载入未过期条目；返回载入条数。"""
+    global _LOADED
+    rows: list[tuple[str, str, float, float]] = []
+    try:
+        if not _get_db_path().exists():
+            raise FileNotFoundError
+        with closing(_get_conn()) as conn:
+            _ensure_table(conn)
+            rows = conn.execute(
+                "SELECT cache_key, body, latency_ms, created_at FROM llm_cache WHERE created_at >= ? "
+                "ORDER BY created_at DESC LIMIT ?",
+                (time.time() - _ttl_sec(), _max_entries()),
+            ).fetchall()
+    except (sqlite3.Error, FileNotFoundError):
+        rows = []
+    with _CACHE_LOCK:
+        for key, body, latency_ms, created_at in reversed(rows):
+            _CACHE.setdefault(key, (body, float(latency_ms), float(created_at)))
+        _LOADED = True
+    return len(rows)
+
+
+def clear() -> None:
+    global _LOADED
+    with _CACHE_LOCK:
+        _CACHE.clear()
+        _STATS.update({"hits": 0, "misses": 0, "saved_ms": 0.0})
+        _LOADED = True
+    if not _get_db_path().exists():
+        return
+    try:
+        with closing(_get_conn()) as conn:
+            _ensure_table(conn)
+            conn.execute("DELETE FROM llm_cache")
+            conn.commit()
+    except sqlite3.Error:
+        pass
+
+
+def get_stats() -> dict[str, Any]:
+    with _CACHE_LOCK:
+        hits, misses = int(_STATS["hits"]), int(_STATS["misses"])
+        return {
+            "entries": len(_CACHE),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "saved_ms": round(_STATS["saved_ms"], 2),
+        }
+
+
+def begin_request_stats() -> dict[str, float]:
+    """为当前请求（及其派生的 task/线程）开启命中统计，供 chat 指标 meta 使用。"""
+    stats = {"hits": 0, "misses": 0, "saved_ms": 0.0}
+    _REQUEST_STATS.set(stats)
+    return stats
+
+
+def _record_request(hit: bool, saved_ms: float) -> None:
+    stats = _REQUEST_STATS.get()
+    if stats is None:
+        return
+    if hit:
+        stats["hits"] += 1
+        stats["saved_ms"] += saved_ms
+    else:
+        stats["misses"] += 1
+
+
+def _ensure_loaded() -> None:
+    if not _LOADED:
+        warm()
+
+
+def _ttl_sec() -> float:
+    return max(1.0, float(settings.llm_cache_ttl_sec))
+
+
+def _max_entries() -> int:
+    return max(1, int(settings.llm_cache_max_entries))
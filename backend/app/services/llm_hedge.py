@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncGenerator, AsyncIterator, Awaitable, Callable
+from contextvars import ContextVar
+from typing import Any, TypeVar
+
+from app.core.config import settings
+from app.core.logging import log_event
+
+logger = logging.getLogger(__name__)
+
+# 对冲请求：默认模型在“近期延迟的 P 分位”内还没有返回（非流式）或吐出首 token（流式）时，
+# 把同一 prompt 发给快速模型，谁先完成用谁，另一路取消。只对冲默认模型的回答生成调用。
+RESPONSE = "response"
+FIRST_TOKEN = "first_token"
+_SAMPLE_LIMIT = 200
+_SAMPLES: dict[str, deque[float]] = {RESPONSE: deque(maxlen=_SAMPLE_LIMIT), FIRST_TOKEN: deque(maxlen=_SAMPLE_LIMIT)}
+_SAMPLES_LOCK = threading.Lock()
+_REQUEST_STATS: ContextVar[dict[str, Any] | None] = ContextVar("llm_hedge_request_stats", default=None)
+T = TypeVar("T")
+
+
+def begin_request_stats() -> dict[str, Any]:
+    """为当前请求开启对冲统计，供 chat 指标 meta 使用；winner 为最终采用的模型名。"""
+    stats: dict[str, Any] = {"hedged": False, "hedge_won": False, "winner": ""}
+    _REQUEST_STATS.set(stats)
+    return stats
+
+
+def _note(hedged: bool, winner: str, hedge_won: bool = False) -> None:
+    stats = _REQUEST_STATS.get()
+    if stats is None:
+        return
+    stats["hedged"] = stats["hedged"] or hedged
+    stats["hedge_won"] = hedge_won
+    stats["winner"] = winner
+
+
+def record_latency(kind: str, latency_ms: float) -> None:
+    with _SAMPLES_LOCK:
+        _SAMPLES[kind].append(float(latency_ms))
+
+
+def hedge_delay_sec(kind: str) -> float:
+    """样本足够时取近期延迟的 LLM_HEDGE_PERCENTILE 分位，否则用 LLM_HEDGE_DELAY_MS；都不低于 LLM_HEDGE_MIN_DELAY_MS。"""
+    with _SAMPLES_LOCK:
+        samples = sorted(_SAMPLES[kind])
+    delay_ms = float(settings.llm_hedge_delay_ms)
+    if len(samples) >= max(1, settings.llm_hedge_min_samples):
+        percentile = min(1.0, max(0.0, float(settings.llm_hedge_percentile)))
+        delay_ms = samples[min(len(samples) - 1, int(percentile * len(samples)))]
+    return max(float(settings.llm_hedge_min_delay_ms), delay_ms) / 1000
+
+
+def reset() -> None:
+    with _SAMPLES_LOCK:
+        for samples in _SAMPLES.values():
+            samples.clear()
+
+
+async def race(
+    primary: Callable[[], Awaitable[T | None]],
+    hedge: Callable[[], Awaitable[T | None]],
+    primary_model: str,
+    hedge_model: str,
+) -> T | None:
+    """非流式对冲：主请求超过对冲延迟才发出备份请求，先拿到非空结果的一方获胜，另一方取消。"""
+    started = time.perf_counter()
+    primary_task = asyncio.ensure_future(primary())
+    try:
+        done, _pending = await asyncio.wait({primary_task}, timeout=hedge_delay_sec(RESPONSE))
+    except BaseException:
+        primary_task.cancel()
+        raise
+    if done:
+        record_latency(RESPONSE, (time.perf_counter() - started) * 1000)
+        _note(False, primary_model)
+        return primary_task.result()
+
+    log_event(logger, "info", "llm_hedge_fired", kind=RESPONSE, primary=primary_model, hedge=hedge_model)
+    hedge_task = asyncio.ensure_future(hedge())
+    models = {primary_task: primary_model, hedge_task: hedge_model}
+    pending: set[asyncio.Future[T | None]] = {primary_task, hedge_task}
+    result: T | None = None
+    winner = primary_model
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # 同时完成时优先采用主模型结果。
+            for task in sorted(done, key=lambda item: item is not primary_task):
+                if task is primary_task:
+                    record_latency(RESPONSE, (time.perf_counter() - started) * 1000)
+                value = None if task.cancelled() or task.exception() is not None else task.result()
+                if value is not None and result is None:
+                    result, winner = value, models[task]
+            if result is not None:
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+    _note(True, winner, winner != primary_model)
+    return result
+
+
+class HedgedStream:
+    """流式对冲：主模型首 token 超过对冲延迟时并发请求快速模型，先吐出首 token 的一路获胜。
+
+    迭代结束后 winner 为实际输出内容的模型名。
+    """
+
+    def __init__(
+        self,
+        primary: Callable[[], AsyncGenerator[str, None]],
+        hedge: Callable[[], AsyncGenerator[str, None]],
+        primary_model: str,
+        hedge_model: str,
+    ) -> None:
+        self._primary = primary
+        self._hedge = hedge
+        self._primary_model = primary_model
+        self._hedge_model = hedge_model
+        self.winner = primary_model
+        self.hedged = False
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        started = time.perf_counter()
+        primary = self._primary()
+        first = asyncio.ensure_future(_first_chunk(primary))
+        try:
+            done, _pending = await asyncio.wait({first}, timeout=hedge_delay_sec(FIRST_TOKEN))
+        except BaseException:
+            first.cancel()
+            raise
+        streams = {first: (primary, self._primary_model)}
+        if not done:
+            self.hedged = True
+            log_event(logger, "info", "llm_hedge_fired", kind=FIRST_TOKEN, primary=self._primary_model, hedge=self._hedge_model)
+            hedge = self._hedge()
+            streams[asyncio.ensure_future(_first_chunk(hedge))] = (hedge, self._hedge_model)
+
+        winner_stream: AsyncGenerator[str, None] | None = None
+        chunk: str | None = None
+        pending = set(streams)
+        try:
+            while pending and winner_stream is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda item: item is not first):
+                    if task is first:
+                        record_latency(FIRST_TOKEN, (time.perf_counter() - started) * 1000)
+                    value = None if task.cancelled() or task.exception() is not None else task.result()
+                    if value is not None and winner_stream is None:
+                        winner_stream, self.winner = streams[task]
+                        chunk = value
+        finally:
+            for task in pending:
+                task.cancel()
+            # 同时吐出首 token 的落败一方停在 yield 处，需要显式关闭以释放连接。
+            for task, (stream, _model) in streams.items():
+                if stream is not winner_stream and task.done() and not task.cancelled() and task.exception() is None:
+                    await stream.aclose()
+        _note(self.hedged, self.winner, self.winner != self._primary_model)
+        if winner_stream is None or chunk is None:
+            return
+        try:
+            yield chunk
+            async for chunk in winner_stream:
+                yield chunk
+        finally:
+            await winner_stream.aclose()
+
+
+async def _first_chunk(stream: AsyncGenerator[str, None]) -> str | None:
+    # 空流（上游失败）返回 None，交给另一路。
+    async for chunk in stream:
+        return chunk
+    return None
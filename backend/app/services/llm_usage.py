@@ -0,0 +1,92 @@
+import threading
+from contextvars import ContextVar
+from typing import Any
+
+# LLM 调用用量与时延记录：每次真正发往上游的调用（缓存命中不算）记一条 stage/model/token/TTFT/总耗时。
+# 调用处只追加到内存缓冲，不在请求路径上写库；metrics.record_api_call 落库接口指标时顺带把缓冲写进 llm_calls 表，
+# 管理端查询前也会先落一次，后台调用（如会话摘要）最迟在下一次指标写入时入库。
+# cached_tokens 是供应商报告的前缀缓存命中 token 数（usage.prompt_tokens_details.cached_tokens），用来对比命中与未命中的 TTFT。
+STAGES = ("rewrite", "expansion", "answer", "web_answer", "summary", "case", "other")
+_BUFFER_LIMIT = 5000
+_BUFFER: list[dict[str, Any]] = []
+_BUFFER_LOCK = threading.Lock()
+_REQUEST_STATS: ContextVar[dict[str, int] | None] = ContextVar("llm_usage_request_stats", default=None)
+
+
+def begin_request_stats() -> dict[str, int]:
+    """为当前请求开启用量统计，供 chat 指标 meta 使用。"""
+    stats = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+    _REQUEST_STATS.set(stats)
+    return stats
+
+
+def record(
+    stage: str,
+    model: str,
+    prompt_tokens: int | None,
+    completion_tokens: int | None,
+    ttft_ms: float | None,
+    duration_ms: float,
+    stream: bool = False,
+    ok: bool = True,
+    cached_tokens: int | None = None,
+) -> None:
+    row = {
+        "stage": stage if stage in STAGES else "other",
+        "model": model or "",
+        "prompt_tokens": int(prompt_tokens) if prompt_tokens is not None else None,
+        "completion_tokens": int(completion_tokens) if completion_tokens is not None else None,
+        "cached_tokens": int(cached_tokens) if cached_tokens is not None else None,
+        "ttft_ms": float(ttft_ms) if ttft_ms is not None else None,
+        "duration_ms": float(duration_ms),
+        "stream": bool(stream),
+        "ok": bool(ok),
+    }
+    with _BUFFER_LOCK:
+        # 长时间无指标写入时丢弃最旧的记录，避免缓冲无限增长。
+        if len(_BUFFER) >= _BUFFER_LIMIT:
+            del _BUFFER[0]
+        _BUFFER.append(row)
+    stats = _REQUEST_STATS.get()
+    if stats is not None:
+        stats["calls"] += 1
+        stats["prompt_tokens"] += row["prompt_tokens"] or 0
+        stats["completion_tokens"] += row["completion_tokens"] or 0
+        stats["cached_tokens"] += row["cached_tokens"] or 0
+
+
+def parse_usage(usage: Any) -> tuple[int | None, int | None]:
+    """从 OpenAI 兼容响应的 usage 字段取 (prompt_tokens, completion_tokens)，缺失时为 None。"""
+    if not isinstance(usage, dict):
+        return None, None
+    return _int_or_none(usage.get("prompt_tokens")), _int_or_none(usage.get("completion_tokens"))
+
+
+def parse_cached_tokens(usage: Any) -> int | None:
+    """前缀缓存命中的 prompt token 数；供应商未报告时为 None。"""
+    if not isinstance(usage, dict) or not isinstance(usage.get("prompt_tokens_details"), dict):
+        return None
+    return _int_or_none(usage["prompt_tokens_details"].get("cached_tokens"))
+
+
+def drain() -> list[dict[str, Any]]:
+    with _BUFFER_LOCK:
+        rows = list(_BUFFER)
+        _BUFFER.clear()
+    return rows
+
+
+def restore(rows: list[dict[str, Any]]) -> None:
+    """落库失败时放回缓冲，等下一次写入重试。"""
+    if not rows:
+        return
+    with _BUFFER_LOCK:
+        _BUFFER[:0] = rows
+        del _BUFFER[: max(0, len(_BUFFER) - _BUFFER_LIMIT)]
+
+
+def _int_or_none(value: Any) -> int | None:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
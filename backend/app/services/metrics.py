@@ -5,6 +5,7 @@ from pathlib import Path
 from typing import Any
 
 from app.core.config import settings
+from app.services import llm_usage
 
 
 def _get_db_path() -> Path:
@@ -36,6 +37,27 @@ def ensure_metrics_table() -> None:
             )
             """
         )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_calls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                stage TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                cached_tokens INTEGER,
+                ttft_ms REAL,
+                duration_ms REAL NOT NULL,
+                stream INTEGER NOT NULL,
+                ok INTEGER NOT NULL,
+                created_at TEXT NOT NULL DEFAULT (datetime('now'))
+            )
+            """
+        )
+        # 早期建的 llm_calls 表没有 cached_tokens 列，就地补上。
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(llm_calls)")}
+        if "cached_tokens" not in columns:
+            conn.execute("ALTER TABLE llm_calls ADD COLUMN cached_tokens INTEGER")
         conn.commit()
 
 
@@ -64,6 +86,105 @@ def record_api_call(
             ),
         )
         conn.commit()
+    # 接口指标写入本就在线程/同步路径上，顺带把缓冲的 LLM 调用记录落库。
+    flush_llm_calls()
+
+
+def flush_llm_calls() -> int:
+    rows = llm_usage.drain()
+    if not rows:
+        return 0
+    try:
+        ensure_metrics_table()
+        with closing(_get_conn()) as conn:
+            conn.executemany(
+                """
+                INSERT INTO llm_calls (stage, model, prompt_tokens, completion_tokens, cached_tokens, ttft_ms, duration_ms, stream, ok)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        row["stage"],
+                        row["model"],
+                        row["prompt_tokens"],
+                        row["completion_tokens"],
+                        row.get("cached_tokens"),
+                        row["ttft_ms"],
+                        row["duration_ms"],
+                        1 if row["stream"] else 0,
+                        1 if row["ok"] else 0,
+                    )
+                    for row in rows
+                ],
+            )
+            conn.commit()
+    except sqlite3.Error:
+        # 调用记录写失败不影响接口指标本身，放回缓冲下次再写。
+        llm_usage.restore(rows)
+        return 0
+    return len(rows)
+
+
+def get_llm_usage_summary(days: int | None = None) -> dict[str, Any]:
+    """按 (stage, model) 汇总 LLM 调用次数、token 用量与 TTFT/总耗时分位。
+
+    ttft_saved_ms 是前缀缓存未命中与命中调用的平均 TTFT 之差，即缓存省下的 prompt 处理时间；任一侧无样本时为 None。
+    """
+    flush_llm_calls()
+    ensure_metrics_table()
+    where_sql, params = _build_filter(days=days)
+    with closing(_get_conn()) as conn:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(
+            f"""
+            SELECT stage, model, prompt_tokens, completion_tokens, cached_tokens, ttft_ms, duration_ms, stream, ok
+            FROM llm_calls
+            {where_sql}
+            ORDER BY id ASC
+            """,
+            params,
+        ).fetchall()
+
+    groups: dict[tuple[str, str], list[sqlite3.Row]] = {}
+    for row in rows:
+        groups.setdefault((str(row["stage"]), str(row["model"])), []).append(row)
+    items: list[dict[str, Any]] = []
+    for (stage, model), group in sorted(groups.items()):
+        prompt = [int(r["prompt_tokens"]) for r in group if r["prompt_tokens"] is not None]
+        completion = [int(r["completion_tokens"]) for r in group if r["completion_tokens"] is not None]
+        ok_rows = [r for r in group if int(r["ok"]) == 1]
+        cached_ttft = [float(r["ttft_ms"]) for r in ok_rows if r["ttft_ms"] is not None and (r["cached_tokens"] or 0) > 0]
+        uncached_ttft = [float(r["ttft_ms"]) for r in ok_rows if r["ttft_ms"] is not None and not r["cached_tokens"]]
+        items.append(
+            {
+                "stage": stage,
+                "model": model,
+                "calls": len(group),
+                "ok": len(ok_rows),
+                "stream_calls": sum(1 for r in group if int(r["stream"]) == 1),
+                "prompt_tokens": sum(prompt),
+                "completion_tokens": sum(completion),
+                "avg_prompt_tokens": (sum(prompt) / len(prompt)) if prompt else 0.0,
+                "avg_completion_tokens": (sum(completion) / len(completion)) if completion else 0.0,
+                "cached_calls": sum(1 for r in group if (r["cached_tokens"] or 0) > 0),
+                "cached_tokens": sum(int(r["cached_tokens"] or 0) for r in group),
+                "ttft_saved_ms": (
+                    round(sum(uncached_ttft) / len(uncached_ttft) - sum(cached_ttft) / len(cached_ttft), 2)
+                    if cached_ttft and uncached_ttft
+                    else None
+                ),
+                "ttft": _value_stats([float(r["ttft_ms"]) for r in ok_rows if r["ttft_ms"] is not None]),
+                "duration": _value_stats([float(r["duration_ms"]) for r in ok_rows]),
+            }
+        )
+    return {
+        "days": int(days) if days else None,
+        "total_calls": len(rows),
+        "prompt_tokens": sum(item["prompt_tokens"] for item in items),
+        "completion_tokens": sum(item["completion_tokens"] for item in items),
+        "cached_tokens": sum(item["cached_tokens"] for item in items),
+        "items": items,
+    }
 
 
 def get_metrics_summary(endpoint: str | None = None, days: int | None = None) -> dict[str, Any]:
@@ -186,6 +307,14 @@ def get_paper_kpis(days: int | None = None) -> dict[str, Any]:
     citation_hits = [r for r in with_evidence if _meta_int(r, "citations") > 0]
     no_evidence_rows = [r for r in chat_rows if _meta_int(r, "evidence") == 0]
     no_evidence_external_references = [r for r in no_evidence_rows if _is_no_local_evidence_external_reference(r)]
+    no_evidence_faq_hits = [r for r in no_evidence_rows if (r.get("meta") or {}).get("faq_hit")]
+    # 非流式路径在 conclusion 生成后提前合成语音，tts_overlap_ms 即每轮省下的端到端耗时。
+    tts_overlap = [_meta_float(r, "tts_overlap_ms") for r in chat_rows if (r.get("meta") or {}).get("tts_speculative_hit")]
+    hedged = [r for r in chat_rows if (r.get("meta") or {}).get("llm_hedged")]
+    hedge_wins = [r for r in hedged if (r.get("meta") or {}).get("llm_hedge_won")]
+    # 整条回答缓存的命中率只在可缓存（无历史、有本地依据）的请求里计算。
+    cache_eligible = [r for r in chat_rows if (r.get("meta") or {}).get("answer_cache_eligible")]
+    cache_hits = [r for r in cache_eligible if (r.get("meta") or {}).get("answer_cache_hit")]
 
     return {
         "days": int(days) if days else None,
@@ -197,13 +326,24 @@ def get_paper_kpis(days: int | None = None) -> dict[str, Any]:
             len(no_evidence_external_references),
             len(no_evidence_rows),
         ),
+        "no_local_evidence_faq_hit_rate": _ratio(len(no_evidence_faq_hits), len(no_evidence_rows)),
         "chat_latency": _latency_stats(chat_rows),
+        "chat_by_model_variant": _model_variant_stats(chat_rows),
+        "chat_tts_speculative_hits": len(tts_overlap),
+        "chat_tts_overlap_saved_ms_avg": (sum(tts_overlap) / len(tts_overlap)) if tts_overlap else 0.0,
+        "chat_llm_hedge_rate": _ratio(len(hedged), len(chat_rows)),
+        "chat_llm_hedge_win_rate": _ratio(len(hedge_wins), len(hedged)),
+        "chat_answer_cache_eligible": len(cache_eligible),
+        "chat_answer_cache_hit_rate": _ratio(len(cache_hits), len(cache_eligible)),
         "case_step_latency": _latency_stats(case_step_rows),
     }
 
 
 def _latency_stats(rows: list[dict[str, Any]]) -> dict[str, Any]:
-    values = [float(r["latency_ms"]) for r in rows]
+    return _value_stats([float(r["latency_ms"]) for r in rows])
+
+
+def _value_stats(values: list[float]) -> dict[str, Any]:
     if not values:
         return {"sample_size": 0, "p50_ms": 0.0, "p90_ms": 0.0, "avg_ms": 0.0}
     return {
@@ -214,6 +354,24 @@ def _latency_stats(rows: list[dict[str, Any]]) -> dict[str, Any]:
     }
 
 
+def _model_variant_stats(chat_rows: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """按实际使用的模型档位分组统计时延与引用命中率，用于验证自动路由策略。"""
+    groups: dict[str, list[dict[str, Any]]] = {}
+    for row in chat_rows:
+        variant = str((row.get("meta") or {}).get("model_variant") or "default")
+        groups.setdefault(variant, []).append(row)
+    stats: dict[str, dict[str, Any]] = {}
+    for variant, rows in sorted(groups.items()):
+        with_evidence = [r for r in rows if _meta_int(r, "evidence") > 0]
+        stats[variant] = {
+            "requests": len(rows),
+            "routed": sum(1 for r in rows if (r.get("meta") or {}).get("model_routed")),
+            "citation_hit_rate": _ratio(sum(1 for r in with_evidence if _meta_int(r, "citations") > 0), len(with_evidence)),
+            "latency": _latency_stats(rows),
+        }
+    return stats
+
+
 def _percentile(values: list[float], p: float) -> float:
     if not values:
         return 0.0
@@ -240,6 +398,15 @@ def _meta_int(row: dict[str, Any], key: str) -> int:
         return 0
 
 
+def _meta_float(row: dict[str, Any], key: str) -> float:
+    meta = row.get("meta") or {}
+    value = meta.get(key) if isinstance(meta, dict) else None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
 def _is_no_local_evidence_external_reference(row: dict[str, Any]) -> bool:
     meta = row.get("meta") or {}
     if not isinstance(meta, dict):
@@ -0,0 +1,61 @@
+from dataclasses import dataclass
+from typing import Any
+
+from app.core.config import settings
+from app.schemas.runtime_config import RuntimeConfig
+from app.services.chat import QueryAnalysis
+
+# 快/默认模型自动路由：客户端传 model_variant="auto"（默认值）时，按问题复杂度在检索完成后选定模型档位。
+# 特征都来自请求里已有的数据，不额外调用模型：问题长度、命中的法律主题数、历史轮数、检索得分区分度（第 1 与第 2 名之差）。
+# 全部落在 RuntimeConfig 的阈值内才走快速模型，否则走默认模型；reason 记录决定性的那条特征，便于按指标回看策略。
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    variant: str  # default / fast
+    routed: bool  # True 表示由路由器决定，False 表示沿用客户端显式指定或路由不可用
+    reason: str
+    features: dict[str, Any]
+
+
+def route(
+    requested: str,
+    analysis: QueryAnalysis,
+    history: list[dict[str, str]],
+    evidence: list[dict[str, Any]],
+    runtime: RuntimeConfig,
+) -> RouteDecision:
+    features = extract_features(analysis, history, evidence)
+    if requested in {"default", "fast"}:
+        return RouteDecision(requested, False, "client", features)
+    if not runtime.model_routing_enabled:
+        return RouteDecision("default", False, "routing_disabled", features)
+    fast_model = settings.resolved_fast_llm_model()
+    if not fast_model or fast_model == settings.resolved_llm_model():
+        return RouteDecision("default", False, "no_fast_model", features)
+
+    if features["chars"] > runtime.route_fast_max_chars:
+        return RouteDecision("default", True, "long_query", features)
+    if features["topics"] > runtime.route_fast_max_topics:
+        return RouteDecision("default", True, "multi_topic", features)
+    if features["history_turns"] > runtime.route_fast_max_history_turns:
+        return RouteDecision("default", True, "deep_history", features)
+    gap = features["score_gap"]
+    if gap is not None and gap < runtime.route_fast_min_score_gap:
+        return RouteDecision("default", True, "ambiguous_evidence", features)
+    return RouteDecision("fast", True, "simple", features)
+
+
+def extract_features(
+    analysis: QueryAnalysis,
+    history: list[dict[str, str]],
+    evidence: list[dict[str, Any]],
+) -> dict[str, Any]:
+    scores = sorted((float(item["score"]) for item in evidence if isinstance(item.get("score"), (int, float))), reverse=True)
+    return {
+        "chars": len(analysis.normalized),
+        "topics": len(analysis.tags),
+        "history_turns": sum(1 for message in history if message.get("role") == "user"),
+        # 少于两条带分数的依据时无从比较，视为区分度足够。
+        "score_gap": round(scores[0] - scores[1], 4) if len(scores) >= 2 else None,
+    }
@@ -0,0 +1,262 @@
+import re
+import threading
+from collections.abc import Iterable
+from functools import lru_cache
+from pathlib import Path
+
+from app.core.config import settings
+
+# 基于词典的中文切分：正向/逆向最大匹配取更优结果，给词法检索与关键词重排提供词项。
+# 词典 = 内置常用法律词 + scripts/build_legal_vocab.py 从 chunks 挖掘出的词表（法律名、章节名、高频 n-gram）。
+_CJK_RUN_RE = re.compile(r"[一-鿿]+")
+# 未登录片段按常见虚词/代词断开，剩余的短片段多为名词性成分（人名、物品、时间等）。
+_OOV_SPLIT_RE = re.compile(r"[的了和与及或我你他她它把被在是有还也就都而等吗呢吧啊]+")
+_MAX_OOV_TERM_LEN = 4
+_BUILTIN_TERMS = (
+    "房东",
+    "租客",
+    "租房",
+    "押金",
+    "房租",
+    "退租",
+    "不退",
+    "租赁",
+    "租赁合同",
+    "出租人",
+    "承租人",
+    "合同",
+    "劳动合同",
+    "劳动",
+    "劳动者",
+    "用人单位",
+    "工资",
+    "加班",
+    "加班费",
+    "拖欠",
+    "辞退",
+    "兼职",
+    "社保",
+    "工伤",
+    "劳动仲裁",
+    "劳动报酬",
+    "网购",
+    "退款",
+    "退货",
+    "假货",
+    "商家",
+    "平台",
+    "消费者",
+    "经营者",
+    "物业",
+    "物业费",
+    "业主",
+    "培训",
+    "退费",
+    "格式条款",
+    "诈骗",
+    "被骗",
+    "转账",
+    "拉黑",
+    "借款",
+    "欠款",
+    "欠钱",
+    "借条",
+    "欠条",
+    "利息",
+    "离婚",
+    "抚养",
+    "彩礼",
+    "继承",
+    "交通事故",
+    "赔偿",
+    "侵权",
+    "侵权责任",
+    "起诉",
+    "仲裁",
+    "报警",
+    "证据",
+    "聊天记录",
+    "转账记录",
+    "违约",
+    "违约金",
+    "定金",
+    "解除合同",
+)
+# 问句中的功能性片段：参与切分（避免与实词粘连），但不作为检索词项输出。
+_STOP_TERMS = frozenset(
+    (
+        "怎么办",
+        "怎么",
+        "怎样",
+        "怎么样",
+        "如何",
+        "应该",
+        "可以",
+        "可以吗",
+        "是否",
+        "什么",
+        "为什么",
+        "请问",
+        "一下",
+        "还是",
+        "已经",
+        "现在",
+        "这个",
+        "那个",
+        "这种",
+        "那种",
+        "情况",
+        "需要",
+        "能不能",
+        "我们",
+        "他们",
+        "对方",
+        "处理",
+        "迟迟",
+        "没有",
+        "不是",
+        "的话",
+        "了吗",
+    )
+)
+
+
+class Segmenter:
+    """词典 trie 上的双向最大匹配切分器。"""
+
+    def __init__(self, words: Iterable[str]) -> None:
+        self._trie: dict[str, dict] = {}
+        self._max_len = 1
+        self.size = 0
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str) -> None:
+        word = (word or "").strip()
+        if len(word) < 2:
+            return
+        node = self._trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        if "" not in node:
+            node[""] = {}
+            self.size += 1
+        self._max_len = max(self._max_len, len(word))
+
+    def _longest_from(self, text: str, start: int) -> int:
+        node = self._trie
+        best = 1
+        for idx in range(start, min(len(text), start + self._max_len)):
+            node = node.get(text[idx])
+            if node is None:
+                break
+            if "" in node:
+                best = idx - start + 1
+        return best
+
+    def _is_word(self, word: str) -> bool:
+        node = self._trie
+        for ch in word:
+            node = node.get(ch)
+            if node is None:
+                return False
+        return "" in node
+
+    def _forward(self, text: str) -> list[str]:
+        out: list[str] = []
+        pos = 0
+        while pos < len(text):
+            size = self._longest_from(text, pos)
+            out.append(text[pos : pos + size])
+            pos += size
+        return out
+
+    def _backward(self, text: str) -> list[str]:
+        out: list[str] = []
+        end = len(text)
+        while end > 0:
+            size = 1
+            for length in range(min(self._max_len, end), 1, -1):
+                if self._is_word(text[end - length : end]):
+                    size = length
+                    break
+            out.append(text[end - size : end])
+            end -= size
+        out.reverse()
+        return out
+
+    def segment(self, text: str) -> list[str]:
+        """切分一段连续汉字：段数少者优先，其次单字少者，再次取逆向结果（中文里逆向歧义更少）。"""
+        forward = self._forward(text)
+        backward = self._backward(text)
+
+        def cost(parts: list[str]) -> tuple[int, int]:
+            return len(parts), sum(1 for part in parts if len(part) == 1)
+
+        return forward if cost(forward) < cost(backward) else backward
+
+    def terms(self, text: str) -> list[str]:
+        """抽取检索词项：词典词（去除功能词）+ 连续未登录单字拼成的短词。"""
+        out: list[str] = []
+        for run in _CJK_RUN_RE.findall(text or ""):
+            pending = ""
+            for part in self.segment(run):
+                if len(part) == 1:
+                    pending += part
+                    continue
+                out.extend(_oov_terms(pending))
+                pending = ""
+                if part not in _STOP_TERMS:
+                    out.append(part)
+            out.extend(_oov_terms(pending))
+        return list(dict.fromkeys(out))
+
+
+def _oov_terms(pending: str) -> list[str]:
+    # 词典外的连续单字（如人名、地名、口语词）长度适中时整体保留，过长的多半是未切开的句子片段。
+    return [piece for piece in _OOV_SPLIT_RE.split(pending) if 2 <= len(piece) <= _MAX_OOV_TERM_LEN]
+
+
+_SEGMENTER: Segmenter | None = None
+_SEGMENTER_LOCK = threading.Lock()
+
+
+def get_segmenter() -> Segmenter:
+    global _SEGMENTER
+    if _SEGMENTER is not None:
+        return _SEGMENTER
+    with _SEGMENTER_LOCK:
+        if _SEGMENTER is None:
+            _SEGMENTER = Segmenter((*_BUILTIN_TERMS, *_STOP_TERMS, *load_vocabulary(settings.legal_vocab_path)))
+    return _SEGMENTER
+
+
+def reset_segmenter() -> None:
+    """词表文件更新后调用，下次切分时重新加载。"""
+    global _SEGMENTER
+    with _SEGMENTER_LOCK:
+        _SEGMENTER = None
+    query_terms.cache_clear()
+
+
+@lru_cache(maxsize=2048)
+def query_terms(text: str) -> tuple[str, ...]:
+    """按查询缓存的切分结果；同一查询在词法检索与重排阶段共用。"""
+    return tuple(get_segmenter().terms(text))
+
+
+def load_vocabulary(path: str | Path) -> list[str]:
+    """读取每行一个词的词表文件（# 开头为注释；词后可跟制表符分隔的词频）。"""
+    if not str(path or "").strip():
+        return []
+    file_path = Path(path)
+    if not file_path.is_absolute():
+        file_path = Path(__file__).resolve().parents[3] / file_path
+    if not file_path.exists():
+        return []
+    words: list[str] = []
+    for line in file_path.read_text(encoding="utf-8").splitlines():
+        word = line.split("\t", 1)[0].strip()
+        if word and not word.startswith("#"):
+            words.append(word)
+    return words
@@ -1,11 +1,18 @@
+import asyncio
 import json
 import sqlite3
+from collections.abc import Callable
 from contextlib import closing
 from pathlib import Path
+from threading import Lock
 from typing import Any
 
 from app.core.config import settings
 
+# 旧表的补列/删列迁移在每个库文件上只做一次；之后每次访问只剩一条 CREATE TABLE IF NOT EXISTS。
+_MIGRATED: set[tuple[str, str]] = set()  # (库文件路径, 表名)
+_MIGRATE_LOCK = Lock()
+
 
 def _get_db_path() -> Path:
     root = Path(__file__).resolve().parents[3]
@@ -42,11 +49,57 @@ def ensure_chat_sessions_table() -> None:
             CREATE TABLE IF NOT EXISTS chat_sessions (
                 session_id TEXT PRIMARY KEY,
                 history_json TEXT NOT NULL,
+                turns INTEGER NOT NULL DEFAULT 0,
                 updated_at TEXT NOT NULL DEFAULT (datetime('now'))
             )
             """
         )
         conn.commit()
+        _migrate_once(conn, "chat_sessions", _migrate_chat_sessions)
+
+
+def ensure_chat_summaries_table() -> None:
+    with closing(_get_conn()) as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chat_summaries (
+                session_id TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                turns INTEGER NOT NULL DEFAULT 0,
+                last_turn INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+            )
+            """
+        )
+        conn.commit()
+        _migrate_once(conn, "chat_summaries", _migrate_chat_summaries)
+
+
+def _migrate_once(conn: sqlite3.Connection, table: str, migrate: Callable[[sqlite3.Connection, set[str]], None]) -> None:
+    key = (str(_get_db_path()), table)
+    if key in _MIGRATED:
+        return
+    with _MIGRATE_LOCK:
+        if key in _MIGRATED:
+            return
+        migrate(conn, {str(row[1]) for row in conn.execute(f"PRAGMA table_info({table})")})
+        conn.commit()
+        _MIGRATED.add(key)
+
+
+def _migrate_chat_sessions(conn: sqlite3.Connection, columns: set[str]) -> None:
+    # turns 是会话累计轮数（只增不减，不受 history 截断影响），滚动摘要据此判断折叠到了哪一轮；旧表就地补列。
+    if "turns" not in columns:
+        conn.execute("ALTER TABLE chat_sessions ADD COLUMN turns INTEGER NOT NULL DEFAULT 0")
+
+
+def _migrate_chat_summaries(conn: sqlite3.Connection, columns: set[str]) -> None:
+    # 早期按 last_user 文本定位折叠位置，重复的短回复（如“好的”）会定位错；改用轮次号 last_turn 后删掉该列。
+    # 旧记录的 last_turn 为 0，视为尚未折叠任何一轮，历史原文全部保留，不会丢上下文。
+    if "last_turn" not in columns:
+        conn.execute("ALTER TABLE chat_summaries ADD COLUMN last_turn INTEGER NOT NULL DEFAULT 0")
+    if "last_user" in columns:
+        conn.execute("ALTER TABLE chat_summaries DROP COLUMN last_user")
 
 
 def get_session(session_id: str) -> dict[str, Any] | None:
@@ -109,7 +162,8 @@ def get_chat_history(session_id: str) -> list[dict[str, str]]:
     return history if isinstance(history, list) else []
 
 
-def save_chat_history(session_id: str, history: list[dict[str, str]]) -> None:
+def save_chat_history(session_id: str, history: list[dict[str, str]]) -> int:
+    """保存追加了一轮问答的历史，返回这一轮的轮次号（会话累计轮数）。"""
     # 只保留最近 3 轮(6条)记录，防止上下文爆炸
     history = history[-6:]
     ensure_chat_sessions_table()
@@ -117,13 +171,90 @@ def save_chat_history(session_id: str, history: list[dict[str, str]]) -> None:
     with closing(_get_conn()) as conn:
         conn.execute(
             """
-            INSERT INTO chat_sessions (session_id, history_json, updated_at)
-            VALUES (?, ?, datetime('now'))
+            INSERT INTO chat_sessions (session_id, history_json, turns, updated_at)
+            VALUES (?, ?, 1, datetime('now'))
             ON CONFLICT(session_id)
             DO UPDATE SET
                 history_json = excluded.history_json,
+                turns = chat_sessions.turns + 1,
                 updated_at = datetime('now')
             """,
             (session_id, payload),
         )
+        (turns,) = conn.execute("SELECT turns FROM chat_sessions WHERE session_id = ?", (session_id,)).fetchone()
+        conn.commit()
+    return int(turns)
+
+
+def delete_chat_history(session_id: str) -> None:
+    ensure_chat_sessions_table()
+    ensure_chat_summaries_table()
+    with closing(_get_conn()) as conn:
+        conn.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+        conn.execute("DELETE FROM chat_summaries WHERE session_id = ?", (session_id,))
         conn.commit()
+
+
+def get_chat_summary(session_id: str) -> dict[str, Any] | None:
+    """滚动摘要：summary 为摘要正文，last_turn 为最近折叠进摘要的轮次号，turns 为已折叠的轮数，
+    session_turns 为会话当前累计轮数（见 chat_sessions.turns）。"""
+    ensure_chat_sessions_table()
+    ensure_chat_summaries_table()
+    with closing(_get_conn()) as conn:
+        conn.row_factory = sqlite3.Row
+        row = conn.execute(
+            """
+            SELECT s.summary, s.turns, s.last_turn, COALESCE(c.turns, 0) AS session_turns
+            FROM chat_summaries s LEFT JOIN chat_sessions c ON c.session_id = s.session_id
+            WHERE s.session_id = ?
+            """,
+            (session_id,),
+        ).fetchone()
+    if not row:
+        return None
+    return {
+        "summary": str(row["summary"]),
+        "turns": int(row["turns"]),
+        "last_turn": int(row["last_turn"]),
+        "session_turns": int(row["session_turns"]),
+    }
+
+
+def save_chat_summary(session_id: str, summary: str, turns: int, last_turn: int) -> None:
+    ensure_chat_summaries_table()
+    with closing(_get_conn()) as conn:
+        conn.execute(
+            """
+            INSERT INTO chat_summaries (session_id, summary, turns, last_turn, updated_at)
+            VALUES (?, ?, ?, ?, datetime('now'))
+            ON CONFLICT(session_id)
+            DO UPDATE SET
+                summary = excluded.summary,
+                turns = excluded.turns,
+                last_turn = excluded.last_turn,
+                updated_at = datetime('now')
+            """,
+            (session_id, summary, int(turns), int(last_turn)),
+        )
+        conn.commit()
+
+
+async def get_chat_history_async(session_id: str) -> list[dict[str, str]]:
+    # SQLite 调用很短，放到默认 executor，避免阻塞事件循环，也不占用 Starlette 线程池。
+    return await asyncio.to_thread(get_chat_history, session_id)
+
+
+async def save_chat_history_async(session_id: str, history: list[dict[str, str]]) -> int:
+    return await asyncio.to_thread(save_chat_history, session_id, history)
+
+
+async def delete_chat_history_async(session_id: str) -> None:
+    await asyncio.to_thread(delete_chat_history, session_id)
+
+
+async def get_chat_summary_async(session_id: str) -> dict[str, Any] | None:
+    return await asyncio.to_thread(get_chat_summary, session_id)
+
+
+async def save_chat_summary_async(session_id: str, summary: str, turns: int, last_turn: int) -> None:
+    await asyncio.to_thread(save_chat_summary, session_id, summary, turns, last_turn)
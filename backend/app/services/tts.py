@@ -5,47 +5,28 @@ import json
 import math
 from pathlib import Path
 import struct
+import time
 import uuid
-from urllib import error, request
 from threading import Lock
+from typing import Any
 
 import websockets
 
 from app.core.config import settings
+from app.services import bulkhead, circuit_breaker, deadline, http_client
 from app.services.runtime_config import get_runtime_config
 
-_NO_PROXY_OPENER = request.build_opener(request.ProxyHandler({}))
 _TTS_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tts")
 _TTS_JOB_LOCK = Lock()
 _TTS_JOBS: dict[str, object] = {}
 
 
-def _get_opener():
-    # Prefer explicit proxy from settings; otherwise follow system proxy; optionally force direct.
-    if settings.force_no_proxy:
-        return _NO_PROXY_OPENER
-    proxy = (settings.outbound_proxy or "").strip()
-    if proxy:
-        return request.build_opener(request.ProxyHandler({"http": proxy, "https": proxy}))
-    return request.build_opener()
-
-
 def synthesize(text: str, emotion: str = "calm") -> str | None:
     content = (text or "").strip()
     if not content or not settings.tts_enabled:
         return None
 
-    provider = settings.tts_provider.strip().lower()
-    # If provider is still mock but real OpenSpeech creds are configured, prefer real TTS.
-    if provider == "mock":
-        has_openspeech_creds = bool(
-            (settings.tts_app_id.strip() or settings.asr_app_id.strip())
-            and (settings.tts_access_token.strip() or settings.asr_access_token.strip())
-            and settings.tts_voice.strip()
-        )
-        if has_openspeech_creds:
-            provider = "openspeech_tts_http"
-
+    provider = _resolve_provider()
     result: str | None = None
     if provider == "mock":
         return _mock_audio_data_url(content)
@@ -64,6 +45,52 @@ def synthesize(text: str, emotion: str = "calm") -> str | None:
     return None
 
 
+async def synthesize_async(text: str, emotion: str = "calm") -> str | None:
+    """synthesize() 的协程版本：HTTP/WebSocket 调用都在事件循环上完成。"""
+    content = (text or "").strip()
+    if not content or not settings.tts_enabled:
+        return None
+
+    provider = _resolve_provider()
+    result: str | None = None
+    if provider == "mock":
+        return await asyncio.to_thread(_mock_audio_data_url, content)
+    if provider in {"openspeech_tts", "doubao_tts_ws", "doubao_openspeech_tts"}:
+        try:
+            result = await _openspeech_tts_ws_with_breaker(content)
+        except Exception:
+            result = None
+    elif provider in {"openspeech_tts_http", "doubao_tts_http"}:
+        result = await _openspeech_tts_http_data_url_async(content)
+    elif provider in {"ark", "doubao"}:
+        result = await _ark_audio_data_url_async(content, emotion=emotion)
+
+    if result:
+        return result
+
+    if settings.env.strip().lower() == "dev":
+        return await asyncio.to_thread(_mock_audio_data_url, content)
+    return None
+
+
+async def public_audio_url_async(audio_url: str | None) -> str | None:
+    return await asyncio.to_thread(public_audio_url, audio_url)
+
+
+def _resolve_provider() -> str:
+    provider = settings.tts_provider.strip().lower()
+    # If provider is still mock but real OpenSpeech creds are configured, prefer real TTS.
+    if provider == "mock":
+        has_openspeech_creds = bool(
+            (settings.tts_app_id.strip() or settings.asr_app_id.strip())
+            and (settings.tts_access_token.strip() or settings.asr_access_token.strip())
+            and settings.tts_voice.strip()
+        )
+        if has_openspeech_creds:
+            provider = "openspeech_tts_http"
+    return provider
+
+
 def synthesize_soft_timeout(text: str, emotion: str = "calm", timeout_ms: int | None = None) -> str | None:
     content = (text or "").strip()
     if not content or not settings.tts_enabled:
@@ -179,6 +206,34 @@ def _persist_data_audio_url(audio_url: str) -> str | None:
 
 
 def _ark_audio_data_url(text: str, emotion: str) -> str | None:
+    prepared = _ark_speech_request(text, emotion)
+    if prepared is None:
+        return None
+    url, payload, headers = prepared
+    try:
+        resp = http_client.request(
+            "POST", url, json=payload, headers=headers, timeout=get_runtime_config().timeout_sec, breaker="tts"
+        )
+    except http_client.UpstreamError:
+        return None
+    return _decode_ark_audio(resp.content, resp.headers.get("Content-Type", ""))
+
+
+async def _ark_audio_data_url_async(text: str, emotion: str) -> str | None:
+    prepared = _ark_speech_request(text, emotion)
+    if prepared is None:
+        return None
+    url, payload, headers = prepared
+    try:
+        resp = await http_client.arequest(
+            "POST", url, json=payload, headers=headers, timeout=get_runtime_config().timeout_sec, breaker="tts"
+        )
+    except http_client.UpstreamError:
+        return None
+    return _decode_ark_audio(resp.content, resp.headers.get("Content-Type", ""))
+
+
+def _ark_speech_request(text: str, emotion: str) -> tuple[str, dict[str, Any], dict[str, str]] | None:
     api_key = settings.resolved_tts_api_key()
     model = settings.resolved_tts_model()
     if not api_key or not model:
@@ -190,23 +245,14 @@ def _ark_audio_data_url(text: str, emotion: str) -> str | None:
         "emotion": emotion,
         "format": "wav",
     }
-    req_obj = request.Request(
-        url=f"{settings.resolved_tts_base_url()}/audio/speech",
-        data=json.dumps(payload).encode("utf-8"),
-        headers={
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        },
-        method="POST",
-    )
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+    return f"{settings.resolved_tts_base_url()}/audio/speech", payload, headers
 
-    try:
-        with _get_opener().open(req_obj, timeout=get_runtime_config().timeout_sec) as resp:
-            body = resp.read()
-            content_type = resp.headers.get("Content-Type", "")
-    except (error.HTTPError, error.URLError, TimeoutError, OSError):
-        return None
 
+def _decode_ark_audio(body: bytes, content_type: str) -> str | None:
     if not body:
         return None
 
@@ -227,12 +273,60 @@ def _ark_audio_data_url(text: str, emotion: str) -> str | None:
 
 def _openspeech_tts_data_url(text: str) -> str | None:
     try:
-        return asyncio.run(_openspeech_tts_data_url_async(text))
+        return asyncio.run(_openspeech_tts_ws_with_breaker(text))
     except Exception:
         return None
 
 
+async def _openspeech_tts_ws_with_breaker(text: str) -> str | None:
+    """WebSocket 合成不经过 http_client，这里单独接入 tts 舱壁与熔断器；熔断打开时直接返回 None 走兜底。"""
+    async with bulkhead.aguard("tts"):
+        if not circuit_breaker.allow("tts"):
+            return None
+        started = time.perf_counter()
+        ok = False
+        try:
+            # WebSocket 也不经过 http_client 的超时收缩，按请求剩余预算整体限时。
+            budget = deadline.clamp_timeout(None)
+            if budget is None:
+                result = await _openspeech_tts_data_url_async(text)
+            else:
+                result = await asyncio.wait_for(_openspeech_tts_data_url_async(text), timeout=budget)
+            ok = True
+            return result
+        finally:
+            circuit_breaker.record("tts", ok, (time.perf_counter() - started) * 1000)
+
+
 def _openspeech_tts_http_data_url(text: str) -> str | None:
+    prepared = _openspeech_http_request(text)
+    if prepared is None:
+        return None
+    url, content, headers, fmt = prepared
+    try:
+        resp = http_client.request(
+            "POST", url, content=content, headers=headers, timeout=get_runtime_config().timeout_sec, breaker="tts"
+        )
+    except http_client.UpstreamError:
+        return None
+    return _decode_openspeech_http_audio(resp.content, resp.headers.get("Content-Type", ""), fmt)
+
+
+async def _openspeech_tts_http_data_url_async(text: str) -> str | None:
+    prepared = _openspeech_http_request(text)
+    if prepared is None:
+        return None
+    url, content, headers, fmt = prepared
+    try:
+        resp = await http_client.arequest(
+            "POST", url, content=content, headers=headers, timeout=get_runtime_config().timeout_sec, breaker="tts"
+        )
+    except http_client.UpstreamError:
+        return None
+    return _decode_openspeech_http_audio(resp.content, resp.headers.get("Content-Type", ""), fmt)
+
+
+def _openspeech_http_request(text: str) -> tuple[str, bytes, dict[str, str], str] | None:
     app_id = settings.tts_app_id.strip() or settings.asr_app_id.strip()
     access_token = settings.tts_access_token.strip() or settings.asr_access_token.strip()
     resource_id = settings.tts_resource_id.strip() or "seed-tts-1.0"
@@ -249,33 +343,26 @@ def _openspeech_tts_http_data_url(text: str) -> str | None:
             "audio_params": {"format": fmt, "sample_rate": sample_rate},
         },
     }
-    req_obj = request.Request(
-        url=settings.tts_http_url.strip() or "https://openspeech.bytedance.com/api/v3/tts/unidirectional",
-        data=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
-        headers=_openspeech_auth_headers(
-            app_id=app_id,
-            access_token=access_token,
-            resource_id=resource_id,
-            request_id=f"tts_{uuid.uuid4()}",
-            content_type="application/json",
-        ),
-        method="POST",
+    url = settings.tts_http_url.strip() or "https://openspeech.bytedance.com/api/v3/tts/unidirectional"
+    headers = _openspeech_auth_headers(
+        app_id=app_id,
+        access_token=access_token,
+        resource_id=resource_id,
+        request_id=f"tts_{uuid.uuid4()}",
+        content_type="application/json",
     )
-    try:
-        with _get_opener().open(req_obj, timeout=get_runtime_config().timeout_sec) as resp:
-            body = resp.read()
-            content_type = (resp.headers.get("Content-Type", "") or "").lower()
-    except (error.HTTPError, error.URLError, TimeoutError, OSError):
-        return None
+    return url, json.dumps(payload, ensure_ascii=False).encode("utf-8"), headers, fmt
+
+
+def _decode_openspeech_http_audio(body: bytes, content_type: str, fmt: str) -> str | None:
     if not body:
         return None
+    mime = "audio/wav" if fmt == "wav" else ("audio/mpeg" if fmt == "mp3" else "audio/ogg")
     # HTTP unidirectional may return direct audio bytes.
-    if "audio/" in content_type or body[:4] == b"RIFF":
-        mime = "audio/wav" if fmt == "wav" else ("audio/mpeg" if fmt == "mp3" else "audio/ogg")
+    if "audio/" in (content_type or "").lower() or body[:4] == b"RIFF":
         return f"data:{mime};base64,{base64.b64encode(body).decode('ascii')}"
     audio_bytes = _extract_openspeech_audio_bytes(body, fmt)
     if audio_bytes:
-        mime = "audio/wav" if fmt == "wav" else ("audio/mpeg" if fmt == "mp3" else "audio/ogg")
         return f"data:{mime};base64,{base64.b64encode(audio_bytes).decode('ascii')}"
     return None
 
@@ -1,26 +1,38 @@
-import html
+import asyncio
 import logging
 import re
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
-from urllib import parse, request
+from html.parser import HTMLParser
+from urllib import parse
 
 from app.core.config import settings
+from app.core.logging import log_event
+from app.services import http_client
 
 logger = logging.getLogger(__name__)
-_NO_PROXY_OPENER = request.build_opener(request.ProxyHandler({}))
-
-
-def _get_opener():
-    # Prefer explicit proxy from settings; otherwise follow system proxy; optionally force direct.
-    if settings.force_no_proxy:
-        return _NO_PROXY_OPENER
-    proxy = (settings.outbound_proxy or "").strip()
-    if proxy:
-        return request.build_opener(request.ProxyHandler({"http": proxy, "https": proxy}))
-    return request.build_opener()
+_SEARCH_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+    )
+}
+# 结果缓存按归一化查询存最多 _PARSE_LIMIT 条，不同 limit 的调用共用同一条目。
+# 有结果的按 WEB_SEARCH_CACHE_TTL_SEC 缓存；无结果的按较短的 WEB_SEARCH_NEGATIVE_TTL_SEC 缓存。
+# 请求失败（超时、5xx）进入全局退避：退避期内直接返回空结果，连续失败时退避时间翻倍，
+# 避免搜索源故障时每个无本地依据的请求都白等一个超时。
+_PARSE_LIMIT = 10
+_CACHE_MAX = 512
+_CACHE: "OrderedDict[str, tuple[tuple[WebSearchHit, ...], float]]" = OrderedDict()  # key -> (hits, expires_at)
+_CACHE_LOCK = threading.Lock()
+_BACKOFF = {"failures": 0, "until": 0.0}
+_INFLIGHT: "dict[str, tuple[asyncio.AbstractEventLoop, asyncio.Task[list[WebSearchHit]]]]" = {}
+_WS_RE = re.compile(r"\s+")
 
 
-@dataclass
+@dataclass(frozen=True)
 class WebSearchHit:
     title: str
     snippet: str
@@ -31,46 +43,189 @@ def search_public_web(query: str, limit: int = 5, timeout_sec: int = 20) -> list
     text = (query or "").strip()
     if not text:
         return []
+    key = _cache_key(text)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached[:limit]
+    if _backing_off():
+        return []
 
-    endpoint = "https://html.duckduckgo.com/html/?q=" + parse.quote(text)
-    req = request.Request(
-        endpoint,
-        headers={
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
-            )
-        },
-        method="GET",
-    )
+    try:
+        resp = http_client.request("GET", _search_url(text), headers=_SEARCH_HEADERS, timeout=timeout_sec, breaker="web_search")
+    except http_client.CircuitOpenError:
+        return []
+    except http_client.UpstreamError as exc:
+        _record_failure(exc)
+        return []
+    return _store(key, resp.content)[:limit]
+
+
+async def search_public_web_async(query: str, limit: int = 5, timeout_sec: int = 20) -> list[WebSearchHit]:
+    """协程版本；同一事件循环里相同查询的并发请求共用一次上游调用。"""
+    text = (query or "").strip()
+    if not text:
+        return []
+    key = _cache_key(text)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached[:limit]
+    if _backing_off():
+        return []
+
+    loop = asyncio.get_running_loop()
+    inflight = _INFLIGHT.get(key)
+    if inflight is not None and inflight[0] is loop and not inflight[1].done():
+        task = inflight[1]
+    else:
+        task = asyncio.ensure_future(_fetch_async(key, text, timeout_sec))
+        _INFLIGHT[key] = (loop, task)
+        task.add_done_callback(lambda done: _forget_inflight(key, done))
+    # shield：某个调用方被取消时，其它等待同一查询的调用方不受影响。
+    hits = await asyncio.shield(task)
+    return hits[:limit]
 
+
+async def _fetch_async(key: str, text: str, timeout_sec: int) -> list[WebSearchHit]:
     try:
-        with _get_opener().open(req, timeout=timeout_sec) as resp:
-            body = resp.read().decode("utf-8", errors="ignore")
-    except Exception as exc:
-        logger.warning("public web search failed: %s", exc)
+        resp = await http_client.arequest(
+            "GET", _search_url(text), headers=_SEARCH_HEADERS, timeout=timeout_sec, breaker="web_search"
+        )
+    except http_client.CircuitOpenError:
+        return []
+    except http_client.UpstreamError as exc:
+        _record_failure(exc)
         return []
+    return _store(key, resp.content)
+
+
+def _forget_inflight(key: str, task: "asyncio.Task[list[WebSearchHit]]") -> None:
+    entry = _INFLIGHT.get(key)
+    if entry is not None and entry[1] is task:
+        _INFLIGHT.pop(key, None)
+
+
+def clear_cache() -> None:
+    """清空结果缓存与失败退避（配置变更或测试用）。"""
+    with _CACHE_LOCK:
+        _CACHE.clear()
+        _BACKOFF.update({"failures": 0, "until": 0.0})
+
+
+def _search_url(text: str) -> str:
+    return settings.web_search_base_url + "?q=" + parse.quote(text)
+
 
+def _cache_key(text: str) -> str:
+    return _WS_RE.sub(" ", text).strip().lower()
+
+
+def _cache_get(key: str) -> list[WebSearchHit] | None:
+    now = time.monotonic()
+    with _CACHE_LOCK:
+        entry = _CACHE.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            _CACHE.pop(key, None)
+            return None
+        _CACHE.move_to_end(key)
+        return list(entry[0])
+
+
+def _store(key: str, content: bytes) -> list[WebSearchHit]:
+    hits = _parse_results(content.decode("utf-8", errors="ignore"), _PARSE_LIMIT)
+    ttl = settings.web_search_cache_ttl_sec if hits else settings.web_search_negative_ttl_sec
+    with _CACHE_LOCK:
+        _BACKOFF.update({"failures": 0, "until": 0.0})
+        if ttl > 0:
+            _CACHE[key] = (tuple(hits), time.monotonic() + ttl)
+            _CACHE.move_to_end(key)
+            while len(_CACHE) > _CACHE_MAX:
+                _CACHE.popitem(last=False)
+    return hits
+
+
+def _backing_off() -> bool:
+    with _CACHE_LOCK:
+        return _BACKOFF["until"] > time.monotonic()
+
+
+def _record_failure(exc: Exception) -> None:
+    with _CACHE_LOCK:
+        _BACKOFF["failures"] += 1
+        failures = _BACKOFF["failures"]
+        backoff_sec = min(
+            float(settings.web_search_failure_backoff_max_sec),
+            float(settings.web_search_failure_backoff_sec) * 2 ** (failures - 1),
+        )
+        _BACKOFF["until"] = time.monotonic() + backoff_sec
+    log_event(logger, "warning", "web_search_failed", error=str(exc), failures=failures, backoff_sec=f"{backoff_sec:.1f}")
+
+
+def _parse_results(body: str, limit: int) -> list[WebSearchHit]:
+    parser = _ResultParser()
+    parser.feed(body)
+    parser.close()
     hits: list[WebSearchHit] = []
-    for block in re.findall(r"<div class=\"result__body\">(.*?)</div>\s*</div>", body, re.DOTALL):
-        title_match = re.search(r'<a[^>]*class=\"result__a\"[^>]*href=\"([^\"]+)\"[^>]*>(.*?)</a>', block, re.DOTALL)
-        if not title_match:
-            continue
-        raw_url = html.unescape(title_match.group(1))
+    for raw_url, title_parts, snippet_parts in parser.results:
         url = _unwrap_duckduckgo_url(raw_url)
-        title = _clean_html(title_match.group(2))
-        snippet_match = re.search(r'<a[^>]*class=\"result__snippet\"[^>]*>(.*?)</a>', block, re.DOTALL)
-        if not snippet_match:
-            snippet_match = re.search(r'<div[^>]*class=\"result__snippet\"[^>]*>(.*?)</div>', block, re.DOTALL)
-        snippet = _clean_html(snippet_match.group(1)) if snippet_match else ""
+        title = _collapse(title_parts)
         if not title or not url:
             continue
-        hits.append(WebSearchHit(title=title, snippet=snippet[:180], url=url))
+        hits.append(WebSearchHit(title=title, snippet=_collapse(snippet_parts)[:180], url=url))
         if len(hits) >= limit:
             break
     return hits
 
 
+class _ResultParser(HTMLParser):
+    """单遍扫描 DuckDuckGo HTML 结果页：每个 a.result__a 开始一条结果，其后的 .result__snippet 为摘要。
+
+    实体由 HTMLParser 解码（convert_charrefs），标签内嵌套的 <b> 等只取文本。
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.results: list[tuple[str, list[str], list[str]]] = []
+        self._field: list[str] | None = None
+        self._field_tag = ""
+        self._depth = 0
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if self._field is not None:
+            if tag == self._field_tag:
+                self._depth += 1
+            return
+        attr_map = dict(attrs)
+        classes = (attr_map.get("class") or "").split()
+        if tag == "a" and "result__a" in classes:
+            self.results.append((attr_map.get("href") or "", [], []))
+            self._capture(tag, self.results[-1][1])
+        elif "result__snippet" in classes and self.results and not self.results[-1][2]:
+            self._capture(tag, self.results[-1][2])
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._field is None or tag != self._field_tag:
+            return
+        if self._depth:
+            self._depth -= 1
+        else:
+            self._field = None
+
+    def handle_data(self, data: str) -> None:
+        if self._field is not None:
+            self._field.append(data)
+
+    def _capture(self, tag: str, field: list[str]) -> None:
+        self._field = field
+        self._field_tag = tag
+        self._depth = 0
+
+
+def _collapse(parts: list[str]) -> str:
+    return _WS_RE.sub(" ", "".join(parts)).strip()
+
+
 def _unwrap_duckduckgo_url(raw_url: str) -> str:
     if "duckduckgo.com/l/?" not in raw_url:
         return raw_url
@@ -78,10 +233,3 @@ def _unwrap_duckduckgo_url(raw_url: str) -> str:
     qs = parse.parse_qs(parsed.query)
     uddg = qs.get("uddg", [""])[0]
     return parse.unquote(uddg) if uddg else raw_url
-
-
-def _clean_html(content: str) -> str:
-    text = re.sub(r"<[^>]+>", " ", content or "")
-    text = html.unescape(text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
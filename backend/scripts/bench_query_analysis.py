@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "backend"))
+
+from app.schemas.chat import AnswerJson, ChatRequest  # noqa: E402
+from app.services import chat as chat_service  # noqa: E402
+
+# 与检索结果形态一致的固定证据，覆盖租赁/劳动两类标签，触发引用相关性过滤。
+_EVIDENCE = [
+    {
+        "chunk_id": "bench-law-1",
+        "law_name": "中华人民共和国民法典",
+        "article_no": "第七百零三条",
+        "text": "租赁合同是出租人将租赁物交付承租人使用、收益，承租人支付租金的合同。",
+        "source_type": "law",
+    },
+    {
+        "chunk_id": "bench-law-2",
+        "law_name": "中华人民共和国劳动合同法",
+        "article_no": "第三十条",
+        "text": "用人单位应当按照劳动合同约定和国家规定，向劳动者及时足额支付劳动报酬。",
+        "source_type": "law",
+    },
+]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmark keyword classification cost per chat turn.")
+    parser.add_argument("--dataset", default=str(ROOT / "backend" / "tests" / "eval_dataset.json"))
+    parser.add_argument("--rounds", type=int, default=200, help="Passes over the question set per mode.")
+    parser.add_argument("--report-json", default="", help="Optional JSON report output path.")
+    args = parser.parse_args()
+
+    dataset = json.loads(Path(args.dataset).read_text(encoding="utf-8"))
+    questions = [item["text"] for key in ("chat_regular", "chat_incomplete") for item in dataset.get(key, [])]
+    if not questions:
+        raise SystemExit(f"no chat questions in {args.dataset}")
+
+    results = [_run_mode(mode, questions, args.rounds) for mode in ("per_call", "per_request")]
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    if args.report_json:
+        path = Path(args.report_json)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0
+
+
+def _run_mode(mode: str, questions: list[str], rounds: int) -> dict[str, Any]:
+    """per_call: 去掉记忆化，每个调用点都重新扫描关键词表（改造前的行为）；
+    per_request: 每轮开始清空缓存，单轮内只分类一次并沿调用链传递。"""
+    analyze = chat_service._analyze_normalized.__wrapped__
+    topic_tags = chat_service._extract_normalized_topic_tags.__wrapped__
+    scans = {"analysis": 0, "topic_tags": 0}
+
+    def counted_analyze(normalized: str) -> chat_service.QueryAnalysis:
+        scans["analysis"] += 1
+        return analyze(normalized)
+
+    def counted_topic_tags(normalized: str) -> frozenset[str]:
+        scans["topic_tags"] += 1
+        return topic_tags(normalized)
+
+    if mode == "per_request":
+        analyze_impl = chat_service.lru_cache(maxsize=1024)(counted_analyze)
+        topic_tags_impl = chat_service.lru_cache(maxsize=4096)(counted_topic_tags)
+    else:
+        analyze_impl, topic_tags_impl = counted_analyze, counted_topic_tags
+
+    async def run_rounds() -> int:
+        turns = 0
+        for _ in range(rounds):
+            for text in questions:
+                if mode == "per_request":
+                    analyze_impl.cache_clear()
+                    topic_tags_impl.cache_clear()
+                await _classify_turn(text)
+                turns += 1
+        return turns
+
+    with (
+        patch.object(chat_service, "_analyze_normalized", analyze_impl),
+        patch.object(chat_service, "_extract_normalized_topic_tags", topic_tags_impl),
+        patch.object(chat_service, "_answer_llm_configured", return_value=False),
+        patch.object(chat_service.web_search_service, "search_public_web_async", return_value=[]),
+    ):
+        started = time.perf_counter()
+        turns = asyncio.run(run_rounds())
+        elapsed = time.perf_counter() - started
+
+    return {
+        "mode": mode,
+        "turns": turns,
+        "analysis_scans_per_turn": round(scans["analysis"] / turns, 2),
+        "topic_tag_scans_per_turn": round(scans["topic_tags"] / turns, 2),
+        "us_per_turn": round(elapsed / turns * 1_000_000, 1),
+    }
+
+
+async def _classify_turn(text: str) -> None:
+    # 覆盖一轮对话中所有依赖关键词分类的环节：检索扩展判定、规则扩展、兜底回答、引用过滤与收尾。
+    req = ChatRequest(session_id="bench", text=text)
+    analysis = chat_service.analyze_query(text)
+    chat_service._should_use_llm_retrieval_expansion(text)
+    chat_service.expand_legal_query(text)
+    await chat_service.build_answer_async(req, _EVIDENCE, analysis=analysis)
+    answer = AnswerJson(
+        conclusion="建议先固定证据，再协商或申请调解。",
+        analysis=["依据《中华人民共和国民法典》第七百零三条，押金应依约返还。"],
+        actions=["保留转账凭证。"],
+        citations=[],
+        emotion="calm",
+    )
+    chat_service._finalize_answer(answer, _EVIDENCE, "calm", False, req, analysis)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
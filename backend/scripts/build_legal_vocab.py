@@ -0,0 +1,116 @@
+import argparse
+import re
+import sqlite3
+import sys
+from collections import Counter
+from contextlib import closing
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "backend"))
+
+from app.core.config import settings  # noqa: E402
+
+_CJK_RUN_RE = re.compile(r"[一-鿿]+")
+_HEADING_PREFIX_RE = re.compile(r"^第[一二三四五六七八九十百零〇\d]+[编章节]\s*")
+# 以虚词开头/结尾的 n-gram 基本是跨词片段，不收入词表。
+_BOUNDARY_CHARS = set("的了和与及或在是等之其以为对于由从向将被把")
+_COUNTRY_PREFIX = "中华人民共和国"
+_MIN_NEIGHBOURS = 3
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Mine a segmentation vocabulary from the knowledge chunks table.")
+    parser.add_argument("--db", default=settings.knowledge_db_path)
+    parser.add_argument("--out", default=settings.legal_vocab_path)
+    parser.add_argument("--min-count", type=int, default=20, help="Minimum corpus frequency for an n-gram.")
+    parser.add_argument("--max-ngrams", type=int, default=20000, help="Keep at most this many n-grams.")
+    args = parser.parse_args()
+
+    db_path = _resolve(args.db)
+    if not db_path.exists():
+        raise SystemExit(f"knowledge db not found: {db_path}")
+    with closing(sqlite3.connect(db_path)) as conn:
+        rows = conn.execute("SELECT law_name, section, tags, text FROM chunks").fetchall()
+
+    vocab = mine_vocabulary(rows, args.min_count, args.max_ngrams)
+    out_path = _resolve(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    lines = ["# generated by scripts/build_legal_vocab.py: term<TAB>count"]
+    lines.extend(f"{term}\t{count}" for term, count in vocab)
+    out_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    print(f"chunks={len(rows)} terms={len(vocab)} -> {out_path}")
+    return 0
+
+
+def mine_vocabulary(
+    rows: list[tuple[str | None, str | None, str | None, str | None]],
+    min_count: int = 20,
+    max_ngrams: int = 20000,
+) -> list[tuple[str, int]]:
+    """法律名、章节名、标签整体入词表；正文中高频且左右邻接字多样的 2-4 字 n-gram 入词表。"""
+    names: Counter[str] = Counter()
+    grams: Counter[str] = Counter()
+    for law_name, section, tags, text in rows:
+        for name in _law_name_variants(law_name or ""):
+            names[name] += 1
+        heading = _HEADING_PREFIX_RE.sub("", (section or "").strip()).strip()
+        if 2 <= len(heading) <= 12 and _CJK_RUN_RE.fullmatch(heading):
+            names[heading] += 1
+        for tag in re.split(r"[,/]", tags or ""):
+            tag = tag.strip()
+            if 2 <= len(tag) <= 12 and _CJK_RUN_RE.fullmatch(tag):
+                names[tag] += 1
+        for run in _CJK_RUN_RE.findall(text or ""):
+            for size in (2, 3, 4):
+                for idx in range(len(run) - size + 1):
+                    grams[run[idx : idx + size]] += 1
+
+    frequent = {
+        gram: count
+        for gram, count in grams.items()
+        if count >= min_count and gram[0] not in _BOUNDARY_CHARS and gram[-1] not in _BOUNDARY_CHARS
+    }
+    # 成词的片段左右邻接字应足够多样；“人单位应”这类跨词片段左右几乎固定，据此过滤。
+    left: dict[str, set[str]] = {gram: set() for gram in frequent}
+    right: dict[str, set[str]] = {gram: set() for gram in frequent}
+    for _law_name, _section, _tags, text in rows:
+        for run in _CJK_RUN_RE.findall(text or ""):
+            padded = f"^{run}$"
+            for size in (2, 3, 4):
+                for idx in range(1, len(padded) - size):
+                    gram = padded[idx : idx + size]
+                    if gram in frequent:
+                        left[gram].add(padded[idx - 1])
+                        right[gram].add(padded[idx + size])
+    kept = sorted(
+        (
+            (gram, count)
+            for gram, count in frequent.items()
+            if len(left[gram]) >= _MIN_NEIGHBOURS and len(right[gram]) >= _MIN_NEIGHBOURS
+        ),
+        key=lambda item: (-item[1], item[0]),
+    )[: max(0, max_ngrams)]
+
+    merged: Counter[str] = Counter(dict(kept))
+    merged.update(names)
+    return sorted(merged.items(), key=lambda item: (-item[1], item[0]))
+
+
+def _law_name_variants(law_name: str) -> list[str]:
+    name = law_name.strip()
+    if not name:
+        return []
+    variants = [name]
+    if name.startswith(_COUNTRY_PREFIX) and len(name) > len(_COUNTRY_PREFIX) + 1:
+        variants.append(name[len(_COUNTRY_PREFIX) :])
+    return variants
+
+
+def _resolve(path: str) -> Path:
+    p = Path(path)
+    return p if p.is_absolute() else ROOT / p
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
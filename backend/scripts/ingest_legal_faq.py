@@ -0,0 +1,56 @@
+import argparse
+import json
+import sys
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "backend"))
+
+from app.core.config import settings  # noqa: E402
+from app.services import faq as faq_service  # noqa: E402
+from app.services.embedding import embed_text  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Build the offline legal FAQ index (items + question/alias embeddings).")
+    parser.add_argument("--source", default=settings.faq_source_path)
+    parser.add_argument("--out", default=settings.faq_index_path)
+    args = parser.parse_args()
+
+    source_path = _resolve(args.source)
+    if not source_path.exists():
+        raise SystemExit(f"faq source not found: {source_path}")
+    items = faq_service.load_source(source_path)
+    ids = [item.id for item in items]
+    if len(set(ids)) != len(ids):
+        raise SystemExit("duplicate faq ids in source")
+
+    signature = faq_service.index_signature()
+    # mock 嵌入只是哈希，向量之间没有语义相似度，索引里不存向量，线上只做字面匹配。
+    with_vectors = signature["embedding_provider"] != "mock"
+    payload_items = []
+    dim = 0
+    for item in items:
+        raw = asdict(item)
+        raw["vectors"] = [embed_text(text) for text in (item.question, *item.aliases)] if with_vectors else []
+        if raw["vectors"]:
+            dim = len(raw["vectors"][0])
+        payload_items.append(raw)
+
+    out_path = _resolve(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {**signature, "embedding_dim": dim, "built_at": time.time(), "items": payload_items}
+    out_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    print(f"items={len(items)} provider={signature['embedding_provider']} dim={dim} -> {out_path}")
+    return 0
+
+
+def _resolve(path: str) -> Path:
+    p = Path(path)
+    return p if p.is_absolute() else ROOT / p
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
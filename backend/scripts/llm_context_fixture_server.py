@@ -0,0 +1,197 @@
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "backend"))
+
+from app.core.config import settings  # noqa: E402
+from app.schemas.chat import ChatRequest  # noqa: E402
+from app.services import chat as chat_service  # noqa: E402
+from app.services import circuit_breaker  # noqa: E402
+from app.services import context_cache  # noqa: E402
+from app.services import http_client  # noqa: E402
+from app.services import llm_usage  # noqa: E402
+from app.services import prompt_budget  # noqa: E402
+
+# 离线模拟 Ark 兼容的对话接口：/chat/completions、/context/create、/context/chat/completions。
+# 首个内容块前按“未命中缓存的 prompt token 数 × 每 token 处理耗时”模拟 prefill，
+# 用来在不访问真实供应商的情况下测量上下文缓存省下的 prompt 处理时间。
+
+
+class FixtureState:
+    prefill_ms_per_1k = 400.0
+    contexts: dict[str, list[dict[str, Any]]] = {}
+    requests: dict[str, int] = {}
+
+
+def _prompt_tokens(messages: list[dict[str, Any]]) -> int:
+    return sum(prompt_budget.estimate_tokens(str(item.get("content") or "")) for item in messages)
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:  # noqa: N802
+        path = self.path.split("?", 1)[0]
+        FixtureState.requests[path] = FixtureState.requests.get(path, 0) + 1
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if path.endswith("/context/create"):
+            context_id = f"ctx-{len(FixtureState.contexts) + 1}"
+            FixtureState.contexts[context_id] = list(body.get("messages") or [])
+            self._reply(200, {"id": context_id, "model": body.get("model"), "mode": body.get("mode"), "ttl": body.get("ttl")})
+            return
+        prefix: list[dict[str, Any]] = []
+        if path.endswith("/context/chat/completions"):
+            if body.get("context_id") not in FixtureState.contexts:
+                self._reply(404, {"error": {"code": "ContextNotFound"}})
+                return
+            prefix = FixtureState.contexts[body["context_id"]]
+        elif not path.endswith("/chat/completions"):
+            self._reply(404, {"error": {"code": "NotFound"}})
+            return
+        cached = _prompt_tokens(prefix)
+        uncached = _prompt_tokens(list(body.get("messages") or []))
+        time.sleep(FixtureState.prefill_ms_per_1k * uncached / 1000 / 1000)
+        content = '{"conclusion":"押金应依约返还","analysis":[],"actions":[],"emotion":"calm","citation_chunk_ids":[]}'
+        usage = {
+            "prompt_tokens": cached + uncached,
+            "completion_tokens": 24,
+            "prompt_tokens_details": {"cached_tokens": cached},
+        }
+        if not body.get("stream"):
+            self._reply(200, {"choices": [{"message": {"role": "assistant", "content": content}}], "usage": usage})
+            return
+        chunks = [{"choices": [{"delta": {"content": content}}]}, {"choices": [], "usage": usage}]
+        payload = "".join(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n" for chunk in chunks) + "data: [DONE]\n\n"
+        self._send(200, payload.encode("utf-8"), "text/event-stream")
+
+    def _reply(self, status: int, data: dict[str, Any]) -> None:
+        self._send(status, json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json")
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        return
+
+
+def start_server(port: int = 0) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _bench_turns(turns: int) -> list[list[dict[str, str]]]:
+    """同一会话逐轮追加历史，每轮换一组依据，模拟真实回答提示词。"""
+    prompts = []
+    history: list[dict[str, str]] = []
+    for idx in range(turns):
+        evidence = [
+            {
+                "chunk_id": f"c{idx}_{n}",
+                "law_name": "中华人民共和国民法典",
+                "article_no": f"第{703 + n}条",
+                "text": f"租赁合同押金条款示例 {idx}-{n}：" + "出租人应当按照约定返还押金，承租人应当按照约定支付租金。" * 6,
+                "score": 0.9 - n * 0.1,
+            }
+            for n in range(4)
+        ]
+        req = ChatRequest(session_id="bench", text=f"第{idx + 1}轮：房东以房屋有损坏为由扣押金，我应该怎么维权？")
+        prompts.append(chat_service._build_stream_messages(req, evidence, history))
+        history = [*history, {"role": "user", "content": req.text}, {"role": "assistant", "content": "押金应依约返还。"}]
+    return prompts
+
+
+async def _run_phase(prompts: list[list[dict[str, str]]], model: str) -> list[dict[str, Any]]:
+    llm_usage.drain()
+    for messages in prompts:
+        async for _chunk in chat_service._chat_completion_stream_async(messages, model, 256):
+            pass
+    await http_client.aclose_client()
+    return [row for row in llm_usage.drain() if row["stage"] == "answer"]
+
+
+def run_bench(turns: int, prefill_ms_per_1k: float) -> dict[str, Any]:
+    """plain：每轮完整发送提示词；context_cache：静态指令前缀登记为上下文后只发其余消息。"""
+    server = start_server()
+    FixtureState.prefill_ms_per_1k = prefill_ms_per_1k
+    settings.llm_base_url = f"http://127.0.0.1:{server.server_address[1]}/api/v3"
+    settings.llm_api_key = "fixture"
+    settings.llm_cache_enabled = False
+    settings.circuit_breaker_enabled = False
+    circuit_breaker.reset()
+    prompts = _bench_turns(turns)
+    phases = []
+    try:
+        for phase in ("plain", "context_cache"):
+            settings.llm_context_cache_enabled = phase == "context_cache"
+            context_cache.clear()
+            FixtureState.contexts.clear()
+            FixtureState.requests = {}
+            rows = asyncio.run(_run_phase(prompts, "fixture-model"))
+            ttft = sorted(float(row["ttft_ms"]) for row in rows if row["ttft_ms"] is not None)
+            phases.append(
+                {
+                    "phase": phase,
+                    "turns": len(rows),
+                    "upstream_requests": dict(FixtureState.requests),
+                    "avg_prompt_tokens": round(sum(row["prompt_tokens"] or 0 for row in rows) / max(1, len(rows)), 1),
+                    "avg_cached_tokens": round(sum(row["cached_tokens"] or 0 for row in rows) / max(1, len(rows)), 1),
+                    "avg_ttft_ms": round(sum(ttft) / len(ttft), 3) if ttft else 0.0,
+                    "p90_ttft_ms": round(ttft[min(len(ttft) - 1, int(0.9 * len(ttft)))], 3) if ttft else 0.0,
+                }
+            )
+    finally:
+        server.shutdown()
+        server.server_close()
+    return {
+        "prefill_ms_per_1k_tokens": prefill_ms_per_1k,
+        "phases": phases,
+        "ttft_saved_ms": round(phases[0]["avg_ttft_ms"] - phases[1]["avg_ttft_ms"], 3),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline Ark-compatible chat/context fixture server for context-cache benchmarks.")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=400.0, help="Simulated prompt processing time per 1k uncached tokens.")
+    parser.add_argument("--bench", action="store_true", help="Run the plain vs context-cache benchmark in-process and exit.")
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--report-json", default="", help="Optional JSON report output path (bench mode).")
+    args = parser.parse_args()
+
+    if args.bench:
+        report = run_bench(args.turns, args.prefill_ms_per_1k)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        if args.report_json:
+            path = Path(args.report_json)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        return 0
+
+    FixtureState.prefill_ms_per_1k = args.prefill_ms_per_1k
+    server = start_server(args.port)
+    print(f"fixture LLM at http://127.0.0.1:{server.server_address[1]}/api/v3 (set LLM_BASE_URL)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,292 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "backend"))
+
+# 固定证据，避免压测依赖 Qdrant；LLM 由本地假上游按固定延迟应答。
+_FAKE_EVIDENCE = [
+    {
+        "chunk_id": "load-test-1",
+        "law_name": "中华人民共和国民法典",
+        "article_no": "第七百零三条",
+        "text": "租赁合同是出租人将租赁物交付承租人使用、收益，承租人支付租金的合同。",
+        "score": 0.9,
+        "source": "law",
+    }
+]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Compare concurrent /api/chat capacity of a thread-per-request handler and the async handler."
+    )
+    parser.add_argument("--concurrency", type=int, default=128, help="Concurrent in-flight requests.")
+    parser.add_argument("--requests", type=int, default=512, help="Total requests per mode.")
+    parser.add_argument("--llm-latency", type=float, default=2.0, help="Simulated LLM latency in seconds.")
+    parser.add_argument(
+        "--upstream-pool",
+        type=int,
+        default=64,
+        help="HTTP_POOL_MAX_CONNECTIONS for the server under test (httpcore pool bookkeeping grows quadratically with it).",
+    )
+    parser.add_argument("--modes", default="sync,async", help="Comma separated modes to run.")
+    parser.add_argument("--report-json", default="", help="Optional JSON report output path.")
+    parser.add_argument("--serve", choices=["sync", "async"], help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument("--llm-url", default="", help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        _serve(args.serve, args.port, args.llm_url, args.data_dir, args.upstream_pool)
+        return 0
+
+    llm_server = _start_fake_llm(args.llm_latency)
+    llm_url = f"http://127.0.0.1:{llm_server.server_address[1]}"
+    results: list[dict[str, Any]] = []
+    try:
+        with tempfile.TemporaryDirectory() as data_dir:
+            for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+                results.append(_run_mode(mode, args, llm_url, data_dir))
+    finally:
+        llm_server.shutdown()
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    if args.report_json:
+        path = Path(args.report_json)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0
+
+
+def _run_mode(mode: str, args: argparse.Namespace, llm_url: str, data_dir: str) -> dict[str, Any]:
+    port = _free_port()
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            str(Path(__file__).resolve()),
+            "--serve",
+            mode,
+            "--port",
+            str(port),
+            "--llm-url",
+            llm_url,
+            "--data-dir",
+            data_dir,
+            "--upstream-pool",
+            str(args.upstream_pool),
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_ready(base_url)
+        baseline_rss_kb = _rss_kb(proc.pid, "VmRSS")
+        stats = asyncio.run(_drive_load(base_url, args.concurrency, args.requests))
+        stats.update(
+            {
+                "mode": mode,
+                "concurrency": args.concurrency,
+                "llm_latency_sec": args.llm_latency,
+                "baseline_rss_mb": round(baseline_rss_kb / 1024, 1) if baseline_rss_kb else None,
+                "peak_rss_mb": _to_mb(_rss_kb(proc.pid, "VmHWM")),
+            }
+        )
+        return stats
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+async def _drive_load(base_url: str, concurrency: int, total: int) -> dict[str, Any]:
+    latencies: list[float] = []
+    errors = 0
+    in_flight = 0
+    peak_in_flight = 0
+    counter = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=300.0) as client:
+
+        async def worker() -> None:
+            nonlocal errors, in_flight, peak_in_flight
+            for idx in counter:
+                payload = {
+                    "session_id": f"load_{idx}",
+                    "text": "房东不退押金怎么办",
+                    "mode": "chat",
+                    "case_state": None,
+                    "enable_tts": False,
+                }
+                started = time.perf_counter()
+                in_flight += 1
+                peak_in_flight = max(peak_in_flight, in_flight)
+                try:
+                    resp = await client.post("/api/chat", json=payload)
+                    if resp.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                finally:
+                    in_flight -= 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall_sec = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "wall_sec": round(wall_sec, 2),
+        "throughput_rps": round(total / wall_sec, 2) if wall_sec else 0.0,
+        "p50_ms": round(statistics.median(latencies), 1) if latencies else 0.0,
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 1) if latencies else 0.0,
+        "peak_client_in_flight": peak_in_flight,
+    }
+
+
+def _serve(mode: str, port: int, llm_url: str, data_dir: str, pool_size: int) -> None:
+    os.environ.update(
+        {
+            "LLM_PROVIDER": "ark",
+            "LLM_BASE_URL": llm_url,
+            "LLM_API_KEY": "load-test",
+            "LLM_MODEL": "load-test",
+            "LLM_FAST_MODEL": "load-test",
+            "TTS_PROVIDER": "mock",
+            # 两种模式使用相同的上游连接池，保证对比只体现处理器模型的差异。
+            "HTTP_POOL_MAX_CONNECTIONS": str(pool_size),
+            "HTTP_POOL_MAX_KEEPALIVE": str(pool_size),
+            "CASE_DB_PATH": str(Path(data_dir) / f"case_{mode}.db"),
+            "METRICS_DB_PATH": str(Path(data_dir) / f"metrics_{mode}.db"),
+        }
+    )
+    import anyio.from_thread
+    import uvicorn
+    from fastapi import Request
+
+    from app.api.v1 import chat as chat_api
+    from app.main import app
+    from app.schemas.chat import ChatRequest, ChatResponse
+    from app.services import knowledge as knowledge_service
+
+    async def fake_search_async(query: str, top_k: int = 5, use_rerank: bool | None = None) -> list[dict[str, Any]]:
+        return [dict(item) for item in _FAKE_EVIDENCE]
+
+    knowledge_service.search_async = fake_search_async
+
+    if mode == "sync":
+        # 复现改造前同步处理器的并发模型：流水线与 async 模式相同，但每个请求在整个处理期间占住一个
+        # Starlette 线程池线程，并发上限由线程池决定。
+        app.router.routes = [r for r in app.router.routes if getattr(r, "path", "") != "/api/chat"]
+
+        @app.post("/api/chat", response_model=ChatResponse)
+        def thread_per_request_chat(req: ChatRequest, request: Request) -> ChatResponse:
+            return anyio.from_thread.run(chat_api.handle_chat, req, getattr(request.state, "request_id", ""))
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+def _start_fake_llm(latency_sec: float) -> ThreadingHTTPServer:
+    body = json.dumps(
+        {
+            "choices": [
+                {
+                    "message": {
+                        "content": json.dumps(
+                            {
+                                "conclusion": "押金应在租赁合同终止后依约返还。",
+                                "analysis": ["依据《中华人民共和国民法典》第七百零三条。"],
+                                "actions": ["保留转账凭证并书面催告房东。"],
+                                "citations": [{"chunk_id": "load-test-1"}],
+                                "assumptions": [],
+                                "follow_up_questions": [],
+                                "emotion": "calm",
+                            },
+                            ensure_ascii=False,
+                        )
+                    }
+                }
+            ]
+        },
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self) -> None:  # noqa: N802
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            time.sleep(latency_sec)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args: Any) -> None:
+            return
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        # listen backlog 需在 bind 前确定，默认值 5 会让高并发建连排队重试。
+        request_queue_size = 1024
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _wait_ready(base_url: str, timeout_sec: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout_sec
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not become ready")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def _rss_kb(pid: int, field: str) -> int | None:
+    status = Path(f"/proc/{pid}/status")
+    if not status.exists():
+        return None
+    for line in status.read_text(encoding="utf-8").splitlines():
+        if line.startswith(f"{field}:"):
+            return int(line.split()[1])
+    return None
+
+
+def _to_mb(kb: int | None) -> float | None:
+    return round(kb / 1024, 1) if kb else None
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
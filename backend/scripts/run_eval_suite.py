@@ -33,10 +33,16 @@ def main() -> int:
         action="store_true",
         help="Use current provider config. Default runs in mock LLM mode for stable reproducibility.",
     )
+    parser.add_argument(
+        "--model-variant",
+        choices=["auto", "default", "fast"],
+        default="auto",
+        help="model_variant sent with every chat request; compare runs to validate the auto routing policy.",
+    )
     args = parser.parse_args()
 
     dataset = _load_json(_resolve_path(args.dataset))
-    report = run_eval(dataset=dataset, use_live_provider=args.use_live_provider)
+    report = run_eval(dataset=dataset, use_live_provider=args.use_live_provider, model_variant=args.model_variant)
 
     report_json_path = _resolve_path(args.report_json)
     report_md_path = _resolve_path(args.report_md)
@@ -51,24 +57,31 @@ def main() -> int:
     return 0
 
 
-def run_eval(dataset: dict[str, Any], use_live_provider: bool) -> dict[str, Any]:
+def run_eval(dataset: dict[str, Any], use_live_provider: bool, model_variant: str = "auto") -> dict[str, Any]:
     old_llm_provider = settings.llm_provider
     old_tts_enabled = settings.tts_enabled
-    old_search = knowledge_service.search
+    old_search_async = knowledge_service.search_async
+    old_search_many_async = knowledge_service.search_many_async
     if not use_live_provider:
         settings.llm_provider = "mock"
         settings.tts_enabled = False
-        knowledge_service.search = lambda *_args, **_kwargs: []
+        knowledge_service.search_async = _no_evidence
+        knowledge_service.search_many_async = _no_evidence_many
 
     try:
         with TestClient(app) as client:
-            chat_regular_results = [_run_chat_item(client, item, expect_followup=False) for item in dataset["chat_regular"]]
-            chat_incomplete_results = [_run_chat_item(client, item, expect_followup=True) for item in dataset["chat_incomplete"]]
+            # 两组问答在同一个 /api/chat/batch 请求里并发跑完，再按数据集顺序逐条判定。
+            events = _run_chat_batch(client, dataset["chat_regular"] + dataset["chat_incomplete"], model_variant)
+            chat_regular_results = [_check_chat_item(item, events.get(item["id"]), expect_followup=False) for item in dataset["chat_regular"]]
+            chat_incomplete_results = [
+                _check_chat_item(item, events.get(item["id"]), expect_followup=True) for item in dataset["chat_incomplete"]
+            ]
             case_results = [_run_case_item(client, item) for item in dataset["case_branches"]]
     finally:
         settings.llm_provider = old_llm_provider
         settings.tts_enabled = old_tts_enabled
-        knowledge_service.search = old_search
+        knowledge_service.search_async = old_search_async
+        knowledge_service.search_many_async = old_search_many_async
 
     all_rows = chat_regular_results + chat_incomplete_results + case_results
     passed = sum(1 for r in all_rows if r["pass"])
@@ -83,6 +96,7 @@ def run_eval(dataset: dict[str, Any], use_live_provider: bool) -> dict[str, Any]
         "chat_incomplete_pass_rate": _ratio(sum(1 for r in chat_incomplete_results if r["pass"]), len(chat_incomplete_results)),
         "case_branch_pass_rate": _ratio(sum(1 for r in case_results if r["pass"]), len(case_results)),
         "chat_latency_ms": _latency_stats(chat_regular_results + chat_incomplete_results),
+        "chat_by_model_variant": _variant_stats(chat_regular_results + chat_incomplete_results),
         "case_latency_ms": _latency_stats(case_results),
     }
     return {
@@ -93,6 +107,7 @@ def run_eval(dataset: dict[str, Any], use_live_provider: bool) -> dict[str, Any]
                 "case_branches": len(case_results),
             },
             "use_live_provider": use_live_provider,
+            "requested_model_variant": model_variant,
             "mock_search_disabled": not use_live_provider,
             "run_at": time.strftime("%Y-%m-%d %H:%M:%S"),
         },
@@ -105,22 +120,42 @@ def run_eval(dataset: dict[str, Any], use_live_provider: bool) -> dict[str, Any]
     }
 
 
-def _run_chat_item(client: TestClient, item: dict[str, Any], expect_followup: bool) -> dict[str, Any]:
-    started = time.perf_counter()
+async def _no_evidence(*_args: Any, **_kwargs: Any) -> list[dict[str, Any]]:
+    return []
+
+
+async def _no_evidence_many(queries: list[str], *_args: Any, **_kwargs: Any) -> list[list[dict[str, Any]]]:
+    return [[] for _ in queries]
+
+
+def _run_chat_batch(client: TestClient, items: list[dict[str, Any]], model_variant: str = "auto") -> dict[str, dict[str, Any]]:
+    """一次 /api/chat/batch 请求跑完全部问答条目，返回 id -> item 事件。"""
     resp = client.post(
-        "/api/chat",
+        "/api/chat/batch",
         json={
-            "session_id": f"eval_{item['id']}",
-            "text": item["text"],
-            "mode": "chat",
-            "case_state": None,
+            "items": [
+                {
+                    "id": item["id"],
+                    "session_id": f"eval_{item['id']}",
+                    "text": item["text"],
+                    "mode": "chat",
+                    "case_state": None,
+                    "model_variant": model_variant,
+                }
+                for item in items
+            ]
         },
     )
-    latency_ms = (time.perf_counter() - started) * 1000
+    resp.raise_for_status()
+    events = [json.loads(line) for line in resp.text.splitlines() if line.strip()]
+    return {str(event["id"]): event for event in events if event.get("type") == "item"}
 
+
+def _check_chat_item(item: dict[str, Any], event: dict[str, Any] | None, expect_followup: bool) -> dict[str, Any]:
+    event = event or {}
     checks: list[tuple[str, bool]] = []
-    checks.append(("status_200", resp.status_code == 200))
-    body = resp.json() if resp.status_code == 200 else {}
+    checks.append(("status_200", event.get("status_code") == 200))
+    body = event.get("response") or {}
     answer = body.get("answer_json") if isinstance(body, dict) else None
     checks.append(("answer_json_exists", isinstance(answer, dict)))
 
@@ -141,7 +176,10 @@ def _run_chat_item(client: TestClient, item: dict[str, Any], expect_followup: bo
         "id": item["id"],
         "type": "chat_incomplete" if expect_followup else "chat_regular",
         "pass": passed,
-        "latency_ms": round(latency_ms, 2),
+        "latency_ms": float(event.get("latency_ms") or 0.0),
+        "stages": event.get("stages") or {},
+        "model_variant": body.get("model_variant") if isinstance(body, dict) else None,
+        "citations": len(answer.get("citations") or []) if isinstance(answer, dict) else 0,
         "checks": [{"name": name, "pass": ok} for name, ok in checks],
     }
 
@@ -207,6 +245,22 @@ def _latency_stats(rows: list[dict[str, Any]]) -> dict[str, Any]:
     }
 
 
+def _variant_stats(rows: list[dict[str, Any]]) -> dict[str, Any]:
+    """按实际使用的模型档位（auto 路由后的结果）分组统计时延与引用命中率。"""
+    groups: dict[str, list[dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault(str(row.get("model_variant") or "unknown"), []).append(row)
+    return {
+        variant: {
+            "requests": len(items),
+            "pass_rate": _ratio(sum(1 for r in items if r["pass"]), len(items)),
+            "citation_hit_rate": _ratio(sum(1 for r in items if r["citations"] > 0), len(items)),
+            "latency_ms": _latency_stats(items),
+        }
+        for variant, items in sorted(groups.items())
+    }
+
+
 def _percentile(values: list[float], p: float) -> float:
     sorted_vals = sorted(values)
     if len(sorted_vals) == 1:
@@ -246,6 +300,11 @@ def _to_markdown(report: dict[str, Any]) -> str:
         f"- chat_latency_p90_ms: {summary['chat_latency_ms']['p90_ms']:.2f}\n"
         f"- case_latency_p50_ms: {summary['case_latency_ms']['p50_ms']:.2f}\n"
         f"- case_latency_p90_ms: {summary['case_latency_ms']['p90_ms']:.2f}\n"
+        + "".join(
+            f"- chat[{variant}]: requests={stats['requests']} citation_hit_rate={stats['citation_hit_rate']:.4f} "
+            f"p50_ms={stats['latency_ms']['p50_ms']:.2f} p90_ms={stats['latency_ms']['p90_ms']:.2f}\n"
+            for variant, stats in summary["chat_by_model_variant"].items()
+        )
     )
 
 
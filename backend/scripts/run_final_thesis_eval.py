@@ -245,15 +245,15 @@ def _avatar_sendmessage_guard_ok() -> tuple[bool, str]:
     return True, "ChatPage.vue / CasePage.vue 的 playAvatar 调用均在 Unity 开关保护内"
 
 
-def _chat(
-    client: TestClient,
+def _chat_item(
     text: str,
     session_id: str,
     top_k: int | None = None,
     enable_tts: bool | None = True,
     citation_strict: bool | None = None,
-) -> tuple[dict[str, Any], float]:
-    payload = {
+) -> dict[str, Any]:
+    item = {
+        "id": session_id,
         "session_id": session_id,
         "text": text,
         "mode": "chat",
@@ -261,13 +261,25 @@ def _chat(
         "enable_tts": enable_tts,
     }
     if top_k is not None:
-        payload["top_k"] = top_k
+        item["top_k"] = top_k
     if citation_strict is not None:
-        payload["citation_strict"] = citation_strict
-    started = time.perf_counter()
-    resp = client.post("/api/chat", json=payload)
-    latency_ms = (time.perf_counter() - started) * 1000
-    return {"status": resp.status_code, "body": resp.json() if resp.status_code == 200 else {}, "headers": dict(resp.headers)}, latency_ms
+        item["citation_strict"] = citation_strict
+    return item
+
+
+def _chat_batch(client: TestClient, items: list[dict[str, Any]]) -> dict[str, tuple[dict[str, Any], float]]:
+    """经 /api/chat/batch 并发跑完一组问答，返回 id -> (响应, 单条服务端耗时 ms)。"""
+    results: dict[str, tuple[dict[str, Any], float]] = {}
+    for offset in range(0, len(items), 200):
+        resp = client.post("/api/chat/batch", json={"items": items[offset : offset + 200]})
+        resp.raise_for_status()
+        for line in resp.text.splitlines():
+            event = json.loads(line) if line.strip() else {}
+            if event.get("type") != "item":
+                continue
+            body = event.get("response") if event.get("ok") else {}
+            results[str(event["id"])] = ({"status": int(event["status_code"]), "body": body or {}}, float(event["latency_ms"]))
+    return results
 
 
 def _case_to_verdict(client: TestClient, case_id: str, steps: list[str], sid_prefix: str) -> tuple[dict[str, Any], list[ApiCall]]:
@@ -312,17 +324,18 @@ def run(rounds: int = 3, use_live_provider: bool = False) -> dict[str, Any]:
     post_clean_status = _metrics_status(metrics_db)
 
     old_llm_provider = settings.llm_provider
-    old_chat_search = chat_api.knowledge_service.search
-    old_web_search = chat_service.web_search_service.search_public_web
-    old_chat_tts_synthesize = chat_api.tts_service.synthesize
-    old_chat_tts_public = chat_api.tts_service.public_audio_url
+    old_chat_search = chat_api.knowledge_service.search_async
+    old_chat_search_many = chat_api.knowledge_service.search_many_async
+    old_web_search = chat_service.web_search_service.search_public_web_async
+    old_chat_tts_synthesize = chat_api.tts_service.synthesize_async
+    old_chat_tts_public = chat_api.tts_service.public_audio_url_async
     old_case_tts_synthesize = case_api.tts_service.synthesize
     old_case_tts_public = case_api.tts_service.public_audio_url
 
     search_calls: list[dict[str, Any]] = []
     tts_counter = {"n": 0}
 
-    def fake_search(query: str, top_k: int = 5, use_rerank: bool = True):
+    def fake_search(query: str, top_k: int = 5, use_rerank: bool | None = None):
         search_calls.append({"query": query, "top_k": top_k, "use_rerank": use_rerank})
         if any(q in query for q in INSUFFICIENT_Q):
             return []
@@ -330,6 +343,15 @@ def run(rounds: int = 3, use_live_provider: bool = False) -> dict[str, Any]:
         rows = _build_evidence(topic)
         return rows[: max(1, min(12, int(top_k)))]
 
+    async def fake_search_async(query: str, top_k: int = 5, use_rerank: bool | None = None):
+        return fake_search(query, top_k, use_rerank)
+
+    async def fake_search_many_async(queries: list[str], top_k: int = 5, use_rerank: bool | None = None):
+        return [fake_search(query, top_k, use_rerank) for query in queries]
+
+    async def fake_web_search_async(*_args, **_kwargs):
+        return []
+
     def fake_synthesize(_text: str, emotion: str = "calm") -> str:
         tts_counter["n"] += 1
         return f"fake_tts_{emotion}_{tts_counter['n']}.wav"
@@ -337,6 +359,12 @@ def run(rounds: int = 3, use_live_provider: bool = False) -> dict[str, Any]:
     def fake_public(path: str) -> str:
         return f"http://127.0.0.1:8000/audio/{path}"
 
+    async def fake_synthesize_async(text: str, emotion: str = "calm") -> str:
+        return fake_synthesize(text, emotion)
+
+    async def fake_public_async(path: str) -> str:
+        return fake_public(path)
+
     api_calls: list[ApiCall] = []
     samples: dict[str, list[dict[str, Any]]] = {
         "normal_qa": [],
@@ -362,17 +390,46 @@ def run(rounds: int = 3, use_live_provider: bool = False) -> dict[str, Any]:
     try:
         if not use_live_provider:
             settings.llm_provider = "mock"
-            chat_api.knowledge_service.search = fake_search
-            chat_service.web_search_service.search_public_web = lambda *_args, **_kwargs: []
-            chat_api.tts_service.synthesize = fake_synthesize
-            chat_api.tts_service.public_audio_url = fake_public
+            chat_api.knowledge_service.search_async = fake_search_async
+            chat_api.knowledge_service.search_many_async = fake_search_many_async
+            chat_service.web_search_service.search_public_web_async = fake_web_search_async
+            chat_api.tts_service.synthesize_async = fake_synthesize_async
+            chat_api.tts_service.public_audio_url_async = fake_public_async
             case_api.tts_service.synthesize = fake_synthesize
             case_api.tts_service.public_audio_url = fake_public
 
         with TestClient(app) as client:
+            # 全部问答与两项设置校验放进同一次 /api/chat/batch 并发执行，再按原顺序逐条判定。
+            chat_items = [
+                *(
+                    _chat_item(text, f"final_legal_r{r}_{i}", enable_tts=True)
+                    for r in range(1, rounds + 1)
+                    for i, text in enumerate(LEGAL_QA, start=1)
+                ),
+                *(
+                    _chat_item(text, f"final_short_r{r}_{i}", enable_tts=True)
+                    for r in range(1, rounds + 1)
+                    for i, text in enumerate(SHORT_Q, start=1)
+                ),
+                *(
+                    _chat_item(text, f"final_ood_r{r}_{i}", enable_tts=False, citation_strict=True)
+                    for r in range(1, rounds + 1)
+                    for i, text in enumerate(OOD_Q, start=1)
+                ),
+                *(
+                    _chat_item(text, f"final_insufficient_r{r}_{i}", enable_tts=False)
+                    for r in range(1, rounds + 1)
+                    for i, text in enumerate(INSUFFICIENT_Q, start=1)
+                ),
+                _chat_item("网购不退款怎么处理？", "final_setting_tts_off", enable_tts=False),
+                _chat_item("帮我预测明天股票涨跌", "final_setting_citation_strict", enable_tts=False, citation_strict=True),
+            ]
+            chat_results = _chat_batch(client, chat_items)
+            missing = ({"status": 0, "body": {}}, 0.0)
+
             for r in range(1, rounds + 1):
                 for i, text in enumerate(LEGAL_QA, start=1):
-                    resp, latency = _chat(client, text=text, session_id=f"final_legal_r{r}_{i}", enable_tts=True)
+                    resp, latency = chat_results.get(f"final_legal_r{r}_{i}", missing)
                     body = resp["body"]
                     answer = body.get("answer_json") if isinstance(body, dict) else {}
                     citations = answer.get("citations") if isinstance(answer, dict) else []
@@ -411,7 +468,7 @@ def run(rounds: int = 3, use_live_provider: bool = False) -> dict[str, Any]:
 
             for r in range(1, rounds + 1):
                 for i, text in enumerate(SHORT_Q, start=1):
-                    resp, latency = _chat(client, text=text, session_id=f"final_short_r{r}_{i}", enable_tts=True)
+                    resp, latency = chat_results.get(f"final_short_r{r}_{i}", missing)
                     body = resp["body"]
                     answer = body.get("answer_json") if isinstance(body, dict) else {}
                     citations = answer.get("citations") if isinstance(answer, dict) else []
@@ -433,7 +490,7 @@ def run(rounds: int = 3, use_live_provider: bool = False) -> dict[str, Any]:
 
             for r in range(1, rounds + 1):
                 for i, text in enumerate(OOD_Q, start=1):
-                    resp, latency = _chat(client, text=text, session_id=f"final_ood_r{r}_{i}", enable_tts=False, citation_strict=True)
+                    resp, latency = chat_results.get(f"final_ood_r{r}_{i}", missing)
                     body = resp["body"]
                     answer = body.get("answer_json") if isinstance(body, dict) else {}
                     conclusion = str(answer.get("conclusion") or "")
@@ -455,7 +512,7 @@ def run(rounds: int = 3, use_live_provider: bool = False) -> dict[str, Any]:
 
             for r in range(1, rounds + 1):
                 for i, text in enumerate(INSUFFICIENT_Q, start=1):
-                    resp, latency = _chat(client, text=text, session_id=f"final_insufficient_r{r}_{i}", enable_tts=False)
+                    resp, latency = chat_results.get(f"final_insufficient_r{r}_{i}", missing)
                     body = resp["body"]
                     answer = body.get("answer_json") if isinstance(body, dict) else {}
                     citations = answer.get("citations") if isinstance(answer, dict) else []
@@ -497,10 +554,17 @@ def run(rounds: int = 3, use_live_provider: bool = False) -> dict[str, Any]:
                             }
                         )
 
-            # 设置联动验证 1: top_k=1 与 top_k=5
+            # 设置联动验证 1: top_k=1 与 top_k=5（单独一批，只观察这两条的检索参数）
             search_calls.clear()
-            r1, l1 = _chat(client, text="房东不退押金，如何维权？", session_id="final_setting_topk_1", top_k=1, enable_tts=False)
-            r2, l2 = _chat(client, text="房东不退押金，如何维权？", session_id="final_setting_topk_5", top_k=5, enable_tts=False)
+            topk_results = _chat_batch(
+                client,
+                [
+                    _chat_item("房东不退押金，如何维权？", "final_setting_topk_1", top_k=1, enable_tts=False),
+                    _chat_item("房东不退押金，如何维权？", "final_setting_topk_5", top_k=5, enable_tts=False),
+                ],
+            )
+            r1, l1 = topk_results.get("final_setting_topk_1", missing)
+            r2, l2 = topk_results.get("final_setting_topk_5", missing)
             api_calls.extend(
                 [
                     ApiCall("chat", l1, r1["status"] == 200),
@@ -512,7 +576,7 @@ def run(rounds: int = 3, use_live_provider: bool = False) -> dict[str, Any]:
             settings_pass += 1 if topk_check else 0
 
             # 设置联动验证 2: enable_tts=false => audio_url=null
-            r3, l3 = _chat(client, text="网购不退款怎么处理？", session_id="final_setting_tts_off", enable_tts=False)
+            r3, l3 = chat_results.get("final_setting_tts_off", missing)
             api_calls.append(ApiCall("chat", l3, r3["status"] == 200))
             tts_off_check = r3["status"] == 200 and r3["body"].get("audio_url") is None
             settings_pass += 1 if tts_off_check else 0
@@ -522,13 +586,7 @@ def run(rounds: int = 3, use_live_provider: bool = False) -> dict[str, Any]:
             settings_pass += 1 if avatar_ok else 0
 
             # 设置联动验证 4: citation_strict=true + 领域外 => citations=[]
-            r4, l4 = _chat(
-                client,
-                text="帮我预测明天股票涨跌",
-                session_id="final_setting_citation_strict",
-                citation_strict=True,
-                enable_tts=False,
-            )
+            r4, l4 = chat_results.get("final_setting_citation_strict", missing)
             api_calls.append(ApiCall("chat", l4, r4["status"] == 200))
             ans4 = r4["body"].get("answer_json") if isinstance(r4["body"], dict) else {}
             strict_check = r4["status"] == 200 and isinstance(ans4.get("citations"), list) and len(ans4.get("citations") or []) == 0
@@ -561,10 +619,11 @@ def run(rounds: int = 3, use_live_provider: bool = False) -> dict[str, Any]:
 
     finally:
         settings.llm_provider = old_llm_provider
-        chat_api.knowledge_service.search = old_chat_search
-        chat_service.web_search_service.search_public_web = old_web_search
-        chat_api.tts_service.synthesize = old_chat_tts_synthesize
-        chat_api.tts_service.public_audio_url = old_chat_tts_public
+        chat_api.knowledge_service.search_async = old_chat_search
+        chat_api.knowledge_service.search_many_async = old_chat_search_many
+        chat_service.web_search_service.search_public_web_async = old_web_search
+        chat_api.tts_service.synthesize_async = old_chat_tts_synthesize
+        chat_api.tts_service.public_audio_url_async = old_chat_tts_public
         case_api.tts_service.synthesize = old_case_tts_synthesize
         case_api.tts_service.public_audio_url = old_case_tts_public
 
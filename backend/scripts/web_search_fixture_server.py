@@ -0,0 +1,150 @@
+import argparse
+import html
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from urllib import parse
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "backend"))
+
+from app.services import circuit_breaker  # noqa: E402
+from app.services import web_search  # noqa: E402
+from app.services.web_search import settings  # noqa: E402
+
+# 离线模拟 DuckDuckGo HTML 结果页（同样的 result__a / result__snippet 结构），
+# 可配置延迟与故障，用于在不访问外网的情况下压测 web_search 的缓存与退避。
+
+
+class FixtureState:
+    latency_ms = 0
+    fail = False
+    results = 8
+    requests = 0
+
+
+def render_results(query: str, count: int) -> str:
+    blocks = []
+    for idx in range(count):
+        target = parse.quote(f"https://law.example.com/{idx}?q={query}", safe="")
+        blocks.append(
+            '<div class="result results_links web-result"><div class="links_main links_deep result__body">'
+            f'<h2 class="result__title"><a rel="nofollow" class="result__a" href="//duckduckgo.com/l/?uddg={target}&amp;rut=x">'
+            f"{html.escape(query)} 相关法律解读 <b>{idx + 1}</b></a></h2>"
+            f'<a class="result__snippet" href="//duckduckgo.com/l/?uddg={target}">'
+            f"根据<b>民法典</b>等规定，{html.escape(query)}的处理方式 &amp; 维权步骤示例 {idx + 1}。</a>"
+            "</div></div>"
+        )
+    return "<html><body><div id=\"links\">" + "".join(blocks) + "</div></body></html>"
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:  # noqa: N802
+        FixtureState.requests += 1
+        if FixtureState.latency_ms:
+            time.sleep(FixtureState.latency_ms / 1000)
+        if FixtureState.fail:
+            self._reply(503, b"unavailable")
+            return
+        query = parse.parse_qs(parse.urlparse(self.path).query).get("q", [""])[0]
+        self._reply(200, render_results(query, FixtureState.results).encode("utf-8"))
+
+    def _reply(self, status: int, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        return
+
+
+def start_server(port: int = 0) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_bench(rounds: int, latency_ms: int) -> list[dict[str, Any]]:
+    """cold：每次新查询；warm：重复查询命中缓存；outage：搜索源 503，首个失败后进入退避。"""
+    server = start_server()
+    settings.web_search_base_url = f"http://127.0.0.1:{server.server_address[1]}/html/"
+    settings.circuit_breaker_enabled = False
+    FixtureState.latency_ms = latency_ms
+    web_search.clear_cache()
+    circuit_breaker.reset()
+    results = []
+    try:
+        for phase in ("cold", "warm", "outage"):
+            FixtureState.fail = phase == "outage"
+            FixtureState.requests = 0
+            if phase == "outage":
+                web_search.clear_cache()
+            latencies = []
+            for idx in range(rounds):
+                query = f"房东不退押金 {idx}" if phase == "cold" else "房东不退押金 法律"
+                if phase == "outage":
+                    query = f"拖欠工资 {idx}"
+                started = time.perf_counter()
+                web_search.search_public_web(query, limit=4, timeout_sec=5)
+                latencies.append((time.perf_counter() - started) * 1000)
+            latencies.sort()
+            results.append(
+                {
+                    "phase": phase,
+                    "rounds": rounds,
+                    "upstream_requests": FixtureState.requests,
+                    "avg_ms": round(sum(latencies) / len(latencies), 3),
+                    "p90_ms": round(latencies[min(len(latencies) - 1, int(0.9 * len(latencies)))], 3),
+                }
+            )
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline DuckDuckGo-style fixture server for web_search benchmarks.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=int, default=300, help="Artificial upstream latency per request.")
+    parser.add_argument("--results", type=int, default=8, help="Results rendered per page.")
+    parser.add_argument("--fail", action="store_true", help="Answer every request with 503 (outage mode).")
+    parser.add_argument("--bench", action="store_true", help="Run the cold/warm/outage benchmark in-process and exit.")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--report-json", default="", help="Optional JSON report output path (bench mode).")
+    args = parser.parse_args()
+
+    FixtureState.results = max(0, args.results)
+    if args.bench:
+        results = run_bench(args.rounds, args.latency_ms)
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        if args.report_json:
+            path = Path(args.report_json)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        return 0
+
+    FixtureState.latency_ms = args.latency_ms
+    FixtureState.fail = args.fail
+    server = start_server(args.port)
+    print(f"fixture search at http://127.0.0.1:{server.server_address[1]}/html/ (set WEB_SEARCH_BASE_URL)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.api.v1.chat import handle_chat
+from app.main import app
+from app.schemas.chat import AnswerJson
+from app.schemas.common import Citation
+from app.services import answer_cache
+from app.services import answer_warmup
+from app.services import http_client
+from app.services import runtime_config as runtime_config_service
+
+_EVIDENCE = [
+    {"chunk_id": "c1", "law_name": "民法典", "article_no": "第七百零三条", "text": "租赁合同押金返还", "source_type": "law"}
+]
+
+
+def _answer(conclusion: str = "押金应依约返还") -> dict:
+    return {"conclusion": conclusion, "analysis": ["依据租赁合同"], "actions": ["协商"], "citations": [], "emotion": "calm"}
+
+
+class AnswerCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        patcher = patch.multiple(
+            answer_cache.settings,
+            answer_cache_enabled=True,
+            answer_cache_db_path=str(Path(self.tmpdir.name) / "answer_cache.db"),
+            answer_cache_max_entries=2,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        answer_cache.clear()
+
+    def tearDown(self) -> None:
+        answer_cache.clear()
+        self.tmpdir.cleanup()
+
+    def test_key_normalizes_question_and_depends_on_evidence_and_corpus(self) -> None:
+        key = answer_cache.cache_key("房东不退押金怎么办？", {"rent"}, ["c2", "c1"], "default", "v1")
+        self.assertEqual(key, answer_cache.cache_key(" 房东 不退押金怎么办", ["rent"], ["c1", "c2"], "default", "v1"))
+        self.assertNotEqual(key, answer_cache.cache_key("房东不退押金怎么办", {"rent"}, ["c1"], "default", "v1"))
+        self.assertNotEqual(key, answer_cache.cache_key("房东不退押金怎么办", {"rent"}, ["c1", "c2"], "fast", "v1"))
+        self.assertNotEqual(key, answer_cache.cache_key("房东不退押金怎么办", {"rent"}, ["c1", "c2"], "default", "v2"))
+
+    def test_pinned_entries_survive_eviction_ttl_and_restart(self) -> None:
+        answer_cache.put("k1", "问题一", "default", _answer("一"), "/static/audio/1.wav")
+        self.assertTrue(answer_cache.pin("k1"))
+        answer_cache.put("k2", "问题二", "default", _answer("二"))
+        answer_cache.put("k3", "问题三", "default", _answer("三"))
+        answer_cache.put("k4", "问题四", "default", _answer("四"))
+        self.assertIsNone(answer_cache.get("k2"))
+        self.assertEqual(answer_cache.get("k1")["audio_url"], "/static/audio/1.wav")
+
+        with patch.object(answer_cache.settings, "answer_cache_ttl_sec", 1):
+            with answer_cache._CACHE_LOCK:
+                for entry in answer_cache._CACHE.values():
+                    entry["created_at"] -= 10
+            self.assertIsNone(answer_cache.get("k3"))
+            self.assertEqual(answer_cache.get("k1")["answer"]["conclusion"], "一")
+
+        with answer_cache._CACHE_LOCK:
+            answer_cache._CACHE.clear()
+        # 重启后从 SQLite 恢复：置顶条目不占容量，过期判断按持久化的创建时间。
+        self.assertEqual(answer_cache.warm(), 3)
+        self.assertEqual(answer_cache.purge(), 2)
+        self.assertEqual([item["key"] for item in answer_cache.list_entries()], ["k1"])
+        self.assertEqual(answer_cache.purge(include_pinned=True), 1)
+
+
+class AnswerCacheChatTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.client = TestClient(app)
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        patcher = patch.multiple(
+            answer_cache.settings,
+            answer_cache_enabled=True,
+            answer_cache_db_path=str(Path(self.tmpdir.name) / "answer_cache.db"),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        answer_cache.clear()
+
+    def tearDown(self) -> None:
+        answer_cache.clear()
+        self.tmpdir.cleanup()
+
+    def _post(self, session_id: str) -> dict:
+        resp = self.client.post(
+            "/api/chat",
+            json={"session_id": session_id, "text": "房东不退押金怎么办", "mode": "chat", "case_state": None, "enable_tts": True},
+        )
+        self.assertEqual(resp.status_code, 200)
+        return resp.json()
+
+    @patch("app.api.v1.chat.metrics_service.record_api_call")
+    @patch("app.api.v1.chat.session_store.get_chat_history_async", side_effect=lambda _session_id: [])
+    @patch("app.api.v1.chat.tts_service.public_audio_url_async", side_effect=lambda url: url)
+    @patch("app.api.v1.chat.tts_service.synthesize_async", return_value="/static/audio/deposit.wav")
+    @patch("app.services.chat._ask_ark_async")
+    @patch("app.api.v1.chat.knowledge_service.search_async", return_value=_EVIDENCE)
+    def test_repeat_question_reuses_answer_and_audio_and_admin_can_purge(
+        self, mock_search, mock_ask, mock_tts, mock_public, mock_history, mock_metrics
+    ) -> None:
+        mock_ask.return_value = AnswerJson(
+            conclusion="房东无正当理由不得扣留押金，可要求返还。",
+            analysis=["押金属于担保，租期届满应返还。"],
+            actions=["保留租赁合同与付款凭证"],
+            citations=[Citation(chunk_id="c1", law_name="民法典", article_no="第七百零三条")],
+            emotion="calm",
+        )
+        with patch("app.services.chat._answer_llm_configured", return_value=True):
+            first = self._post("s_answer_cache_1")
+            second = self._post("s_answer_cache_2")
+
+        self.assertEqual(mock_ask.call_count, 1)
+        self.assertEqual(mock_tts.call_count, 1)
+        self.assertEqual(second["answer_json"], first["answer_json"])
+        self.assertEqual(second["audio_url"], "/static/audio/deposit.wav")
+        metas = [call.kwargs["meta"] for call in mock_metrics.call_args_list]
+        self.assertEqual([meta["answer_cache_hit"] for meta in metas], [False, True])
+
+        state = self.client.get("/api/admin/answer-cache").json()
+        self.assertEqual((state["entries"], state["hits"], state["misses"]), (1, 1, 1))
+        key = state["items"][0]["key"]
+        self.assertTrue(self.client.post(f"/api/admin/answer-cache/{key}/pin").json()["items"][0]["pinned"])
+        self.assertEqual(self.client.post("/api/admin/answer-cache/nope/pin").status_code, 404)
+        self.assertEqual(self.client.delete("/api/admin/answer-cache").json()["purged"], 0)
+        self.assertEqual(self.client.delete("/api/admin/answer-cache", params={"key": key}).json()["purged"], 1)
+
+    @patch("app.api.v1.chat.metrics_service.record_api_call")
+    @patch("app.api.v1.chat.session_store.get_chat_history_async")
+    @patch("app.services.chat._ask_ark_async", return_value=None)
+    @patch("app.api.v1.chat.knowledge_service.search_async", return_value=_EVIDENCE)
+    def test_fallback_answers_and_follow_up_turns_are_not_cached(
+        self, mock_search, mock_ask, mock_history, mock_metrics
+    ) -> None:
+        mock_history.return_value = []
+        with patch("app.services.chat._answer_llm_configured", return_value=True):
+            self._post("s_answer_cache_fallback")
+            mock_history.return_value = [{"role": "user", "content": "之前的问题"}, {"role": "assistant", "content": "之前的回答"}]
+            self._post("s_answer_cache_history")
+
+        self.assertEqual(answer_cache.get_stats()["entries"], 0)
+        metas = [call.kwargs["meta"] for call in mock_metrics.call_args_list]
+        self.assertEqual([meta["answer_cache_eligible"] for meta in metas], [True, False])
+
+    @patch("app.api.v1.chat.metrics_service.record_api_call")
+    @patch("app.api.v1.chat.session_store.save_chat_history_async", return_value=1)
+    @patch("app.api.v1.chat.session_store.get_chat_history_async", side_effect=lambda _session_id: [])
+    @patch("app.services.chat._chat_completion_stream_async")
+    @patch("app.api.v1.chat.knowledge_service.search_async", return_value=_EVIDENCE)
+    def test_stream_cut_off_midway_is_not_cached(self, mock_search, mock_stream, mock_history, mock_save, mock_metrics) -> None:
+        async def cut_off(*_args, **_kwargs):
+            yield "房东应退还押金。根据民"
+            raise http_client.UpstreamError("RemoteProtocolError: peer closed connection")
+
+        async def complete(*_args, **_kwargs):
+            yield "房东应退还押金。\n[[CITATIONS:c1]]"
+
+        def post(session_id: str) -> dict:
+            resp = self.client.post(
+                "/api/chat/stream",
+                json={"session_id": session_id, "text": "房东不退押金怎么办", "mode": "chat", "enable_tts": False},
+            )
+            return json.loads(resp.text.splitlines()[-1])
+
+        mock_stream.side_effect = cut_off
+        final = post("s_stream_cut_off")
+        self.assertEqual(final["type"], "final")
+        self.assertEqual(answer_cache.list_entries(), [])
+
+        mock_stream.side_effect = complete
+        post("s_stream_complete")
+        self.assertEqual([item["conclusion"] for item in answer_cache.list_entries()], ["房东应退还押金。"])
+
+    @patch("app.api.v1.chat.metrics_service.record_api_call")
+    @patch("app.services.answer_warmup.session_store.delete_chat_history_async")
+    @patch("app.api.v1.chat.session_store.save_chat_history_async")
+    @patch("app.api.v1.chat.session_store.get_chat_history_async", side_effect=lambda _session_id: [])
+    @patch("app.api.v1.chat.tts_service.public_audio_url_async", side_effect=lambda url: url)
+    @patch("app.api.v1.chat.tts_service.synthesize_async", return_value="/static/audio/warm.wav")
+    @patch("app.services.chat._ask_ark_async")
+    @patch("app.api.v1.chat.knowledge_service.search_async", return_value=_EVIDENCE)
+    def test_warmup_precomputes_suggested_questions_for_first_click(
+        self, mock_search, mock_ask, mock_tts, mock_public, mock_history, mock_save, mock_delete, mock_metrics
+    ) -> None:
+        mock_ask.return_value = AnswerJson(
+            conclusion="房东无正当理由不得扣留押金，可要求返还。",
+            analysis=["押金属于担保，租期届满应返还。"],
+            actions=["保留租赁合同与付款凭证"],
+            citations=[Citation(chunk_id="c1", law_name="民法典", article_no="第七百零三条")],
+            emotion="calm",
+        )
+        question = "房东不退押金怎么办"
+        with (
+            patch.object(answer_cache.settings, "suggested_questions", question),
+            patch.object(answer_cache.settings, "tts_enabled", True),
+            patch("app.services.chat._answer_llm_configured", return_value=True),
+        ):
+            self.assertEqual(self.client.get("/api/chat/suggestions").json()["questions"], [question])
+            asyncio.run(answer_warmup.run(handle_chat))
+            runtime = runtime_config_service.get_runtime_config()
+            # 前端总是显式带上生成参数；与服务端默认值一致时仍命中预热结果。
+            resp = self.client.post(
+                "/api/chat",
+                json={
+                    "session_id": "s_after_warmup",
+                    "text": question,
+                    "temperature": runtime.temperature,
+                    "max_tokens": runtime.max_tokens,
+                    "citation_strict": runtime.strict_citation_check,
+                    "enable_tts": True,
+                },
+            )
+
+        self.assertEqual(mock_ask.call_count, 1)
+        self.assertEqual(resp.json()["audio_url"], "/static/audio/warm.wav")
+        self.assertEqual([call.kwargs["endpoint"] for call in mock_metrics.call_args_list], ["chat_warmup", "chat"])
+        self.assertTrue(mock_metrics.call_args.kwargs["meta"]["answer_cache_hit"])
+        state = self.client.get("/api/admin/answer-cache/warmup").json()
+        self.assertEqual((state["status"], state["total"], state["completed"], state["failed"]), ("done", 1, 1, 0))
+        self.assertTrue(state["items"][0]["audio_ready"])
+        self.assertEqual(state["cache_entries"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -75,6 +75,8 @@ class ApiAdminMetricsTests(unittest.TestCase):
                 "citations": 1,
                 "answer_emotion": "calm",
                 "no_local_evidence_external_reference": False,
+                "tts_speculative_hit": True,
+                "tts_overlap_ms": 120.0,
             },
         )
         metrics_service.record_api_call(
@@ -102,6 +104,8 @@ class ApiAdminMetricsTests(unittest.TestCase):
         self.assertAlmostEqual(payload["no_local_evidence_external_reference_rate"], 1.0)
         self.assertEqual(payload["chat_latency"]["sample_size"], 2)
         self.assertEqual(payload["case_step_latency"]["sample_size"], 1)
+        self.assertEqual(payload["chat_tts_speculative_hits"], 1)
+        self.assertAlmostEqual(payload["chat_tts_overlap_saved_ms_avg"], 120.0)
 
 
 if __name__ == "__main__":
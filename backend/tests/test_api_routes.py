@@ -1,3 +1,5 @@
+import asyncio
+import json
 import unittest
 import base64
 from unittest.mock import patch
@@ -15,8 +17,8 @@ class ApiRoutesTests(unittest.TestCase):
     def setUpClass(cls) -> None:
         cls.client = TestClient(app)
 
-    @patch("app.api.v1.chat.chat_service.build_answer")
-    @patch("app.api.v1.chat.knowledge_service.search")
+    @patch("app.api.v1.chat.chat_service.build_answer_async")
+    @patch("app.api.v1.chat.knowledge_service.search_async")
     def test_chat_success(self, mock_search, mock_build_answer) -> None:
         mock_search.return_value = [{"chunk_id": "c1", "law_name": "民法典", "article_no": "第一条"}]
         mock_build_answer.return_value = AnswerJson(
@@ -43,9 +45,9 @@ class ApiRoutesTests(unittest.TestCase):
         self.assertIn("押金返还", search_query)
         self.assertEqual(mock_search.call_args.args[1], 1)
 
-    @patch("app.api.v1.chat.tts_service.synthesize")
-    @patch("app.api.v1.chat.chat_service.build_answer")
-    @patch("app.api.v1.chat.knowledge_service.search")
+    @patch("app.api.v1.chat.tts_service.synthesize_async")
+    @patch("app.api.v1.chat.chat_service.build_answer_async")
+    @patch("app.api.v1.chat.knowledge_service.search_async")
     def test_chat_enable_tts_false_skips_tts(self, mock_search, mock_build_answer, mock_tts) -> None:
         mock_search.return_value = [{"chunk_id": "c1", "law_name": "民法典", "article_no": "第一条"}]
         mock_build_answer.return_value = AnswerJson(
@@ -68,11 +70,15 @@ class ApiRoutesTests(unittest.TestCase):
         mock_tts.assert_not_called()
 
     @patch("app.api.v1.chat.chat_service.build_answer_from_stream_text")
-    @patch("app.api.v1.chat.chat_service.stream_answer_text")
-    @patch("app.api.v1.chat.knowledge_service.search")
+    @patch("app.api.v1.chat.chat_service.stream_answer_text_async")
+    @patch("app.api.v1.chat.knowledge_service.search_async")
     def test_chat_stream_success(self, mock_search, mock_stream_answer, mock_build_stream_answer) -> None:
         mock_search.return_value = [{"chunk_id": "c1", "law_name": "民法典", "article_no": "第一条"}]
-        mock_stream_answer.return_value = iter(["测试", "结论"])
+        async def fake_stream(*_args, **_kwargs):
+            for delta in ["测试", "结论"]:
+                yield delta
+
+        mock_stream_answer.side_effect = fake_stream
         mock_build_stream_answer.return_value = AnswerJson(
             conclusion="测试结论",
             analysis=["分析1"],
@@ -92,9 +98,137 @@ class ApiRoutesTests(unittest.TestCase):
         self.assertIn('"type": "delta"', body)
         self.assertIn('"type": "final"', body)
 
-    @patch("app.api.v1.chat.tts_service.synthesize")
-    @patch("app.api.v1.chat.chat_service.build_answer")
-    @patch("app.api.v1.chat.knowledge_service.search")
+    @patch("app.api.v1.chat.tts_service.public_audio_url_async")
+    @patch("app.api.v1.chat.tts_service.synthesize_async")
+    @patch("app.api.v1.chat.chat_service.stream_answer_text_async")
+    @patch("app.api.v1.chat.knowledge_service.search_async")
+    def test_chat_stream_emits_sentence_audio_before_answer_finishes(
+        self, mock_search, mock_stream_answer, mock_tts, mock_public_url
+    ) -> None:
+        mock_search.return_value = [{"chunk_id": "c1", "law_name": "民法典", "article_no": "第一条", "text": "押金返还"}]
+
+        async def fake_stream(*_args, **_kwargs):
+            for delta in ["押金应在合同终止后", "依约返还给承租人。", "建议：保留转账凭证", "并书面催告房东。", "\n[[CITATIONS:c1]]"]:
+                await asyncio.sleep(0.02)
+                yield delta
+
+        async def fake_tts(text, emotion="calm"):
+            # 第一句合成更慢，验证 audio 事件仍按句序输出。
+            await asyncio.sleep(0.03 if text.startswith("押金") else 0.0)
+            return f"data:{text}"
+
+        mock_stream_answer.side_effect = fake_stream
+        mock_tts.side_effect = fake_tts
+        mock_public_url.side_effect = lambda url: url
+
+        resp = self.client.post(
+            "/api/chat/stream",
+            json={"session_id": "s_stream_tts", "text": "房东不退押金", "mode": "chat", "case_state": None, "enable_tts": True},
+        )
+        events = [json.loads(line) for line in resp.text.splitlines() if line.strip()]
+        kinds = [event["type"] for event in events]
+        audio = [event for event in events if event["type"] == "audio"]
+        self.assertEqual([event["seq"] for event in audio], [0, 1])
+        self.assertEqual(audio[0]["text"], "押金应在合同终止后依约返还给承租人。")
+        self.assertNotIn("CITATIONS", audio[1]["text"])
+        last_delta = max(idx for idx, kind in enumerate(kinds) if kind == "delta")
+        self.assertLess(kinds.index("audio"), last_delta)
+        final = events[kinds.index("final")]
+        self.assertTrue(final["audio_streaming"])
+        self.assertIsNone(final["audio_url"])
+
+    @patch("app.api.v1.chat.session_store.save_chat_history_async")
+    @patch("app.api.v1.chat.chat_service.stream_answer_text_async")
+    @patch("app.api.v1.chat.knowledge_service.search_async")
+    def test_chat_stream_sends_evidence_early_and_saves_history_after_final(
+        self, mock_search, mock_stream_answer, mock_save
+    ) -> None:
+        mock_search.return_value = [{"chunk_id": "c1", "law_name": "民法典", "article_no": "第七百零三条", "text": "租赁合同"}]
+
+        async def fake_stream(*_args, **_kwargs):
+            for delta in ["押金应依约返还。\n[[CITA", "TIONS:c1]", "]"]:
+                yield delta
+
+        mock_stream_answer.side_effect = fake_stream
+
+        resp = self.client.post(
+            "/api/chat/stream",
+            json={"session_id": "s_stream_early", "text": "房东不退押金", "mode": "chat", "case_state": None, "enable_tts": False},
+        )
+        events = [json.loads(line) for line in resp.text.splitlines() if line.strip()]
+        kinds = [event["type"] for event in events]
+        self.assertLess(kinds.index("evidence"), kinds.index("delta"))
+        self.assertEqual(events[kinds.index("evidence")]["citations"][0]["chunk_id"], "c1")
+        self.assertNotIn("CITATIONS", "".join(event["text"] for event in events if event["type"] == "delta"))
+        self.assertEqual(events[kinds.index("citations")]["chunk_ids"], ["c1"])
+        self.assertLess(kinds.index("citations"), kinds.index("final"))
+        self.assertEqual(kinds[-1], "final")
+        # 历史在响应结束后的后台任务中保存。
+        mock_save.assert_called_once()
+        self.assertEqual(mock_save.call_args.args[1][-1]["content"], "押金应依约返还。")
+
+    @patch("app.api.v1.chat.tts_service.public_audio_url_async")
+    @patch("app.api.v1.chat.tts_service.synthesize_async")
+    @patch("app.services.chat.llm_cache.cache_key", return_value=None)
+    @patch("app.services.chat._answer_llm_configured", return_value=True)
+    @patch("app.services.chat._chat_completion_stream_async")
+    @patch("app.api.v1.chat.knowledge_service.search_async")
+    def test_chat_starts_tts_when_json_conclusion_closes(
+        self, mock_search, mock_stream, _mock_configured, _mock_cache_key, mock_tts, mock_public_url
+    ) -> None:
+        mock_search.return_value = [
+            {"chunk_id": "c1", "law_name": "民法典", "article_no": "第七百零三条", "text": "租赁合同押金返还", "source_type": "law"}
+        ]
+        order: list[str] = []
+        conclusion = "房东无正当理由不退押金，可要求返还押金。"
+
+        async def fake_stream(*_args, **_kwargs):
+            chunks = ['{"conclusion":"', conclusion, '","analysis":["押金属于担保"],', '"actions":["保留凭证"],"emotion":"calm",', '"citation_chunk_ids":["c1"]}']
+            for chunk in chunks:
+                await asyncio.sleep(0.01)
+                yield chunk
+            order.append("llm_done")
+
+        async def fake_tts(text, emotion="calm"):
+            order.append("tts_started")
+            return f"data:{text}"
+
+        mock_stream.side_effect = fake_stream
+        mock_tts.side_effect = fake_tts
+        mock_public_url.side_effect = lambda url: url
+
+        resp = self.client.post(
+            "/api/chat",
+            json={"session_id": "s_json_tts", "text": "房东不退押金怎么办", "mode": "chat", "case_state": None, "enable_tts": True},
+        )
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["answer_json"]["conclusion"], conclusion)
+        self.assertEqual(resp.json()["audio_url"], f"data:{conclusion}")
+        self.assertEqual(order, ["tts_started", "llm_done"])
+        mock_tts.assert_called_once()
+
+    @patch("app.services.chat.circuit_breaker.is_open", return_value=True)
+    @patch("app.api.v1.chat.chat_service.stream_answer_text_async")
+    @patch("app.api.v1.chat.knowledge_service.search_async")
+    def test_chat_stream_skips_llm_while_breaker_is_open(self, mock_search, mock_stream_answer, _mock_open) -> None:
+        mock_search.return_value = [
+            {"chunk_id": "c1", "law_name": "民法典", "article_no": "第七百零三条", "text": "租赁合同押金返还", "source_type": "law"}
+        ]
+
+        resp = self.client.post(
+            "/api/chat/stream",
+            json={"session_id": "s_stream_breaker", "text": "房东不退押金", "mode": "chat", "case_state": None, "enable_tts": False},
+        )
+
+        events = [json.loads(line) for line in resp.text.splitlines() if line.strip()]
+        self.assertEqual(events[-1]["type"], "final")
+        self.assertTrue(events[-1]["answer_json"]["conclusion"])
+        mock_stream_answer.assert_not_called()
+
+    @patch("app.api.v1.chat.tts_service.synthesize_async")
+    @patch("app.api.v1.chat.chat_service.build_answer_async")
+    @patch("app.api.v1.chat.knowledge_service.search_async")
     def test_chat_tts_failure_does_not_break_response(self, mock_search, mock_build_answer, mock_tts) -> None:
         mock_search.return_value = [{"chunk_id": "c1", "law_name": "民法典", "article_no": "第一条"}]
         mock_build_answer.return_value = AnswerJson(
@@ -115,8 +249,8 @@ class ApiRoutesTests(unittest.TestCase):
         self.assertEqual(resp.status_code, 200)
         self.assertIsNone(resp.json()["audio_url"])
 
-    @patch("app.api.v1.chat.chat_service.build_answer")
-    @patch("app.api.v1.chat.knowledge_service.search")
+    @patch("app.api.v1.chat.chat_service.build_answer_async")
+    @patch("app.api.v1.chat.knowledge_service.search_async")
     def test_chat_failure(self, mock_search, mock_build_answer) -> None:
         mock_search.return_value = []
         mock_build_answer.side_effect = RuntimeError("boom")
@@ -0,0 +1,96 @@
+import asyncio
+import base64
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import bulkhead
+
+
+class BulkheadTests(unittest.TestCase):
+    def setUp(self) -> None:
+        bulkhead.reset()
+
+    def tearDown(self) -> None:
+        bulkhead.reset()
+
+    def test_queue_hands_slot_to_waiter_and_rejects_overflow(self) -> None:
+        hull = bulkhead.Bulkhead("test", max_concurrent=1, max_queue=1, queue_timeout_sec=2)
+        hull.acquire()
+        admitted = threading.Event()
+
+        def waiter() -> None:
+            hull.acquire()
+            admitted.set()
+            hull.release(5)
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        while hull.snapshot()["queued"] == 0:
+            time.sleep(0.005)
+
+        with self.assertRaises(bulkhead.BulkheadFullError) as ctx:
+            hull.acquire()
+        self.assertEqual(ctx.exception.status_code, 429)
+        self.assertGreaterEqual(ctx.exception.retry_after_sec, 1)
+
+        hull.release(20)
+        thread.join(2)
+        self.assertTrue(admitted.is_set())
+        snapshot = hull.snapshot()
+        self.assertEqual((snapshot["active"], snapshot["queued"]), (0, 0))
+        self.assertEqual((snapshot["admitted"], snapshot["rejected"], snapshot["peak_queued"]), (2, 1, 1))
+
+    def test_async_waiter_times_out_with_503(self) -> None:
+        hull = bulkhead.Bulkhead("test", max_concurrent=1, max_queue=2, queue_timeout_sec=0.05)
+
+        async def run() -> None:
+            await hull.acquire_async()
+            try:
+                await hull.acquire_async()
+            finally:
+                hull.release()
+
+        with self.assertRaises(bulkhead.BulkheadFullError) as ctx:
+            asyncio.run(run())
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertEqual(hull.snapshot()["timed_out"], 1)
+        self.assertEqual(hull.snapshot()["queued"], 0)
+
+    def test_nested_guard_with_same_name_does_not_take_second_slot(self) -> None:
+        with patch("app.services.bulkhead.settings.bulkhead_limits", "tts=1:0"):
+            with bulkhead.guard("tts"):
+                with bulkhead.guard("tts"):
+                    self.assertEqual(bulkhead.get_bulkhead("tts").snapshot()["active"], 1)
+            self.assertEqual(bulkhead.get_bulkhead("tts").snapshot()["active"], 0)
+            self.assertIsNone(bulkhead.get_bulkhead("unknown"))
+
+    def test_saturated_endpoint_returns_429_with_retry_after(self) -> None:
+        client = TestClient(app)
+        audio = base64.b64encode(b"RIFF0000WAVE").decode()
+        with patch("app.services.bulkhead.settings.bulkhead_limits", "asr=1:0"):
+            hull = bulkhead.get_bulkhead("asr")
+            hull.acquire()
+            try:
+                resp = client.post("/api/asr/transcribe", json={"audio_base64": audio, "mime_type": "audio/wav"})
+                gauges = {item["name"]: item for item in client.get("/api/admin/upstreams/bulkheads").json()["bulkheads"]}
+            finally:
+                hull.release()
+            self.assertEqual(resp.status_code, 429)
+            self.assertIn("Retry-After", resp.headers)
+            self.assertEqual(gauges["asr"]["active"], 1)
+            self.assertEqual(gauges["asr"]["rejected"], 1)
+            self.assertEqual(gauges["asr"]["saturation"], 1.0)
+
+            with patch("app.api.v1.asr.asr_service.transcribe", return_value="你好"):
+                resp = client.post("/api/asr/transcribe", json={"audio_base64": audio, "mime_type": "audio/wav"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["text"], "你好")
+
+
+if __name__ == "__main__":
+    unittest.main()
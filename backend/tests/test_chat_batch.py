@@ -0,0 +1,147 @@
+import asyncio
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.schemas.chat import AnswerJson
+from app.services import embedding
+from app.services import http_client
+from app.services import knowledge
+
+_EVIDENCE = [{"chunk_id": "c1", "law_name": "民法典", "article_no": "第七百零三条", "text": "租赁合同押金返还", "score": 0.9}]
+
+
+def _ndjson(resp) -> list[dict]:
+    return [json.loads(line) for line in resp.text.splitlines() if line.strip()]
+
+
+class ChatBatchTests(unittest.TestCase):
+    def setUp(self) -> None:
+        for cache in (knowledge._SEARCH_CACHE, embedding._EMBED_CACHE):
+            cache.clear()
+            self.addCleanup(cache.clear)
+
+    def test_search_many_embeds_unique_queries_once_and_fills_search_cache(self) -> None:
+        embed_calls: list[list[str]] = []
+
+        async def fake_embed(texts):
+            embed_calls.append(list(texts))
+            return [[float(idx)] for idx, _ in enumerate(texts)]
+
+        async def fake_batch(_client, vectors, _top_k, _collection):
+            return [[SimpleNamespace(id=f"v{int(vector[0])}", score=0.9)] for vector in vectors]
+
+        def fake_assemble(query, *_args):
+            return [{"chunk_id": query, "text": query, "score": 0.9}]
+
+        with (
+            patch("app.services.knowledge.ensure_collection"),
+            patch("app.services.knowledge._get_async_qdrant"),
+            patch("app.services.knowledge.embed_texts_async", side_effect=fake_embed),
+            patch("app.services.knowledge._search_points_batch_async", side_effect=fake_batch) as batch_search,
+            patch("app.services.knowledge._assemble_results", side_effect=fake_assemble),
+            patch("app.services.knowledge.get_runtime_config", return_value=SimpleNamespace(
+                enable_rerank=True, chat_case_top_k=0, knowledge_collection="laws", case_collection="cases"
+            )),
+        ):
+            found = asyncio.run(knowledge.search_many_async(["押金", " 工资 ", "押金"], top_k=3))
+            again = asyncio.run(knowledge.search_many_async(["工资"], top_k=3))
+
+        self.assertEqual(embed_calls, [["押金", "工资"]])
+        batch_search.assert_called_once()
+        self.assertEqual([items[0]["chunk_id"] for items in found], ["押金", "工资", "押金"])
+        self.assertEqual(again[0][0]["chunk_id"], "工资")
+
+    def test_embed_texts_sends_one_request_for_uncached_texts(self) -> None:
+        body = {"data": [{"index": 1, "embedding": [0.0, 1.0]}, {"index": 0, "embedding": [1.0, 0.0]}]}
+        with (
+            patch.multiple(embedding.settings, embedding_provider="doubao", embedding_dim=2, embedding_model="emb-text", embedding_api_key="k"),
+            patch("app.services.embedding.get_runtime_config", return_value=SimpleNamespace(embedding_provider="", timeout_sec=5)),
+            patch("app.services.embedding.http_client.arequest", return_value=MagicMock(text=json.dumps(body))) as request,
+        ):
+            vectors = asyncio.run(embedding.embed_texts_async(["a", "b", "a"]))
+            cached = asyncio.run(embedding.embed_texts_async(["b"]))
+        request.assert_called_once()
+        self.assertEqual(request.call_args.kwargs["json"]["input"], ["a", "b"])
+        self.assertEqual(vectors, [[1.0, 0.0], [0.0, 1.0], [1.0, 0.0]])
+        self.assertEqual(cached, [[0.0, 1.0]])
+
+    @patch("app.api.v1.chat.session_store.save_chat_history_async")
+    @patch("app.api.v1.chat.session_store.get_chat_history_async", side_effect=lambda _session_id: [])
+    @patch("app.api.v1.chat.chat_service.build_answer_async")
+    @patch("app.api.v1.chat.knowledge_service.search_async", return_value=_EVIDENCE)
+    @patch("app.api.v1.chat.knowledge_service.search_many_async")
+    def test_batch_streams_items_in_completion_order_with_stage_timings(
+        self, mock_many, _search, mock_build_answer, _history, _save
+    ) -> None:
+        mock_many.side_effect = lambda queries, _top_k, use_rerank=None: [list(_EVIDENCE) for _ in queries]
+
+        async def fake_answer(req, *_args, **_kwargs):
+            await asyncio.sleep(0.05 if req.text.startswith("慢") else 0)
+            return AnswerJson(conclusion=f"答：{req.text}", analysis=[], actions=[], citations=[], emotion="calm")
+
+        mock_build_answer.side_effect = fake_answer
+        items = [{"id": "slow", "text": "慢：房东不退押金怎么办"}, {"text": "老板拖欠工资怎么办"}, {"id": "x", "text": "网购到假货怎么办"}]
+        resp = TestClient(app).post(
+            "/api/chat/batch", json={"items": [dict(item, enable_tts=False) for item in items], "concurrency": 3}
+        )
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("application/x-ndjson", resp.headers["content-type"])
+        events = _ndjson(resp)
+        item_events, done = events[:-1], events[-1]
+        self.assertEqual(item_events[-1]["id"], "slow")
+        self.assertEqual({event["id"] for event in item_events}, {"slow", "1", "x"})
+        self.assertTrue(all(event["ok"] and "answer" in event["stages"] for event in item_events))
+        self.assertEqual(item_events[-1]["response"]["answer_json"]["conclusion"], "答：慢：房东不退押金怎么办")
+        self.assertEqual((done["type"], done["total"], done["ok"], done["prefetch"]["queries"]), ("done", 3, 3, 3))
+        mock_many.assert_called_once()
+        sessions = {call.args[0].session_id for call in mock_build_answer.call_args_list}
+        self.assertEqual(len(sessions), 3)
+
+    @patch("app.api.v1.chat.chat_service.build_answer_async")
+    @patch("app.api.v1.chat.knowledge_service.search_many_async")
+    def test_retrieval_only_batch_returns_evidence_without_answering(self, mock_many, mock_build_answer) -> None:
+        mock_many.side_effect = lambda queries, _top_k, use_rerank=None: [list(_EVIDENCE) for _ in queries]
+        resp = TestClient(app).post(
+            "/api/chat/batch",
+            json={"items": [{"text": "押金", "top_k": 3}, {"text": "工资", "top_k": 3}], "retrieval_only": True},
+        )
+        events = _ndjson(resp)
+        self.assertEqual([event["evidence"][0]["chunk_id"] for event in events[:-1]], ["c1", "c1"])
+        self.assertEqual(mock_many.call_args.args[:2], (["押金", "工资"], 3))
+        mock_build_answer.assert_not_called()
+
+    def test_retrieval_only_batch_reports_upstream_outage_as_failed_items(self) -> None:
+        async def fake_batch(_client, vectors, _top_k, _collection):
+            return [[] for _ in vectors]
+
+        outages = {
+            "embedding": patch("app.services.knowledge.embed_texts_async", side_effect=http_client.UpstreamError("HTTP 503", status_code=503)),
+            "qdrant": patch("app.services.knowledge._search_points_batch_async", side_effect=ConnectionError("qdrant down")),
+        }
+        for name, outage in outages.items():
+            with (
+                self.subTest(upstream=name),
+                patch("app.services.knowledge.ensure_collection"),
+                patch("app.services.knowledge._get_async_qdrant"),
+                patch("app.services.knowledge.embed_texts_async", side_effect=lambda texts: [[1.0] for _ in texts]),
+                patch("app.services.knowledge._search_points_batch_async", side_effect=fake_batch),
+                outage,
+            ):
+                resp = TestClient(app).post(
+                    "/api/chat/batch",
+                    json={"items": [{"text": f"押金{name}", "top_k": 3}, {"text": f"工资{name}", "top_k": 5}], "retrieval_only": True},
+                )
+                events = _ndjson(resp)
+                self.assertEqual([(event["ok"], event["status_code"]) for event in events[:-1]], [(False, 500), (False, 500)])
+                self.assertTrue(all("error" in event and "evidence" not in event for event in events[:-1]))
+                self.assertEqual((events[-1]["ok"], events[-1]["failed"], events[-1]["prefetch"]["failed"]), (0, 2, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
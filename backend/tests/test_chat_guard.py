@@ -1,3 +1,4 @@
+import asyncio
 import unittest
 from unittest.mock import patch
 
@@ -19,14 +20,15 @@ class ChatGuardTests(unittest.TestCase):
         picked = chat_service.select_answer_evidence(evidence)
         self.assertEqual(len(picked), 3)
         self.assertEqual([item["chunk_id"] for item in picked], ["l1", "l2", "c1"])
-        self.assertTrue(all(len(str(item["text"])) <= 120 for item in picked))
+        # 正文不再按字数硬截断，长度交给回答提示词的 token 预算控制。
+        self.assertTrue(all(len(str(item["text"])) == 200 for item in picked))
 
     def test_rule_rewrite_expands_follow_up_without_llm(self) -> None:
         history = [
             {"role": "user", "content": "租房押金不退怎么办"},
             {"role": "assistant", "content": "请补充是否签合同"},
         ]
-        rewritten = chat_service.rewrite_query(history, "没签合同他也不退呢？")
+        rewritten = asyncio.run(chat_service.rewrite_query_async(history, "没签合同他也不退呢？"))
         self.assertIn("租房押金不退怎么办", rewritten)
         self.assertIn("没签合同他也不退呢？", rewritten)
 
@@ -48,43 +50,158 @@ class ChatGuardTests(unittest.TestCase):
         self.assertIn("承租人", expanded)
 
     def test_short_query_uses_llm_only_for_retrieval_expansion(self) -> None:
+        async def search(query: str):
+            return [{"chunk_id": "l1", "source_type": "law", "score": 0.5}]
+
         with (
             patch("app.services.chat.settings.llm_provider", "ark"),
             patch("app.services.chat.settings.ark_api_key", "k"),
             patch("app.services.chat.settings.ark_model", "m"),
             patch(
-                "app.services.chat._chat_completion_text",
+                "app.services.chat._chat_completion_text_async",
                 return_value="房屋租赁合同 出租人 承租人 押金返还 保证金 拒绝返还 合同履行",
             ) as completion,
         ):
-            query = chat_service.build_retrieval_query([], "房东不退押金", "fast")
+            result = asyncio.run(chat_service.retrieve_evidence_async([], "房东不退押金", search, "fast"))
 
         completion.assert_called_once()
+        self.assertEqual(result.expansion, "fused")
+        query = result.query
         self.assertIn("房东不退押金", query)
         self.assertIn("房屋租赁", query)
         self.assertIn("押金返还", query)
         self.assertIn("承租人", query)
         self.assertNotIn("可以起诉", query)
 
+    def test_llm_json_answer_is_parsed_into_structured_answer(self) -> None:
+        req = ChatRequest(session_id="s_async", text="房东不退押金怎么办", mode="chat", case_state=None)
+        evidence = [{"chunk_id": "c_ok", "law_name": "民法典", "article_no": "第七百零三条", "text": "租赁合同押金返还"}]
+        llm_answer = (
+            '{"conclusion": "押金应依约返还。", "analysis": ["租赁合同终止后押金应返还。"], '
+            '"actions": ["书面催告房东。"], "citations": [{"chunk_id": "c_ok"}], '
+            '"assumptions": [], "follow_up_questions": [], "emotion": "calm"}'
+        )
+
+        async def fake_completion(messages, model, max_tokens, temperature=0.2, stage="other"):
+            return llm_answer
+
+        with (
+            patch("app.services.chat.settings.llm_provider", "ark"),
+            patch("app.services.chat.settings.ark_api_key", "k"),
+            patch("app.services.chat.settings.ark_model", "m"),
+            patch("app.services.chat._chat_completion_text_async", side_effect=fake_completion) as completion,
+        ):
+            answer = asyncio.run(chat_service.build_answer_async(req, evidence=evidence))
+
+        completion.assert_called_once()
+        self.assertEqual(completion.call_args.kwargs["stage"], "answer")
+        self.assertEqual(answer.conclusion, "押金应依约返还。")
+        self.assertEqual(answer.actions, ["书面催告房东。"])
+        self.assertEqual([citation.chunk_id for citation in answer.citations], ["c_ok"])
+
+    def test_confident_first_retrieval_cancels_llm_expansion(self) -> None:
+        expansion_cancelled = asyncio.Event()
+        searched: list[str] = []
+
+        async def slow_expansion(*_args, **_kwargs):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                expansion_cancelled.set()
+                raise
+            return "不应使用"
+
+        async def search(query: str):
+            searched.append(query)
+            await asyncio.sleep(0.01)
+            return [{"chunk_id": "l1", "source_type": "law", "score": 0.93}]
+
+        async def run():
+            result = await chat_service.retrieve_evidence_async([], "房东不退押金", search, "fast")
+            await asyncio.sleep(0)
+            return result
+
+        with (
+            patch("app.services.chat.settings.llm_provider", "ark"),
+            patch("app.services.chat.settings.ark_api_key", "k"),
+            patch("app.services.chat.settings.ark_model", "m"),
+            patch("app.services.chat._expand_query_with_llm_for_retrieval_async", side_effect=slow_expansion),
+        ):
+            result = asyncio.run(run())
+
+        self.assertEqual(result.expansion, "confident")
+        self.assertEqual(len(searched), 1)
+        self.assertIn("押金返还", searched[0])
+        self.assertTrue(expansion_cancelled.is_set())
+
+    def test_low_confidence_retrieval_searches_only_expansion_delta(self) -> None:
+        searched: list[str] = []
+
+        async def expansion(original_query, rule_expanded_query, model_variant):
+            return f"{rule_expanded_query} 保证金 违约责任"
+
+        async def search(query: str):
+            searched.append(query)
+            if len(searched) == 1:
+                return [
+                    {"chunk_id": "l1", "source_type": "law", "score": 0.61},
+                    {"chunk_id": "c1", "source_type": "case", "score": 0.55},
+                ]
+            return [{"chunk_id": "l2", "source_type": "law", "score": 0.7}, {"chunk_id": "l1", "source_type": "law", "score": 0.6}]
+
+        with (
+            patch("app.services.chat.settings.llm_provider", "ark"),
+            patch("app.services.chat.settings.ark_api_key", "k"),
+            patch("app.services.chat.settings.ark_model", "m"),
+            patch("app.services.chat._expand_query_with_llm_for_retrieval_async", side_effect=expansion),
+        ):
+            result = asyncio.run(chat_service.retrieve_evidence_async([], "房东不退押金", search, "fast"))
+
+        self.assertEqual(result.expansion, "fused")
+        self.assertEqual(searched[1], "保证金 违约责任")
+        self.assertEqual([item["chunk_id"] for item in result.evidence], ["l1", "l2", "c1"])
+
     def test_retrieval_expansion_skips_ood_and_insufficient_queries(self) -> None:
+        async def search(query: str):
+            return []
+
         with (
             patch("app.services.chat.settings.llm_provider", "ark"),
             patch("app.services.chat.settings.ark_api_key", "k"),
             patch("app.services.chat.settings.ark_model", "m"),
-            patch("app.services.chat._chat_completion_text") as completion,
+            patch("app.services.chat._chat_completion_text_async") as completion,
         ):
-            stock_query = chat_service.build_retrieval_query([], "帮我预测明天股票涨跌", "fast")
-            vague_query = chat_service.build_retrieval_query([], "我和别人有纠纷，怎么办？", "fast")
+            stock = asyncio.run(chat_service.retrieve_evidence_async([], "帮我预测明天股票涨跌", search, "fast"))
+            vague = asyncio.run(chat_service.retrieve_evidence_async([], "我和别人有纠纷，怎么办？", search, "fast"))
 
         completion.assert_not_called()
-        self.assertEqual(stock_query, "帮我预测明天股票涨跌")
-        self.assertEqual(vague_query, "我和别人有纠纷，怎么办？")
+        self.assertEqual((stock.query, stock.expansion), ("帮我预测明天股票涨跌", "skipped"))
+        self.assertEqual((vague.query, vague.expansion), ("我和别人有纠纷，怎么办？", "skipped"))
 
     def test_generic_insufficient_eval_questions_still_trigger_followup(self) -> None:
         self.assertTrue(chat_service._is_insufficient_fact_query("我和别人有纠纷，怎么办？"))
         self.assertTrue(chat_service._is_insufficient_fact_query("公司有问题，我想维权。"))
         self.assertTrue(chat_service._is_insufficient_fact_query("工资相关有争议，怎么处理？"))
 
+    def test_query_analysis_is_classified_once_per_turn(self) -> None:
+        text = "房东不退押金怎么办"
+        analysis = chat_service.analyze_query(text)
+        self.assertIs(chat_service.analyze_query(f"  {text} "), analysis)
+        self.assertIn("rent", analysis.tags)
+        self.assertTrue(analysis.legal_domain)
+        self.assertFalse(analysis.out_of_scope)
+        self.assertEqual(analysis.insufficient, chat_service._is_insufficient_fact_query(text))
+
+        evidence = [
+            {"chunk_id": "law-1", "law_name": "中华人民共和国民法典", "article_no": "第七百零三条", "text": "租赁合同押金返还", "source_type": "law"}
+        ]
+        req = ChatRequest(session_id="s1", text="租房押金被扣了一半，房东说墙面有污渍，合同没写，怎么办？")
+        with patch("app.services.chat._answer_llm_configured", return_value=False), patch(
+            "app.services.chat._analyze_normalized", wraps=chat_service._analyze_normalized.__wrapped__
+        ) as analyze:
+            asyncio.run(chat_service.build_answer_async(req, evidence, analysis=chat_service.analyze_query(req.text)))
+        self.assertEqual(analyze.call_count, 1)
+
     def test_stream_text_can_recover_citations(self) -> None:
         answer = chat_service.build_answer_from_stream_text(
             "房东无正当理由不退押金属于违约。\n建议：保留转账和聊天记录。\n[[CITATIONS:c1,c2]]",
@@ -96,16 +213,41 @@ class ChatGuardTests(unittest.TestCase):
         self.assertEqual(len(answer.citations), 2)
         self.assertIn("不退押金", answer.conclusion)
 
+    def test_stream_citation_parser_strips_sentinel_split_across_deltas(self) -> None:
+        content = "押金应依约返还[附件]。\n[[citations:c1, c2]]\n"
+        for cut in range(1, len(content)):
+            parser = chat_service.StreamCitationParser()
+            visible = parser.feed(content[:cut]) + parser.feed(content[cut:]) + parser.finish()
+            self.assertNotIn("[[", visible, cut)
+            self.assertEqual(parser.text, "押金应依约返还[附件]。", cut)
+            self.assertEqual(parser.chunk_ids, ["c1", "c2"], cut)
+
+        parser = chat_service.StreamCitationParser()
+        self.assertEqual(parser.feed("结论。[[CITATIONS:c3"), "结论。")
+        self.assertIsNone(parser.chunk_ids)
+        parser.finish()
+        self.assertEqual(parser.chunk_ids, ["c3"])
+
+    def test_stream_json_field_parser_returns_conclusion_once_closed(self) -> None:
+        content = '```json\n{"emotion":"conclusion","meta":{"conclusion":"x"},"conclusion":"押金\\"应\\"返还\\n","analysis":["a"]}\n```'
+        for cut in range(1, len(content)):
+            parser = chat_service.StreamJsonFieldParser("conclusion")
+            head = parser.feed(content[:cut])
+            tail = parser.feed(content[cut:])
+            self.assertEqual(head or tail, '押金"应"返还\n', cut)
+            self.assertIsNone(head if tail else tail, cut)
+        self.assertIsNone(chat_service.StreamJsonFieldParser("conclusion").feed('{"conclusion":"未闭合'))
+
     def test_external_disclaimer_when_no_local_evidence(self) -> None:
         req = ChatRequest(session_id="s1", text="房东不退押金", mode="chat", case_state=None)
         with patch(
             "app.services.chat.get_runtime_config",
             return_value=RuntimeConfig(reject_without_evidence=True, strict_citation_check=True),
         ), patch(
-            "app.services.chat.web_search_service.search_public_web",
+            "app.services.chat.web_search_service.search_public_web_async",
             return_value=[],
         ):
-            answer = chat_service.build_answer(req, evidence=[])
+            answer = asyncio.run(chat_service.build_answer_async(req, evidence=[]))
         self.assertEqual(answer.emotion, "supportive")
         self.assertEqual(answer.citations, [])
         self.assertIn("租赁押金纠纷", answer.conclusion)
@@ -117,7 +259,7 @@ class ChatGuardTests(unittest.TestCase):
             "app.services.chat.get_runtime_config",
             return_value=RuntimeConfig(reject_without_evidence=True, strict_citation_check=True),
         ), patch(
-            "app.services.chat.web_search_service.search_public_web",
+            "app.services.chat.web_search_service.search_public_web_async",
             return_value=[
                 WebSearchHit(
                     title="押金纠纷处理提示",
@@ -125,8 +267,8 @@ class ChatGuardTests(unittest.TestCase):
                     url="https://example.test/rent",
                 )
             ],
-        ), patch("app.services.chat._ask_ark_with_web_results", return_value=None):
-            answer = chat_service.build_answer(req, evidence=[])
+        ), patch("app.services.chat._ask_ark_with_web_results_async", return_value=None):
+            answer = asyncio.run(chat_service.build_answer_async(req, evidence=[]))
         self.assertEqual(answer.emotion, "supportive")
         self.assertEqual(answer.citations, [])
         self.assertIn("公开网络信息", answer.conclusion)
@@ -161,9 +303,9 @@ class ChatGuardTests(unittest.TestCase):
                 "app.services.chat.get_runtime_config",
                 return_value=RuntimeConfig(reject_without_evidence=True, strict_citation_check=True),
             ),
-            patch("app.services.chat._ask_ark", return_value=fake_answer),
+            patch("app.services.chat._ask_ark_async", return_value=fake_answer),
         ):
-            answer = chat_service.build_answer(req, evidence=evidence)
+            answer = asyncio.run(chat_service.build_answer_async(req, evidence=evidence))
 
         self.assertNotIn("系统已中止直接结论输出", answer.conclusion)
         self.assertEqual([citation.chunk_id for citation in answer.citations], ["rent_deposit_1"])
@@ -197,9 +339,9 @@ class ChatGuardTests(unittest.TestCase):
                 "app.services.chat.get_runtime_config",
                 return_value=RuntimeConfig(reject_without_evidence=True, strict_citation_check=True),
             ),
-            patch("app.services.chat._ask_ark", return_value=fake_answer),
+            patch("app.services.chat._ask_ark_async", return_value=fake_answer),
         ):
-            answer = chat_service.build_answer(req, evidence=evidence)
+            answer = asyncio.run(chat_service.build_answer_async(req, evidence=evidence))
 
         self.assertEqual(len(answer.citations), 1)
         self.assertIn("租赁", answer.citations[0].article_no or "")
@@ -224,9 +366,9 @@ class ChatGuardTests(unittest.TestCase):
                 "app.services.chat.get_runtime_config",
                 return_value=RuntimeConfig(reject_without_evidence=True, strict_citation_check=True),
             ),
-            patch("app.services.chat._ask_ark", return_value=fake_answer),
+            patch("app.services.chat._ask_ark_async", return_value=fake_answer),
         ):
-            answer = chat_service.build_answer(req, evidence=evidence)
+            answer = asyncio.run(chat_service.build_answer_async(req, evidence=evidence))
 
         self.assertEqual(answer.citations, [])
         self.assertNotIn("系统已中止直接结论输出", answer.conclusion)
@@ -255,7 +397,7 @@ class ChatGuardTests(unittest.TestCase):
             },
         ]
 
-        answer = chat_service.build_answer(req, evidence=evidence)
+        answer = asyncio.run(chat_service.build_answer_async(req, evidence=evidence))
 
         self.assertIn("只能提供法律", answer.conclusion)
         self.assertIn("无法预测股票涨跌", answer.conclusion)
@@ -285,10 +427,10 @@ class ChatGuardTests(unittest.TestCase):
                 "app.services.chat.get_runtime_config",
                 return_value=RuntimeConfig(reject_without_evidence=True, strict_citation_check=False),
             ),
-            patch("app.services.chat._ask_ark", return_value=fake_answer),
-            patch("app.services.chat.web_search_service.search_public_web", return_value=[]),
+            patch("app.services.chat._ask_ark_async", return_value=fake_answer),
+            patch("app.services.chat.web_search_service.search_public_web_async", return_value=[]),
         ):
-            answer = chat_service.build_answer(req, evidence=evidence)
+            answer = asyncio.run(chat_service.build_answer_async(req, evidence=evidence))
 
         self.assertEqual(answer.citations, [])
         self.assertNotIn("本轮已引用", answer.conclusion)
@@ -331,9 +473,9 @@ class ChatGuardTests(unittest.TestCase):
                 "app.services.chat.get_runtime_config",
                 return_value=RuntimeConfig(reject_without_evidence=True, strict_citation_check=True),
             ),
-            patch("app.services.chat._ask_ark", return_value=fake_answer),
+            patch("app.services.chat._ask_ark_async", return_value=fake_answer),
         ):
-            answer = chat_service.build_answer(req, evidence=evidence)
+            answer = asyncio.run(chat_service.build_answer_async(req, evidence=evidence))
 
         self.assertEqual([citation.article_no for citation in answer.citations], ["第七十七条", "第九十一条"])
 
@@ -357,9 +499,9 @@ class ChatGuardTests(unittest.TestCase):
                 "app.services.chat.get_runtime_config",
                 return_value=RuntimeConfig(reject_without_evidence=True, strict_citation_check=True),
             ),
-            patch("app.services.chat._ask_ark", return_value=fake_answer),
+            patch("app.services.chat._ask_ark_async", return_value=fake_answer),
         ):
-            answer = chat_service.build_answer(req, evidence=evidence)
+            answer = asyncio.run(chat_service.build_answer_async(req, evidence=evidence))
             self.assertEqual(answer.citations, [])
             self.assertEqual(answer.emotion, "serious")
             self.assertIn("未能生成可核验引用", answer.conclusion)
@@ -377,7 +519,7 @@ class ChatGuardTests(unittest.TestCase):
                 return_value=RuntimeConfig(reject_without_evidence=True, strict_citation_check=False),
             ),
             patch(
-                "app.services.chat._ask_ark",
+                "app.services.chat._ask_ark_async",
                 return_value=AnswerJson(
                     conclusion="用人单位应当及时足额支付劳动报酬。",
                     analysis=["拖欠工资属于常见劳动争议。"],
@@ -389,7 +531,7 @@ class ChatGuardTests(unittest.TestCase):
                 ),
             ),
         ):
-            answer = chat_service.build_answer(req, evidence=evidence)
+            answer = asyncio.run(chat_service.build_answer_async(req, evidence=evidence))
         self.assertEqual(answer.emotion, "calm")
         self.assertGreaterEqual(len(answer.citations), 1)
         self.assertTrue(isinstance(answer.analysis, list))
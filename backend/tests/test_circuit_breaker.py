@@ -0,0 +1,94 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import circuit_breaker
+from app.services import http_client
+from app.services import knowledge as knowledge_service
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def setUp(self) -> None:
+        circuit_breaker.reset()
+
+    def tearDown(self) -> None:
+        circuit_breaker.reset()
+
+    def _breaker(self, **overrides) -> circuit_breaker.CircuitBreaker:
+        options = {
+            "window_sec": 60,
+            "min_calls": 3,
+            "error_rate": 0.5,
+            "slow_call_ms": 1000,
+            "slow_call_rate": 0.8,
+            "open_sec": 0.05,
+        }
+        options.update(overrides)
+        return circuit_breaker.CircuitBreaker("test", **options)
+
+    def test_error_rate_opens_then_half_open_probe_closes(self) -> None:
+        breaker = self._breaker()
+        breaker.record(True, 10)
+        breaker.record(False, 10)
+        self.assertEqual(breaker.state, circuit_breaker.CLOSED)
+        breaker.record(False, 10)
+        self.assertEqual(breaker.state, circuit_breaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, circuit_breaker.HALF_OPEN)
+        self.assertTrue(breaker.allow())
+        # 半开期间只放行一个探测请求。
+        self.assertFalse(breaker.allow())
+        breaker.record(True, 10)
+        self.assertEqual(breaker.state, circuit_breaker.CLOSED)
+        self.assertEqual(breaker.snapshot()["opened_count"], 1)
+
+    def test_slow_calls_open_and_failed_probe_reopens(self) -> None:
+        breaker = self._breaker(min_calls=2)
+        breaker.record(True, 1500)
+        breaker.record(True, 2000)
+        self.assertEqual(breaker.state, circuit_breaker.OPEN)
+
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        breaker.record(False, 10)
+        self.assertEqual(breaker.state, circuit_breaker.OPEN)
+        self.assertEqual(breaker.snapshot()["opened_count"], 2)
+
+    def test_open_embedding_breaker_falls_back_to_lexical_retrieval(self) -> None:
+        async def open_breaker(_query):
+            raise http_client.CircuitOpenError("embedding")
+
+        lexical = [{"chunk_id": "law-1", "text": "押金", "source_type": "law"}]
+        with patch("app.services.knowledge.ensure_collection"), patch(
+            "app.services.knowledge.embed_text_async", side_effect=open_breaker
+        ), patch("app.services.knowledge._assemble_results", return_value=lexical) as assemble:
+            result = asyncio.run(knowledge_service.search_async("房东不退押金熔断", top_k=3))
+        self.assertEqual(result, lexical)
+        self.assertTrue(assemble.call_args.args[-1])
+
+    def test_admin_exposes_and_resets_breaker_state(self) -> None:
+        client = TestClient(app)
+        breaker = circuit_breaker.get_breaker("llm")
+        for _ in range(breaker.min_calls):
+            breaker.record(False, 10)
+
+        payload = client.get("/api/admin/upstreams/breakers").json()
+        states = {item["name"]: item for item in payload["breakers"]}
+        self.assertEqual(set(circuit_breaker.UPSTREAMS), set(states))
+        self.assertEqual(states["llm"]["state"], "open")
+        self.assertGreater(states["llm"]["retry_after_sec"], 0)
+
+        resp = client.post("/api/admin/upstreams/breakers/reset", params={"name": "llm"})
+        states = {item["name"]: item for item in resp.json()["breakers"]}
+        self.assertEqual(states["llm"]["state"], "closed")
+        self.assertEqual(client.post("/api/admin/upstreams/breakers/reset", params={"name": "nope"}).status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.schemas.chat import ChatRequest
+from app.services import chat as chat_service
+from app.services import circuit_breaker
+from app.services import context_cache
+from app.services import http_client
+from app.services import llm_usage
+
+
+class _ArkStandIn(BaseHTTPRequestHandler):
+    """本地替身：模拟 Ark 的 /context/create 与 /context/chat/completions，上下文前缀计为 cached_tokens。"""
+
+    protocol_version = "HTTP/1.1"
+    contexts: dict[str, list[dict]] = {}
+    calls: list[tuple[str, dict]] = []
+
+    def do_POST(self) -> None:  # noqa: N802
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        _ArkStandIn.calls.append((self.path, body))
+        if self.path == "/context/create":
+            context_id = f"ctx-{len(_ArkStandIn.contexts) + 1}"
+            _ArkStandIn.contexts[context_id] = body["messages"]
+            self._reply(200, {"id": context_id})
+            return
+        prefix: list[dict] = []
+        if self.path == "/context/chat/completions":
+            if body.get("context_id") not in _ArkStandIn.contexts:
+                self._reply(404, {"error": {"code": "ContextNotFound"}})
+                return
+            prefix = _ArkStandIn.contexts[body["context_id"]]
+        cached = sum(len(item["content"]) for item in prefix)
+        usage = {
+            "prompt_tokens": cached + sum(len(item["content"]) for item in body["messages"]),
+            "completion_tokens": 4,
+            "prompt_tokens_details": {"cached_tokens": cached},
+        }
+        if body.get("stream"):
+            chunks = [{"choices": [{"delta": {"content": "押金应返还"}}]}, {"choices": [], "usage": usage}]
+            raw = "".join(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n" for chunk in chunks) + "data: [DONE]\n\n"
+            self._send(200, raw.encode("utf-8"))
+            return
+        self._reply(200, {"choices": [{"message": {"content": "押金应返还"}}], "usage": usage})
+
+    def _reply(self, status: int, data: dict) -> None:
+        self._send(status, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+    def _send(self, status: int, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        return
+
+
+def _evidence(chunk_id: str) -> list[dict]:
+    return [{"chunk_id": chunk_id, "law_name": "民法典", "article_no": "第七百零三条", "text": "押金应依约返还", "score": 0.9}]
+
+
+class ContextCacheTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _ArkStandIn)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self) -> None:
+        patcher = patch.multiple(
+            settings,
+            llm_base_url=self.base_url,
+            llm_api_key="k",
+            llm_cache_enabled=False,
+            llm_context_cache_enabled=True,
+            circuit_breaker_enabled=False,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        _ArkStandIn.contexts.clear()
+        _ArkStandIn.calls.clear()
+        for reset in (context_cache.clear, llm_usage.drain, circuit_breaker.reset):
+            reset()
+            self.addCleanup(reset)
+
+    def _answer(self, text: str, chunk_id: str, history: list[dict] | None = None, stream: bool = False) -> str:
+        messages = chat_service._build_answer_messages(ChatRequest(session_id="s", text=text), _evidence(chunk_id), history)
+
+        async def run() -> str:
+            if stream:
+                parts = [chunk async for chunk in chat_service._chat_completion_stream_async(messages, "m", 64)]
+                content = "".join(parts)
+            else:
+                content = await chat_service._chat_completion_text_async(messages, model="m", max_tokens=64, stage="answer")
+            await http_client.aclose_client()
+            return content or ""
+
+        return asyncio.run(run())
+
+    def test_answer_prompts_keep_a_static_prefix_and_put_evidence_last(self) -> None:
+        history = [{"role": "user", "content": "房东不退押金"}, {"role": "assistant", "content": "可以协商"}]
+        first = chat_service._build_answer_messages(ChatRequest(session_id="s", text="怎么办"), _evidence("c1"), None)
+        second = chat_service._build_answer_messages(ChatRequest(session_id="s", text="还能起诉吗"), _evidence("c2"), history)
+
+        self.assertEqual(first[0], second[0])
+        self.assertNotIn("c2", second[0]["content"])
+        self.assertEqual(second[1:3], history)
+        self.assertTrue(second[-1]["content"].startswith("依据：\n1. 类型=法条 | chunk_id=c2"))
+        self.assertTrue(second[-1]["content"].endswith("问题：还能起诉吗"))
+
+    def test_answer_calls_reuse_one_provider_context(self) -> None:
+        self.assertEqual(self._answer("房东不退押金怎么办", "c1"), "押金应返还")
+        self.assertEqual(self._answer("还能起诉吗", "c2", stream=True), "押金应返还")
+
+        paths = [path for path, _body in _ArkStandIn.calls]
+        self.assertEqual(paths, ["/context/create", "/context/chat/completions", "/context/chat/completions"])
+        created = _ArkStandIn.calls[0][1]
+        self.assertEqual((created["mode"], created["messages"][0]["content"]), ("common_prefix", chat_service._ANSWER_SYSTEM_PROMPT))
+        for _path, body in _ArkStandIn.calls[1:]:
+            self.assertEqual(body["context_id"], "ctx-1")
+            self.assertNotIn("system", [item["role"] for item in body["messages"]])
+        rows = llm_usage.drain()
+        self.assertEqual([row["cached_tokens"] for row in rows], [len(chat_service._ANSWER_SYSTEM_PROMPT)] * 2)
+        self.assertEqual(context_cache.stats()["hits"], 1)
+
+    def test_lost_context_falls_back_to_plain_endpoint_and_is_recreated(self) -> None:
+        self._answer("房东不退押金怎么办", "c1")
+        _ArkStandIn.contexts.clear()
+        _ArkStandIn.calls.clear()
+
+        self.assertEqual(self._answer("还能起诉吗", "c2"), "押金应返还")
+        self._answer("押金能要回来吗", "c3")
+
+        paths = [path for path, _body in _ArkStandIn.calls]
+        self.assertEqual(
+            paths,
+            ["/context/chat/completions", "/chat/completions", "/context/create", "/context/chat/completions"],
+        )
+        self.assertEqual(_ArkStandIn.calls[1][1]["messages"][0]["content"], chat_service._ANSWER_SYSTEM_PROMPT)
+        self.assertEqual(context_cache.stats()["invalidated"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
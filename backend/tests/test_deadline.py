@@ -0,0 +1,104 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import chat as chat_service
+from app.services import deadline
+from app.services import http_client
+
+
+class DeadlineTests(unittest.TestCase):
+    def tearDown(self) -> None:
+        deadline.clear()
+
+    def test_allows_keeps_answer_reserve_and_records_degraded_stages(self) -> None:
+        budget = deadline.Deadline(10, reserve_sec=8)
+        self.assertTrue(budget.allows("rewrite", 1.5))
+        self.assertFalse(budget.allows("expansion", 3))
+        self.assertTrue(budget.allows("answer_llm", 3, keep_reserve=False))
+        self.assertFalse(budget.allows("expansion", 3))
+        self.assertEqual(budget.degraded, ["expansion"])
+        self.assertAlmostEqual(budget.clamp(30), budget.clamp(None), places=2)
+        self.assertLessEqual(budget.clamp(30), 10)
+        self.assertEqual(budget.clamp(2), 2)
+
+        expired = deadline.Deadline(0.01, started=time.perf_counter() - 1)
+        self.assertEqual(expired.clamp(30), 0.5)
+        summary = expired.summary()
+        self.assertTrue(summary["deadline_exceeded"])
+        self.assertEqual(summary["deadline_budget_ms"], 10.0)
+
+    def test_no_deadline_leaves_timeouts_and_stages_untouched(self) -> None:
+        self.assertIsNone(deadline.start(0))
+        self.assertTrue(deadline.allows("rewrite", 1000))
+        self.assertEqual(deadline.clamp_timeout(30), 30)
+        self.assertIsNone(deadline.clamp_timeout(None))
+
+    def test_expired_budget_skips_llm_expansion_and_clamps_upstream_timeout(self) -> None:
+        searched: list[str] = []
+
+        async def search(query: str):
+            searched.append(query)
+            return []
+
+        deadline.start(0.01)
+        time.sleep(0.02)
+        with (
+            patch("app.services.chat.settings.llm_provider", "ark"),
+            patch("app.services.chat.settings.ark_api_key", "k"),
+            patch("app.services.chat.settings.ark_model", "m"),
+            patch("app.services.chat._expand_query_with_llm_for_retrieval_async") as expansion,
+        ):
+            result = asyncio.run(chat_service.retrieve_evidence_async([], "房东不退押金", search, "fast"))
+
+        expansion.assert_not_called()
+        self.assertEqual(result.expansion, "deadline")
+        self.assertEqual(len(searched), 1)
+        self.assertIn("expansion", deadline.current().degraded)
+        self.assertEqual(http_client._request_timeout(30).read, 0.5)
+
+
+class DeadlineChatTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.client = TestClient(app)
+
+    @patch("app.api.v1.chat.metrics_service.record_api_call")
+    @patch("app.api.v1.chat.tts_service.start_synthesize_job", return_value="tts_deadline")
+    @patch("app.api.v1.chat.tts_service.synthesize_async")
+    @patch("app.services.chat._ask_ark_async")
+    @patch("app.api.v1.chat.knowledge_service.search_async")
+    def test_exhausted_budget_returns_tts_job_instead_of_waiting(
+        self, mock_search, mock_ask, mock_tts, mock_job, mock_metrics
+    ) -> None:
+        mock_search.return_value = [
+            {"chunk_id": "c1", "law_name": "民法典", "article_no": "第七百零三条", "text": "租赁合同押金返还", "source_type": "law"}
+        ]
+        with (
+            patch("app.api.v1.chat.settings.chat_deadline_sec", 0.001),
+            patch("app.services.chat._answer_llm_configured", return_value=True),
+        ):
+            resp = self.client.post(
+                "/api/chat",
+                json={"session_id": "s_deadline", "text": "房东不退押金怎么办", "mode": "chat", "case_state": None, "enable_tts": True},
+            )
+
+        self.assertEqual(resp.status_code, 200)
+        payload = resp.json()
+        self.assertTrue(payload["answer_json"]["conclusion"])
+        self.assertIsNone(payload["audio_url"])
+        self.assertEqual(payload["tts_job_id"], "tts_deadline")
+        mock_ask.assert_not_called()
+        mock_tts.assert_not_called()
+        meta = mock_metrics.call_args.kwargs["meta"]
+        self.assertTrue(meta["deadline_exceeded"])
+        self.assertIn("answer_llm", meta["degraded_stages"])
+        self.assertIn("tts", meta["degraded_stages"])
+
+
+if __name__ == "__main__":
+    unittest.main()
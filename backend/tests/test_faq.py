@@ -0,0 +1,147 @@
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.schemas.chat import ChatRequest
+from app.services import chat as chat_service
+from app.services import faq
+from app.services import http_client
+from app.services.faq import settings
+
+_ITEMS = [
+    {
+        "id": "friend-loan",
+        "question": "借钱给同学不还怎么办？",
+        "aliases": ["同学欠钱一直拖着不还"],
+        "keywords": ["借钱", "欠钱", "不还"],
+        "answer": "先保留借款证据并书面催告，协商不成可以向法院起诉。",
+        "analysis": ["诉讼时效期间为三年。"],
+        "actions": ["整理转账记录和聊天记录。"],
+        "source": "中华人民共和国民法典",
+        "article": "第一百八十八条",
+    },
+    {
+        "id": "express-lost",
+        "question": "快递丢了或者摔坏了谁来赔？",
+        "aliases": [],
+        "keywords": ["快递", "丢件"],
+        "answer": "运输过程中货物毁损、灭失的，由承运人承担赔偿责任。",
+        "source": "中华人民共和国民法典",
+        "article": "第八百三十二条",
+    },
+]
+
+
+class FaqTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        source = self.dir / "faq.jsonl"
+        source.write_text("".join(json.dumps(item, ensure_ascii=False) + "\n" for item in _ITEMS), encoding="utf-8")
+        for name, value in {
+            "faq_enabled": True,
+            "faq_source_path": str(source),
+            "faq_index_path": str(self.dir / "missing_index.json"),
+            "faq_min_score": 0.5,
+            "faq_min_vector_score": 0.8,
+        }.items():
+            patcher = patch.object(settings, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        faq.clear_cache()
+        self.addCleanup(faq.clear_cache)
+
+    def test_lexical_match_needs_a_keyword_and_falls_back_to_source_without_index(self) -> None:
+        found = faq.match("我借钱给同学，他一直不还怎么办")
+        self.assertIsNotNone(found)
+        self.assertEqual((found.item.id, found.method), ("friend-loan", "lexical"))
+        self.assertIsNone(faq.match("今天天气怎么样"))
+        # 字面很像但没有任何关键词命中，不算命中。
+        self.assertEqual(faq.lexical_score("借给同学的书不见了", found.item), 0.0)
+
+    def test_vector_tier_only_used_when_index_matches_current_embedding(self) -> None:
+        index = self.dir / "index.json"
+        items = [dict(item, vectors=[[1.0, 0.0]] if item["id"] == "express-lost" else [[0.0, 1.0]]) for item in _ITEMS]
+        signature = {"embedding_provider": "doubao", "embedding_model": "emb-1"}
+        index.write_text(json.dumps({**signature, "embedding_dim": 2, "items": items}, ensure_ascii=False), encoding="utf-8")
+
+        with patch.object(settings, "faq_index_path", str(index)), patch(
+            "app.services.faq.index_signature", return_value=signature
+        ), patch("app.services.faq.embed_text_async", return_value=[0.9, 0.1]) as embed:
+            found = asyncio.run(faq.match_async("包裹寄出后一直没送到"))
+        embed.assert_called_once()
+        self.assertEqual((found.item.id, found.method), ("express-lost", "vector"))
+
+        faq.clear_cache()
+        with patch.object(settings, "faq_index_path", str(index)), patch(
+            "app.services.faq.index_signature", return_value={"embedding_provider": "doubao", "embedding_model": "emb-2"}
+        ), patch("app.services.faq.embed_text") as embed:
+            self.assertIsNone(faq.match("包裹寄出后一直没送到"))
+        embed.assert_not_called()
+
+    def test_busy_embedding_upstream_skips_vector_tier(self) -> None:
+        index = self.dir / "index.json"
+        items = [dict(item, vectors=[[1.0, 0.0]]) for item in _ITEMS]
+        signature = {"embedding_provider": "doubao", "embedding_model": "emb-1"}
+        index.write_text(json.dumps({**signature, "embedding_dim": 2, "items": items}, ensure_ascii=False), encoding="utf-8")
+
+        busy = http_client.UpstreamBusyError("embedding", "full", 1)
+        with patch.object(settings, "faq_index_path", str(index)), patch(
+            "app.services.faq.index_signature", return_value=signature
+        ), patch("app.services.faq.embed_text_async", side_effect=busy) as embed:
+            self.assertIsNone(asyncio.run(faq.match_async("包裹寄出后一直没送到")))
+        embed.assert_called_once()
+
+    def test_no_evidence_answer_uses_faq_before_web_search(self) -> None:
+        req = ChatRequest(session_id="s1", text="我借钱给同学，他一直不还，有微信转账记录，怎么要回来")
+        trace = chat_service.begin_answer_trace()
+        with patch("app.services.chat.web_search_service.search_public_web_async") as web:
+            answer = asyncio.run(chat_service.build_answer_async(req, []))
+        web.assert_not_called()
+        self.assertEqual(trace["source"], "faq")
+        self.assertEqual(answer.conclusion, _ITEMS[0]["answer"])
+        self.assertEqual(answer.citations[0].chunk_id, "faq:friend-loan")
+        self.assertEqual(answer.citations[0].source_type, "faq")
+
+        client = TestClient(app)
+        resp = client.get("/api/knowledge/chunk/faq:friend-loan")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["article_no"], "第一百八十八条")
+        self.assertEqual(client.get("/api/knowledge/chunk/faq:unknown").status_code, 404)
+
+    def test_slow_web_search_does_not_hold_the_no_evidence_answer(self) -> None:
+        req = ChatRequest(session_id="s1", text="邻居装修噪音太大影响休息")
+        finished = asyncio.Event()
+
+        async def slow_search(*_args, **_kwargs) -> list:
+            await asyncio.sleep(0.3)
+            finished.set()
+            return []
+
+        async def run() -> tuple[object, bool]:
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            answer = await chat_service.build_answer_async(req, [])
+            elapsed = loop.time() - started
+            await asyncio.wait_for(finished.wait(), timeout=2)
+            return answer, elapsed < 0.2
+
+        with patch.object(settings, "web_search_inline_wait_sec", 0.05), patch(
+            "app.services.chat.web_search_service.search_public_web_async", side_effect=slow_search
+        ), patch("app.services.chat._ask_ark_with_web_results_async") as online:
+            answer, fast = asyncio.run(run())
+        self.assertTrue(fast)
+        online.assert_not_called()
+        self.assertEqual(answer.citations, [])
+        self.assertEqual(chat_service._BACKGROUND_WEB_SEARCHES, set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import asyncio
+import sqlite3
+import tempfile
+import unittest
+from contextlib import closing
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.schemas.chat import AnswerJson
+from app.services import chat as chat_service
+from app.services import history_summary
+from app.services import session_store
+
+_HISTORY = [
+    {"role": "user", "content": "我在奶茶店兼职"},
+    {"role": "assistant", "content": "请说明具体问题"},
+    {"role": "user", "content": "老板拖欠两个月工资"},
+    {"role": "assistant", "content": "可以申请劳动仲裁"},
+]
+
+
+class HistorySummaryTests(unittest.TestCase):
+    def test_prompt_history_keeps_summary_plus_uncovered_turns(self) -> None:
+        self.assertEqual(history_summary.prompt_history([], {"summary": "s", "last_turn": 1, "session_turns": 1}), [])
+        self.assertEqual(history_summary.prompt_history(_HISTORY, None), _HISTORY)
+
+        up_to_date = history_summary.prompt_history(_HISTORY, {"summary": "兼职被拖欠工资", "last_turn": 2, "session_turns": 2})
+        self.assertEqual(up_to_date[0], {"role": "system", "content": history_summary.SUMMARY_PREFIX + "兼职被拖欠工资"})
+        self.assertEqual(up_to_date[1:], _HISTORY[-2:])
+
+        # 摘要落后一轮：尚未折叠的那一轮按原文保留。
+        lagging = history_summary.prompt_history(_HISTORY, {"summary": "兼职", "last_turn": 1, "session_turns": 2})
+        self.assertEqual(lagging[1:], _HISTORY[2:])
+        # 早期记录没有轮次号：全部按原文保留。
+        legacy = history_summary.prompt_history(_HISTORY, {"summary": "兼职", "session_turns": 2})
+        self.assertEqual(legacy[1:], _HISTORY)
+
+        trimmed = chat_service._trim_history_messages([up_to_date[0], *(_HISTORY * 3)])
+        self.assertEqual(trimmed[0]["role"], "system")
+        self.assertEqual(len(trimmed), 1 + chat_service._ANSWER_HISTORY_LIMIT)
+
+    def test_summary_is_cut_to_the_configured_limit(self) -> None:
+        with patch.object(history_summary.settings, "history_summary_max_chars", 5):
+            context = history_summary.prompt_history(_HISTORY, {"summary": "兼职被拖欠两个月工资", "last_turn": 2, "session_turns": 2})
+        self.assertEqual(context[0]["content"], history_summary.SUMMARY_PREFIX + "兼职被拖欠")
+        head, _ = chat_service._split_history(context)
+        self.assertIn("兼职被拖欠", head)
+        self.assertNotIn("两个月", head)
+
+    def test_legacy_summary_table_drops_last_user_once(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        db_path = Path(tmpdir.name) / "case.db"
+        with closing(sqlite3.connect(db_path)) as conn:
+            conn.execute(
+                "CREATE TABLE chat_summaries (session_id TEXT PRIMARY KEY, summary TEXT NOT NULL, "
+                "last_user TEXT NOT NULL, turns INTEGER NOT NULL, updated_at TEXT NOT NULL)"
+            )
+            conn.execute("INSERT INTO chat_summaries VALUES ('old', '旧摘要', '你好', 1, '2024-01-01T00:00:00')")
+            conn.commit()
+
+        with patch.object(session_store.settings, "case_db_path", str(db_path)), patch.object(
+            session_store, "_migrate_chat_summaries", wraps=session_store._migrate_chat_summaries
+        ) as migrate:
+            session_store.ensure_chat_summaries_table()
+            session_store.ensure_chat_summaries_table()
+            session_store.save_chat_summary("new", "新摘要", 2, 2)
+            self.assertEqual(migrate.call_count, 1)
+            self.assertEqual(session_store.get_chat_summary("old")["last_turn"], 0)
+            self.assertEqual(session_store.get_chat_summary("new")["summary"], "新摘要")
+        with closing(sqlite3.connect(db_path)) as conn:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(chat_summaries)")}
+        self.assertNotIn("last_user", columns)
+
+    def test_repeated_short_reply_does_not_hide_unsummarized_turns(self) -> None:
+        history = [
+            {"role": "user", "content": "好的"},
+            {"role": "assistant", "content": "A1"},
+            {"role": "user", "content": "押金被扣了两千"},
+            {"role": "assistant", "content": "A2"},
+            {"role": "user", "content": "好的"},
+            {"role": "assistant", "content": "A3"},
+        ]
+        # 会话共 5 轮（history 只存最近 3 轮），摘要才折叠到第 3 轮，即 history 里的第一个“好的”。
+        context = history_summary.prompt_history(history, {"summary": "s", "last_turn": 3, "session_turns": 5})
+        self.assertEqual(context[1:], history[2:])
+
+    def test_scheduled_updates_fold_turns_in_order(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+
+        async def run() -> None:
+            turn = session_store.save_chat_history("s-summary", _HISTORY[:2])
+            history_summary.schedule("s-summary", turn, "我在奶茶店兼职", "请说明具体问题")
+            turn = session_store.save_chat_history("s-summary", _HISTORY)
+            history_summary.schedule("s-summary", turn, "老板拖欠两个月工资", "可以申请劳动仲裁")
+            await history_summary.drain()
+
+        with patch.object(session_store.settings, "case_db_path", str(Path(tmpdir.name) / "case.db")), patch(
+            "app.services.chat._answer_llm_configured", return_value=False
+        ):
+            asyncio.run(run())
+            summary = session_store.get_chat_summary("s-summary")
+            self.assertEqual(summary["turns"], 2)
+            self.assertEqual((summary["last_turn"], summary["session_turns"]), (2, 2))
+            self.assertIn("奶茶店", summary["summary"])
+            self.assertIn("劳动仲裁", summary["summary"])
+
+            session_store.delete_chat_history("s-summary")
+            self.assertIsNone(session_store.get_chat_summary("s-summary"))
+
+    @patch("app.api.v1.chat.history_summary.schedule")
+    @patch("app.api.v1.chat.session_store.save_chat_history_async", return_value=3)
+    @patch("app.api.v1.chat.session_store.get_chat_summary_async", return_value={"summary": "兼职被拖欠工资", "last_turn": 2, "turns": 2, "session_turns": 2})
+    @patch("app.api.v1.chat.session_store.get_chat_history_async", side_effect=lambda _session_id: list(_HISTORY))
+    @patch("app.api.v1.chat.chat_service.build_answer_async")
+    @patch("app.api.v1.chat.knowledge_service.search_async", return_value=[])
+    def test_chat_prompts_use_summary_and_saves_full_history(
+        self, _search, mock_build_answer, _history, _summary, mock_save, mock_schedule
+    ) -> None:
+        mock_build_answer.return_value = AnswerJson(
+            conclusion="可以申请劳动仲裁", analysis=[], actions=[], citations=[], emotion="calm"
+        )
+        resp = TestClient(app).post(
+            "/api/chat", json={"session_id": "s-api", "text": "需要准备什么证据", "enable_tts": False}
+        )
+        self.assertEqual(resp.status_code, 200)
+        context = mock_build_answer.call_args.args[2]
+        self.assertEqual(context[0]["role"], "system")
+        self.assertEqual(context[1:], _HISTORY[-2:])
+        saved = mock_save.call_args.args[1]
+        self.assertEqual(saved[:4], _HISTORY)
+        mock_schedule.assert_called_once_with("s-api", 3, "需要准备什么证据", "可以申请劳动仲裁")
+
+
+if __name__ == "__main__":
+    unittest.main()
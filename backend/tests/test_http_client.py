@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from app.services import bulkhead
+from app.services import circuit_breaker
+from app.services import http_client
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fail_budget = 0
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path.startswith("/flaky") and _Handler.fail_budget > 0:
+            _Handler.fail_budget -= 1
+            self._reply(503, b"busy")
+            return
+        self._reply(200, b"ok")
+
+    def _reply(self, status: int, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        return
+
+
+class HttpClientTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self) -> None:
+        http_client.close_client()
+        http_client.reset_host_stats()
+
+    def tearDown(self) -> None:
+        http_client.close_client()
+
+    def _host_stats(self) -> dict:
+        host = self.base_url.split("://", 1)[1]
+        return next(item for item in http_client.get_host_stats() if item["host"] == host)
+
+    def test_keep_alive_connection_is_reused(self) -> None:
+        for _ in range(3):
+            resp = http_client.request("GET", f"{self.base_url}/ok", timeout=5)
+            self.assertEqual(resp.text, "ok")
+
+        stats = self._host_stats()
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["new_connections"], 1)
+        self.assertEqual(stats["reused_connections"], 2)
+
+    def test_retry_on_retryable_status(self) -> None:
+        _Handler.fail_budget = 1
+        with patch("app.services.http_client.settings.http_retry_backoff_ms", 0):
+            resp = http_client.request("GET", f"{self.base_url}/flaky", timeout=5, retries=1)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self._host_stats()["retries"], 1)
+
+    def test_async_requests_share_one_connection_per_loop(self) -> None:
+        async def run() -> list[str]:
+            texts = []
+            for _ in range(3):
+                resp = await http_client.arequest("GET", f"{self.base_url}/ok", timeout=5)
+                texts.append(resp.text)
+            await http_client.aclose_client()
+            return texts
+
+        self.assertEqual(asyncio.run(run()), ["ok", "ok", "ok"])
+        stats = self._host_stats()
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["new_connections"], 1)
+
+    def test_http_error_raises_upstream_error(self) -> None:
+        _Handler.fail_budget = 1
+        with self.assertRaises(http_client.UpstreamError) as ctx:
+            http_client.request("GET", f"{self.base_url}/flaky", timeout=5)
+        self.assertEqual(ctx.exception.status_code, 503)
+
+    def test_open_breaker_fails_fast_without_sending(self) -> None:
+        circuit_breaker.reset()
+        self.addCleanup(circuit_breaker.reset)
+        _Handler.fail_budget = 2
+        with patch("app.services.circuit_breaker.settings.circuit_breaker_min_calls", 2):
+            for _ in range(2):
+                with self.assertRaises(http_client.UpstreamError):
+                    http_client.request("GET", f"{self.base_url}/flaky", timeout=5, breaker="llm")
+            with self.assertRaises(http_client.CircuitOpenError):
+                http_client.request("GET", f"{self.base_url}/ok", timeout=5, breaker="llm")
+        self.assertEqual(self._host_stats()["requests"], 2)
+        # 未指定 breaker 的请求不受熔断影响。
+        self.assertEqual(http_client.request("GET", f"{self.base_url}/ok", timeout=5).text, "ok")
+
+    def test_full_bulkhead_rejects_without_sending(self) -> None:
+        bulkhead.reset()
+        self.addCleanup(bulkhead.reset)
+        with patch("app.services.bulkhead.settings.bulkhead_limits", "web_search=1:0"):
+            # 直接占住名额（同一上下文里 guard 可重入，不会被拒绝）。
+            hull = bulkhead.get_bulkhead("web_search")
+            hull.acquire()
+            try:
+                with self.assertRaises(http_client.UpstreamBusyError) as ctx:
+                    http_client.request("GET", f"{self.base_url}/ok", timeout=5, breaker="web_search")
+            finally:
+                hull.release()
+            self.assertEqual(ctx.exception.reason, "queue_full")
+            # 舱壁拒绝与熔断打开一样属于 CircuitOpenError，调用方走同一条降级路径。
+            self.assertIsInstance(ctx.exception, http_client.CircuitOpenError)
+            self.assertEqual(http_client.request("GET", f"{self.base_url}/ok", timeout=5, breaker="web_search").text, "ok")
+        self.assertEqual(self._host_stats()["requests"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.services import chat as chat_service
+from app.services import keyword_matcher
+from app.services import knowledge as knowledge_service
+
+
+class KeywordMatcherTests(unittest.TestCase):
+    def test_overlapping_and_nested_keywords_are_all_reported(self) -> None:
+        matcher = keyword_matcher.KeywordMatcher(
+            {"a": ("he", "hers"), "b": ("she",), "c": ("劳动仲裁",), "d": ("劳动",), "e": ("仲裁委",)}
+        )
+        self.assertEqual(matcher.match("uSHErs"), frozenset({"a", "b"}))
+        self.assertEqual(matcher.match("申请劳动仲裁"), frozenset({"c", "d"}))
+        self.assertEqual(matcher.match("劳动仲仲裁委"), frozenset({"d", "e"}))
+        self.assertEqual(matcher.match(""), frozenset())
+
+    def test_data_file_extends_builtin_groups(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "keywords.json"
+            path.write_text(json.dumps({"topic:rent": ["转租"], "new": ["宅基地"]}, ensure_ascii=False), encoding="utf-8")
+            matcher = keyword_matcher.compile_groups({"topic:rent": ("押金",)}, extra_path=path)
+            broken = Path(tmpdir) / "broken.json"
+            broken.write_text("{", encoding="utf-8")
+            self.assertEqual(keyword_matcher.load_groups(broken), {})
+        self.assertEqual(matcher.match("二房东转租"), frozenset({"topic:rent"}))
+        self.assertEqual(matcher.match("宅基地纠纷"), frozenset({"new"}))
+
+    def test_chat_and_retrieval_tables_use_compiled_matcher(self) -> None:
+        analysis = chat_service.analyze_query("老板拖欠工资还把我拉黑了")
+        self.assertIn("labor", analysis.tags)
+        self.assertIn("劳动报酬", analysis.synonyms)
+        self.assertTrue(chat_service.analyze_query("明天天气怎么样").out_of_scope)
+        self.assertTrue(chat_service.analyze_query("这只股票明天会涨吗").investment_prediction)
+
+        terms = knowledge_service._legal_retrieval_terms("房东不退押金")
+        self.assertIn("租赁合同", terms)
+        self.assertEqual(knowledge_service._legal_retrieval_terms("Python 报错"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from app.services import case as case_service
+from app.services import chat as chat_service
+from app.services import circuit_breaker
+from app.services import http_client
+from app.services import llm_cache
+
+
+def _payload(content: str, temperature: float = 0.0) -> dict:
+    return {"model": "m", "messages": [{"role": "user", "content": content}], "temperature": temperature, "max_tokens": 160}
+
+
+class _CutOffStream(BaseHTTPRequestHandler):
+    """本地替身：SSE 回答写到一半就断开连接（声明的 Content-Length 大于实际发送的字节数）。"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:  # noqa: N802
+        self.rfile.read(int(self.headers["Content-Length"]))
+        chunks = ['{"conclusion":"房东应退还押金。",', '"analysis":["根据民法']
+        raw = "".join(f"data: {json.dumps({'choices': [{'delta': {'content': c}}]}, ensure_ascii=False)}\n\n" for c in chunks)
+        body = raw.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Content-Length", str(len(body) + 4096))
+        self.end_headers()
+        self.wfile.write(body)
+        self.wfile.flush()
+        self.close_connection = True
+
+    def log_message(self, *args) -> None:
+        return
+
+
+class LlmCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_patch = patch.object(
+            llm_cache.settings, "llm_cache_db_path", str(Path(self.tmpdir.name) / "llm_cache.db")
+        )
+        self.db_patch.start()
+        llm_cache.clear()
+
+    def tearDown(self) -> None:
+        llm_cache.clear()
+        self.db_patch.stop()
+        self.tmpdir.cleanup()
+
+    def test_key_normalizes_whitespace_and_skips_high_temperature(self) -> None:
+        self.assertEqual(llm_cache.cache_key(_payload("房东  不退\n押金")), llm_cache.cache_key(_payload("房东 不退 押金")))
+        self.assertIsNone(llm_cache.cache_key(_payload("房东不退押金", temperature=0.6)))
+        self.assertIsNotNone(llm_cache.cache_key(_payload("房东不退押金", temperature=0.6), force=True))
+        self.assertIsNone(llm_cache.cache_key({**_payload("x"), "stream": True}))
+
+    def test_entries_survive_restart(self) -> None:
+        key = llm_cache.cache_key(_payload("房东不退押金"))
+        llm_cache.put(key, "m", "cached-body", latency_ms=850.0)
+
+        with llm_cache._CACHE_LOCK:
+            llm_cache._CACHE.clear()
+        self.assertEqual(llm_cache.warm(), 1)
+        stats = llm_cache.begin_request_stats()
+        self.assertEqual(llm_cache.get(key), "cached-body")
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["saved_ms"], 850.0)
+
+    def test_ttl_and_size_bounds(self) -> None:
+        with patch.object(llm_cache.settings, "llm_cache_max_entries", 2):
+            keys = [llm_cache.cache_key(_payload(f"q{i}")) for i in range(3)]
+            for key in keys:
+                llm_cache.put(key, "m", "body", latency_ms=1.0)
+            self.assertIsNone(llm_cache.get(keys[0]))
+            self.assertEqual(llm_cache.get(keys[2]), "body")
+
+        with patch("app.services.llm_cache.time.time", return_value=llm_cache.time.time() + 10 * 24 * 3600):
+            self.assertIsNone(llm_cache.get(keys[2]))
+
+    def test_rewrite_request_is_served_from_cache(self) -> None:
+        resp = MagicMock(text='{"choices": [{"message": {"content": "租房押金不退怎么办"}}]}')
+        with patch("app.services.chat.http_client.arequest", return_value=resp) as request:
+            first = asyncio.run(chat_service._chat_completion_request_async(_payload("改写", temperature=0.1)))
+            second = asyncio.run(chat_service._chat_completion_request_async(_payload("改写", temperature=0.1)))
+        self.assertEqual(first, second)
+        request.assert_called_once()
+        self.assertEqual(llm_cache.get_stats()["hits"], 1)
+
+    def test_case_calls_share_the_response_body_format(self) -> None:
+        body = '{"choices": [{"message": {"content": " 请陈述诉讼请求 "}}]}'
+        resp = MagicMock(text=body)
+        resp.json.return_value = json.loads(body)
+        with patch("app.services.case.http_client.request", return_value=resp) as request, patch(
+            "app.services.case.llm_usage.record"
+        ):
+            key = llm_cache.cache_key(
+                {
+                    "model": case_service.settings.resolved_llm_model(),
+                    "messages": [{"role": "system", "content": "法官"}, {"role": "user", "content": "开庭"}],
+                    "temperature": 0.6,
+                },
+                force=True,
+            )
+            # 旧版本直接存正文的条目不被当成响应体返回，重新请求后覆盖。
+            llm_cache.put(key, "m", "旧正文", latency_ms=1.0)
+            first = case_service._llm_call("法官", "开庭", cacheable=True)
+            second = case_service._llm_call("法官", "开庭", cacheable=True)
+        self.assertEqual((first, second), ("请陈述诉讼请求", "请陈述诉讼请求"))
+        request.assert_called_once()
+        self.assertEqual(llm_cache.get(key), body)
+
+    def test_stream_cut_off_midway_is_neither_returned_nor_cached(self) -> None:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _CutOffStream)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        conclusions: list[str] = []
+        messages = [{"role": "user", "content": "房东不退押金怎么办"}]
+
+        async def run() -> str | None:
+            try:
+                return await chat_service._chat_completion_json_streamed_async(messages, "m", 160, 0.0, conclusions.append)
+            finally:
+                await http_client.aclose_client()
+
+        with patch.multiple(
+            llm_cache.settings,
+            llm_base_url=f"http://127.0.0.1:{server.server_address[1]}",
+            llm_api_key="k",
+            llm_context_cache_enabled=False,
+            llm_hedge_enabled=False,
+            circuit_breaker_enabled=False,
+        ):
+            self.assertIsNone(asyncio.run(run()))
+        circuit_breaker.reset()
+        self.assertEqual(conclusions, ["房东应退还押金。"])
+        payload = {"model": "m", "messages": messages, "temperature": 0.0, "max_tokens": 160}
+        self.assertIsNone(llm_cache.get(llm_cache.cache_key(payload)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from app.schemas.chat import ChatRequest
+from app.services import chat as chat_service
+from app.services import llm_hedge
+
+
+class LlmHedgeTests(unittest.TestCase):
+    def setUp(self) -> None:
+        llm_hedge.reset()
+        patcher = patch.multiple(
+            "app.services.llm_hedge.settings",
+            llm_hedge_delay_ms=30,
+            llm_hedge_min_delay_ms=0,
+            llm_hedge_min_samples=5,
+            llm_hedge_percentile=0.9,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(llm_hedge.reset)
+
+    def test_delay_follows_latency_percentile_once_enough_samples(self) -> None:
+        self.assertAlmostEqual(llm_hedge.hedge_delay_sec(llm_hedge.RESPONSE), 0.03)
+        for latency in (100, 200, 300, 400, 1000):
+            llm_hedge.record_latency(llm_hedge.RESPONSE, latency)
+        self.assertAlmostEqual(llm_hedge.hedge_delay_sec(llm_hedge.RESPONSE), 1.0)
+        self.assertAlmostEqual(llm_hedge.hedge_delay_sec(llm_hedge.FIRST_TOKEN), 0.03)
+
+    def test_fast_primary_is_not_hedged(self) -> None:
+        hedge_calls: list[str] = []
+
+        async def primary():
+            return "default"
+
+        async def hedge():
+            hedge_calls.append("fast")
+            return "fast"
+
+        async def run():
+            stats = llm_hedge.begin_request_stats()
+            return await llm_hedge.race(primary, hedge, "m-default", "m-fast"), stats
+
+        result, stats = asyncio.run(run())
+        self.assertEqual(result, "default")
+        self.assertEqual(hedge_calls, [])
+        self.assertEqual(stats, {"hedged": False, "hedge_won": False, "winner": "m-default"})
+
+    def test_slow_primary_is_hedged_and_loser_cancelled(self) -> None:
+        async def run():
+            cancelled = asyncio.Event()
+
+            async def primary():
+                try:
+                    await asyncio.sleep(1)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+                return "default"
+
+            async def hedge():
+                return "fast"
+
+            stats = llm_hedge.begin_request_stats()
+            result = await llm_hedge.race(primary, hedge, "m-default", "m-fast")
+            await asyncio.sleep(0)
+            return result, stats, cancelled.is_set()
+
+        result, stats, cancelled = asyncio.run(run())
+        self.assertEqual(result, "fast")
+        self.assertTrue(cancelled)
+        self.assertEqual(stats, {"hedged": True, "hedge_won": True, "winner": "m-fast"})
+
+    def test_hedged_stream_switches_to_model_with_first_token(self) -> None:
+        closed: list[str] = []
+
+        async def slow_stream():
+            try:
+                await asyncio.sleep(1)
+                yield "慢"
+            finally:
+                closed.append("default")
+
+        async def fast_stream():
+            for chunk in ("快速", "回答"):
+                await asyncio.sleep(0)
+                yield chunk
+
+        async def run():
+            stream = llm_hedge.HedgedStream(slow_stream, fast_stream, "m-default", "m-fast")
+            chunks = [chunk async for chunk in stream]
+            return chunks, stream
+
+        chunks, stream = asyncio.run(run())
+        self.assertEqual(chunks, ["快速", "回答"])
+        self.assertTrue(stream.hedged)
+        self.assertEqual(stream.winner, "m-fast")
+        self.assertEqual(closed, ["default"])
+
+    def test_answer_generation_hedges_default_model_only_when_enabled(self) -> None:
+        calls: list[str] = []
+
+        async def completion(messages, model, max_tokens, temperature=0.2, stage="other"):
+            calls.append(model)
+            await asyncio.sleep(0.5 if model == "m-default" else 0)
+            return '{"conclusion":"%s","analysis":[],"actions":[],"emotion":"calm","citation_chunk_ids":[]}' % model
+
+        req = ChatRequest(session_id="s_hedge", text="房东不退押金怎么办", mode="chat", model_variant="default")
+        evidence = [{"chunk_id": "c1", "law_name": "民法典", "text": "押金返还", "source_type": "law"}]
+        with (
+            patch("app.services.chat.settings.llm_hedge_enabled", True),
+            patch("app.services.chat.settings.ark_model", "m-default"),
+            patch("app.services.chat.settings.llm_model", ""),
+            patch("app.services.chat.settings.llm_fast_model", "m-fast"),
+            patch("app.services.chat._chat_completion_text_async", side_effect=completion),
+        ):
+            answer = asyncio.run(chat_service._ask_ark_async(req, evidence))
+            self.assertEqual(answer.conclusion, "m-fast")
+            self.assertEqual(calls, ["m-default", "m-fast"])
+
+            calls.clear()
+            fast_req = req.model_copy(update={"model_variant": "fast"})
+            asyncio.run(chat_service._ask_ark_async(fast_req, evidence))
+            self.assertEqual(calls, ["m-fast"])
+
+
+if __name__ == "__main__":
+    unittest.main()
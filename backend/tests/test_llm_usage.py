@@ -0,0 +1,108 @@
+import asyncio
+import json
+import tempfile
+import unittest
+from contextlib import asynccontextmanager
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services import chat as chat_service
+from app.services import llm_usage
+from app.services import metrics as metrics_service
+
+
+class LlmUsageTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        for name, value in {
+            "metrics_db_path": str(Path(tmpdir.name) / "metrics.db"),
+            "llm_cache_enabled": False,
+        }.items():
+            patcher = patch.object(settings, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        llm_usage.drain()
+        self.addCleanup(llm_usage.drain)
+
+    def test_non_stream_call_records_usage_per_stage(self) -> None:
+        body = {"choices": [{"message": {"content": "改写后的问题"}}], "usage": {"prompt_tokens": 120, "completion_tokens": 8}}
+        stats = llm_usage.begin_request_stats()
+        with patch("app.services.chat.http_client.arequest", return_value=MagicMock(text=json.dumps(body, ensure_ascii=False))):
+            content = asyncio.run(
+                chat_service._chat_completion_text_async([{"role": "user", "content": "改写"}], model="m", max_tokens=60, stage="rewrite")
+            )
+        with patch("app.services.chat.http_client.arequest", side_effect=chat_service.http_client.UpstreamError("boom")):
+            asyncio.run(
+                chat_service._chat_completion_text_async([{"role": "user", "content": "x"}], model="m", max_tokens=10, stage="expansion")
+            )
+
+        self.assertEqual(content, "改写后的问题")
+        rows = llm_usage.drain()
+        self.assertEqual([(row["stage"], row["ok"]) for row in rows], [("rewrite", True), ("expansion", False)])
+        self.assertEqual((rows[0]["prompt_tokens"], rows[0]["completion_tokens"]), (120, 8))
+        self.assertEqual(rows[0]["ttft_ms"], rows[0]["duration_ms"])
+        self.assertIsNone(rows[1]["ttft_ms"])
+        self.assertEqual(stats, {"calls": 2, "prompt_tokens": 120, "completion_tokens": 8, "cached_tokens": 0})
+
+    def test_stream_requests_usage_and_measures_first_token(self) -> None:
+        lines = [
+            'data: {"choices":[{"delta":{"role":"assistant"}}]}',
+            'data: {"choices":[{"delta":{"content":"押金"}}]}',
+            'data: {"choices":[{"delta":{"content":"应返还"}}]}',
+            'data: {"choices":[],"usage":{"prompt_tokens":300,"completion_tokens":12}}',
+            "data: [DONE]",
+        ]
+        payloads: list[dict] = []
+
+        @asynccontextmanager
+        async def fake_astream(_method, _url, json, **_kwargs):
+            payloads.append(json)
+
+            async def aiter_lines():
+                for line in lines:
+                    yield line
+
+            yield MagicMock(aiter_lines=aiter_lines)
+
+        async def run() -> list[str]:
+            return [chunk async for chunk in chat_service._chat_completion_stream_async([{"role": "user", "content": "x"}], "m", 64)]
+
+        with patch("app.services.chat.http_client.astream", side_effect=fake_astream):
+            chunks = asyncio.run(run())
+
+        self.assertEqual(chunks, ["押金", "应返还"])
+        self.assertTrue(payloads[0]["stream_options"]["include_usage"])
+        (row,) = llm_usage.drain()
+        self.assertEqual((row["stage"], row["stream"], row["prompt_tokens"], row["completion_tokens"]), ("answer", True, 300, 12))
+        self.assertIsNotNone(row["ttft_ms"])
+        self.assertLessEqual(row["ttft_ms"], row["duration_ms"])
+
+    def test_calls_are_flushed_with_api_metrics_and_summarized_by_stage_and_model(self) -> None:
+        llm_usage.record("answer", "m-default", 400, 60, 900.0, 2400.0, stream=True)
+        llm_usage.record("answer", "m-default", 200, 40, 700.0, 1600.0, stream=True, cached_tokens=150)
+        llm_usage.record("rewrite", "m-fast", 80, 10, 300.0, 300.0)
+        metrics_service.record_api_call("chat", True, 200, 2500.0, request_id="r1", meta={})
+        self.assertEqual(llm_usage.drain(), [])
+        llm_usage.record("summary", "m-fast", None, None, None, 50.0, ok=False)
+
+        resp = TestClient(app).get("/api/admin/metrics/llm-usage")
+        self.assertEqual(resp.status_code, 200)
+        payload = resp.json()
+        self.assertEqual((payload["total_calls"], payload["prompt_tokens"], payload["completion_tokens"]), (4, 680, 110))
+        items = {(item["stage"], item["model"]): item for item in payload["items"]}
+        answer = items[("answer", "m-default")]
+        self.assertEqual((answer["calls"], answer["stream_calls"], answer["avg_prompt_tokens"]), (2, 2, 300.0))
+        self.assertEqual(answer["ttft"]["p50_ms"], 800.0)
+        self.assertEqual(answer["duration"]["avg_ms"], 2000.0)
+        self.assertEqual((answer["cached_calls"], answer["cached_tokens"], answer["ttft_saved_ms"]), (1, 150, 200.0))
+        summary = items[("summary", "m-fast")]
+        self.assertEqual((summary["calls"], summary["ok"], summary["duration"]["sample_size"]), (1, 0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
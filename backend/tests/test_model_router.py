@@ -0,0 +1,65 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.schemas.chat import AnswerJson
+from app.schemas.runtime_config import RuntimeConfig
+from app.services import model_router
+from app.services.chat import analyze_query
+from app.services.model_router import settings
+
+_EVIDENCE = [
+    {"chunk_id": "c1", "law_name": "民法典", "article_no": "第七百零三条", "text": "租赁合同押金返还", "score": 0.82},
+    {"chunk_id": "c2", "law_name": "民法典", "article_no": "第七百零四条", "text": "租赁合同内容", "score": 0.61},
+]
+
+
+class ModelRouterTests(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = patch.multiple(settings, llm_model="model-default", llm_fast_model="model-fast")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.runtime = RuntimeConfig()
+
+    def _route(self, text: str, history=None, evidence=_EVIDENCE, requested: str = "auto", runtime=None):
+        return model_router.route(requested, analyze_query(text), history or [], evidence, runtime or self.runtime)
+
+    def test_simple_single_topic_question_goes_fast(self) -> None:
+        decision = self._route("房东不退押金怎么办？")
+        self.assertEqual((decision.variant, decision.routed, decision.reason), ("fast", True, "simple"))
+        self.assertEqual(decision.features["score_gap"], 0.21)
+
+    def test_complex_signals_keep_the_default_model(self) -> None:
+        long_text = "我和室友合租，房东不退押金，还说我们弄坏了家具要扣钱，合同里没写清楚，我们有入住时的照片和聊天记录，应该怎么办？"
+        self.assertEqual(self._route(long_text).reason, "long_query")
+        self.assertEqual(self._route("租房押金被扣，工资也被拖欠怎么办").reason, "multi_topic")
+        history = [{"role": "user", "content": "a"}, {"role": "assistant", "content": "b"}] * 2
+        self.assertEqual(self._route("房东不退押金怎么办？", history=history).reason, "deep_history")
+        close = [dict(_EVIDENCE[0]), dict(_EVIDENCE[1], score=0.80)]
+        decision = self._route("房东不退押金怎么办？", evidence=close)
+        self.assertEqual((decision.variant, decision.reason), ("default", "ambiguous_evidence"))
+
+    def test_explicit_variant_disabled_routing_and_missing_fast_model(self) -> None:
+        self.assertEqual(self._route("房东不退押金怎么办？", requested="default").reason, "client")
+        disabled = self._route("房东不退押金怎么办？", runtime=RuntimeConfig(model_routing_enabled=False))
+        self.assertEqual((disabled.variant, disabled.reason), ("default", "routing_disabled"))
+        with patch.object(settings, "llm_fast_model", ""):
+            self.assertEqual(self._route("房东不退押金怎么办？").reason, "no_fast_model")
+
+    @patch("app.api.v1.chat.session_store.save_chat_history_async")
+    @patch("app.api.v1.chat.session_store.get_chat_history_async", side_effect=lambda _session_id: [])
+    @patch("app.api.v1.chat.chat_service.build_answer_async")
+    @patch("app.api.v1.chat.knowledge_service.search_async", return_value=_EVIDENCE)
+    def test_chat_uses_routed_variant_downstream(self, _search, mock_build_answer, _history, _save) -> None:
+        mock_build_answer.return_value = AnswerJson(conclusion="押金应依约返还", analysis=[], actions=[], citations=[], emotion="calm")
+        with patch("app.api.v1.chat.runtime_config_service.get_runtime_config", return_value=self.runtime):
+            resp = TestClient(app).post("/api/chat", json={"session_id": "s-route", "text": "房东不退押金怎么办？", "enable_tts": False})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["model_variant"], "fast")
+        self.assertEqual(mock_build_answer.call_args.args[0].model_variant, "fast")
+
+
+if __name__ == "__main__":
+    unittest.main()
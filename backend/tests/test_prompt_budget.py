@@ -0,0 +1,65 @@
+import unittest
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.schemas.chat import ChatRequest
+from app.services import chat as chat_service
+from app.services import prompt_budget
+
+
+class PromptBudgetTests(unittest.TestCase):
+    def test_estimate_and_truncate(self) -> None:
+        self.assertEqual(prompt_budget.estimate_tokens("民法典第703条 deposit，押金"), 11)
+        self.assertEqual(prompt_budget.truncate_to_tokens("租赁合同押金", 10), "租赁合同押金")
+        cut = prompt_budget.truncate_to_tokens("租赁合同是出租人将租赁物交付承租人使用", 6)
+        self.assertEqual(cut, "租赁合同是" + prompt_budget.ELLIPSIS)
+        self.assertLessEqual(prompt_budget.estimate_tokens(cut), 6)
+
+    def test_allocate_gives_short_items_what_they_need_and_the_rest_by_weight(self) -> None:
+        self.assertEqual(prompt_budget.allocate([300, 50, 200], [0.9, 0.8, 0.3], 400, floor=60), [232, 50, 117])
+        self.assertEqual(prompt_budget.allocate([30, 40], [0.1, 0.9], 400, floor=60), [30, 40])
+        self.assertEqual(prompt_budget.allocate([], [], 400), [])
+
+    def test_answer_prompt_spends_evidence_budget_by_relevance(self) -> None:
+        evidence = [
+            {"chunk_id": "long", "law_name": "民法典", "article_no": "第七百零三条", "text": "租" * 600, "score": 0.9},
+            {"chunk_id": "short", "law_name": "民法典", "article_no": "第七百零四条", "text": "押金应返还", "score": 0.8},
+            {"chunk_id": "weak", "law_name": "民法典", "article_no": "第五百零九条", "text": "履" * 600, "score": 0.3},
+        ]
+        history = [{"role": "user", "content": "旧" * 400}, {"role": "assistant", "content": "答" * 400}] * 2
+        req = ChatRequest(session_id="s", text="问" * 500)
+        with patch.multiple(
+            settings,
+            prompt_evidence_token_budget=400,
+            prompt_evidence_min_tokens=60,
+            prompt_history_token_budget=200,
+            prompt_question_token_budget=100,
+        ):
+            messages = chat_service._build_answer_messages(req, evidence, history)
+
+        evidence_text, question = messages[-1]["content"].split("\n\n问题：")
+        self.assertIn("内容=押金应返还\n", evidence_text)
+        self.assertEqual(evidence_text.count("租"), 265)
+        self.assertEqual(evidence_text.count("履"), 127)
+        recent = messages[1:-1]
+        self.assertEqual(len(recent), 4)
+        # 历史预算平均分成每条 50 token 的固定上限。
+        self.assertEqual([prompt_budget.estimate_tokens(item["content"]) for item in recent], [50] * 4)
+        self.assertEqual(prompt_budget.estimate_tokens(question), 100)
+
+    def test_history_messages_are_cut_the_same_way_on_every_turn(self) -> None:
+        first_turn = [{"role": "user", "content": "押" * 300}, {"role": "assistant", "content": "答" * 300}]
+        next_turn = [*first_turn, {"role": "user", "content": "还能起诉吗"}, {"role": "assistant", "content": "可以"}]
+        summary = {"role": "system", "content": "此前对话摘要：押金纠纷"}
+        req = ChatRequest(session_id="s", text="需要什么证据")
+        before = chat_service._build_answer_messages(req, [], first_turn)
+        after = chat_service._build_answer_messages(req, [], [summary, *next_turn])
+
+        self.assertEqual(after[: len(before) - 1], before[:-1])
+        # 每轮都变的摘要放进最后一条 user 消息，不打断前面的稳定前缀。
+        self.assertEqual([item["role"] for item in after], ["system", "user", "assistant", "user", "assistant", "user"])
+        self.assertTrue(after[-1]["content"].startswith("此前对话摘要：押金纠纷\n\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
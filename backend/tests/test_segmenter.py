@@ -0,0 +1,39 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app.services import knowledge as knowledge_service
+from app.services import segmenter
+
+
+class SegmenterTests(unittest.TestCase):
+    def tearDown(self) -> None:
+        segmenter.reset_segmenter()
+
+    def test_bidirectional_max_match_prefers_fewer_segments(self) -> None:
+        seg = segmenter.Segmenter(["研究", "研究生", "生命", "起源"])
+        self.assertEqual(seg.segment("研究生命起源"), ["研究", "生命", "起源"])
+        seg = segmenter.Segmenter(["劳动", "劳动合同", "合同", "解除"])
+        self.assertEqual(seg.segment("解除劳动合同"), ["解除", "劳动合同"])
+
+    def test_query_sentence_becomes_proper_terms(self) -> None:
+        terms = knowledge_service._extract_query_terms("房东不退押金怎么办")
+        self.assertNotIn("房东不退押金怎么办", terms)
+        self.assertEqual(terms[:3], ["房东", "不退", "押金"])
+        self.assertNotIn("怎么办", terms)
+        self.assertIn("交接记录", segmenter.query_terms("我有租赁合同和交接记录"))
+
+    def test_mined_vocabulary_file_extends_builtin_terms(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "vocab.txt"
+            path.write_text("# comment\n治安管理处罚法\t12\n宅基地\t30\n", encoding="utf-8")
+            with patch.object(segmenter.settings, "legal_vocab_path", str(path)):
+                segmenter.reset_segmenter()
+                terms = segmenter.query_terms("邻居占了我家宅基地还违反治安管理处罚法吗")
+        self.assertIn("宅基地", terms)
+        self.assertIn("治安管理处罚法", terms)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import asyncio
 import uuid
 from pathlib import Path
 from unittest.mock import patch
@@ -116,17 +117,11 @@ def test_s1_runtime_config_can_round_trip(client):
 
 @pytest.mark.sprint2
 def test_s2_chat_returns_structured_payload(client, monkeypatch):
-    monkeypatch.setattr(
-        "app.api.v1.chat.knowledge_service.search",
-        lambda query, top_k=5: [{"chunk_id": "c1", "law_name": "民法典", "article_no": "第一条"}],
-    )
-    monkeypatch.setattr(
-        "app.api.v1.chat.runtime_config_service.get_runtime_config",
-        lambda: RuntimeConfig(reject_without_evidence=True, strict_citation_check=False, chat_top_k=5),
-    )
-    monkeypatch.setattr(
-        "app.api.v1.chat.chat_service.build_answer",
-        lambda req, evidence, history=None: AnswerJson(
+    async def fake_search(query, top_k=5):
+        return [{"chunk_id": "c1", "law_name": "民法典", "article_no": "第一条"}]
+
+    async def fake_build_answer(req, evidence, history=None, analysis=None, on_conclusion=None):
+        return AnswerJson(
             conclusion="测试结论",
             analysis=["分析A"],
             actions=["建议A"],
@@ -134,8 +129,14 @@ def test_s2_chat_returns_structured_payload(client, monkeypatch):
             assumptions=["假设A"],
             follow_up_questions=["追问A"],
             emotion="calm",
-        ),
+        )
+
+    monkeypatch.setattr("app.api.v1.chat.knowledge_service.search_async", fake_search)
+    monkeypatch.setattr(
+        "app.api.v1.chat.runtime_config_service.get_runtime_config",
+        lambda: RuntimeConfig(reject_without_evidence=True, strict_citation_check=False, chat_top_k=5),
     )
+    monkeypatch.setattr("app.api.v1.chat.chat_service.build_answer_async", fake_build_answer)
     resp = client.post("/api/chat", json={"session_id": "s2_1", "text": "租房纠纷", "mode": "chat", "case_state": None})
     assert resp.status_code == 200
     answer = resp.json()["answer_json"]
@@ -153,10 +154,10 @@ def test_s2_no_local_evidence_returns_external_disclaimer():
         "app.services.chat.get_runtime_config",
         return_value=RuntimeConfig(reject_without_evidence=True, strict_citation_check=True),
     ), patch(
-        "app.services.chat.web_search_service.search_public_web",
+        "app.services.chat.web_search_service.search_public_web_async",
         return_value=[],
     ):
-        result = chat_service.build_answer(chat_service.ChatRequest(**req), evidence=[])
+        result = asyncio.run(chat_service.build_answer_async(chat_service.ChatRequest(**req), evidence=[]))
     assert result.emotion == "supportive"
     assert result.citations == []
     assert "本地知识库没有直接命中" in result.conclusion
@@ -186,8 +187,11 @@ def test_s2_guard_filters_invalid_citations(monkeypatch):
         "app.services.chat.get_runtime_config",
         lambda: RuntimeConfig(reject_without_evidence=True, strict_citation_check=True),
     )
-    monkeypatch.setattr("app.services.chat._ask_ark", lambda *_: fake_answer)
-    result = chat_service.build_answer(req, evidence=evidence)
+    async def fake_ask_ark(*_args, **_kwargs):
+        return fake_answer
+
+    monkeypatch.setattr("app.services.chat._ask_ark_async", fake_ask_ark)
+    result = asyncio.run(chat_service.build_answer_async(req, evidence=evidence))
     assert result.citations == []
     assert result.emotion == "serious"
 
@@ -0,0 +1,96 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app.services import http_client
+from app.services import web_search
+
+_PAGE = """
+<div class="result results_links web-result"><div class="links_main links_deep result__body">
+  <h2 class="result__title">
+    <a rel="nofollow" class="result__a" href="//duckduckgo.com/l/?uddg=https%3A%2F%2Flaw.example.com%2Fa&amp;rut=x">押金 <b>返还</b> 规定</a>
+  </h2>
+  <a class="result__snippet" href="#">出租人应当返还押金 &amp; 利息，<b>民法典</b>第七百零三条。</a>
+</div></div>
+<div class="result"><div class="result__body">
+  <a class="result__a" href="https://court.example.com/b">拖欠工资  维权</a>
+  <div class="result__snippet">向劳动仲裁委员会申请<span>仲裁</span></div>
+</div></div>
+<div class="result"><div class="result__body"><a class="result__a" href="">无链接</a></div></div>
+"""
+
+
+def _response(body: str = _PAGE) -> SimpleNamespace:
+    return SimpleNamespace(content=body.encode("utf-8"))
+
+
+class WebSearchTests(unittest.TestCase):
+    def setUp(self) -> None:
+        web_search.clear_cache()
+        self.addCleanup(web_search.clear_cache)
+
+    def test_single_pass_parser_extracts_titles_snippets_and_unwrapped_urls(self) -> None:
+        hits = web_search._parse_results(_PAGE, limit=5)
+        self.assertEqual(
+            hits,
+            [
+                web_search.WebSearchHit(
+                    title="押金 返还 规定",
+                    snippet="出租人应当返还押金 & 利息，民法典第七百零三条。",
+                    url="https://law.example.com/a",
+                ),
+                web_search.WebSearchHit(title="拖欠工资 维权", snippet="向劳动仲裁委员会申请仲裁", url="https://court.example.com/b"),
+            ],
+        )
+        self.assertEqual(len(web_search._parse_results(_PAGE, limit=1)), 1)
+
+    def test_hits_and_empty_results_are_cached_per_normalized_query(self) -> None:
+        with patch("app.services.web_search.http_client.request", return_value=_response()) as request:
+            first = web_search.search_public_web("房东不退押金  法律", limit=1)
+            second = web_search.search_public_web("房东不退押金 法律", limit=4)
+        self.assertEqual(request.call_count, 1)
+        self.assertEqual(len(first), 1)
+        self.assertEqual(len(second), 2)
+
+        with patch("app.services.web_search.http_client.request", return_value=_response("<html></html>")) as request:
+            self.assertEqual(web_search.search_public_web("冷门问题"), [])
+            self.assertEqual(web_search.search_public_web("冷门问题"), [])
+        self.assertEqual(request.call_count, 1)
+
+    def test_failure_backs_off_all_searches_until_it_expires(self) -> None:
+        with patch(
+            "app.services.web_search.http_client.request", side_effect=http_client.UpstreamError("ReadTimeout: timed out")
+        ) as request:
+            self.assertEqual(web_search.search_public_web("问题一"), [])
+            self.assertEqual(web_search.search_public_web("问题二"), [])
+            self.assertEqual(asyncio.run(web_search.search_public_web_async("问题三")), [])
+        self.assertEqual(request.call_count, 1)
+
+        with web_search._CACHE_LOCK:
+            web_search._BACKOFF["until"] = 0.0
+        with patch("app.services.web_search.http_client.request", return_value=_response()) as request:
+            self.assertEqual(len(web_search.search_public_web("问题二")), 2)
+        self.assertEqual(web_search._BACKOFF["failures"], 0)
+
+    def test_concurrent_async_searches_share_one_upstream_call(self) -> None:
+        calls = 0
+
+        async def arequest(*_args, **_kwargs):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.02)
+            return _response()
+
+        async def run():
+            return await asyncio.gather(*(web_search.search_public_web_async("网购 假货 取证", limit=2) for _ in range(5)))
+
+        with patch("app.services.web_search.http_client.arequest", side_effect=arequest):
+            results = asyncio.run(run())
+        self.assertEqual(calls, 1)
+        self.assertTrue(all(len(hits) == 2 for hits in results))
+        self.assertEqual(web_search._INFLIGHT, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -47,6 +47,14 @@ const DEFAULT_GESTURE_BY_EMOTION: Record<AvatarEmotion, AvatarGesture> = {
 };
 
 let callbacksBound = false;
+// Sentence-level audio streamed by /api/chat/stream, played back in arrival order.
+type QueuedAvatarAudio = {
+  audioUrl: string;
+  subtitleText: string;
+  emotion: AvatarEmotion;
+  gesture: string;
+};
+const avatarAudioQueue: QueuedAvatarAudio[] = [];
 const avatarAudioOptions: Required<AvatarAudioOptions> = {
   rate: 1,
   volume: 1,
@@ -128,6 +136,9 @@ function handleUnityEvent(eventName: UnityEvent): void {
     avatarState.ready = true;
   } else if (eventName === "OnPlayFinished") {
     avatarState.isPlaying = false;
+    if (playNextQueuedAudio()) {
+      return;
+    }
     setAvatarPose("idle", "calm");
   }
 }
@@ -192,6 +203,34 @@ export function playAvatar(
   console.log("[TTS] playback source=unity-only");
 }
 
+export function enqueueAvatarAudio(
+  audioUrl: string,
+  subtitleText: string,
+  emotion: AvatarEmotion = avatarState.emotion,
+  gesture: string = getDefaultGestureForEmotion(emotion),
+): void {
+  if (!audioUrl.trim()) {
+    return;
+  }
+  avatarAudioQueue.push({ audioUrl, subtitleText, emotion, gesture });
+  if (!avatarState.isPlaying) {
+    playNextQueuedAudio();
+  }
+}
+
+export function clearAvatarAudioQueue(): void {
+  avatarAudioQueue.length = 0;
+}
+
+function playNextQueuedAudio(): boolean {
+  const next = avatarAudioQueue.shift();
+  if (!next) {
+    return false;
+  }
+  playAvatar(next.audioUrl, next.subtitleText, next.emotion, next.gesture);
+  return true;
+}
+
 export function setAvatarAudioOptions(options: AvatarAudioOptions): void {
   if (typeof options.rate === "number" && Number.isFinite(options.rate)) {
     avatarAudioOptions.rate = Math.min(2, Math.max(0.5, options.rate));
@@ -203,6 +242,7 @@ export function setAvatarAudioOptions(options: AvatarAudioOptions): void {
 }
 
 export function stopAvatar(): void {
+  clearAvatarAudioQueue();
   avatarState.isPlaying = false;
   sendAvatarCommand({ gesture: "idle", emotion: "calm", text: "", audioUrl: "" });
   if (typeof window !== "undefined") {
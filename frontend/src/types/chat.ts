@@ -42,6 +42,16 @@ export type ChatApiResponse = {
 
 export type ChatStreamEvent =
   | { type: "status"; phase: string }
+  | { type: "evidence"; citations?: unknown[] }
   | { type: "delta"; text: string }
-  | { type: "final"; answer_json?: Record<string, unknown>; audio_url?: string | null; tts_job_id?: string | null }
+  | { type: "citations"; chunk_ids?: string[]; citations?: unknown[] }
+  | { type: "audio"; seq: number; text: string; audio_url: string }
+  | {
+      type: "final";
+      answer_json?: Record<string, unknown>;
+      audio_url?: string | null;
+      audio_segments?: number;
+      audio_streaming?: boolean;
+      tts_job_id?: string | null;
+    }
   | { type: "error"; detail?: string };